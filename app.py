@@ -1,19 +1,35 @@
 import os
 import sqlite3
 import logging
+import mimetypes
+import multiprocessing
 from flask import Flask, g, session, redirect, url_for, request
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 
+def in_pool_worker():
+    """Whether this is a process pool worker (document extraction, Monte Carlo).
+
+    spawn and forkserver workers re-import the parent's __main__ (main.py or
+    app.py), and with it create_app(), before running any task. Their process
+    name is set before that import, so it tells them apart from the server."""
+    return multiprocessing.current_process().name != 'MainProcess'
+
 def create_app():
     app = Flask(__name__)
+    # Workers only need the modules imported; no database setup or scheduler
+    worker = in_pool_worker()
     app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
-    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+    # X-Forwarded-For is only trusted for the proxies we actually run behind;
+    # without one, clients could pick their own remote_addr (and login throttle key)
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ.get('TRUSTED_PROXY_HOPS', 0)),
+                            x_proto=1, x_host=1)
     
     # Database configuration
     DATABASE = 'civilsaas.db'
+    app.config['DATABASE'] = DATABASE
     
     def get_db():
         """Get database connection with row factory for dict-like access"""
@@ -28,9 +44,25 @@ def create_app():
         if db is not None:
             db.close()
     
+    # Columns added after a table was first created; CREATE TABLE IF NOT EXISTS
+    # in schema.sql won't add them to existing databases
+    COLUMN_MIGRATIONS = [
+        ('purchase_orders', 'delivered_date', 'DATE'),
+    ]
+    
+    def migrate_columns(db):
+        """Add missing columns to tables that already exist"""
+        for table, column, definition in COLUMN_MIGRATIONS:
+            columns = {row['name'] for row in db.execute(f'PRAGMA table_info({table})')}
+            if columns and column not in columns:
+                db.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    
     def init_db():
         """Initialize database with schema"""
         db = get_db()
+        # WAL lets request handlers read while background jobs write
+        db.execute('PRAGMA journal_mode=WAL')
+        migrate_columns(db)
         with app.open_resource('schema.sql', mode='r') as f:
             db.executescript(f.read())
         db.commit()
@@ -41,12 +73,17 @@ def create_app():
     # Make get_db available to all modules
     app.get_db = get_db
     
-    # Create uploads directory
-    os.makedirs('uploads', exist_ok=True)
+    # Server-side sessions: the cookie only carries a random session id
+    from session_store import SqliteSessionInterface
+    app.session_interface = SqliteSessionInterface()
     
-    # Initialize database on first run
-    with app.app_context():
-        init_db()
+    if not worker:
+        # Create uploads directory
+        os.makedirs('uploads', exist_ok=True)
+        
+        # Initialize database on first run
+        with app.app_context():
+            init_db()
     
     # Import and register blueprints
     from blueprints.dashboard import dashboard_bp
@@ -62,6 +99,8 @@ def create_app():
     from blueprints.field import field_bp
     from blueprints.reports import reports_bp
     from blueprints.calculators import calculators_bp
+    from blueprints.search import search_bp
+    from blueprints.uploads import uploads_bp
     from auth import auth_bp
     from subscription import subscription_bp
     
@@ -80,6 +119,20 @@ def create_app():
     app.register_blueprint(field_bp, url_prefix='/field')
     app.register_blueprint(reports_bp, url_prefix='/reports')
     app.register_blueprint(calculators_bp, url_prefix='/calculators')
+    app.register_blueprint(search_bp, url_prefix='/search')
+    app.register_blueprint(uploads_bp, url_prefix='/upload-sessions')
+    
+    # Background jobs (expiry sweeps, rollups, archival)
+    from scheduler import init_scheduler
+    if not worker:
+        init_scheduler(app)
+    
+    # Subscription state for templates, from the per-process entitlement cache
+    from subscription_utils import current_entitlement
+    
+    @app.context_processor
+    def inject_entitlement():
+        return {'entitlement': current_entitlement()}
     
     # Notes and credits routes
     from flask import render_template
@@ -116,11 +169,66 @@ def create_app():
     def credits():
         return render_template('credits.html')
     
+    # Upload offload when running behind a proxy: 'x-sendfile' (Apache/lighttpd)
+    # or 'x-accel-redirect' (nginx, with an internal location at UPLOADS_ACCEL_PREFIX)
+    app.config['UPLOADS_SENDFILE'] = os.environ.get('UPLOADS_SENDFILE', '')
+    app.config['UPLOADS_ACCEL_PREFIX'] = os.environ.get('UPLOADS_ACCEL_PREFIX', '/_uploads/')
+    app.config['USE_X_SENDFILE'] = app.config['UPLOADS_SENDFILE'] == 'x-sendfile'
+    
     @app.route('/uploads/<filename>')
     def uploaded_file(filename):
-        """Serve uploaded files"""
-        from flask import send_from_directory
-        return send_from_directory('uploads', filename)
+        """Serve uploaded files to logged-in users.
+        
+        Blobs are content-addressed, so their digest is a strong ETag and the
+        response can be cached as immutable. send_file answers If-None-Match
+        and Range requests (partial PDF loading) itself."""
+        from flask import send_file, abort, make_response
+        from werkzeug.utils import secure_filename
+        from blobstore import UPLOAD_FOLDER, blob_digest
+        
+        if 'user_id' not in session:
+            abort(401)
+        
+        filename = secure_filename(filename)
+        path = os.path.join(UPLOAD_FOLDER, filename)
+        if not filename or not os.path.isfile(path):
+            abort(404)
+        
+        digest = blob_digest(filename)
+        blob = None
+        if digest:
+            blob = get_db().execute(
+                'SELECT original_name FROM upload_blobs WHERE digest = ?', (digest,)
+            ).fetchone()
+        download_name = blob['original_name'] if blob and blob['original_name'] else filename
+        download_name = os.path.basename(download_name)
+        
+        offload = app.config['UPLOADS_SENDFILE']
+        if offload == 'x-accel-redirect':
+            if digest and request.if_none_match.contains(digest):
+                response = make_response('', 304)
+            else:
+                response = make_response('')
+                response.headers['X-Accel-Redirect'] = app.config['UPLOADS_ACCEL_PREFIX'] + filename
+                response.headers['Content-Disposition'] = f'inline; filename="{secure_filename(download_name)}"'
+                response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        else:
+            # The blob store is relative to the working directory, not app.root_path
+            response = send_file(
+                os.path.abspath(path),
+                download_name=download_name,
+                conditional=True,
+                etag=digest or True,
+                max_age=None if digest else 0
+            )
+        
+        if digest:
+            response.set_etag(digest)
+            response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+        else:
+            # Legacy names can be reused for different content
+            response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     
     return app
 
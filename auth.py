@@ -1,7 +1,8 @@
 import hashlib
 import sqlite3
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, g
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
+from login_guard import login_retry_after, record_login_failure, verify_password
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -26,20 +27,30 @@ def login():
             flash('Username and password are required', 'error')
             return render_template('login.html')
         
+        # Throttled usernames and IPs are turned away before any hashing
+        retry_after = login_retry_after(username, request.remote_addr)
+        if retry_after:
+            flash(f'Too many failed attempts. Try again in {max(1, retry_after // 60)} minute(s).', 'error')
+            return render_template('login.html'), 429
+        
         db = get_db()
         user = db.execute(
             'SELECT * FROM users WHERE username = ?', (username,)
         ).fetchone()
         
-        if user and check_password_hash(user['password_hash'], password):
+        valid = verify_password(user['password_hash'], password) if user else False
+        if valid is None:
+            flash('The server is busy, please try again in a moment', 'error')
+            return render_template('login.html'), 503
+        
+        if valid:
+            session.regenerate()
             session['user_id'] = user['id']
             session['username'] = user['username']
-            session['subscription_plan'] = user['subscription_plan']
-            session['subscription_status'] = user['subscription_status']
-            session['trial_end_date'] = user['trial_end_date']
             flash(f'Welcome, {username}!', 'success')
             return redirect(url_for('dashboard.index'))
         else:
+            record_login_failure(username, request.remote_addr)
             flash('Invalid username or password', 'error')
     
     return render_template('login.html')
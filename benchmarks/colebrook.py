@@ -0,0 +1,73 @@
+"""Colebrook-White friction factors for a million pipes.
+
+Compares the vectorized fixed-iteration Newton solver with a per-pipe
+Python loop (the usual fixed-point iteration until converged), and checks
+the vectorized results against a tightly converged reference:
+
+    python benchmarks/colebrook.py [--pipes 1000000] [--loop-pipes 20000]
+
+The loop is timed on --loop-pipes pipes and scaled up, since running it
+on all of them takes minutes.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calc_engine import evaluate  # noqa: E402
+from calc_engine.friction import colebrook, FRICTION_ITERATIONS  # noqa: E402
+
+def colebrook_scalar(reynolds, relative_roughness, tolerance=1e-12):
+    """One pipe by fixed-point iteration on 1/√f, stopping on convergence"""
+    x = 8.0
+    while True:
+        updated = -2 * math.log10(relative_roughness / 3.7 + 2.51 * x / reynolds)
+        if abs(updated - x) < tolerance:
+            return 1 / updated**2
+        x = updated
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--pipes', type=int, default=10**6)
+    parser.add_argument('--loop-pipes', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    # Turbulent pipes from smooth plastic to rough concrete
+    reynolds = 10**rng.uniform(math.log10(4000), 8, args.pipes)
+    relative_roughness = 10**rng.uniform(-7, -1.5, args.pipes)
+
+    colebrook(reynolds[:1000], relative_roughness[:1000])
+    started = time.perf_counter()
+    factors = colebrook(reynolds, relative_roughness)
+    vectorized = time.perf_counter() - started
+
+    count = min(args.loop_pipes, args.pipes)
+    started = time.perf_counter()
+    reference = np.array([colebrook_scalar(re, rr) for re, rr in zip(reynolds[:count], relative_roughness[:count])])
+    loop = (time.perf_counter() - started) * args.pipes / count
+
+    error = np.max(np.abs(factors[:count] - reference) / reference)
+    x = 1 / np.sqrt(factors)
+    residual = np.max(np.abs(x + 2 * np.log10(relative_roughness / 3.7 + 2.51 * x / reynolds)))
+    print(f'{args.pipes} pipes, {FRICTION_ITERATIONS} Newton iterations from Swamee-Jain')
+    print(f'  vectorized      {vectorized:8.3f} s  ({args.pipes / vectorized / 1e6:.1f} M pipes/s)')
+    print(f'  per-pipe loop   {loop:8.3f} s  (extrapolated from {count} pipes)')
+    print(f'  speedup         {loop / vectorized:8.0f}x')
+    print(f'  max relative error vs loop {error:.1e}, max Colebrook residual {residual:.1e}')
+
+    # The full head loss formula: velocity, Reynolds, regime and friction factor
+    length = rng.uniform(10, 1000, args.pipes)
+    diameter = rng.uniform(0.02, 1.0, args.pipes)
+    flow_rate = rng.uniform(1e-5, 0.5, args.pipes)
+    started = time.perf_counter()
+    evaluate('darcy_weisbach', length=length, diameter=diameter, flow_rate=flow_rate)
+    print(f'  darcy_weisbach  {time.perf_counter() - started:8.3f} s for {args.pipes} pipes')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Direct stiffness solver on large beams and frames.
+
+Times parse and solve for a continuous beam and a multi-storey frame with
+two load cases and three combinations, and checks global equilibrium:
+
+    python benchmarks/frame_solver.py [--spans 1000] [--storeys 40] [--bays 40]
+
+Each beam span is split into 10 elements, so the defaults give a 10,000
+element beam and a 3,240 element frame.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calc_engine.frames import parse_frame, solve_frame  # noqa: E402
+
+SECTION = {'E': 2.8e7, 'A': 0.12, 'I': 0.0016}
+COMBINATIONS = {'ELU': {'G': 1.4, 'Q': 1.4}, 'ELS': {'G': 1.0, 'Q': 0.4}, 'G': {'G': 1.0}}
+
+def continuous_beam(spans, divisions=10, span=6.0):
+    count = spans * divisions
+    nodes = [{'id': f'N{i}', 'x': i * span / divisions, 'y': 0.0} for i in range(count + 1)]
+    for i in range(0, count + 1, divisions):
+        nodes[i]['support'] = 'pinned' if i == 0 else 'roller'
+    elements = [{'id': f'E{i}', 'start': f'N{i}', 'end': f'N{i + 1}'} for i in range(count)]
+    return {
+        **SECTION, 'nodes': nodes, 'elements': elements, 'combinations': COMBINATIONS,
+        'load_cases': {
+            'G': {'distributed': [{'element': f'E{i}', 'qy': -20.0} for i in range(count)]},
+            'Q': {'point': [{'element': f'E{i}', 'position': 0.3, 'fy': -15.0} for i in range(0, count, 7)]},
+        },
+    }
+
+def building_frame(storeys, bays, height=3.0, bay=6.0):
+    nodes = [
+        {'id': f'N{level}_{column}', 'x': column * bay, 'y': level * height,
+         **({'support': 'fixed'} if level == 0 else {})}
+        for level in range(storeys + 1) for column in range(bays + 1)
+    ]
+    elements = []
+    beams = []
+    for level in range(1, storeys + 1):
+        for column in range(bays + 1):
+            elements.append({'id': f'C{level}_{column}', 'start': f'N{level - 1}_{column}', 'end': f'N{level}_{column}'})
+        for column in range(bays):
+            beams.append(f'B{level}_{column}')
+            elements.append({'id': beams[-1], 'start': f'N{level}_{column}', 'end': f'N{level}_{column + 1}'})
+    return {
+        **SECTION, 'nodes': nodes, 'elements': elements, 'combinations': COMBINATIONS,
+        'load_cases': {
+            'G': {'distributed': [{'element': name, 'qy': -30.0} for name in beams]},
+            'Q': {'nodal': [{'node': f'N{level}_0', 'fx': 10.0} for level in range(1, storeys + 1)]},
+        },
+    }
+
+def run(name, data):
+    started = time.perf_counter()
+    frame = parse_frame(data)
+    parsed = time.perf_counter() - started
+    started = time.perf_counter()
+    result = solve_frame(frame)
+    solved = time.perf_counter() - started
+
+    # Reactions balance the applied loads in every combination
+    length = result['elements']['length']
+    applied_y = frame.nodal_loads[1::3].sum(axis=0) + (frame.distributed[:, 1] * length[:, None]).sum(axis=0)
+    if len(frame.point_loads):
+        applied_y += np.bincount(frame.point_loads[:, 1].astype(int), frame.point_loads[:, 4], len(frame.cases))
+    imbalance = max(
+        abs(combination['reactions']['fy'].sum() + applied_y @ frame.combinations[combination_name])
+        for combination_name, combination in result['combinations'].items()
+    )
+    print(f'{name}: {len(frame.element_ids)} elements, {result["dofs"]} dofs, bandwidth {result["bandwidth"]}')
+    print(f'  parse {parsed:6.3f} s, solve {solved:6.3f} s, vertical imbalance {imbalance:.1e} kN')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--spans', type=int, default=1000)
+    parser.add_argument('--storeys', type=int, default=40)
+    parser.add_argument('--bays', type=int, default=40)
+    args = parser.parse_args()
+    run('continuous beam', continuous_beam(args.spans))
+    run('building frame', building_frame(args.storeys, args.bays))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Legitimate login latency while attackers hammer the login path.
+
+Runs the same steps as auth.login (throttle check, password check, failure
+recording) from attacker threads and measures one legitimate user's login
+latency, with and without login_guard:
+
+    python benchmarks/login_attack.py [--attackers 32] [--rate 500] [--seconds 10]
+
+'unguarded' calls check_password_hash inline, like auth.login used to.
+'brute-force' attackers target a few accounts from a few IPs, so the
+sliding windows reject them before hashing; 'stuffing' attackers rotate
+usernames and IPs, so only the bounded pool stands between them and the CPU.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('RATE_LIMIT_FILE', os.path.join(tempfile.mkdtemp(), 'ratelimit'))
+
+from werkzeug.security import generate_password_hash, check_password_hash  # noqa: E402
+import login_guard  # noqa: E402
+
+STORED_HASH = generate_password_hash('correct horse battery staple')
+
+def guarded_login(username, ip, password):
+    if login_guard.login_retry_after(username, ip):
+        return 'throttled'
+    valid = login_guard.verify_password(STORED_HASH, password)
+    if valid is None:
+        return 'busy'
+    if not valid:
+        login_guard.record_login_failure(username, ip)
+        return 'failed'
+    return 'ok'
+
+def unguarded_login(username, ip, password):
+    return 'ok' if check_password_hash(STORED_HASH, password) else 'failed'
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float('nan')
+
+def run(name, login, attacker_identity, attackers, rate, seconds):
+    stop = threading.Event()
+    attempts = [0] * attackers
+
+    def attack(n):
+        # Each thread is one client sending its share of `rate` attempts per second
+        interval = attackers / rate
+        i = 0
+        while not stop.wait(interval):
+            username, ip = attacker_identity(n, i)
+            login(username, ip, f'guess-{i}')
+            attempts[n] += 1
+            i += 1
+
+    threads = [threading.Thread(target=attack, args=(n,), daemon=True) for n in range(attackers)]
+    for thread in threads:
+        thread.start()
+
+    latencies = []
+    outcomes = {}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        outcome = login('engineer', '10.0.0.1', 'correct horse battery staple')
+        latencies.append((time.perf_counter() - start) * 1000)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        time.sleep(0.1)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    print(f'{name:12} attacker attempts/s {sum(attempts) / seconds:6.0f}   '
+          f'legit p50 {percentile(latencies, 0.5):7.1f} ms  p95 {percentile(latencies, 0.95):7.1f} ms  '
+          f'outcomes {outcomes}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--attackers', type=int, default=32)
+    parser.add_argument('--rate', type=float, default=500, help='attempts per second, all attackers')
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    # Baseline: one login with nobody attacking
+    start = time.perf_counter()
+    check_password_hash(STORED_HASH, 'correct horse battery staple')
+    print(f'idle login {(time.perf_counter() - start) * 1000:.1f} ms, '
+          f'{args.attackers} attackers sending up to {args.rate:.0f} attempts/s')
+
+    run('unguarded', unguarded_login, lambda n, i: ('admin', f'203.0.113.{n % 4}'),
+        args.attackers, args.rate, args.seconds)
+    run('brute-force', guarded_login, lambda n, i: (f'admin{n % 4}', f'203.0.113.{n % 4}'),
+        args.attackers, args.rate, args.seconds)
+    run('stuffing', guarded_login, lambda n, i: (f'user{n}-{i}', f'198.51.{n}.{i % 256}'),
+        args.attackers, args.rate, args.seconds)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Monte Carlo throughput against the number of worker processes.
+
+Runs the same seeded bearing capacity simulation on pools of 1..N workers
+and checks that every pool size gives the identical answer:
+
+    python benchmarks/montecarlo_scaling.py [--samples 4000000] [--max-workers 8]
+
+Chunks have a fixed size (MC_CHUNK_SAMPLES) and their own spawned seeds,
+so the work splits evenly and speedup should stay close to the worker
+count until the cores run out.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calc_engine.montecarlo import simulate  # noqa: E402
+
+INPUTS = {
+    'cohesion': {'dist': 'lognormal', 'mean': 10, 'std': 3},
+    'friction_angle': {'dist': 'normal', 'mean': 30, 'std': 3},
+    'unit_weight': {'dist': 'normal', 'mean': 18, 'std': 0.9},
+    'depth': 1.5,
+    'width': 2,
+}
+DEMAND = {'dist': 'normal', 'mean': 400, 'std': 60}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--samples', type=int, default=4 * 10**6)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    baseline = None
+    reference = simulate('terzaghi_bearing', INPUTS, DEMAND, args.samples, seed=1)
+    print(f"pf = {reference['failure_probability']:.6f}, beta = {reference['reliability_index']:.4f}")
+    for workers in range(1, args.max_workers + 1):
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            # Warm the workers up so process start-up isn't timed
+            list(executor.map(abs, range(workers)))
+            started = time.perf_counter()
+            result = simulate('terzaghi_bearing', INPUTS, DEMAND, args.samples, seed=1, executor=executor)
+            elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        assert result == reference, 'results differ between pool sizes'
+        print(f'{workers:3d} workers  {elapsed:7.3f} s  {args.samples / elapsed / 1e6:6.2f} M samples/s  '
+              f'speedup {baseline / elapsed:4.2f}')
+
+if __name__ == '__main__':
+    main()
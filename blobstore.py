@@ -0,0 +1,308 @@
+import os
+import re
+import uuid
+import shutil
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from werkzeug.utils import secure_filename
+from scheduler import job, format_timestamp, migration_progress, save_migration_progress
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FOLDER = 'uploads'
+CHUNK_SIZE = 1024 * 1024
+# Unreferenced blobs younger than this may belong to a record that isn't committed yet
+GC_GRACE_HOURS = 1
+LEGACY_MIGRATION_BATCH = 200
+
+# Resumable uploads: chunks are appended to UPLOAD_TEMP_FOLDER/<session id>.part
+UPLOAD_TEMP_FOLDER = os.path.join(UPLOAD_FOLDER, '.sessions')
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+MAX_CHUNK_BYTES = 8 * 1024 * 1024
+UPLOAD_SESSION_HOURS = 48
+
+# Record columns that point at blobs: (table, column)
+BLOB_COLUMNS = [
+    ('permits', 'document_path'),
+    ('compliance_docs', 'file_path'),
+    ('worker_trainings', 'certificate_path'),
+]
+
+# Not the result of a finished upload session that may still be claimed
+UNCLAIMED = ("NOT EXISTS (SELECT 1 FROM upload_sessions "
+             "WHERE upload_sessions.blob_path = upload_blobs.path AND status = 'complete')")
+
+BLOB_NAME_PATTERN = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]+)?$')
+
+def blob_digest(filename):
+    """The sha256 digest of a blob file name, or None for legacy uploads"""
+    match = BLOB_NAME_PATTERN.match(filename)
+    return match.group(1) if match else None
+
+def blob_path(digest, extension):
+    return os.path.join(UPLOAD_FOLDER, digest + extension)
+
+def file_extension(filename):
+    return os.path.splitext(secure_filename(filename or ''))[1].lower()
+
+def _hash_stream(stream):
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+def _register_blob(db, digest, path, size, original_name):
+    """Insert or touch a blob row and return its stored path (caller commits)"""
+    now = format_timestamp(datetime.now())
+    db.execute(
+        'INSERT OR IGNORE INTO upload_blobs (digest, path, size, original_name, created_at, updated_at) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        (digest, path, size, original_name, now, now)
+    )
+    # Touch so the garbage collector leaves it alone until the record is committed
+    db.execute('UPDATE upload_blobs SET updated_at = ? WHERE digest = ?', (now, digest))
+    return db.execute('SELECT path FROM upload_blobs WHERE digest = ?', (digest,)).fetchone()['path']
+
+def store_blob(db, digest, size, original_name, write):
+    """Store content under its digest unless it's already there; `write(path)` writes it"""
+    existing = db.execute('SELECT path FROM upload_blobs WHERE digest = ?', (digest,)).fetchone()
+    if existing is None or not os.path.exists(existing['path']):
+        path = existing['path'] if existing else blob_path(digest, file_extension(original_name))
+        if not os.path.exists(path):
+            write(path)
+    else:
+        path = existing['path']
+    return _register_blob(db, digest, path, size, original_name)
+
+def save_upload(db, file):
+    """Store an uploaded FileStorage in the blob store and return its path.
+
+    Seekable uploads (werkzeug spools them in memory or a temp file) are
+    hashed first and only copied when the content is new, so a duplicate
+    costs no disk writes. Other streams are hashed while being written to a
+    temp file, which is discarded for duplicates. The returned path must be
+    saved on a record in the same transaction; the blob's refcount is kept by
+    triggers on the record columns."""
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    stream = file.stream
+    if stream.seekable():
+        digest, size = _hash_stream(stream)
+
+        def write(path):
+            stream.seek(0)
+            _copy_to(stream, path)
+        return store_blob(db, digest, size, file.filename, write)
+
+    temp_path = os.path.join(UPLOAD_FOLDER, f'.upload-{uuid.uuid4().hex}')
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, 'wb') as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+        return store_blob(db, digest.hexdigest(), size, file.filename,
+                          lambda path: os.replace(temp_path, path))
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _copy_to(stream, path):
+    """Write to a temp name first so a partial file never appears under a digest"""
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            shutil.copyfileobj(stream, f, CHUNK_SIZE)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return _hash_stream(f)
+
+def create_upload_session(db, user_id, filename, size, sha256):
+    """Start (or resume) a chunked upload; returns the session row (caller commits).
+
+    An open session for the same user and content is reused, so a client that
+    lost its session id resumes from the last acknowledged offset. Content
+    that is already stored completes immediately without any transfer."""
+    now = format_timestamp(datetime.now())
+    existing = db.execute(
+        "SELECT * FROM upload_sessions WHERE user_id = ? AND sha256 = ? AND size = ? "
+        "AND status = 'open' ORDER BY created_at DESC LIMIT 1",
+        (user_id, sha256, size)
+    ).fetchone()
+    if existing is not None:
+        return existing
+
+    session_id = uuid.uuid4().hex
+    blob = db.execute('SELECT path FROM upload_blobs WHERE digest = ?', (sha256,)).fetchone()
+    if blob is not None and os.path.exists(blob['path']):
+        _register_blob(db, sha256, blob['path'], size, filename)
+        db.execute(
+            'INSERT INTO upload_sessions (id, user_id, filename, size, sha256, received, status, '
+            "blob_path, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'complete', ?, ?, ?)",
+            (session_id, user_id, filename, size, sha256, size, blob['path'], now, now)
+        )
+    else:
+        os.makedirs(UPLOAD_TEMP_FOLDER, exist_ok=True)
+        open(os.path.join(UPLOAD_TEMP_FOLDER, session_id + '.part'), 'wb').close()
+        db.execute(
+            'INSERT INTO upload_sessions (id, user_id, filename, size, sha256, received, status, '
+            "created_at, updated_at) VALUES (?, ?, ?, ?, ?, 0, 'open', ?, ?)",
+            (session_id, user_id, filename, size, sha256, now, now)
+        )
+    return db.execute('SELECT * FROM upload_sessions WHERE id = ?', (session_id,)).fetchone()
+
+def write_chunk(db, upload, offset, stream, length):
+    """Write up to `length` bytes from `stream` at `offset`; returns the new acknowledged offset.
+
+    Chunks must arrive in order (offset == received). Data is copied in
+    CHUNK_SIZE pieces straight into the part file, so memory stays bounded."""
+    if offset != upload['received']:
+        raise ValueError('offset mismatch')
+    if offset + length > upload['size']:
+        raise ValueError('chunk past end of file')
+    path = os.path.join(UPLOAD_TEMP_FOLDER, upload['id'] + '.part')
+    written = 0
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        while written < length:
+            chunk = stream.read(min(CHUNK_SIZE, length - written))
+            if not chunk:
+                break
+            f.write(chunk)
+            written += len(chunk)
+        f.truncate(offset + written)
+    # A dropped connection still acknowledges the bytes that made it to disk
+    db.execute(
+        'UPDATE upload_sessions SET received = ?, updated_at = ? WHERE id = ? AND received = ?',
+        (offset + written, format_timestamp(datetime.now()), upload['id'], offset)
+    )
+    return offset + written
+
+def finalize_upload(db, upload):
+    """Verify the whole-file sha256 and move the part file into the blob store.
+
+    Returns the blob path, or None when the hash doesn't match (the session is
+    reset so the client can upload again)."""
+    if upload['status'] == 'complete':
+        return upload['blob_path']
+    path = os.path.join(UPLOAD_TEMP_FOLDER, upload['id'] + '.part')
+    digest, size = file_digest(path)
+    now = format_timestamp(datetime.now())
+    if digest != upload['sha256'] or size != upload['size']:
+        open(path, 'wb').close()
+        db.execute('UPDATE upload_sessions SET received = 0, updated_at = ? WHERE id = ?',
+                   (now, upload['id']))
+        return None
+    blob = store_blob(db, digest, size, upload['filename'], lambda target: os.replace(path, target))
+    if os.path.exists(path):
+        os.remove(path)
+    db.execute(
+        "UPDATE upload_sessions SET status = 'complete', blob_path = ?, updated_at = ? WHERE id = ?",
+        (blob, now, upload['id'])
+    )
+    return blob
+
+def claim_upload(db, upload_id, user_id):
+    """Blob path of a finished chunked upload owned by `user_id`, for saving on a record;
+    None when there is no such upload or its file is gone"""
+    upload = db.execute(
+        "SELECT * FROM upload_sessions WHERE id = ? AND user_id = ? AND status = 'complete'",
+        (upload_id, user_id)
+    ).fetchone()
+    if upload is None or not os.path.exists(upload['blob_path']):
+        return None
+    return _register_blob(db, upload['sha256'], upload['blob_path'], upload['size'], upload['filename'])
+
+def is_referenced(db, path):
+    return any(
+        db.execute(f'SELECT 1 FROM {table} WHERE {column} = ? LIMIT 1', (path,)).fetchone()
+        for table, column in BLOB_COLUMNS
+    )
+
+@job('upload_blob_gc', '15 4 * * *')
+def upload_blob_gc(db):
+    """Delete blobs no record points at anymore.
+
+    A finished chunked upload stays claimable for UPLOAD_SESSION_HOURS, so its
+    blob is kept while the session exists even though no record uses it yet."""
+    cutoff = format_timestamp(datetime.now() - timedelta(hours=GC_GRACE_HOURS))
+    blobs = db.execute(
+        f'SELECT digest, path FROM upload_blobs WHERE refcount <= 0 AND updated_at < ? AND {UNCLAIMED}',
+        (cutoff,)
+    ).fetchall()
+    deleted = 0
+    for blob in blobs:
+        # Re-check under the write lock: a record may have claimed it since the SELECT
+        if db.execute(
+            f'DELETE FROM upload_blobs WHERE digest = ? AND refcount <= 0 AND updated_at < ? AND {UNCLAIMED}',
+            (blob['digest'], cutoff)
+        ).rowcount == 0:
+            continue
+        if os.path.exists(blob['path']) and not is_referenced(db, blob['path']):
+            os.remove(blob['path'])
+        db.commit()
+        deleted += 1
+    return deleted
+
+@job('upload_session_cleanup', '45 * * * *')
+def upload_session_cleanup(db):
+    """Drop chunked upload sessions (and their part files) older than UPLOAD_SESSION_HOURS"""
+    cutoff = format_timestamp(datetime.now() - timedelta(hours=UPLOAD_SESSION_HOURS))
+    sessions = db.execute(
+        'SELECT id FROM upload_sessions WHERE updated_at < ?', (cutoff,)
+    ).fetchall()
+    for upload in sessions:
+        path = os.path.join(UPLOAD_TEMP_FOLDER, upload['id'] + '.part')
+        if os.path.exists(path):
+            os.remove(path)
+        db.execute('DELETE FROM upload_sessions WHERE id = ?', (upload['id'],))
+    db.commit()
+    return len(sessions)
+
+@job('migrate_legacy_uploads', '*/10 * * * *')
+def migrate_legacy_uploads(db):
+    """One-off move of `uploads/<timestamp>_<name>` files into the blob store"""
+    migrated = 0
+    for table, column in BLOB_COLUMNS:
+        name = f'upload_blobs:{table}'
+        last_id, completed = migration_progress(db, name)
+        if completed:
+            continue
+        while True:
+            rows = db.execute(
+                f'SELECT id, {column} as path FROM {table} WHERE id > ? AND {column} IS NOT NULL '
+                f'ORDER BY id LIMIT ?',
+                (last_id, LEGACY_MIGRATION_BATCH)
+            ).fetchall()
+            if not rows:
+                save_migration_progress(db, name, last_id, completed=True)
+                db.commit()
+                break
+            for row in rows:
+                old_path = row['path']
+                known = db.execute('SELECT 1 FROM upload_blobs WHERE path = ?', (old_path,)).fetchone()
+                if known or not os.path.exists(old_path):
+                    continue
+                with open(old_path, 'rb') as f:
+                    digest, size = _hash_stream(f)
+                new_path = store_blob(db, digest, size, old_path,
+                                      lambda path: shutil.copyfile(old_path, path))
+                # The column triggers move the reference onto the blob
+                db.execute(f'UPDATE {table} SET {column} = ? WHERE id = ?', (new_path, row['id']))
+                db.commit()
+                if not is_referenced(db, old_path):
+                    os.remove(old_path)
+                migrated += 1
+            last_id = rows[-1]['id']
+            save_migration_progress(db, name, last_id)
+            db.commit()
+    return migrated
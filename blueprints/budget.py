@@ -1,4 +1,5 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
+from pricing import price_lookup, search_materials, PRICE_WINDOW_DAYS
 
 budget_bp = Blueprint('budget', __name__)
 
@@ -134,6 +135,22 @@ def edit(id):
                          projects=projects,
                          suppliers=suppliers)
 
+@budget_bp.route('/prices')
+def prices():
+    """Material name suggestions and latest/median/best unit price for autocomplete"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    db = get_db()
+    query = request.args.get('q', '')
+    supplier_id = request.args.get('supplier_id', type=int)
+    days = request.args.get('days', PRICE_WINDOW_DAYS, type=int)
+    
+    return jsonify({
+        'suggestions': search_materials(db, query),
+        'price': price_lookup(db, query, days, supplier_id) if query.strip() else None
+    })
+
 @budget_bp.route('/<int:id>/delete', methods=['POST'])
 def delete(id):
     if 'user_id' not in session:
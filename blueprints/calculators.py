@@ -1,9 +1,29 @@
-import math
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+import io
+import json
+import shutil
+import tempfile
+import numpy as np
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context
 from functools import wraps
+from calc_engine import FORMULAS, evaluate
+from calc_engine.batch import evaluate_rows, iter_csv_rows, iter_json_rows, csv_lines, ndjson_lines
+from calc_engine.bearing_factors import DEFAULT_CONVENTION
+from calc_engine.channels import gvf_profile, DEFAULT_SHAPE
+from calc_engine.costs import schedule_curve
+from calc_engine.sweep import run_study, numeric_inputs, to_json, TORNADO_VARIATION
+from calc_engine.network import parse_network, solve_network, pipe_quantities
+from calc_engine.frames import parse_frame, solve_frame
+from calc_engine.montecarlo import simulate, RESISTANCE_OUTPUTS, DISTRIBUTIONS, MC_DEFAULT_SAMPLES
+from calc_cache import cached_json, get_cached
+from pricing import price_lookup
 
 calculators_bp = Blueprint('calculators', __name__)
 
+def get_db():
+    """Get database connection"""
+    from flask import current_app
+    return current_app.get_db()
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -12,6 +32,65 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def field(name, default=0, scale=1):
+    """Form field feeding a formula input: value = float(form[name]) * scale"""
+    return (name, default, scale)
+
+def calculation(formula, fields, result, required=(), extra=None):
+    """Adapter from a calculator form to an engine formula.
+
+    fields: formula input -> field(...)
+    result: template key -> formula output or form field name, or a
+            (name, factor) pair to convert units
+    required: form fields that must be non-zero, as the forms expect
+    extra: optional function(values) adding keys that aren't numbers"""
+    return {
+        'formula': formula,
+        'fields': fields,
+        'result': result,
+        'required': required,
+        'extra': extra,
+    }
+
+def form_value(name, default):
+    """A form field as float; blank or absent fields take the default"""
+    raw = request.form.get(name, '').strip()
+    if isinstance(default, str):
+        return raw or default
+    return float(raw) if raw else default
+
+def run_calculation(spec):
+    values = {name: form_value(name, default) for name, default, _ in spec['fields'].values()}
+    if not all(values[name] for name in spec['required']):
+        return None
+    inputs = {
+        param: values[name] * scale if scale != 1 else values[name]
+        for param, (name, _, scale) in spec['fields'].items()
+    }
+    outputs = evaluate(spec['formula'], **inputs)
+
+    result = {}
+    for key, source in spec['result'].items():
+        name, factor = source if isinstance(source, tuple) else (source, 1)
+        value = outputs[name].item() if name in outputs else values[name]
+        result[key] = value * factor if factor != 1 else value
+    if spec['extra']:
+        result.update(spec['extra'](values))
+    return result
+
+def calculate(calculations):
+    """Evaluate the posted calc_type; {calc_type: result} for the templates"""
+    calc_type = request.form.get('calc_type')
+    spec = calculations.get(calc_type)
+    if spec is None:
+        return {}
+    try:
+        result = spec() if callable(spec) else run_calculation(spec)
+    except ValueError:
+        flash('Valores inválidos: use apenas números nos campos', 'error')
+        return {}
+    return {calc_type: result} if result is not None else {}
+
 @calculators_bp.route('/')
 @login_required
 def index():
@@ -62,1131 +141,861 @@ def index():
     ]
     return render_template('calculators/index.html', calculators=calculators)
 
+CONCRETE_STRUCTURES = {
+    # Viga simplesmente apoiada com carga uniformemente distribuída
+    'beam_moment': calculation(
+        'beam_moment',
+        {'load': field('load'), 'length': field('length')},
+        {'max_moment': 'max_moment', 'load': 'load', 'length': 'length'},
+        required=('load', 'length')
+    ),
+    # Carga máxima aproximada em pilar (sem armadura), em kN
+    'column_load': calculation(
+        'column_load',
+        {'fck': field('fck'), 'area': field('area')},
+        {'max_load': 'max_load', 'fck': 'fck', 'area': 'area'},
+        required=('fck', 'area')
+    ),
+    # Espessura mínima de laje, em cm
+    'slab_thickness': calculation(
+        'slab_thickness',
+        {'span': field('span'), 'slab_type': field('slab_type', 'solid')},
+        {'min_thickness': ('min_thickness', 100), 'span': 'span', 'slab_type': 'slab_type'},
+        required=('span',)
+    ),
+    # Dimensionamento de viga à flexão e ao cisalhamento (NBR 6118), seção em cm
+    'beam_design': calculation(
+        'beam_design',
+        {'positive_moment': field('positive_moment'), 'negative_moment': field('negative_moment'),
+         'shear': field('shear'), 'width': field('width', scale=1e-2), 'height': field('height', scale=1e-2),
+         'cover': field('cover', 4, scale=1e-2), 'fck': field('fck', 25), 'fyk': field('fyk', 500),
+         'stirrup_diameter': field('stirrup_diameter', 5)},
+        {'bottom_steel': 'bottom_steel', 'top_steel': 'top_steel', 'neutral_axis_ratio': 'neutral_axis_ratio',
+         'stirrup_area': 'stirrup_area', 'stirrup_spacing': 'stirrup_spacing', 'shear_capacity': 'shear_capacity',
+         'status': 'status', 'width': 'width', 'height': 'height', 'fck': 'fck',
+         'stirrup_diameter': 'stirrup_diameter'},
+        required=('width', 'height', 'fck', 'fyk')
+    ),
+    # Verificação de pilar à flexo-compressão (diagrama de interação N-M), seção em cm
+    'column_check': calculation(
+        'column_check',
+        {'axial': field('axial'), 'moment': field('moment'), 'width': field('width', scale=1e-2),
+         'height': field('height', scale=1e-2), 'steel_area': field('steel_area'),
+         'cover': field('cover', 4, scale=1e-2), 'fck': field('fck', 25), 'fyk': field('fyk', 500)},
+        {'design_moment': 'design_moment', 'utilization': 'utilization', 'axial_capacity': 'axial_capacity',
+         'steel_ratio': ('steel_ratio', 100), 'min_steel': 'min_steel', 'status': 'status',
+         'axial': 'axial', 'width': 'width', 'height': 'height', 'steel_area': 'steel_area'},
+        required=('width', 'height', 'fck', 'fyk')
+    ),
+}
+
 @calculators_bp.route('/concrete-structures', methods=['GET', 'POST'])
 @login_required
 def concrete_structures():
     """Calculadoras para estruturas de concreto"""
-    results = {}
-    
-    if request.method == 'POST':
-        calc_type = request.form.get('calc_type')
-        
-        if calc_type == 'beam_moment':
-            # Cálculo de momento fletor em viga
-            load = float(request.form.get('load', 0))
-            length = float(request.form.get('length', 0))
-            
-            if load and length:
-                # Viga simplesmente apoiada com carga uniformemente distribuída
-                max_moment = (load * length**2) / 8
-                results['beam_moment'] = {
-                    'max_moment': max_moment,
-                    'load': load,
-                    'length': length
-                }
-        
-        elif calc_type == 'column_load':
-            # Cálculo de carga em pilar
-            fck = float(request.form.get('fck', 0))  # Resistência do concreto
-            area = float(request.form.get('area', 0))  # Área da seção
-            
-            if fck and area:
-                # Carga máxima aproximada (sem armadura)
-                max_load = 0.85 * fck * area / 1000  # Em kN
-                results['column_load'] = {
-                    'max_load': max_load,
-                    'fck': fck,
-                    'area': area
-                }
-        
-        elif calc_type == 'slab_thickness':
-            # Espessura mínima de laje
-            span = float(request.form.get('span', 0))
-            slab_type = request.form.get('slab_type', 'solid')
-            
-            if span:
-                if slab_type == 'solid':
-                    min_thickness = span / 40  # Para lajes maciças
-                elif slab_type == 'ribbed':
-                    min_thickness = span / 50  # Para lajes nervuradas
-                else:
-                    min_thickness = span / 35  # Para outras lajes
-                
-                results['slab_thickness'] = {
-                    'min_thickness': min_thickness * 100,  # Em cm
-                    'span': span,
-                    'slab_type': slab_type
-                }
-    
+    results = calculate(CONCRETE_STRUCTURES) if request.method == 'POST' else {}
     return render_template('calculators/concrete_structures.html', results=results)
 
+MATERIALS = {
+    # Volume de concreto e materiais para traço 1:2:3
+    'concrete_volume': calculation(
+        'concrete_volume',
+        {'length': field('length'), 'width': field('width'), 'height': field('height')},
+        {'volume': 'volume', 'cement_bags': 'cement_bags', 'sand_m3': 'sand', 'gravel_m3': 'gravel'},
+        required=('length', 'width', 'height')
+    ),
+    # Peso do aço por diâmetro (mm)
+    'steel_weight': calculation(
+        'steel_weight',
+        {'diameter': field('diameter', scale=1e-3), 'length': field('length'),
+         'quantity': field('quantity', 1)},
+        {'weight_per_meter': 'weight_per_meter', 'total_weight': 'total_weight',
+         'diameter': 'diameter', 'length': 'length', 'quantity': 'quantity'},
+        required=('diameter', 'length')
+    ),
+    # Volume de argamassa para alvenaria (junta em cm), traço 1:3
+    'mortar_volume': calculation(
+        'mortar_volume',
+        {'wall_area': field('wall_area'), 'joint_thickness': field('joint_thickness', 1.0, 1e-2)},
+        {'mortar_volume': 'mortar_volume', 'cement_bags': 'cement_bags', 'sand_m3': 'sand',
+         'wall_area': 'wall_area'},
+        required=('wall_area',)
+    ),
+}
+
 @calculators_bp.route('/materials', methods=['GET', 'POST'])
 @login_required
 def materials():
     """Calculadoras para materiais de construção"""
-    results = {}
-    
-    if request.method == 'POST':
-        calc_type = request.form.get('calc_type')
-        
-        if calc_type == 'concrete_volume':
-            # Cálculo de volume de concreto
-            length = float(request.form.get('length', 0))
-            width = float(request.form.get('width', 0))
-            height = float(request.form.get('height', 0))
-            
-            if length and width and height:
-                volume = length * width * height
-                # Materiais necessários (traço 1:2:3)
-                cement_bags = volume * 7  # sacos de 50kg
-                sand_m3 = volume * 0.5
-                gravel_m3 = volume * 0.8
-                
-                results['concrete_volume'] = {
-                    'volume': volume,
-                    'cement_bags': cement_bags,
-                    'sand_m3': sand_m3,
-                    'gravel_m3': gravel_m3
-                }
-        
-        elif calc_type == 'steel_weight':
-            # Peso do aço por diâmetro
-            diameter = float(request.form.get('diameter', 0))
-            length = float(request.form.get('length', 0))
-            quantity = int(request.form.get('quantity', 1))
-            
-            if diameter and length:
-                # Peso específico do aço = 7850 kg/m³
-                area = math.pi * (diameter/1000)**2 / 4  # Área em m²
-                weight_per_meter = area * 7850  # kg/m
-                total_weight = weight_per_meter * length * quantity
-                
-                results['steel_weight'] = {
-                    'weight_per_meter': weight_per_meter,
-                    'total_weight': total_weight,
-                    'diameter': diameter,
-                    'length': length,
-                    'quantity': quantity
-                }
-        
-        elif calc_type == 'mortar_volume':
-            # Volume de argamassa para alvenaria
-            wall_area = float(request.form.get('wall_area', 0))
-            joint_thickness = float(request.form.get('joint_thickness', 1.0))
-            
-            if wall_area:
-                # Aproximadamente 30% da área em juntas
-                mortar_volume = wall_area * (joint_thickness/100) * 0.3
-                # Traço 1:3 (cimento:areia)
-                cement_bags = mortar_volume * 8  # sacos de 50kg
-                sand_m3 = mortar_volume * 0.6
-                
-                results['mortar_volume'] = {
-                    'mortar_volume': mortar_volume,
-                    'cement_bags': cement_bags,
-                    'sand_m3': sand_m3,
-                    'wall_area': wall_area
-                }
-    
+    results = calculate(MATERIALS) if request.method == 'POST' else {}
     return render_template('calculators/materials.html', results=results)
 
+# Convenções dos fatores de capacidade de carga (calc_engine.bearing_factors)
+BEARING_CONVENTIONS = {
+    'ec7': 'Eurocódigo 7 (padrão)',
+    'terzaghi': 'Terzaghi',
+    'meyerhof': 'Meyerhof',
+    'vesic': 'Vesic',
+    'hansen': 'Hansen',
+}
+
+GEOTECHNICS = {
+    # Capacidade de carga do solo (Terzaghi), fator de segurança 3 e fatores Nc/Nq/Nγ da convenção escolhida
+    'bearing_capacity': calculation(
+        'terzaghi_bearing',
+        {'cohesion': field('cohesion'), 'friction_angle': field('friction_angle'),
+         'unit_weight': field('unit_weight', 18), 'depth': field('depth', 1),
+         'width': field('width', 1), 'safety_factor': field('safety_factor', 3),
+         'convention': field('convention', DEFAULT_CONVENTION)},
+        {'ultimate_capacity': 'ultimate_capacity', 'allowable_capacity': 'allowable_capacity',
+         'safety_factor': 'safety_factor', 'cohesion': 'cohesion', 'friction_angle': 'friction_angle',
+         'convention': 'convention'},
+        required=('friction_angle',)
+    ),
+    # Capacidade de estaca (ponta + fuste), fator de segurança 2
+    'pile_capacity': calculation(
+        'pile_capacity',
+        {'diameter': field('diameter'), 'length': field('length'),
+         'tip_resistance': field('tip_resistance'), 'shaft_resistance': field('shaft_resistance')},
+        {'tip_capacity': 'tip_capacity', 'shaft_capacity': 'shaft_capacity',
+         'total_capacity': 'total_capacity', 'allowable_capacity': 'allowable_capacity',
+         'diameter': 'diameter', 'length': 'length'},
+        required=('diameter', 'length')
+    ),
+}
+
 @calculators_bp.route('/geotechnics', methods=['GET', 'POST'])
 @login_required
 def geotechnics():
     """Calculadoras para geotecnia e fundações"""
-    results = {}
-    
-    if request.method == 'POST':
-        calc_type = request.form.get('calc_type')
-        
-        if calc_type == 'bearing_capacity':
-            # Capacidade de carga do solo
-            cohesion = float(request.form.get('cohesion', 0))
-            friction_angle = float(request.form.get('friction_angle', 0))
-            unit_weight = float(request.form.get('unit_weight', 18))
-            depth = float(request.form.get('depth', 1))
-            width = float(request.form.get('width', 1))
-            
-            if friction_angle:
-                # Fórmulas de Terzaghi (simplificadas)
-                phi_rad = math.radians(friction_angle)
-                
-                # Fatores de capacidade de carga
-                Nq = math.exp(math.pi * math.tan(phi_rad)) * (math.tan(math.pi/4 + phi_rad/2))**2
-                Nc = (Nq - 1) / math.tan(phi_rad) if friction_angle > 0 else 5.14
-                Ng = 2 * (Nq - 1) * math.tan(phi_rad)
-                
-                # Capacidade de carga última
-                qu = cohesion * Nc + unit_weight * depth * Nq + 0.5 * unit_weight * width * Ng
-                
-                # Capacidade admissível (fator de segurança = 3)
-                qa = qu / 3
-                
-                results['bearing_capacity'] = {
-                    'ultimate_capacity': qu,
-                    'allowable_capacity': qa,
-                    'safety_factor': 3,
-                    'cohesion': cohesion,
-                    'friction_angle': friction_angle
-                }
-        
-        elif calc_type == 'pile_capacity':
-            # Capacidade de estaca
-            diameter = float(request.form.get('diameter', 0))
-            length = float(request.form.get('length', 0))
-            tip_resistance = float(request.form.get('tip_resistance', 0))
-            shaft_resistance = float(request.form.get('shaft_resistance', 0))
-            
-            if diameter and length:
-                area_tip = math.pi * (diameter/2)**2
-                perimeter = math.pi * diameter
-                
-                # Capacidade de ponta
-                Qp = tip_resistance * area_tip
-                
-                # Capacidade lateral
-                Qs = shaft_resistance * perimeter * length
-                
-                # Capacidade total
-                Qt = Qp + Qs
-                
-                # Capacidade admissível
-                Qa = Qt / 2  # Fator de segurança = 2
-                
-                results['pile_capacity'] = {
-                    'tip_capacity': Qp,
-                    'shaft_capacity': Qs,
-                    'total_capacity': Qt,
-                    'allowable_capacity': Qa,
-                    'diameter': diameter,
-                    'length': length
-                }
-    
-    return render_template('calculators/geotechnics.html', results=results)
+    results = calculate(GEOTECHNICS) if request.method == 'POST' else {}
+    return render_template('calculators/geotechnics.html', results=results, conventions=BEARING_CONVENTIONS)
+
+CHANNEL_SHAPES = {
+    'trapezoidal': 'Trapezoidal',
+    'rectangular': 'Retangular',
+    'circular': 'Circular (largura = diâmetro)',
+}
+# Estações da curva de remanso mostradas no formulário
+CHANNEL_PROFILE_STEPS = 20
+
+def channel_profile(values):
+    """Water surface profile from the form's control depth over the reach length"""
+    control_depth = form_value('control_depth', 0)
+    length = form_value('reach_length', 0)
+    if not (control_depth and length):
+        return {}
+    profile = gvf_profile(values['flow_rate'], values['slope'], values['width'], control_depth, length,
+                          values['side_slope'], values['manning_n'], values['shape'], CHANNEL_PROFILE_STEPS)
+    stations = [
+        {'distance': distance, 'depth': depth, 'velocity': velocity, 'froude': froude,
+         'water_level': bed + depth}
+        for distance, depth, velocity, froude, bed in zip(
+            *(profile[key][0].tolist() for key in ('distance', 'depth', 'velocity', 'froude', 'bed')))
+    ]
+    return {'profile_type': profile['profile'][0].item(), 'control_depth': control_depth,
+            'reach_length': length, 'stations': stations}
+
+HYDRAULICS = {
+    # Vazão em tubulações (diâmetro em mm)
+    'pipe_flow': calculation(
+        'pipe_flow',
+        {'diameter': field('diameter', scale=1e-3), 'velocity': field('velocity')},
+        {'flow_rate_ls': ('flow_rate', 1000), 'flow_rate_m3h': ('flow_rate', 3600),
+         'diameter_mm': 'diameter', 'velocity': 'velocity', 'area': 'area'},
+        required=('diameter', 'velocity')
+    ),
+    # Perda de carga por Darcy-Weisbach com fator de atrito de Colebrook-White (água a 20 °C);
+    # diâmetro e rugosidade em mm, vazão em L/s
+    'head_loss': calculation(
+        'darcy_weisbach',
+        {'length': field('length'), 'diameter': field('diameter', scale=1e-3),
+         'flow_rate': field('flow_rate', scale=1e-3), 'roughness': field('roughness', 0.1, scale=1e-3)},
+        {'unit_loss': 'unit_loss', 'total_loss': 'total_loss', 'velocity': 'velocity',
+         'reynolds': 'reynolds', 'friction_factor': 'friction_factor', 'flow_type': 'flow_type',
+         'length': 'length', 'diameter_mm': 'diameter', 'roughness_mm': 'roughness'},
+        required=('length', 'diameter', 'flow_rate')
+    ),
+    # Canais (Manning): profundidades normal e crítica e, com uma seção de controle,
+    # a curva de remanso pelo método standard step
+    'channel_flow': calculation(
+        'channel_flow',
+        {'flow_rate': field('flow_rate'), 'slope': field('slope'), 'width': field('width'),
+         'side_slope': field('side_slope'), 'manning_n': field('manning_n', 0.013),
+         'shape': field('shape', DEFAULT_SHAPE)},
+        {'normal_depth': 'normal_depth', 'critical_depth': 'critical_depth', 'velocity': 'velocity',
+         'froude': 'froude', 'area': 'area', 'hydraulic_radius': 'hydraulic_radius',
+         'top_width': 'top_width', 'flow_type': 'flow_type', 'slope_type': 'slope_type',
+         'flow_rate': 'flow_rate', 'slope': 'slope', 'shape': 'shape'},
+        required=('flow_rate', 'manning_n'),
+        extra=channel_profile
+    ),
+}
 
 @calculators_bp.route('/hydraulics', methods=['GET', 'POST'])
 @login_required
 def hydraulics():
     """Calculadoras para hidráulica"""
-    results = {}
-    
-    if request.method == 'POST':
-        calc_type = request.form.get('calc_type')
-        
-        if calc_type == 'pipe_flow':
-            # Vazão em tubulações
-            diameter = float(request.form.get('diameter', 0)) / 1000  # Converter mm para m
-            velocity = float(request.form.get('velocity', 0))
-            
-            if diameter and velocity:
-                area = math.pi * (diameter/2)**2
-                flow_rate = area * velocity * 1000  # L/s
-                flow_rate_m3h = flow_rate * 3.6  # m³/h
-                
-                results['pipe_flow'] = {
-                    'flow_rate_ls': flow_rate,
-                    'flow_rate_m3h': flow_rate_m3h,
-                    'diameter_mm': diameter * 1000,
-                    'velocity': velocity,
-                    'area': area
-                }
-        
-        elif calc_type == 'head_loss':
-            # Perda de carga
-            length = float(request.form.get('length', 0))
-            diameter = float(request.form.get('diameter', 0)) / 1000  # mm para m
-            flow_rate = float(request.form.get('flow_rate', 0)) / 1000  # L/s para m³/s
-            roughness = float(request.form.get('roughness', 0.1)) / 1000  # mm para m
-            
-            if length and diameter and flow_rate:
-                # Fórmula de Hazen-Williams (simplificada)
-                C = 130  # Coeficiente para tubos novos
-                area = math.pi * (diameter/2)**2
-                velocity = flow_rate / area
-                
-                # Perda de carga unitária (m/m)
-                hf_unit = 10.65 * (flow_rate ** 1.85) / (C ** 1.85 * diameter ** 4.87)
-                
-                # Perda de carga total
-                hf_total = hf_unit * length
-                
-                results['head_loss'] = {
-                    'unit_loss': hf_unit,
-                    'total_loss': hf_total,
-                    'velocity': velocity,
-                    'length': length,
-                    'diameter_mm': diameter * 1000
-                }
-    
-    return render_template('calculators/hydraulics.html', results=results)
+    results = calculate(HYDRAULICS) if request.method == 'POST' else {}
+    return render_template('calculators/hydraulics.html', results=results, shapes=CHANNEL_SHAPES)
+
+def schedule_cost():
+    """Cronograma físico-financeiro: percentual e valor por mês"""
+    total_value = form_value('total_value', 0)
+    duration_months = int(form_value('duration_months', 12))
+    curve_type = form_value('curve_type', 'linear')
+    if not (total_value and duration_months):
+        return None
+
+    monthly_percent = schedule_curve(duration_months, curve_type)
+    monthly_value = total_value * monthly_percent / 100
+    accumulated = np.cumsum(monthly_value)
+    schedule = [
+        {
+            'month': month,
+            'monthly_percent': percent,
+            'monthly_value': value,
+            'accumulated_percent': total / total_value * 100,
+            'accumulated_value': total
+        }
+        for month, percent, value, total in zip(
+            range(1, duration_months + 1), monthly_percent.tolist(),
+            monthly_value.tolist(), accumulated.tolist())
+    ]
+    return {
+        'schedule': schedule,
+        'total_value': total_value,
+        'duration_months': duration_months
+    }
+
+COSTS = {
+    'bdi_calculation': calculation(
+        'bdi_calculation',
+        {'direct_cost': field('direct_cost'), 'indirect_cost_percent': field('indirect_cost_percent', 15),
+         'profit_percent': field('profit_percent', 8), 'tax_percent': field('tax_percent', 15)},
+        {'bdi_percent': 'bdi_percent', 'direct_cost': 'direct_cost', 'selling_price': 'selling_price',
+         'indirect_cost_percent': 'indirect_cost_percent', 'profit_percent': 'profit_percent',
+         'tax_percent': 'tax_percent'},
+        required=('direct_cost',)
+    ),
+    'unit_cost': calculation(
+        'unit_cost',
+        {'material_cost': field('material_cost'), 'labor_cost': field('labor_cost'),
+         'equipment_cost': field('equipment_cost'), 'productivity': field('productivity', 1)},
+        {'total_unit_cost': 'total_unit_cost', 'material_cost': 'material_cost',
+         'labor_cost': 'labor_cost', 'equipment_cost': 'equipment_cost', 'productivity': 'productivity'},
+        required=('productivity',)
+    ),
+    'schedule_cost': schedule_cost,
+}
 
 @calculators_bp.route('/costs', methods=['GET', 'POST'])
 @login_required
 def costs():
     """Calculadoras para custos e orçamentos"""
-    results = {}
-    
-    if request.method == 'POST':
-        calc_type = request.form.get('calc_type')
-        
-        if calc_type == 'bdi_calculation':
-            # Cálculo de BDI
-            direct_cost = float(request.form.get('direct_cost', 0))
-            indirect_cost_percent = float(request.form.get('indirect_cost_percent', 15))
-            profit_percent = float(request.form.get('profit_percent', 8))
-            tax_percent = float(request.form.get('tax_percent', 15))
-            
-            if direct_cost:
-                # Cálculo do BDI
-                bdi = ((1 + indirect_cost_percent/100) * (1 + profit_percent/100) / (1 - tax_percent/100)) - 1
-                bdi_percent = bdi * 100
-                
-                # Preço de venda
-                selling_price = direct_cost * (1 + bdi)
-                
-                results['bdi_calculation'] = {
-                    'bdi_percent': bdi_percent,
-                    'direct_cost': direct_cost,
-                    'selling_price': selling_price,
-                    'indirect_cost_percent': indirect_cost_percent,
-                    'profit_percent': profit_percent,
-                    'tax_percent': tax_percent
-                }
-        
-        elif calc_type == 'unit_cost':
-            # Custo unitário de serviço
-            material_cost = float(request.form.get('material_cost', 0))
-            labor_cost = float(request.form.get('labor_cost', 0))
-            equipment_cost = float(request.form.get('equipment_cost', 0))
-            productivity = float(request.form.get('productivity', 1))
-            
-            if productivity:
-                total_unit_cost = (material_cost + labor_cost + equipment_cost) / productivity
-                
-                results['unit_cost'] = {
-                    'total_unit_cost': total_unit_cost,
-                    'material_cost': material_cost,
-                    'labor_cost': labor_cost,
-                    'equipment_cost': equipment_cost,
-                    'productivity': productivity
-                }
-        
-        elif calc_type == 'schedule_cost':
-            # Cronograma físico-financeiro
-            total_value = float(request.form.get('total_value', 0))
-            duration_months = int(request.form.get('duration_months', 12))
-            curve_type = request.form.get('curve_type', 'linear')
-            
-            if total_value and duration_months:
-                schedule = []
-                accumulated = 0
-                
-                for month in range(1, duration_months + 1):
-                    monthly_percent = 0  # Valor padrão
-                    if curve_type == 'linear':
-                        monthly_percent = 100 / duration_months
-                    elif curve_type == 's_curve':
-                        # Curva S simplificada
-                        t = month / duration_months
-                        monthly_percent = (3 * t**2 - 2 * t**3) * 100
-                        if month > 1:
-                            prev_t = (month-1) / duration_months
-                            prev_percent = (3 * prev_t**2 - 2 * prev_t**3) * 100
-                            monthly_percent = monthly_percent - prev_percent
-                    else:
-                        monthly_percent = 100 / duration_months  # Fallback para linear
-                    
-                    monthly_value = total_value * monthly_percent / 100
-                    accumulated += monthly_value
-                    
-                    schedule.append({
-                        'month': month,
-                        'monthly_percent': monthly_percent,
-                        'monthly_value': monthly_value,
-                        'accumulated_percent': (accumulated / total_value) * 100,
-                        'accumulated_value': accumulated
-                    })
-                
-                results['schedule_cost'] = {
-                    'schedule': schedule,
-                    'total_value': total_value,
-                    'duration_months': duration_months
-                }
-    
+    results = calculate(COSTS) if request.method == 'POST' else {}
     return render_template('calculators/costs.html', results=results)
 
+def continuity_equation():
+    """Equação da Continuidade (A₁⋅v₁ = A₂⋅v₂), resolvendo o termo deixado em branco"""
+    area1 = form_value('area1', 0)  # m²
+    velocity1 = form_value('velocity1', 0)  # m/s
+    area2 = form_value('area2', 0)  # m²
+    velocity2 = form_value('velocity2', 0)  # m/s
+
+    def solve(area, velocity, known):
+        return evaluate('continuity', area1=area, velocity1=velocity, known2=known)['unknown'].item()
+
+    if area1 and velocity1 and area2 and not velocity2:
+        velocity2 = solve(area1, velocity1, area2)
+    elif area1 and velocity1 and velocity2 and not area2:
+        area2 = solve(area1, velocity1, velocity2)
+    elif area2 and velocity2 and area1 and not velocity1:
+        velocity1 = solve(area2, velocity2, area1)
+    elif area2 and velocity2 and velocity1 and not area1:
+        area1 = solve(area2, velocity2, velocity1)
+
+    return {
+        'area1': area1,
+        'velocity1': velocity1,
+        'area2': area2,
+        'velocity2': velocity2,
+        'flow_rate1': area1 * velocity1,
+        'flow_rate2': area2 * velocity2
+    }
+
+# Resistência dos Materiais - 20 fórmulas fundamentais, nas unidades dos formulários (mm², cm, GPa...)
+MATERIAL_RESISTANCE = {
+    # 1. Tensão Normal (σ = F/A), área em mm²
+    'normal_stress': calculation(
+        'normal_stress',
+        {'force': field('force'), 'area': field('area', scale=1e-6)},
+        {'normal_stress_pa': 'stress', 'normal_stress_mpa': ('stress', 1e-6), 'force': 'force',
+         'area_mm2': 'area', 'area_m2': ('area', 1e-6)},
+        required=('force', 'area')
+    ),
+    # 2. Deformação (ε = ΔL/L₀)
+    'deformation': calculation(
+        'deformation',
+        {'delta_length': field('delta_length'), 'initial_length': field('initial_length')},
+        {'deformation': 'strain', 'deformation_percent': ('strain', 100),
+         'delta_length': 'delta_length', 'initial_length': 'initial_length'},
+        required=('initial_length',)
+    ),
+    # 3. Lei de Hooke (σ = E⋅ε), E em GPa
+    'hooke_law': calculation(
+        'hooke_law',
+        {'elastic_modulus': field('elastic_modulus', scale=1e9), 'strain': field('strain')},
+        {'stress_mpa': ('stress', 1e-6), 'elastic_modulus_gpa': 'elastic_modulus', 'strain': 'strain'},
+        required=('elastic_modulus', 'strain')
+    ),
+    # 4. Momento Fletor (M = F⋅d)
+    'bending_moment': calculation(
+        'bending_moment',
+        {'force': field('force'), 'distance': field('distance')},
+        {'bending_moment_nm': 'moment', 'bending_moment_knm': ('moment', 1e-3),
+         'force': 'force', 'distance': 'distance'},
+        required=('force', 'distance')
+    ),
+    # 5. Inércia da Seção (I = b⋅h³/12), em cm
+    'moment_inertia': calculation(
+        'moment_inertia',
+        {'base': field('base', scale=1e-2), 'height': field('height', scale=1e-2)},
+        {'moment_inertia_cm4': ('inertia', 1e8), 'moment_inertia_m4': 'inertia',
+         'base': 'base', 'height': 'height'},
+        required=('base', 'height')
+    ),
+    # 6. Tensão de Flexão (σf = M⋅y/I), y em cm e I em cm⁴
+    'bending_stress': calculation(
+        'bending_stress',
+        {'moment': field('moment'), 'distance_centroid': field('distance_centroid', scale=1e-2),
+         'moment_inertia': field('moment_inertia', scale=1e-8)},
+        {'bending_stress_ncm2': ('stress', 1e-4), 'bending_stress_mpa': ('stress', 1e-6),
+         'moment': 'moment', 'distance_centroid': 'distance_centroid', 'moment_inertia': 'moment_inertia'},
+        required=('moment', 'distance_centroid', 'moment_inertia')
+    ),
+    # 7. Cisalhamento (τ = V/A), área em mm²
+    'shear_stress': calculation(
+        'shear_stress',
+        {'shear_force': field('shear_force'), 'area': field('area', scale=1e-6)},
+        {'shear_stress_pa': 'stress', 'shear_stress_mpa': ('stress', 1e-6),
+         'shear_force': 'shear_force', 'area': 'area'},
+        required=('shear_force', 'area')
+    ),
+    # 8. Resistência Característica do Concreto (fck = Fruptura/A), área em cm²
+    'concrete_fck': calculation(
+        'concrete_fck',
+        {'rupture_force': field('rupture_force'), 'area': field('area', scale=1e-4)},
+        {'fck_pa': 'fck', 'fck_mpa': ('fck', 1e-6), 'rupture_force': 'rupture_force', 'area_cm2': 'area'},
+        required=('rupture_force', 'area')
+    ),
+    # 9. Dosagem de Argamassa (Traço 1:a:b), cimento em sacos de 50 kg
+    'mortar_mix': calculation(
+        'mortar_mix',
+        {'cement': field('cement_bags', 1, 50), 'sand_ratio': field('sand_ratio', 3),
+         'aggregate_ratio': field('aggregate_ratio')},
+        {'cement_kg': ('cement_bags', 50), 'sand_kg': 'sand', 'aggregate_kg': 'aggregate',
+         'cement_bags': 'cement_bags', 'sand_ratio': 'sand_ratio', 'aggregate_ratio': 'aggregate_ratio'},
+        required=('cement_bags', 'sand_ratio')
+    ),
+    # 10. Lei de Abrams (fc = K⋅(a/c)^-n)
+    'abrams_law': calculation(
+        'abrams_law',
+        {'k_constant': field('k_constant', 200), 'water_cement_ratio': field('water_cement_ratio', 0.5),
+         'n_exponent': field('n_exponent', 2)},
+        {'concrete_strength_mpa': 'strength', 'k_constant': 'k_constant',
+         'water_cement_ratio': 'water_cement_ratio', 'n_exponent': 'n_exponent'},
+        required=('k_constant', 'water_cement_ratio', 'n_exponent')
+    ),
+    # 11. Vazão (Q = A⋅v)
+    'flow_rate': calculation(
+        'flow_rate',
+        {'area': field('area'), 'velocity': field('velocity')},
+        {'flow_rate_m3s': 'flow_rate', 'flow_rate_ls': ('flow_rate', 1000),
+         'flow_rate_m3h': ('flow_rate', 3600), 'area': 'area', 'velocity': 'velocity'},
+        required=('area', 'velocity')
+    ),
+    # 12. Equação da Continuidade (A₁⋅v₁ = A₂⋅v₂)
+    'continuity_equation': continuity_equation,
+    # 13. Equação de Bernoulli (p/γ + v²/2g + z = constante)
+    'bernoulli_equation': calculation(
+        'bernoulli_equation',
+        {'pressure1': field('pressure1'), 'velocity1': field('velocity1'),
+         'elevation1': field('elevation1'), 'pressure2': field('pressure2'),
+         'velocity2': field('velocity2'), 'elevation2': field('elevation2'),
+         'specific_weight': field('specific_weight', 9810)},
+        {'total_head1': 'total_head1', 'total_head2': 'total_head2',
+         'pressure_head1': 'pressure_head1', 'velocity_head1': 'velocity_head1',
+         'pressure_head2': 'pressure_head2', 'velocity_head2': 'velocity_head2',
+         'head_difference': 'head_difference'}
+    ),
+    # 14. Número de Reynolds (Re = ρ⋅v⋅D/μ)
+    'reynolds_number': calculation(
+        'reynolds_number',
+        {'density': field('density', 1000), 'velocity': field('velocity'),
+         'diameter': field('diameter'), 'dynamic_viscosity': field('dynamic_viscosity', 0.001)},
+        {'reynolds': 'reynolds', 'flow_type': 'flow_type', 'density': 'density', 'velocity': 'velocity',
+         'diameter': 'diameter', 'dynamic_viscosity': 'dynamic_viscosity'},
+        required=('velocity', 'diameter', 'dynamic_viscosity')
+    ),
+    # 15. Fórmula de Manning (Q = 1/n⋅A⋅R^(2/3)⋅S^(1/2))
+    'manning_formula': calculation(
+        'manning_formula',
+        {'area': field('area'), 'wetted_perimeter': field('wetted_perimeter'),
+         'slope': field('slope'), 'manning_n': field('manning_n', 0.013)},
+        {'flow_rate': 'flow_rate', 'hydraulic_radius': 'hydraulic_radius', 'area': 'area',
+         'wetted_perimeter': 'wetted_perimeter', 'slope': 'slope', 'manning_n': 'manning_n'},
+        required=('area', 'wetted_perimeter', 'slope', 'manning_n')
+    ),
+    # 16. Pressão Efetiva (σ' = σ - u), em kPa
+    'effective_stress': calculation(
+        'effective_stress',
+        {'total_stress': field('total_stress'), 'pore_pressure': field('pore_pressure')},
+        {'effective_stress': 'effective_stress', 'total_stress': 'total_stress',
+         'pore_pressure': 'pore_pressure'},
+        required=('total_stress',)
+    ),
+    # 17. Capacidade de Carga Terzaghi (q_ult = c⋅Nc + γ⋅Df⋅Nq + 0.5⋅γ⋅B⋅Nγ), em kPa e kN/m³
+    'terzaghi_bearing': calculation(
+        'terzaghi_bearing',
+        {'cohesion': field('cohesion'), 'unit_weight': field('unit_weight', 18),
+         'depth': field('depth', 1), 'width': field('width', 1),
+         'friction_angle': field('friction_angle', 30)},
+        {'ultimate_bearing_capacity': 'ultimate_capacity', 'Nc': 'Nc', 'Nq': 'Nq', 'Ng': 'Ng',
+         'cohesion': 'cohesion', 'unit_weight': 'unit_weight', 'depth': 'depth', 'width': 'width',
+         'friction_angle': 'friction_angle'},
+        required=('friction_angle',)
+    ),
+    # 18. Assentamento Elástico (S = q⋅B(1-ν²)/E), em kPa
+    'elastic_settlement': calculation(
+        'elastic_settlement',
+        {'bearing_pressure': field('bearing_pressure'), 'width': field('foundation_width'),
+         'poisson_ratio': field('poisson_ratio', 0.3), 'elastic_modulus': field('elastic_modulus')},
+        {'settlement_m': 'settlement', 'settlement_mm': ('settlement', 1000),
+         'bearing_pressure': 'bearing_pressure', 'foundation_width': 'foundation_width',
+         'poisson_ratio': 'poisson_ratio', 'elastic_modulus': 'elastic_modulus'},
+        required=('bearing_pressure', 'foundation_width', 'elastic_modulus')
+    ),
+    # 19. Peso Específico (γ = P/V)
+    'specific_weight': calculation(
+        'specific_weight',
+        {'weight': field('weight'), 'volume': field('volume')},
+        {'specific_weight_nm3': 'specific_weight', 'specific_weight_knm3': ('specific_weight', 1e-3),
+         'weight': 'weight', 'volume': 'volume'},
+        required=('weight', 'volume')
+    ),
+    # 20. Volume de Concreto (V = b⋅h⋅l)
+    'concrete_volume': calculation(
+        'concrete_volume',
+        {'width': field('base'), 'height': field('height'), 'length': field('length')},
+        {'volume_m3': 'volume', 'volume_liters': ('volume', 1000),
+         'base': 'base', 'height': 'height', 'length': 'length'},
+        required=('base', 'height', 'length')
+    ),
+}
+
 @calculators_bp.route('/material-resistance', methods=['GET', 'POST'])
 @login_required
 def material_resistance():
     """Fórmulas de Resistência dos Materiais - 20 Fórmulas Fundamentais"""
-    results = {}
-    
-    if request.method == 'POST':
-        calc_type = request.form.get('calc_type')
-        
-        if calc_type == 'normal_stress':
-            # 1. Tensão Normal (σ = F/A)
-            force = float(request.form.get('force', 0))  # N
-            area = float(request.form.get('area', 0))  # mm²
-            
-            if force and area:
-                area_m2 = area / 1000000  # Converter mm² para m²
-                normal_stress = force / area_m2  # Pa
-                normal_stress_mpa = normal_stress / 1000000  # MPa
-                
-                results['normal_stress'] = {
-                    'normal_stress_pa': normal_stress,
-                    'normal_stress_mpa': normal_stress_mpa,
-                    'force': force,
-                    'area_mm2': area,
-                    'area_m2': area_m2
-                }
-        
-        elif calc_type == 'deformation':
-            # 2. Deformação (ε = ΔL/L₀)
-            delta_length = float(request.form.get('delta_length', 0))  # mm
-            initial_length = float(request.form.get('initial_length', 0))  # mm
-            
-            if initial_length:
-                deformation = delta_length / initial_length  # adimensional
-                deformation_percent = deformation * 100
-                
-                results['deformation'] = {
-                    'deformation': deformation,
-                    'deformation_percent': deformation_percent,
-                    'delta_length': delta_length,
-                    'initial_length': initial_length
-                }
-        
-        elif calc_type == 'hooke_law':
-            # 3. Lei de Hooke (σ = E⋅ε)
-            elastic_modulus = float(request.form.get('elastic_modulus', 0))  # GPa
-            strain = float(request.form.get('strain', 0))  # adimensional
-            
-            if elastic_modulus and strain:
-                stress = elastic_modulus * strain * 1000  # MPa
-                
-                results['hooke_law'] = {
-                    'stress_mpa': stress,
-                    'elastic_modulus_gpa': elastic_modulus,
-                    'strain': strain
-                }
-        
-        elif calc_type == 'bending_moment':
-            # 4. Momento Fletor (M = F⋅d)
-            force = float(request.form.get('force', 0))  # N
-            distance = float(request.form.get('distance', 0))  # m
-            
-            if force and distance:
-                bending_moment = force * distance  # N.m
-                bending_moment_knm = bending_moment / 1000  # kN.m
-                
-                results['bending_moment'] = {
-                    'bending_moment_nm': bending_moment,
-                    'bending_moment_knm': bending_moment_knm,
-                    'force': force,
-                    'distance': distance
-                }
-        
-        elif calc_type == 'moment_inertia':
-            # 5. Inércia da Seção (I = b⋅h³/12) - seção retangular
-            base = float(request.form.get('base', 0))  # cm
-            height = float(request.form.get('height', 0))  # cm
-            
-            if base and height:
-                moment_inertia = (base * height**3) / 12  # cm⁴
-                moment_inertia_m4 = moment_inertia / 100000000  # m⁴
-                
-                results['moment_inertia'] = {
-                    'moment_inertia_cm4': moment_inertia,
-                    'moment_inertia_m4': moment_inertia_m4,
-                    'base': base,
-                    'height': height
-                }
-        
-        elif calc_type == 'bending_stress':
-            # 6. Tensão de Flexão (σf = M⋅y/I)
-            moment = float(request.form.get('moment', 0))  # N.m
-            distance_centroid = float(request.form.get('distance_centroid', 0))  # cm
-            moment_inertia = float(request.form.get('moment_inertia', 0))  # cm⁴
-            
-            if moment and distance_centroid and moment_inertia:
-                # Converter unidades
-                moment_ncm = moment * 100  # N.cm
-                bending_stress = (moment_ncm * distance_centroid) / moment_inertia  # N/cm²
-                bending_stress_mpa = bending_stress / 10  # MPa
-                
-                results['bending_stress'] = {
-                    'bending_stress_ncm2': bending_stress,
-                    'bending_stress_mpa': bending_stress_mpa,
-                    'moment': moment,
-                    'distance_centroid': distance_centroid,
-                    'moment_inertia': moment_inertia
-                }
-        
-        elif calc_type == 'shear_stress':
-            # 7. Cisalhamento (τ = V/A)
-            shear_force = float(request.form.get('shear_force', 0))  # N
-            area = float(request.form.get('area', 0))  # mm²
-            
-            if shear_force and area:
-                area_m2 = area / 1000000  # Converter mm² para m²
-                shear_stress = shear_force / area_m2  # Pa
-                shear_stress_mpa = shear_stress / 1000000  # MPa
-                
-                results['shear_stress'] = {
-                    'shear_stress_pa': shear_stress,
-                    'shear_stress_mpa': shear_stress_mpa,
-                    'shear_force': shear_force,
-                    'area': area
-                }
-        
-        elif calc_type == 'concrete_fck':
-            # 8. Resistência Característica do Concreto (fck = Fruptura/A)
-            rupture_force = float(request.form.get('rupture_force', 0))  # N
-            area = float(request.form.get('area', 0))  # cm²
-            
-            if rupture_force and area:
-                area_m2 = area / 10000  # Converter cm² para m²
-                fck = rupture_force / area_m2  # Pa
-                fck_mpa = fck / 1000000  # MPa
-                
-                results['concrete_fck'] = {
-                    'fck_pa': fck,
-                    'fck_mpa': fck_mpa,
-                    'rupture_force': rupture_force,
-                    'area_cm2': area
-                }
-        
-        elif calc_type == 'mortar_mix':
-            # 9. Dosagem de Argamassa (Traço 1:a:b)
-            cement_bags = float(request.form.get('cement_bags', 1))  # sacos de 50kg
-            sand_ratio = float(request.form.get('sand_ratio', 3))  # proporção de areia
-            aggregate_ratio = float(request.form.get('aggregate_ratio', 0))  # proporção de agregado (opcional)
-            
-            if cement_bags and sand_ratio:
-                cement_kg = cement_bags * 50
-                sand_kg = cement_kg * sand_ratio
-                aggregate_kg = cement_kg * aggregate_ratio if aggregate_ratio else 0
-                
-                results['mortar_mix'] = {
-                    'cement_kg': cement_kg,
-                    'sand_kg': sand_kg,
-                    'aggregate_kg': aggregate_kg,
-                    'cement_bags': cement_bags,
-                    'sand_ratio': sand_ratio,
-                    'aggregate_ratio': aggregate_ratio
-                }
-        
-        elif calc_type == 'abrams_law':
-            # 10. Lei de Abrams (fc = K⋅(a/c)^-n)
-            k_constant = float(request.form.get('k_constant', 200))  # constante K
-            water_cement_ratio = float(request.form.get('water_cement_ratio', 0.5))  # a/c
-            n_exponent = float(request.form.get('n_exponent', 2))  # expoente n
-            
-            if k_constant and water_cement_ratio and n_exponent:
-                concrete_strength = k_constant * (water_cement_ratio ** (-n_exponent))
-                
-                results['abrams_law'] = {
-                    'concrete_strength_mpa': concrete_strength,
-                    'k_constant': k_constant,
-                    'water_cement_ratio': water_cement_ratio,
-                    'n_exponent': n_exponent
-                }
-        
-        elif calc_type == 'flow_rate':
-            # 11. Vazão (Q = A⋅v)
-            area = float(request.form.get('area', 0))  # m²
-            velocity = float(request.form.get('velocity', 0))  # m/s
-            
-            if area and velocity:
-                flow_rate = area * velocity  # m³/s
-                flow_rate_ls = flow_rate * 1000  # L/s
-                flow_rate_m3h = flow_rate * 3600  # m³/h
-                
-                results['flow_rate'] = {
-                    'flow_rate_m3s': flow_rate,
-                    'flow_rate_ls': flow_rate_ls,
-                    'flow_rate_m3h': flow_rate_m3h,
-                    'area': area,
-                    'velocity': velocity
-                }
-        
-        elif calc_type == 'continuity_equation':
-            # 12. Equação da Continuidade (A₁⋅v₁ = A₂⋅v₂)
-            area1 = float(request.form.get('area1', 0))  # m²
-            velocity1 = float(request.form.get('velocity1', 0))  # m/s
-            area2 = float(request.form.get('area2', 0))  # m²
-            velocity2 = float(request.form.get('velocity2', 0))  # m/s
-            
-            # Calcular a variável que está em branco
-            if area1 and velocity1 and area2 and not velocity2:
-                velocity2 = (area1 * velocity1) / area2
-            elif area1 and velocity1 and velocity2 and not area2:
-                area2 = (area1 * velocity1) / velocity2
-            elif area2 and velocity2 and area1 and not velocity1:
-                velocity1 = (area2 * velocity2) / area1
-            elif area2 and velocity2 and velocity1 and not area1:
-                area1 = (area2 * velocity2) / velocity1
-            
-            flow_rate1 = area1 * velocity1 if area1 and velocity1 else 0
-            flow_rate2 = area2 * velocity2 if area2 and velocity2 else 0
-            
-            results['continuity_equation'] = {
-                'area1': area1,
-                'velocity1': velocity1,
-                'area2': area2,
-                'velocity2': velocity2,
-                'flow_rate1': flow_rate1,
-                'flow_rate2': flow_rate2
-            }
-        
-        elif calc_type == 'bernoulli_equation':
-            # 13. Equação de Bernoulli (p/γ + v²/2g + z = constante)
-            pressure1 = float(request.form.get('pressure1', 0))  # Pa
-            velocity1 = float(request.form.get('velocity1', 0))  # m/s
-            elevation1 = float(request.form.get('elevation1', 0))  # m
-            pressure2 = float(request.form.get('pressure2', 0))  # Pa
-            velocity2 = float(request.form.get('velocity2', 0))  # m/s
-            elevation2 = float(request.form.get('elevation2', 0))  # m
-            specific_weight = float(request.form.get('specific_weight', 9810))  # N/m³ (água)
-            
-            g = 9.81  # m/s²
-            
-            # Carga total no ponto 1
-            pressure_head1 = pressure1 / specific_weight
-            velocity_head1 = (velocity1**2) / (2 * g)
-            total_head1 = pressure_head1 + velocity_head1 + elevation1
-            
-            # Carga total no ponto 2
-            pressure_head2 = pressure2 / specific_weight
-            velocity_head2 = (velocity2**2) / (2 * g)
-            total_head2 = pressure_head2 + velocity_head2 + elevation2
-            
-            results['bernoulli_equation'] = {
-                'total_head1': total_head1,
-                'total_head2': total_head2,
-                'pressure_head1': pressure_head1,
-                'velocity_head1': velocity_head1,
-                'pressure_head2': pressure_head2,
-                'velocity_head2': velocity_head2,
-                'head_difference': abs(total_head1 - total_head2)
-            }
-        
-        elif calc_type == 'reynolds_number':
-            # 14. Número de Reynolds (Re = ρ⋅v⋅D/μ)
-            density = float(request.form.get('density', 1000))  # kg/m³
-            velocity = float(request.form.get('velocity', 0))  # m/s
-            diameter = float(request.form.get('diameter', 0))  # m
-            dynamic_viscosity = float(request.form.get('dynamic_viscosity', 0.001))  # Pa.s
-            
-            if velocity and diameter and dynamic_viscosity:
-                reynolds = (density * velocity * diameter) / dynamic_viscosity
-                
-                # Classificação do escoamento
-                if reynolds < 2300:
-                    flow_type = "Laminar"
-                elif reynolds > 4000:
-                    flow_type = "Turbulento"
-                else:
-                    flow_type = "Transição"
-                
-                results['reynolds_number'] = {
-                    'reynolds': reynolds,
-                    'flow_type': flow_type,
-                    'density': density,
-                    'velocity': velocity,
-                    'diameter': diameter,
-                    'dynamic_viscosity': dynamic_viscosity
-                }
-        
-        elif calc_type == 'manning_formula':
-            # 15. Fórmula de Manning (Q = 1/n⋅A⋅R^(2/3)⋅S^(1/2))
-            area = float(request.form.get('area', 0))  # m²
-            wetted_perimeter = float(request.form.get('wetted_perimeter', 0))  # m
-            slope = float(request.form.get('slope', 0))  # m/m
-            manning_n = float(request.form.get('manning_n', 0.013))  # coeficiente de rugosidade
-            
-            if area and wetted_perimeter and slope and manning_n:
-                hydraulic_radius = area / wetted_perimeter
-                flow_rate = (1 / manning_n) * area * (hydraulic_radius ** (2/3)) * (slope ** 0.5)
-                
-                results['manning_formula'] = {
-                    'flow_rate': flow_rate,
-                    'hydraulic_radius': hydraulic_radius,
-                    'area': area,
-                    'wetted_perimeter': wetted_perimeter,
-                    'slope': slope,
-                    'manning_n': manning_n
-                }
-        
-        elif calc_type == 'effective_stress':
-            # 16. Pressão Efetiva (σ' = σ - u)
-            total_stress = float(request.form.get('total_stress', 0))  # kPa
-            pore_pressure = float(request.form.get('pore_pressure', 0))  # kPa
-            
-            if total_stress:
-                effective_stress = total_stress - pore_pressure
-                
-                results['effective_stress'] = {
-                    'effective_stress': effective_stress,
-                    'total_stress': total_stress,
-                    'pore_pressure': pore_pressure
-                }
-        
-        elif calc_type == 'terzaghi_bearing':
-            # 17. Capacidade de Carga Terzaghi (q_ult = c⋅Nc + γ⋅Df⋅Nq + 0.5⋅γ⋅B⋅Nγ)
-            cohesion = float(request.form.get('cohesion', 0))  # kPa
-            unit_weight = float(request.form.get('unit_weight', 18))  # kN/m³
-            depth = float(request.form.get('depth', 1))  # m
-            width = float(request.form.get('width', 1))  # m
-            friction_angle = float(request.form.get('friction_angle', 30))  # graus
-            
-            if friction_angle:
-                phi_rad = math.radians(friction_angle)
-                
-                # Fatores de capacidade de carga de Terzaghi
-                Nq = math.exp(math.pi * math.tan(phi_rad)) * (math.tan(math.pi/4 + phi_rad/2))**2
-                Nc = (Nq - 1) / math.tan(phi_rad) if friction_angle > 0 else 5.14
-                Ng = 2 * (Nq - 1) * math.tan(phi_rad)
-                
-                # Capacidade de carga última
-                q_ult = cohesion * Nc + unit_weight * depth * Nq + 0.5 * unit_weight * width * Ng
-                
-                results['terzaghi_bearing'] = {
-                    'ultimate_bearing_capacity': q_ult,
-                    'Nc': Nc,
-                    'Nq': Nq,
-                    'Ng': Ng,
-                    'cohesion': cohesion,
-                    'unit_weight': unit_weight,
-                    'depth': depth,
-                    'width': width,
-                    'friction_angle': friction_angle
-                }
-        
-        elif calc_type == 'elastic_settlement':
-            # 18. Assentamento Elástico (S = q⋅B(1-ν²)/E)
-            bearing_pressure = float(request.form.get('bearing_pressure', 0))  # kPa
-            foundation_width = float(request.form.get('foundation_width', 0))  # m
-            poisson_ratio = float(request.form.get('poisson_ratio', 0.3))  # adimensional
-            elastic_modulus = float(request.form.get('elastic_modulus', 0))  # kPa
-            
-            if bearing_pressure and foundation_width and elastic_modulus:
-                settlement = (bearing_pressure * foundation_width * (1 - poisson_ratio**2)) / elastic_modulus
-                settlement_mm = settlement * 1000  # converter para mm
-                
-                results['elastic_settlement'] = {
-                    'settlement_m': settlement,
-                    'settlement_mm': settlement_mm,
-                    'bearing_pressure': bearing_pressure,
-                    'foundation_width': foundation_width,
-                    'poisson_ratio': poisson_ratio,
-                    'elastic_modulus': elastic_modulus
-                }
-        
-        elif calc_type == 'specific_weight':
-            # 19. Peso Específico (γ = P/V)
-            weight = float(request.form.get('weight', 0))  # N
-            volume = float(request.form.get('volume', 0))  # m³
-            
-            if weight and volume:
-                specific_weight = weight / volume  # N/m³
-                specific_weight_knm3 = specific_weight / 1000  # kN/m³
-                
-                results['specific_weight'] = {
-                    'specific_weight_nm3': specific_weight,
-                    'specific_weight_knm3': specific_weight_knm3,
-                    'weight': weight,
-                    'volume': volume
-                }
-        
-        elif calc_type == 'concrete_volume':
-            # 20. Volume de Concreto (V = b⋅h⋅l)
-            base = float(request.form.get('base', 0))  # m
-            height = float(request.form.get('height', 0))  # m
-            length = float(request.form.get('length', 0))  # m
-            
-            if base and height and length:
-                volume = base * height * length  # m³
-                volume_liters = volume * 1000  # litros
-                
-                results['concrete_volume'] = {
-                    'volume_m3': volume,
-                    'volume_liters': volume_liters,
-                    'base': base,
-                    'height': height,
-                    'length': length
-                }
-    
+    results = calculate(MATERIAL_RESISTANCE) if request.method == 'POST' else {}
     return render_template('calculators/material_resistance.html', results=results)
 
+def mortar_ratio(values):
+    sand_ratio, aggregate_ratio = values['sand_ratio'], values['aggregate_ratio']
+    return {'ratio': f"1:{sand_ratio}:{aggregate_ratio}" if aggregate_ratio else f"1:{sand_ratio}"}
+
+# Fórmulas de Engenharia Civil - as mesmas fórmulas, em unidades SI
+CIVIL_ENGINEERING_FORMULAS = {
+    # ESTRUTURAS E RESISTÊNCIA DOS MATERIAIS
+    'normal_stress': calculation(
+        'normal_stress',
+        {'force': field('force'), 'area': field('area')},
+        {'stress_pa': 'stress', 'stress_mpa': ('stress', 1e-6), 'force': 'force', 'area': 'area'},
+        required=('force', 'area')
+    ),
+    'deformation': calculation(
+        'deformation',
+        {'delta_length': field('delta_length'), 'initial_length': field('initial_length')},
+        {'deformation': 'strain', 'deformation_percent': ('strain', 100),
+         'delta_length': 'delta_length', 'initial_length': 'initial_length'},
+        required=('initial_length',)
+    ),
+    'hooke_law': calculation(
+        'hooke_law',
+        {'elastic_modulus': field('elastic_modulus'), 'strain': field('strain')},
+        {'stress_pa': 'stress', 'stress_mpa': ('stress', 1e-6),
+         'elastic_modulus': 'elastic_modulus', 'strain': 'strain'},
+        required=('elastic_modulus', 'strain')
+    ),
+    'bending_moment': calculation(
+        'bending_moment',
+        {'force': field('force'), 'distance': field('distance')},
+        {'moment': 'moment', 'force': 'force', 'distance': 'distance'},
+        required=('force', 'distance')
+    ),
+    'moment_inertia': calculation(
+        'moment_inertia',
+        {'base': field('base'), 'height': field('height')},
+        {'inertia': 'inertia', 'base': 'base', 'height': 'height'},
+        required=('base', 'height')
+    ),
+    'bending_stress': calculation(
+        'bending_stress',
+        {'moment': field('moment'), 'distance_centroid': field('distance_centroid'),
+         'moment_inertia': field('moment_inertia')},
+        {'stress_pa': 'stress', 'stress_mpa': ('stress', 1e-6), 'moment': 'moment',
+         'distance_centroid': 'distance_centroid', 'moment_inertia': 'moment_inertia'},
+        required=('moment', 'distance_centroid', 'moment_inertia')
+    ),
+    'shear_stress': calculation(
+        'shear_stress',
+        {'shear_force': field('shear_force'), 'area': field('area')},
+        {'stress_pa': 'stress', 'stress_mpa': ('stress', 1e-6), 'shear_force': 'shear_force', 'area': 'area'},
+        required=('shear_force', 'area')
+    ),
+    # CONCRETO E ARGAMASSAS
+    'concrete_fck': calculation(
+        'concrete_fck',
+        {'rupture_force': field('rupture_force'), 'area': field('area')},
+        {'fck_pa': 'fck', 'fck_mpa': ('fck', 1e-6), 'rupture_force': 'rupture_force', 'area': 'area'},
+        required=('rupture_force', 'area')
+    ),
+    'mortar_dosage': calculation(
+        'mortar_mix',
+        {'cement': field('cement', 1), 'sand_ratio': field('sand_ratio', 3),
+         'aggregate_ratio': field('aggregate_ratio')},
+        {'cement': 'cement', 'sand': 'sand', 'aggregate': 'aggregate'},
+        extra=mortar_ratio
+    ),
+    'abrams_law': calculation(
+        'abrams_law',
+        {'k_constant': field('k_constant', 200), 'water_cement_ratio': field('water_cement_ratio', 0.5),
+         'n_exponent': field('n_exponent', 2)},
+        {'concrete_strength': 'strength', 'k_constant': 'k_constant',
+         'water_cement_ratio': 'water_cement_ratio', 'n_exponent': 'n_exponent'},
+        required=('k_constant', 'water_cement_ratio', 'n_exponent')
+    ),
+    # HIDRÁULICA E HIDROLOGIA
+    'flow_rate': calculation(
+        'flow_rate',
+        {'area': field('area'), 'velocity': field('velocity')},
+        {'flow_rate': 'flow_rate', 'area': 'area', 'velocity': 'velocity'},
+        required=('area', 'velocity')
+    ),
+    'continuity_equation': calculation(
+        'continuity',
+        {'area1': field('area1'), 'velocity1': field('velocity1'), 'known2': field('area2')},
+        {'area1': 'area1', 'velocity1': 'velocity1', 'area2': 'area2', 'velocity2': 'unknown'},
+        required=('area1', 'velocity1', 'area2')
+    ),
+    'bernoulli_equation': calculation(
+        'bernoulli_equation',
+        {'pressure1': field('pressure1'), 'velocity1': field('velocity1'),
+         'elevation1': field('elevation1'), 'pressure2': field('pressure2'),
+         'velocity2': field('velocity2'), 'elevation2': field('elevation2'),
+         'specific_weight': field('specific_weight', 9810)},
+        {'head1': 'total_head1', 'head2': 'total_head2', 'head_loss': 'head_difference',
+         'pressure1': 'pressure1', 'velocity1': 'velocity1', 'elevation1': 'elevation1',
+         'pressure2': 'pressure2', 'velocity2': 'velocity2', 'elevation2': 'elevation2'}
+    ),
+    'reynolds_number': calculation(
+        'reynolds_number',
+        {'density': field('density', 1000), 'velocity': field('velocity'),
+         'diameter': field('diameter'), 'dynamic_viscosity': field('viscosity', 0.001)},
+        {'reynolds': 'reynolds', 'flow_type': 'flow_type', 'density': 'density', 'velocity': 'velocity',
+         'diameter': 'diameter', 'viscosity': 'viscosity'},
+        required=('velocity', 'diameter', 'viscosity')
+    ),
+    'manning_formula': MATERIAL_RESISTANCE['manning_formula'],
+    # GEOTECNIA E FUNDAÇÕES
+    'effective_stress': calculation(
+        'effective_stress',
+        {'total_stress': field('total_stress'), 'pore_pressure': field('pore_pressure')},
+        {'effective_stress': 'effective_stress', 'total_stress': 'total_stress',
+         'pore_pressure': 'pore_pressure'}
+    ),
+    'terzaghi_bearing': calculation(
+        'terzaghi_bearing',
+        {'cohesion': field('cohesion'), 'unit_weight': field('unit_weight', 18000),
+         'depth': field('depth', 1), 'width': field('width', 1),
+         'friction_angle': field('friction_angle', 30)},
+        {'ultimate_capacity': 'ultimate_capacity', 'Nc': 'Nc', 'Nq': 'Nq', 'Ng': 'Ng',
+         'cohesion': 'cohesion', 'unit_weight': 'unit_weight', 'depth': 'depth', 'width': 'width',
+         'friction_angle': 'friction_angle'},
+        required=('friction_angle',)
+    ),
+    'elastic_settlement': calculation(
+        'elastic_settlement',
+        {'bearing_pressure': field('bearing_pressure'), 'width': field('width'),
+         'poisson_ratio': field('poisson_ratio', 0.3), 'elastic_modulus': field('elastic_modulus')},
+        {'settlement': 'settlement', 'bearing_pressure': 'bearing_pressure', 'width': 'width',
+         'poisson_ratio': 'poisson_ratio', 'elastic_modulus': 'elastic_modulus'},
+        required=('bearing_pressure', 'width', 'elastic_modulus')
+    ),
+    # CONSTRUÇÃO E MATERIAIS
+    'specific_weight': calculation(
+        'specific_weight',
+        {'weight': field('weight'), 'volume': field('volume')},
+        {'specific_weight': 'specific_weight', 'weight': 'weight', 'volume': 'volume'},
+        required=('weight', 'volume')
+    ),
+    'concrete_volume': calculation(
+        'concrete_volume',
+        {'width': field('base'), 'height': field('height'), 'length': field('length')},
+        {'volume': 'volume', 'base': 'base', 'height': 'height', 'length': 'length'},
+        required=('base', 'height', 'length')
+    ),
+}
+
 @calculators_bp.route('/civil-engineering-formulas', methods=['GET', 'POST'])
 @login_required
 def civil_engineering_formulas():
     """Fórmulas de Engenharia Civil - 20 Fórmulas Organizadas por Categoria"""
-    results = {}
+    results = calculate(CIVIL_ENGINEERING_FORMULAS) if request.method == 'POST' else {}
+    return render_template('calculators/civil_engineering_formulas.html', results=results)
+
+@calculators_bp.route('/<formula>/batch', methods=['GET', 'POST'])
+@login_required
+def batch(formula):
+    """Evaluate a formula over many cases.
+
+    GET describes the formula's inputs and outputs. POST takes a CSV (one
+    case per row, a column per input) or a JSON array / NDJSON of objects,
+    and streams back CSV (input columns, outputs, error) or NDJSON
+    respectively. Rows are evaluated in vectorized chunks; invalid rows get
+    an error instead of failing the whole request."""
+    if formula not in FORMULAS:
+        return jsonify({'error': f'Unknown formula: {formula}'}), 404
+    spec = FORMULAS[formula]
+    
+    if request.method == 'GET':
+        return jsonify({
+            'formula': formula,
+            'category': spec['category'],
+            'inputs': list(spec['inputs']),
+            'defaults': spec['defaults'],
+            'outputs': list(spec['outputs'])
+        })
+    
+    upload = request.files.get('file')
+    if upload:
+        # Uploaded files are closed with the request, before the response
+        # has been streamed, so the rows are read from a private copy
+        copy = tempfile.TemporaryFile()
+        shutil.copyfileobj(upload.stream, copy)
+        copy.seek(0)
+        stream = io.TextIOWrapper(copy, encoding='utf-8-sig', newline='')
+        is_json = upload.filename.lower().endswith(('.json', '.ndjson', '.jsonl'))
+    else:
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        is_json = request.mimetype in ('application/json', 'application/x-ndjson')
+    
+    if is_json:
+        def generate():
+            try:
+                yield from ndjson_lines(evaluate_rows(formula, iter_json_rows(stream)))
+            except ValueError as e:
+                yield json.dumps({'error': f'Invalid JSON: {e}'}) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    reader = iter_csv_rows(stream)
+    columns = reader.fieldnames or []
+    missing = [name for name in spec['inputs'] if name not in columns and name not in spec['defaults']]
+    if missing:
+        return jsonify({'error': f"Missing column(s): {', '.join(missing)}"}), 400
+    
+    response = Response(stream_with_context(csv_lines(formula, evaluate_rows(formula, reader), columns)),
+                        mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename={formula}_results.csv'
+    return response
+
+@calculators_bp.route('/<formula>/sweep', methods=['GET', 'POST'])
+@login_required
+def sweep(formula):
+    """Parametric study: a formula over a grid of 1-3 swept inputs plus
+    tornado sensitivities of every output.
+
+    GET renders the study page. POST takes JSON
+    {"inputs": {...}, "axes": [{"input", "start", "stop", "steps"} or
+    {"input", "values"}], "variation": 0.1} and returns the result surface
+    and sensitivities. Results are cached by a hash of the study, so posting
+    the same study again (or fetching its key) doesn't recompute it."""
+    if formula not in FORMULAS:
+        if request.method == 'GET':
+            flash('Fórmula não encontrada.', 'error')
+            return redirect(url_for('calculators.index'))
+        return jsonify({'error': f'Unknown formula: {formula}'}), 404
+    spec = FORMULAS[formula]
+    
+    if request.method == 'GET':
+        return render_template('calculators/sweep.html', formula=formula, spec=spec,
+                               numeric_inputs=numeric_inputs(spec), variation=TORNADO_VARIATION)
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    inputs = data.get('inputs') or {}
+    axes = data.get('axes')
+    try:
+        variation = float(data.get('variation', TORNADO_VARIATION))
+    except (TypeError, ValueError):
+        variation = -1
+    if not isinstance(inputs, dict) or not 0 < variation < 1:
+        return jsonify({'error': 'inputs must be an object and variation between 0 and 1'}), 400
+    
+    study = {'inputs': inputs, 'axes': axes, 'variation': variation}
+    try:
+        key, result = cached_json(get_db(), formula, study,
+                                  lambda: run_study(formula, inputs, axes, variation))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(result, mimetype='application/json')
+
+@calculators_bp.route('/<formula>/sweep/<key>')
+@login_required
+def sweep_result(formula, key):
+    """A previously computed study by its key"""
+    result = get_cached(get_db(), formula, key)
+    if result is None:
+        return jsonify({'error': 'Study not found or expired; post it again'}), 404
+    return Response(result, mimetype='application/json')
+
+@calculators_bp.route('/<formula>/reliability', methods=['GET', 'POST'])
+@login_required
+def reliability(formula):
+    """Monte Carlo mode for capacity formulas (bearing capacity, piles).
+
+    POST takes JSON {"inputs": {name: number or {"dist": ...}}, "demand":
+    number or {"dist": ...}, "samples": 1000000, "seed": 0} and returns the
+    failure probability, reliability index and capacity percentiles. A seed
+    reproduces a run exactly, so results are cached like sweeps."""
+    if formula not in RESISTANCE_OUTPUTS:
+        if request.method == 'GET':
+            flash('Análise probabilística não disponível para esta fórmula.', 'error')
+            return redirect(url_for('calculators.index'))
+        return jsonify({'error': f'No reliability mode for {formula}'}), 404
+    spec = FORMULAS[formula]
     
-    if request.method == 'POST':
-        calc_type = request.form.get('calc_type')
-        
-        # ESTRUTURAS E RESISTÊNCIA DOS MATERIAIS
-        if calc_type == 'normal_stress':
-            # 1. Tensão Normal (σ = F/A)
-            force = float(request.form.get('force', 0))  # N
-            area = float(request.form.get('area', 0))  # m²
-            
-            if force and area:
-                normal_stress = force / area  # Pa
-                normal_stress_mpa = normal_stress / 1000000  # MPa
-                
-                results['normal_stress'] = {
-                    'stress_pa': normal_stress,
-                    'stress_mpa': normal_stress_mpa,
-                    'force': force,
-                    'area': area
-                }
-        
-        elif calc_type == 'deformation':
-            # 2. Deformação (ε = ΔL/L₀)
-            delta_length = float(request.form.get('delta_length', 0))  # m
-            initial_length = float(request.form.get('initial_length', 0))  # m
-            
-            if initial_length:
-                deformation = delta_length / initial_length
-                deformation_percent = deformation * 100
-                
-                results['deformation'] = {
-                    'deformation': deformation,
-                    'deformation_percent': deformation_percent,
-                    'delta_length': delta_length,
-                    'initial_length': initial_length
-                }
-        
-        elif calc_type == 'hooke_law':
-            # 3. Lei de Hooke (σ = E⋅ε)
-            elastic_modulus = float(request.form.get('elastic_modulus', 0))  # Pa
-            strain = float(request.form.get('strain', 0))
-            
-            if elastic_modulus and strain:
-                stress = elastic_modulus * strain  # Pa
-                stress_mpa = stress / 1000000  # MPa
-                
-                results['hooke_law'] = {
-                    'stress_pa': stress,
-                    'stress_mpa': stress_mpa,
-                    'elastic_modulus': elastic_modulus,
-                    'strain': strain
-                }
-        
-        elif calc_type == 'bending_moment':
-            # 4. Momento Fletor (M = F⋅d)
-            force = float(request.form.get('force', 0))  # N
-            distance = float(request.form.get('distance', 0))  # m
-            
-            if force and distance:
-                moment = force * distance  # N.m
-                
-                results['bending_moment'] = {
-                    'moment': moment,
-                    'force': force,
-                    'distance': distance
-                }
-        
-        elif calc_type == 'moment_inertia':
-            # 5. Inércia da Seção (I = b⋅h³/12)
-            base = float(request.form.get('base', 0))  # m
-            height = float(request.form.get('height', 0))  # m
-            
-            if base and height:
-                inertia = (base * height**3) / 12  # m⁴
-                
-                results['moment_inertia'] = {
-                    'inertia': inertia,
-                    'base': base,
-                    'height': height
-                }
-        
-        elif calc_type == 'bending_stress':
-            # 6. Tensão de Flexão (σf = M⋅y/I)
-            moment = float(request.form.get('moment', 0))  # N.m
-            distance_centroid = float(request.form.get('distance_centroid', 0))  # m
-            moment_inertia = float(request.form.get('moment_inertia', 0))  # m⁴
-            
-            if moment and distance_centroid and moment_inertia:
-                bending_stress = (moment * distance_centroid) / moment_inertia  # Pa
-                bending_stress_mpa = bending_stress / 1000000  # MPa
-                
-                results['bending_stress'] = {
-                    'stress_pa': bending_stress,
-                    'stress_mpa': bending_stress_mpa,
-                    'moment': moment,
-                    'distance_centroid': distance_centroid,
-                    'moment_inertia': moment_inertia
-                }
-        
-        elif calc_type == 'shear_stress':
-            # 7. Cisalhamento (τ = V/A)
-            shear_force = float(request.form.get('shear_force', 0))  # N
-            area = float(request.form.get('area', 0))  # m²
-            
-            if shear_force and area:
-                shear_stress = shear_force / area  # Pa
-                shear_stress_mpa = shear_stress / 1000000  # MPa
-                
-                results['shear_stress'] = {
-                    'stress_pa': shear_stress,
-                    'stress_mpa': shear_stress_mpa,
-                    'shear_force': shear_force,
-                    'area': area
-                }
-        
-        # CONCRETO E ARGAMASSAS
-        elif calc_type == 'concrete_fck':
-            # 8. Resistência Característica do Concreto (fck = Fruptura/A)
-            rupture_force = float(request.form.get('rupture_force', 0))  # N
-            area = float(request.form.get('area', 0))  # m²
-            
-            if rupture_force and area:
-                fck = rupture_force / area  # Pa
-                fck_mpa = fck / 1000000  # MPa
-                
-                results['concrete_fck'] = {
-                    'fck_pa': fck,
-                    'fck_mpa': fck_mpa,
-                    'rupture_force': rupture_force,
-                    'area': area
-                }
-        
-        elif calc_type == 'mortar_dosage':
-            # 9. Dosagem de Argamassa (Traço 1:a:b)
-            cement = float(request.form.get('cement', 1))
-            sand_ratio = float(request.form.get('sand_ratio', 3))
-            aggregate_ratio = float(request.form.get('aggregate_ratio', 0))
-            
-            sand = cement * sand_ratio
-            aggregate = cement * aggregate_ratio
-            
-            results['mortar_dosage'] = {
-                'cement': cement,
-                'sand': sand,
-                'aggregate': aggregate,
-                'ratio': f"1:{sand_ratio}:{aggregate_ratio}" if aggregate_ratio else f"1:{sand_ratio}"
-            }
-        
-        elif calc_type == 'abrams_law':
-            # 10. Lei de Abrams (fc = K⋅(a/c)^-n)
-            k_constant = float(request.form.get('k_constant', 200))
-            water_cement_ratio = float(request.form.get('water_cement_ratio', 0.5))
-            n_exponent = float(request.form.get('n_exponent', 2))
-            
-            if k_constant and water_cement_ratio and n_exponent:
-                concrete_strength = k_constant * (water_cement_ratio ** (-n_exponent))
-                
-                results['abrams_law'] = {
-                    'concrete_strength': concrete_strength,
-                    'k_constant': k_constant,
-                    'water_cement_ratio': water_cement_ratio,
-                    'n_exponent': n_exponent
-                }
-        
-        # HIDRÁULICA E HIDROLOGIA
-        elif calc_type == 'flow_rate':
-            # 11. Vazão (Q = A⋅v)
-            area = float(request.form.get('area', 0))  # m²
-            velocity = float(request.form.get('velocity', 0))  # m/s
-            
-            if area and velocity:
-                flow_rate = area * velocity  # m³/s
-                
-                results['flow_rate'] = {
-                    'flow_rate': flow_rate,
-                    'area': area,
-                    'velocity': velocity
-                }
-        
-        elif calc_type == 'continuity_equation':
-            # 12. Equação da Continuidade (A₁⋅v₁ = A₂⋅v₂)
-            area1 = float(request.form.get('area1', 0))  # m²
-            velocity1 = float(request.form.get('velocity1', 0))  # m/s
-            area2 = float(request.form.get('area2', 0))  # m²
-            
-            if area1 and velocity1 and area2:
-                velocity2 = (area1 * velocity1) / area2  # m/s
-                
-                results['continuity_equation'] = {
-                    'area1': area1,
-                    'velocity1': velocity1,
-                    'area2': area2,
-                    'velocity2': velocity2
-                }
-        
-        elif calc_type == 'bernoulli_equation':
-            # 13. Equação de Bernoulli (p/γ + v²/2g + z = constante)
-            pressure1 = float(request.form.get('pressure1', 0))  # Pa
-            velocity1 = float(request.form.get('velocity1', 0))  # m/s
-            elevation1 = float(request.form.get('elevation1', 0))  # m
-            pressure2 = float(request.form.get('pressure2', 0))  # Pa
-            velocity2 = float(request.form.get('velocity2', 0))  # m/s
-            elevation2 = float(request.form.get('elevation2', 0))  # m
-            specific_weight = float(request.form.get('specific_weight', 9810))  # N/m³
-            
-            g = 9.81  # m/s²
-            
-            # Carga total nos pontos
-            head1 = pressure1/specific_weight + (velocity1**2)/(2*g) + elevation1
-            head2 = pressure2/specific_weight + (velocity2**2)/(2*g) + elevation2
-            
-            results['bernoulli_equation'] = {
-                'head1': head1,
-                'head2': head2,
-                'head_loss': abs(head1 - head2),
-                'pressure1': pressure1,
-                'velocity1': velocity1,
-                'elevation1': elevation1,
-                'pressure2': pressure2,
-                'velocity2': velocity2,
-                'elevation2': elevation2
-            }
-        
-        elif calc_type == 'reynolds_number':
-            # 14. Número de Reynolds (Re = ρ⋅v⋅D/μ)
-            density = float(request.form.get('density', 1000))  # kg/m³
-            velocity = float(request.form.get('velocity', 0))  # m/s
-            diameter = float(request.form.get('diameter', 0))  # m
-            viscosity = float(request.form.get('viscosity', 0.001))  # Pa.s
-            
-            if velocity and diameter and viscosity:
-                reynolds = (density * velocity * diameter) / viscosity
-                
-                if reynolds < 2300:
-                    flow_type = "Laminar"
-                elif reynolds > 4000:
-                    flow_type = "Turbulento"
-                else:
-                    flow_type = "Transição"
-                
-                results['reynolds_number'] = {
-                    'reynolds': reynolds,
-                    'flow_type': flow_type,
-                    'density': density,
-                    'velocity': velocity,
-                    'diameter': diameter,
-                    'viscosity': viscosity
-                }
-        
-        elif calc_type == 'manning_formula':
-            # 15. Fórmula de Manning (Q = 1/n⋅A⋅R^(2/3)⋅S^(1/2))
-            area = float(request.form.get('area', 0))  # m²
-            wetted_perimeter = float(request.form.get('wetted_perimeter', 0))  # m
-            slope = float(request.form.get('slope', 0))  # m/m
-            manning_n = float(request.form.get('manning_n', 0.013))
-            
-            if area and wetted_perimeter and slope and manning_n:
-                hydraulic_radius = area / wetted_perimeter
-                flow_rate = (1/manning_n) * area * (hydraulic_radius**(2/3)) * (slope**0.5)
-                
-                results['manning_formula'] = {
-                    'flow_rate': flow_rate,
-                    'hydraulic_radius': hydraulic_radius,
-                    'area': area,
-                    'wetted_perimeter': wetted_perimeter,
-                    'slope': slope,
-                    'manning_n': manning_n
-                }
-        
-        # GEOTECNIA E FUNDAÇÕES
-        elif calc_type == 'effective_stress':
-            # 16. Pressão Efetiva (σ' = σ - u)
-            total_stress = float(request.form.get('total_stress', 0))  # Pa
-            pore_pressure = float(request.form.get('pore_pressure', 0))  # Pa
-            
-            effective_stress = total_stress - pore_pressure
-            
-            results['effective_stress'] = {
-                'effective_stress': effective_stress,
-                'total_stress': total_stress,
-                'pore_pressure': pore_pressure
-            }
-        
-        elif calc_type == 'terzaghi_bearing':
-            # 17. Capacidade de Carga (Terzaghi)
-            cohesion = float(request.form.get('cohesion', 0))  # Pa
-            unit_weight = float(request.form.get('unit_weight', 18000))  # N/m³
-            depth = float(request.form.get('depth', 1))  # m
-            width = float(request.form.get('width', 1))  # m
-            friction_angle = float(request.form.get('friction_angle', 30))  # graus
-            
-            if friction_angle:
-                phi_rad = math.radians(friction_angle)
-                
-                # Fatores de capacidade de carga
-                Nq = math.exp(math.pi * math.tan(phi_rad)) * (math.tan(math.pi/4 + phi_rad/2))**2
-                Nc = (Nq - 1) / math.tan(phi_rad) if friction_angle > 0 else 5.14
-                Ng = 2 * (Nq - 1) * math.tan(phi_rad)
-                
-                # Capacidade de carga última
-                q_ult = cohesion * Nc + unit_weight * depth * Nq + 0.5 * unit_weight * width * Ng
-                
-                results['terzaghi_bearing'] = {
-                    'ultimate_capacity': q_ult,
-                    'Nc': Nc,
-                    'Nq': Nq,
-                    'Ng': Ng,
-                    'cohesion': cohesion,
-                    'unit_weight': unit_weight,
-                    'depth': depth,
-                    'width': width,
-                    'friction_angle': friction_angle
-                }
-        
-        elif calc_type == 'elastic_settlement':
-            # 18. Assentamento Elástico (S = q⋅B(1-ν²)/E)
-            bearing_pressure = float(request.form.get('bearing_pressure', 0))  # Pa
-            width = float(request.form.get('width', 0))  # m
-            poisson_ratio = float(request.form.get('poisson_ratio', 0.3))
-            elastic_modulus = float(request.form.get('elastic_modulus', 0))  # Pa
-            
-            if bearing_pressure and width and elastic_modulus:
-                settlement = (bearing_pressure * width * (1 - poisson_ratio**2)) / elastic_modulus
-                
-                results['elastic_settlement'] = {
-                    'settlement': settlement,
-                    'bearing_pressure': bearing_pressure,
-                    'width': width,
-                    'poisson_ratio': poisson_ratio,
-                    'elastic_modulus': elastic_modulus
-                }
-        
-        # CONSTRUÇÃO E MATERIAIS
-        elif calc_type == 'specific_weight':
-            # 19. Peso Específico (γ = P/V)
-            weight = float(request.form.get('weight', 0))  # N
-            volume = float(request.form.get('volume', 0))  # m³
-            
-            if weight and volume:
-                specific_weight = weight / volume  # N/m³
-                
-                results['specific_weight'] = {
-                    'specific_weight': specific_weight,
-                    'weight': weight,
-                    'volume': volume
-                }
-        
-        elif calc_type == 'concrete_volume':
-            # 20. Volume de Concreto (V = b⋅h⋅l)
-            base = float(request.form.get('base', 0))  # m
-            height = float(request.form.get('height', 0))  # m
-            length = float(request.form.get('length', 0))  # m
-            
-            if base and height and length:
-                volume = base * height * length  # m³
-                
-                results['concrete_volume'] = {
-                    'volume': volume,
-                    'base': base,
-                    'height': height,
-                    'length': length
-                }
+    if request.method == 'GET':
+        return render_template('calculators/reliability.html', formula=formula, spec=spec,
+                               resistance=RESISTANCE_OUTPUTS[formula], numeric_inputs=numeric_inputs(spec),
+                               distributions={name: list(d[0]) for name, d in DISTRIBUTIONS.items()},
+                               samples=MC_DEFAULT_SAMPLES)
     
-    return render_template('calculators/civil_engineering_formulas.html', results=results)
\ No newline at end of file
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('inputs'), dict) or 'demand' not in data:
+        return jsonify({'error': 'Expected a JSON object with inputs and demand'}), 400
+    study = {
+        'mode': 'reliability',
+        'inputs': data['inputs'],
+        'demand': data['demand'],
+        'samples': data.get('samples', MC_DEFAULT_SAMPLES),
+        'seed': data.get('seed', 0),
+    }
+    try:
+        key, result = cached_json(get_db(), formula, study,
+                                  lambda: simulate(formula, study['inputs'], study['demand'],
+                                                   study['samples'], study['seed']))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(result, mimetype='application/json')
+
+def json_arrays(value):
+    """A solver result with its NumPy arrays as JSON lists (non-finite numbers as null)"""
+    if isinstance(value, dict):
+        return {key: json_arrays(item) for key, item in value.items()}
+    if isinstance(value, np.ndarray):
+        return to_json(value)
+    return value
+
+@calculators_bp.route('/network')
+@login_required
+def network():
+    """Análise de redes de distribuição de água"""
+    projects = get_db().execute('SELECT id, name FROM projects ORDER BY name').fetchall()
+    return render_template('calculators/network.html', projects=projects)
+
+@calculators_bp.route('/network/solve', methods=['POST'])
+@login_required
+def network_solve():
+    """Solve a pipe network posted as JSON (see calc_engine.network.parse_network).
+
+    Returns per-node heads and pressures and per-pipe flows, velocities
+    and head losses as parallel lists, in SI units."""
+    try:
+        network = parse_network(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(json_arrays(solve_network(network)))
+
+@calculators_bp.route('/network/budget', methods=['POST'])
+@login_required
+def network_budget():
+    """Add a network's pipe quantities to a project's budget.
+
+    JSON {"network": {...}, "project_id": 1, "unit_costs": {"100": 45.0}}:
+    one budget line per diameter with the total length in m. Unit costs
+    are per metre by diameter in mm; diameters without one take the
+    median recent price paid for the same description, else 0."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        network = parse_network(data.get('network'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    unit_costs = data.get('unit_costs') or {}
+    if not isinstance(unit_costs, dict):
+        return jsonify({'error': 'unit_costs must map diameters in mm to prices'}), 400
+    
+    db = get_db()
+    project = db.execute('SELECT id FROM projects WHERE id = ?', (data.get('project_id'),)).fetchone()
+    if project is None:
+        return jsonify({'error': 'Project not found'}), 404
+    
+    items = []
+    for diameter, length in pipe_quantities(network):
+        nominal = round(diameter * 1000, 1)
+        description = f'Tubo DN {nominal:g} mm'
+        try:
+            unit_cost = float(unit_costs.get(f'{nominal:g}', ''))
+        except (TypeError, ValueError):
+            price = price_lookup(db, description)
+            unit_cost = price['median'] if price else 0.0
+        items.append((project['id'], 'Hidráulica', description, round(length, 2), unit_cost,
+                      round(length, 2) * unit_cost))
+    db.executemany(
+        'INSERT INTO budget_items (project_id, category, description, '
+        'quantity, unit_cost, total_cost) VALUES (?, ?, ?, ?, ?, ?)',
+        items
+    )
+    db.commit()
+    return jsonify({
+        'project_id': project['id'],
+        'items': [
+            {'description': description, 'quantity': quantity, 'unit': 'm', 'unit_cost': unit_cost,
+             'total_cost': total_cost}
+            for _, _, description, quantity, unit_cost, total_cost in items
+        ]
+    })
+
+@calculators_bp.route('/frame')
+@login_required
+def frame():
+    """Análise de vigas contínuas e pórticos planos"""
+    return render_template('calculators/frame.html')
+
+@calculators_bp.route('/frame/solve', methods=['POST'])
+@login_required
+def frame_solve():
+    """Solve a plane beam or frame posted as JSON (see calc_engine.frames.parse_frame).
+
+    Returns node displacements, support reactions and axial force, shear,
+    moment and deflection diagrams per load combination, plus each
+    element's envelope, in kN and m."""
+    try:
+        result = solve_frame(parse_frame(request.get_json(silent=True)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(json_arrays(result))
@@ -1,7 +1,6 @@
-import os
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from werkzeug.utils import secure_filename
 from datetime import datetime
+from blobstore import save_upload, claim_upload
 
 compliance_bp = Blueprint('compliance', __name__)
 
@@ -80,14 +79,16 @@ def new():
         
         # Handle file upload
         file_path = None
-        if 'document_file' in request.files:
+        if request.form.get('document_file_upload'):
+            # Sent through the resumable chunked upload API
+            file_path = claim_upload(db, request.form['document_file_upload'], session['user_id'])
+            if file_path is None:
+                flash('Uploaded file not found or expired, please upload it again', 'error')
+                return render_template('compliance/form.html', projects=projects)
+        elif 'document_file' in request.files:
             file = request.files['document_file']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                filename = timestamp + filename
-                file_path = os.path.join('uploads', filename)
-                file.save(file_path)
+                file_path = save_upload(db, file)
         
         try:
             db.execute(
@@ -134,14 +135,16 @@ def edit(id):
         
         # Handle file upload
         file_path = document['file_path']  # Keep existing path
-        if 'document_file' in request.files:
+        if request.form.get('document_file_upload'):
+            # Sent through the resumable chunked upload API
+            file_path = claim_upload(db, request.form['document_file_upload'], session['user_id'])
+            if file_path is None:
+                flash('Uploaded file not found or expired, please upload it again', 'error')
+                return render_template('compliance/form.html', document=document, projects=projects)
+        elif 'document_file' in request.files:
             file = request.files['document_file']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                filename = timestamp + filename
-                file_path = os.path.join('uploads', filename)
-                file.save(file_path)
+                file_path = save_upload(db, file)
         
         try:
             db.execute(
@@ -173,10 +176,7 @@ def delete(id):
         return redirect(url_for('compliance.index'))
     
     try:
-        # Delete associated file if exists
-        if document['file_path'] and os.path.exists(document['file_path']):
-            os.remove(document['file_path'])
-        
+        # The file's blob is released by a trigger and garbage-collected
         db.execute('DELETE FROM compliance_docs WHERE id = ?', (id,))
         db.commit()
         flash('Document deleted successfully', 'success')
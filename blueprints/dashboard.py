@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, session, redirect, url_for
 from datetime import datetime, timedelta
+from jobs import KPI_QUERIES, compute_kpis
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -15,28 +16,10 @@ def index():
     
     db = get_db()
     
-    # Get KPIs
-    total_projects = db.execute('SELECT COUNT(*) as count FROM projects').fetchone()['count']
-    active_projects = db.execute(
-        'SELECT COUNT(*) as count FROM projects WHERE status = ?', ('active',)
-    ).fetchone()['count']
-    
-    total_budget = db.execute(
-        'SELECT SUM(total_cost) as total FROM budget_items'
-    ).fetchone()['total'] or 0
-    
-    pending_tasks = db.execute(
-        'SELECT COUNT(*) as count FROM tasks WHERE status = ?', ('pending',)
-    ).fetchone()['count']
-    
-    overdue_tasks = db.execute(
-        'SELECT COUNT(*) as count FROM tasks WHERE due_date < ? AND status = ?',
-        (datetime.now().date(), 'pending')
-    ).fetchone()['count']
-    
-    open_incidents = db.execute(
-        'SELECT COUNT(*) as count FROM incidents WHERE status = ?', ('open',)
-    ).fetchone()['count']
+    # KPIs are precomputed by the dashboard_rollup job; compute live until the first run
+    kpis = {row['name']: row['value'] for row in db.execute('SELECT name, value FROM kpi_rollups')}
+    if not all(name in kpis for name in KPI_QUERIES):
+        kpis = compute_kpis(db)
     
     # Get recent activities
     recent_projects = db.execute(
@@ -69,15 +52,6 @@ def index():
         (datetime.now().date(), (datetime.now() + timedelta(days=30)).date())
     ).fetchall()
     
-    kpis = {
-        'total_projects': total_projects,
-        'active_projects': active_projects,
-        'total_budget': total_budget,
-        'pending_tasks': pending_tasks,
-        'overdue_tasks': overdue_tasks,
-        'open_incidents': open_incidents
-    }
-    
     return render_template('dashboard.html', 
                          kpis=kpis,
                          recent_projects=recent_projects,
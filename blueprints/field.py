@@ -1,8 +1,24 @@
+import os
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from subscription_utils import require_pro
+from device_keys import create_device, revoke_device, verify_api_key
+from ratelimit import TokenBucketLimiter
 
 field_bp = Blueprint('field', __name__)
 
+# Per device and project: FIELD_RATE_LIMIT measurements per second, bursts up to FIELD_RATE_BURST
+ingest_limiter = TokenBucketLimiter(
+    rate=float(os.environ.get('FIELD_RATE_LIMIT', 1)),
+    burst=float(os.environ.get('FIELD_RATE_BURST', 30))
+)
+
+def request_api_key():
+    """API key from `Authorization: Bearer <key>` or `X-API-Key`"""
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        return auth[7:].strip()
+    return request.headers.get('X-API-Key')
+
 def get_db():
     """Get database connection"""
     from flask import current_app
@@ -97,9 +113,17 @@ def add():
 
 @field_bp.route('/api/record', methods=['POST'])
 def api_record():
-    """API endpoint for IoT devices and external systems to submit measurements"""
+    """API endpoint for IoT devices and external systems to submit measurements.
+
+    Requires a device API key (see /field/devices) and is rate limited per
+    device and project, answering 429 with Retry-After when exceeded."""
     try:
-        data = request.get_json()
+        db = get_db()
+        device = verify_api_key(db, request_api_key())
+        if device is None:
+            return jsonify({'error': 'Invalid or missing API key'}), 401
+        
+        data = request.get_json(silent=True)
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
@@ -115,22 +139,37 @@ def api_record():
         except (ValueError, TypeError):
             return jsonify({'error': 'Invalid value - must be numeric'}), 400
         
-        db = get_db()
+        # The integer id keys the rate limit, so '1' and '001' share one bucket
+        project_id = data.get('project_id') or device['project_id']
+        if project_id is not None:
+            try:
+                project_id = int(str(project_id))
+            except ValueError:
+                return jsonify({'error': 'Invalid project_id'}), 400
+        
+        # Devices bound to a project can only record for it
+        if device['project_id'] and project_id != device['project_id']:
+            return jsonify({'error': 'Device is not allowed to record for this project'}), 403
         
         # Validate project_id if provided
-        project_id = data.get('project_id')
-        if project_id:
+        if project_id and not device['project_id']:
             project = db.execute('SELECT id FROM projects WHERE id = ?', (project_id,)).fetchone()
             if not project:
                 return jsonify({'error': 'Invalid project_id'}), 400
         
+        allowed, retry_after = ingest_limiter.acquire(f"{device['id']}:{project_id or ''}")
+        if not allowed:
+            response = jsonify({'error': 'Rate limit exceeded'})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
+        
         db.execute(
             'INSERT INTO field_measurements (project_id, measurement_type, '
             'value, unit, location, device_id, notes) '
             'VALUES (?, ?, ?, ?, ?, ?, ?)',
             (project_id, data['measurement_type'], value,
              data.get('unit'), data.get('location'),
-             data.get('device_id'), data.get('notes'))
+             device['device_id'], data.get('notes'))
         )
         db.commit()
         
@@ -139,6 +178,54 @@ def api_record():
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
+@field_bp.route('/devices', methods=['GET', 'POST'])
+@require_pro
+def devices():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    db = get_db()
+    new_key = None
+    
+    if request.method == 'POST':
+        name = request.form.get('name')
+        device_id = request.form.get('device_id')
+        project_id = request.form.get('project_id')
+        
+        if not all([name, device_id]):
+            flash('Device name and identifier are required', 'error')
+        else:
+            new_key = create_device(db, session['user_id'], name, device_id, project_id or None)
+            db.commit()
+            flash('Device registered. Copy the API key now, it will not be shown again.', 'success')
+    
+    device_list = db.execute(
+        'SELECT fd.*, p.name as project_name FROM field_devices fd '
+        'LEFT JOIN projects p ON fd.project_id = p.id '
+        'WHERE fd.user_id = ? ORDER BY fd.revoked_at IS NOT NULL, fd.created_at DESC',
+        (session['user_id'],)
+    ).fetchall()
+    projects = db.execute('SELECT id, name FROM projects ORDER BY name').fetchall()
+    
+    return render_template('field/devices.html', devices=device_list,
+                         projects=projects, new_key=new_key)
+
+@field_bp.route('/devices/<int:device_pk>/revoke', methods=['POST'])
+def revoke(device_pk):
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    db = get_db()
+    device = db.execute(
+        'SELECT id FROM field_devices WHERE id = ? AND user_id = ?',
+        (device_pk, session['user_id'])
+    ).fetchone()
+    if device:
+        revoke_device(db, device_pk)
+        db.commit()
+        flash('Device key revoked', 'success')
+    return redirect(url_for('field.devices'))
+
 @field_bp.route('/charts')
 def charts():
     if 'user_id' not in session:
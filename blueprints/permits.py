@@ -1,7 +1,5 @@
-import os
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from werkzeug.utils import secure_filename
-from datetime import datetime
+from blobstore import save_upload, claim_upload
 
 permits_bp = Blueprint('permits', __name__)
 
@@ -73,12 +71,10 @@ def new():
         if 'document' in request.files:
             file = request.files['document']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                filename = timestamp + filename
-                file_path = os.path.join('uploads', filename)
-                file.save(file_path)
-                document_path = file_path
+                document_path = save_upload(db, file)
+        if request.form.get('document_upload'):
+            # Sent through the resumable chunked upload API
+            document_path = claim_upload(db, request.form['document_upload'], session['user_id']) or document_path
         
         try:
             db.execute(
@@ -128,12 +124,10 @@ def edit(id):
         if 'document' in request.files:
             file = request.files['document']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                filename = timestamp + filename
-                file_path = os.path.join('uploads', filename)
-                file.save(file_path)
-                document_path = file_path
+                document_path = save_upload(db, file)
+        if request.form.get('document_upload'):
+            # Sent through the resumable chunked upload API
+            document_path = claim_upload(db, request.form['document_upload'], session['user_id']) or document_path
         
         try:
             db.execute(
@@ -165,10 +159,7 @@ def delete(id):
         return redirect(url_for('permits.index'))
     
     try:
-        # Delete associated file if exists
-        if permit['document_path'] and os.path.exists(permit['document_path']):
-            os.remove(permit['document_path'])
-        
+        # The file's blob is released by a trigger and garbage-collected
         db.execute('DELETE FROM permits WHERE id = ?', (id,))
         db.commit()
         flash('Permit deleted successfully', 'success')
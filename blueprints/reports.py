@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, make_response
 from datetime import datetime, timedelta
 import json
+from purchasing import normalize_material
 
 reports_bp = Blueprint('reports', __name__)
 
@@ -292,6 +293,70 @@ def permits():
                              'type': permit_type
                          })
 
+@reports_bp.route('/materials')
+def materials():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    db = get_db()
+    
+    # Get filter parameters
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    material = request.args.get('material')
+    supplier_id = request.args.get('supplier_id')
+    
+    # Quantities and prices per material and supplier, aggregated from order lines
+    query = '''
+        SELECT l.material_key, MIN(l.description) as material, l.unit,
+               s.name as supplier_name,
+               COUNT(DISTINCT l.order_id) as order_count,
+               SUM(l.quantity) as total_quantity,
+               SUM(l.total_price) as total_spent,
+               SUM(l.total_price) / NULLIF(SUM(CASE WHEN l.unit_price IS NOT NULL THEN l.quantity END), 0) as avg_unit_price,
+               MIN(l.unit_price) as min_unit_price,
+               MAX(l.unit_price) as max_unit_price
+        FROM purchase_order_lines l
+        JOIN purchase_orders po ON l.order_id = po.id
+        LEFT JOIN suppliers s ON po.supplier_id = s.id
+        WHERE 1=1
+    '''
+    params = []
+    
+    if start_date:
+        query += ' AND COALESCE(po.order_date, date(po.created_at)) >= ?'
+        params.append(start_date)
+    
+    if end_date:
+        query += ' AND COALESCE(po.order_date, date(po.created_at)) <= ?'
+        params.append(end_date)
+    
+    if material:
+        # Prefix match on the normalized key uses idx_purchase_order_lines_material
+        key = normalize_material(material)
+        query += ' AND l.material_key >= ? AND l.material_key < ?'
+        params.extend([key, key + '\uffff'])
+    
+    if supplier_id:
+        query += ' AND po.supplier_id = ?'
+        params.append(supplier_id)
+    
+    query += ' GROUP BY l.material_key, l.unit, po.supplier_id ORDER BY total_spent DESC, total_quantity DESC'
+    
+    rows = db.execute(query, params).fetchall()
+    
+    suppliers = db.execute('SELECT id, name FROM suppliers ORDER BY name').fetchall()
+    
+    return render_template('reports/materials.html',
+                         rows=rows,
+                         suppliers=suppliers,
+                         filters={
+                             'start_date': start_date,
+                             'end_date': end_date,
+                             'material': material,
+                             'supplier_id': supplier_id
+                         })
+
 @reports_bp.route('/export/<report_type>')
 def export(report_type):
     if 'user_id' not in session:
@@ -0,0 +1,46 @@
+from flask import Blueprint, render_template, request, redirect, url_for, session
+from search_index import search, search_documents, SEARCH_KINDS
+
+search_bp = Blueprint('search', __name__)
+
+# Where each kind of result is opened
+RESULT_ENDPOINTS = {
+    'project': lambda id: url_for('projects.edit', id=id),
+    'permit': lambda id: url_for('permits.edit', id=id),
+    'incident': lambda id: url_for('safety.edit', id=id),
+    'compliance_doc': lambda id: url_for('compliance.edit', id=id),
+    'risk': lambda id: url_for('risks.edit', id=id),
+    'note': lambda id: url_for('notes'),
+    'certification': lambda id: url_for('training.worker_details', worker_id=id),
+}
+
+def get_db():
+    """Get database connection"""
+    from flask import current_app
+    return current_app.get_db()
+
+@search_bp.route('/')
+def index():
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind') or None
+    page = max(request.args.get('page', 1, type=int), 1)
+    
+    if not query:
+        results, has_next = [], False
+    elif kind == 'document':
+        results, has_next = search_documents(get_db(), query, page)
+    else:
+        results, has_next = search(get_db(), query, page, kind)
+    for result in results:
+        result['url'] = RESULT_ENDPOINTS[result['kind']](result['id'])
+    
+    return render_template('search/index.html',
+                         query=query,
+                         kind=kind,
+                         kinds=SEARCH_KINDS,
+                         page=page,
+                         has_next=has_next,
+                         results=results)
@@ -1,5 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 import json
+from datetime import datetime
+from purchasing import save_order_lines
 
 suppliers_bp = Blueprint('suppliers', __name__)
 
@@ -8,33 +10,38 @@ def get_db():
     from flask import current_app
     return current_app.get_db()
 
+# Supplier list orderings (whitelisted ORDER BY clauses)
+SUPPLIER_SORTS = {
+    'name': 's.name',
+    'spend': 'sc.total_spend DESC',
+    'orders': 'sc.order_count DESC',
+    'on_time': 'sc.on_time_rate DESC',
+    'lead_time': 'sc.avg_lead_time IS NULL, sc.avg_lead_time ASC',
+}
+
+ORDER_STATUSES = ('pending', 'confirmed', 'delivered', 'cancelled')
+
 @suppliers_bp.route('/')
 def index():
     if 'user_id' not in session:
         return redirect(url_for('auth.login'))
     
+    sort = request.args.get('sort', 'name')
+    if sort not in SUPPLIER_SORTS:
+        sort = 'name'
+    
+    # Order statistics come from the scorecard maintained by purchase_orders triggers
     db = get_db()
     suppliers = db.execute(
-        'SELECT * FROM suppliers ORDER BY name'
+        'SELECT s.*, COALESCE(sc.order_count, 0) as orders_count, '
+        'COALESCE(sc.total_spend, 0) as total_amount, '
+        'sc.avg_lead_time, sc.on_time_rate '
+        'FROM suppliers s '
+        'LEFT JOIN supplier_scorecard sc ON sc.supplier_id = s.id '
+        'ORDER BY ' + SUPPLIER_SORTS[sort]
     ).fetchall()
     
-    # Get purchase order statistics
-    for supplier in suppliers:
-        orders_count = db.execute(
-            'SELECT COUNT(*) as count FROM purchase_orders WHERE supplier_id = ?',
-            (supplier['id'],)
-        ).fetchone()['count']
-        
-        total_amount = db.execute(
-            'SELECT SUM(total_amount) as total FROM purchase_orders WHERE supplier_id = ?',
-            (supplier['id'],)
-        ).fetchone()['total'] or 0
-        
-        supplier = dict(supplier)
-        supplier['orders_count'] = orders_count
-        supplier['total_amount'] = total_amount
-    
-    return render_template('suppliers/index.html', suppliers=suppliers)
+    return render_template('suppliers/index.html', suppliers=suppliers, sort=sort)
 
 @suppliers_bp.route('/new', methods=['GET', 'POST'])
 def new():
@@ -175,7 +182,7 @@ def new_order():
                                  projects=projects, suppliers=suppliers)
         
         try:
-            db.execute(
+            cursor = db.execute(
                 'INSERT INTO purchase_orders (project_id, supplier_id, order_number, '
                 'order_date, expected_delivery, total_amount, items) '
                 'VALUES (?, ?, ?, ?, ?, ?, ?)',
@@ -183,6 +190,7 @@ def new_order():
                  order_date or None, expected_delivery or None,
                  float(total_amount) if total_amount else 0, items)
             )
+            save_order_lines(db, cursor.lastrowid, items)
             db.commit()
             flash('Purchase order created successfully', 'success')
             return redirect(url_for('suppliers.orders'))
@@ -191,3 +199,37 @@ def new_order():
     
     return render_template('suppliers/order_form.html', 
                          projects=projects, suppliers=suppliers)
+
+@suppliers_bp.route('/orders/<int:id>/status', methods=['POST'])
+def update_order_status(id):
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    
+    db = get_db()
+    order = db.execute('SELECT * FROM purchase_orders WHERE id = ?', (id,)).fetchone()
+    
+    if not order:
+        flash('Purchase order not found', 'error')
+        return redirect(url_for('suppliers.orders'))
+    
+    status = request.form.get('status')
+    if status not in ORDER_STATUSES:
+        flash('Invalid order status', 'error')
+        return redirect(url_for('suppliers.orders'))
+    
+    # Delivery date feeds the supplier's on-time rate
+    delivered_date = None
+    if status == 'delivered':
+        delivered_date = request.form.get('delivered_date') or datetime.now().strftime('%Y-%m-%d')
+    
+    try:
+        db.execute(
+            'UPDATE purchase_orders SET status = ?, delivered_date = ? WHERE id = ?',
+            (status, delivered_date, id)
+        )
+        db.commit()
+        flash('Purchase order updated successfully', 'success')
+    except Exception as e:
+        flash('Error updating purchase order', 'error')
+    
+    return redirect(url_for('suppliers.orders'))
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from subscription_utils import require_pro
+from pricing import record_price
 
 sustainability_bp = Blueprint('sustainability', __name__)
 
@@ -128,20 +129,23 @@ def log_usage():
             
             # Get material emissions and cost per unit
             material = db.execute(
-                'SELECT carbon_emissions_per_unit, cost_per_unit FROM materials WHERE id = ?',
+                'SELECT name, carbon_emissions_per_unit, cost_per_unit, supplier_id FROM materials WHERE id = ?',
                 (material_id,)
             ).fetchone()
             
             total_emissions = quantity * material['carbon_emissions_per_unit']
             total_cost = quantity * material['cost_per_unit']
             
-            db.execute(
+            cursor = db.execute(
                 'INSERT INTO material_logs (project_id, material_id, quantity, '
                 'date_used, total_emissions, total_cost, notes) '
                 'VALUES (?, ?, ?, ?, ?, ?, ?)',
                 (project_id or None, material_id, quantity,
                  date_used or None, total_emissions, total_cost, notes)
             )
+            if material['cost_per_unit']:
+                record_price(db, material['name'], material['cost_per_unit'], date_used,
+                             material['supplier_id'], material_id, 'material_log', cursor.lastrowid)
             db.commit()
             flash('Material usage logged successfully', 'success')
             return redirect(url_for('sustainability.index'))
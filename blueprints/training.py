@@ -1,7 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from datetime import datetime, timedelta
-import os
-from werkzeug.utils import secure_filename
+from blobstore import save_upload, claim_upload
 
 training_bp = Blueprint('training', __name__)
 
@@ -226,15 +225,17 @@ def assign():
         
         # Handle certificate upload
         certificate_path = None
-        if 'certificate' in request.files:
+        if request.form.get('certificate_upload'):
+            # Sent through the resumable chunked upload API
+            certificate_path = claim_upload(db, request.form['certificate_upload'], session['user_id'])
+            if certificate_path is None:
+                flash('Uploaded certificate not found or expired, please upload it again', 'error')
+                return render_template('training/assign_form.html',
+                                     workers=workers, trainings=trainings)
+        elif 'certificate' in request.files:
             file = request.files['certificate']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                filename = timestamp + filename
-                file_path = os.path.join('uploads', filename)
-                file.save(file_path)
-                certificate_path = file_path
+                certificate_path = save_upload(db, file)
         
         try:
             db.execute(
@@ -0,0 +1,114 @@
+import os
+from flask import Blueprint, request, session, jsonify
+from werkzeug.utils import secure_filename
+from blobstore import (create_upload_session, write_chunk, finalize_upload,
+                       MAX_UPLOAD_BYTES, MAX_CHUNK_BYTES)
+
+uploads_bp = Blueprint('uploads', __name__)
+
+ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png'}
+
+def get_db():
+    """Get database connection"""
+    from flask import current_app
+    return current_app.get_db()
+
+def allowed_file(filename):
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def session_json(upload):
+    return {
+        'id': upload['id'],
+        'offset': upload['received'],
+        'size': upload['size'],
+        'complete': upload['status'] == 'complete',
+        'chunk_size': MAX_CHUNK_BYTES
+    }
+
+def get_upload(db, upload_id):
+    return db.execute(
+        'SELECT * FROM upload_sessions WHERE id = ? AND user_id = ?',
+        (upload_id, session['user_id'])
+    ).fetchone()
+
+@uploads_bp.route('', methods=['POST'])
+def init():
+    """Start or resume an upload: {filename, size, sha256}"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    sha256 = (data.get('sha256') or '').lower()
+    size = data.get('size')
+    
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'File type not allowed'}), 400
+    if not isinstance(size, int) or size <= 0 or size > MAX_UPLOAD_BYTES:
+        return jsonify({'error': f'Size must be between 1 and {MAX_UPLOAD_BYTES} bytes'}), 400
+    if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+        return jsonify({'error': 'Invalid sha256'}), 400
+    
+    db = get_db()
+    upload = create_upload_session(db, session['user_id'], filename, size, sha256)
+    db.commit()
+    return jsonify(session_json(upload)), 201
+
+@uploads_bp.route('/<upload_id>', methods=['GET'])
+def status(upload_id):
+    """Last acknowledged offset, for resuming"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    upload = get_upload(get_db(), upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(session_json(upload))
+
+@uploads_bp.route('/<upload_id>', methods=['PUT'])
+def put_chunk(upload_id):
+    """Append the raw request body at ?offset=; the body is streamed to disk, never buffered"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    db = get_db()
+    upload = get_upload(db, upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    if upload['status'] == 'complete':
+        return jsonify(session_json(upload))
+    
+    offset = request.args.get('offset', type=int)
+    length = request.content_length
+    if length is None or length > MAX_CHUNK_BYTES:
+        return jsonify({'error': f'Chunks need a Content-Length of at most {MAX_CHUNK_BYTES} bytes'}), 413
+    if offset != upload['received']:
+        # Client is out of sync (e.g. a lost acknowledgement): tell it where to resume
+        return jsonify(dict(session_json(upload), error='Offset mismatch')), 409
+    
+    try:
+        write_chunk(db, upload, offset, request.stream, length)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    db.commit()
+    return jsonify(session_json(get_upload(db, upload_id)))
+
+@uploads_bp.route('/<upload_id>/finalize', methods=['POST'])
+def finalize(upload_id):
+    """Verify the whole-file hash and store the file; returns the id to submit with the form"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    db = get_db()
+    upload = get_upload(db, upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    if upload['received'] != upload['size']:
+        return jsonify(dict(session_json(upload), error='Upload incomplete')), 409
+    
+    path = finalize_upload(db, upload)
+    db.commit()
+    if path is None:
+        return jsonify(dict(session_json(get_upload(db, upload_id)), error='Hash mismatch')), 422
+    return jsonify(dict(session_json(get_upload(db, upload_id)), filename=os.path.basename(path)))
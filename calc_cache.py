@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from functools import lru_cache
+import calc_engine
+from scheduler import job, format_timestamp
+
+CALC_CACHE_DAYS = 30
+
+@lru_cache(maxsize=None)
+def engine_fingerprint():
+    """Hash of the calc_engine sources, so cached results are not reused
+    once a formula, or anything it depends on (e.g. a factor table), changes"""
+    digest = hashlib.sha256()
+    directory = os.path.dirname(calc_engine.__file__)
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.py'):
+            with open(os.path.join(directory, filename), 'rb') as f:
+                digest.update(filename.encode() + b'\0' + f.read())
+    return digest.hexdigest()
+
+def study_key(name, study):
+    """sha256 of the formula, the engine version and a canonical JSON form of the study"""
+    canonical = json.dumps(
+        {'formula': name, 'engine': engine_fingerprint(), 'study': study},
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def get_cached(db, name, key):
+    """The stored JSON text of a study of formula `name`, or None"""
+    row = db.execute('SELECT result FROM calc_cache WHERE key = ? AND formula = ?', (key, name)).fetchone()
+    return row[0] if row else None
+
+def cached_json(db, name, study, compute):
+    """(key, JSON text) for a study, computing and storing it on a miss.
+
+    compute() returns the result as a JSON-serializable object; the text is
+    stored as is so a hit is returned without parsing."""
+    key = study_key(name, study)
+    result = get_cached(db, name, key)
+    if result is None:
+        result = json.dumps(dict(compute(), key=key), allow_nan=False, separators=(',', ':'))
+        db.execute(
+            'INSERT OR REPLACE INTO calc_cache (key, formula, result, created_at) VALUES (?, ?, ?, ?)',
+            (key, name, result, format_timestamp(datetime.now()))
+        )
+        db.commit()
+    return key, result
+
+@job('calc_cache_cleanup', '15 4 * * *')
+def calc_cache_cleanup(db):
+    """Drop cached studies older than CALC_CACHE_DAYS"""
+    cutoff = format_timestamp(datetime.now() - timedelta(days=CALC_CACHE_DAYS))
+    deleted = db.execute('DELETE FROM calc_cache WHERE created_at < ?', (cutoff,)).rowcount
+    db.commit()
+    return deleted
@@ -0,0 +1,10 @@
+"""Engineering formulas as pure functions over scalars or NumPy arrays.
+
+    from calc_engine import evaluate
+    evaluate('beam_moment', load=[10, 12, 15], length=6)['max_moment']
+
+Formulas register themselves with @formula in the domain modules below and
+work in consistent base units (documented per function); the calculator
+views only parse forms and convert units."""
+from calc_engine.registry import FORMULAS, formula, evaluate, get_formula
+from calc_engine import costs, geotechnics, hydraulics, materials, structures  # noqa: F401
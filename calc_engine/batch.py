@@ -0,0 +1,182 @@
+import csv
+import io
+import json
+from itertools import islice
+import numpy as np
+from calc_engine.registry import get_formula, evaluate
+
+# Rows evaluated per vectorized call; bounds memory for any file size
+BATCH_CHUNK_ROWS = 5000
+JSON_READ_SIZE = 64 * 1024
+# Longest JSON row read before giving up on finding its end
+JSON_MAX_ROW_CHARS = 1024 * 1024
+# Output is handed to the server in pieces of about this size
+STREAM_FLUSH_BYTES = 64 * 1024
+
+def iter_csv_rows(stream):
+    """Dict rows from a CSV text stream, header first"""
+    return csv.DictReader(stream)
+
+def truncated(error, buffer):
+    """Whether a decode error is only the buffer ending inside a value.
+
+    A string left open runs to the end of the buffer (raw newlines aren't
+    allowed in one); anything else is truncation only if nothing but part
+    of a single token (a literal, number or escape) follows the error."""
+    if error.msg.startswith('Unterminated string'):
+        return True
+    return not any(char in ',:{}[]"\n' for char in buffer[error.pos:])
+
+def iter_json_rows(stream):
+    """Objects from a JSON array (or NDJSON) text stream, decoded one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        # Skip separators; refill the buffer when it runs out
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer) and buffer[position] == '[':
+                position += 1
+                started = True
+                continue
+            if position < len(buffer):
+                break
+            chunk = stream.read(JSON_READ_SIZE)
+            if not chunk:
+                return
+            buffer = buffer[position:] + chunk
+            position = 0
+        if buffer[position] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as e:
+            # Only a value cut by the read boundary is worth more input
+            if not truncated(e, buffer) or len(buffer) - position > JSON_MAX_ROW_CHARS:
+                raise
+            chunk = stream.read(JSON_READ_SIZE)
+            if not chunk:
+                raise
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        if end == len(buffer):
+            # A number at the end of the buffer may continue in the next read
+            chunk = stream.read(JSON_READ_SIZE)
+            if chunk:
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+        position = end
+        yield value
+
+def parse_row(spec, row):
+    """Formula inputs for one row, or raise ValueError naming the bad column"""
+    values = {}
+    for name in spec['inputs']:
+        raw = row.get(name)
+        if isinstance(raw, str):
+            raw = raw.strip()
+        default = spec['defaults'].get(name)
+        if raw is None or raw == '':
+            if name not in spec['defaults']:
+                raise ValueError(f'missing {name}')
+            values[name] = default
+        elif isinstance(default, str):
+            values[name] = str(raw)
+        else:
+            try:
+                values[name] = float(raw)
+            except (TypeError, ValueError):
+                raise ValueError(f'{name} is not a number')
+    return values
+
+def evaluate_rows(name, rows, chunk_rows=BATCH_CHUNK_ROWS):
+    """Evaluate a formula over an iterable of dict rows, chunk by chunk.
+
+    Yields (row, outputs, error) in input order: outputs maps each formula
+    output to a Python value, or is None with error set when the row is
+    invalid or its result is not finite (e.g. a division by zero)."""
+    spec = get_formula(name)
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+        parsed = []
+        errors = []
+        for row in chunk:
+            if not isinstance(row, dict):
+                parsed.append(None)
+                errors.append('row is not an object')
+                continue
+            try:
+                parsed.append(parse_row(spec, row))
+                errors.append(None)
+            except ValueError as e:
+                parsed.append(None)
+                errors.append(str(e))
+
+        valid = [i for i, values in enumerate(parsed) if values is not None]
+        columns = {}
+        if valid:
+            inputs = {key: [parsed[i][key] for i in valid] for key in spec['inputs']}
+            results = evaluate(name, **inputs)
+            finite = np.ones(len(valid), dtype=bool)
+            for key, array in results.items():
+                if array.dtype.kind == 'f':
+                    finite &= np.isfinite(array)
+                columns[key] = array.tolist()
+            for position, i in enumerate(valid):
+                if not finite[position]:
+                    errors[i] = 'result is not finite (check for zero or negative inputs)'
+        position_of = {i: position for position, i in enumerate(valid)}
+
+        for i, row in enumerate(chunk):
+            if errors[i] is not None:
+                yield row, None, errors[i]
+            else:
+                position = position_of[i]
+                yield row, {key: values[position] for key, values in columns.items()}, None
+
+def csv_lines(name, results, input_columns):
+    """CSV text for evaluate_rows() output: the input columns, the outputs and an error column"""
+    spec = get_formula(name)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(list(input_columns) + list(spec['outputs']) + ['error'])
+    for row, outputs, error in results:
+        line = [row.get(column, '') for column in input_columns]
+        if outputs is None:
+            line += [''] * len(spec['outputs']) + [error]
+        else:
+            line += [outputs[key] for key in spec['outputs']] + ['']
+        writer.writerow(line)
+        if buffer.tell() > STREAM_FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def ndjson_lines(results):
+    """One JSON object per row: {"row": n, ...outputs} or {"row": n, "error": ...}.
+
+    A row's "id", when it has one, is passed through."""
+    lines = []
+    for number, (row, outputs, error) in enumerate(results, start=1):
+        line = {'row': number}
+        if isinstance(row, dict) and 'id' in row:
+            line['id'] = row['id']
+        if outputs is None:
+            line['error'] = error
+        else:
+            line.update(outputs)
+        lines.append(json.dumps(line, allow_nan=False))
+        if len(lines) >= 1000:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
@@ -0,0 +1,147 @@
+"""Bearing capacity factors from precomputed tables.
+
+Nc, Nq and Nγ are tabulated for each convention every PHI_STEP degrees
+from 0 to PHI_MAX when the module is imported; lookups interpolate
+linearly on the uniform grid (one index computation shared by the three
+factors), so large sweeps and Monte Carlo runs don't evaluate exp/tan per
+sample. Away from φ = 0 (where the tables use the conventional 5.14/5.7
+rather than the limit of the Nc formula) interpolated Nc and Nq are within
+about 2e-6 of the closed forms, relative; Nγ is too above a few degrees,
+and within 1e-4 below that, where it tends to 0.
+Friction angles outside the table give nan.
+
+Conventions (all share Nc = (Nq - 1)·cot φ):
+    terzaghi  Nq = e^{2(3π/4 - φ/2)tan φ} / (2cos²(45° + φ/2)),
+              Nγ = 2(Nq + 1)tan φ / (1 + 0.4 sin 4φ) (Coduto's fit of Terzaghi's Kpγ)
+    meyerhof  Nq = e^{π tan φ}·tan²(45° + φ/2), Nγ = (Nq - 1)tan(1.4φ)
+    vesic     same Nq, Nγ = 2(Nq + 1)tan φ
+    hansen    same Nq, Nγ = 1.5(Nq - 1)tan φ
+    ec7       same Nq, Nγ = 2(Nq - 1)tan φ (EN 1997-1 Annex D; the app's original factors)
+"""
+import numpy as np
+
+PHI_STEP = 0.01
+PHI_MAX = 60.0
+DEFAULT_CONVENTION = 'ec7'
+
+# Nc at φ = 0, where (Nq - 1)/tan φ is 0/0
+NC_UNDRAINED = 5.14
+NC_UNDRAINED_TERZAGHI = 5.7
+
+def reissner_nq(phi):
+    return np.exp(np.pi * np.tan(phi)) * np.tan(np.pi / 4 + phi / 2)**2
+
+def terzaghi_nq(phi):
+    return np.exp(2 * (3 * np.pi / 4 - phi / 2) * np.tan(phi)) / (2 * np.cos(np.pi / 4 + phi / 2)**2)
+
+# convention -> (Nq(φ), Nγ(φ, Nq), Nc at φ = 0), φ in radians
+CONVENTIONS = {
+    'terzaghi': (
+        terzaghi_nq,
+        lambda phi, Nq: 2 * (Nq + 1) * np.tan(phi) / (1 + 0.4 * np.sin(4 * phi)),
+        NC_UNDRAINED_TERZAGHI,
+    ),
+    'meyerhof': (reissner_nq, lambda phi, Nq: (Nq - 1) * np.tan(1.4 * phi), NC_UNDRAINED),
+    'vesic': (reissner_nq, lambda phi, Nq: 2 * (Nq + 1) * np.tan(phi), NC_UNDRAINED),
+    'hansen': (reissner_nq, lambda phi, Nq: 1.5 * (Nq - 1) * np.tan(phi), NC_UNDRAINED),
+    'ec7': (reissner_nq, lambda phi, Nq: 2 * (Nq - 1) * np.tan(phi), NC_UNDRAINED),
+}
+
+def closed_form_factors(friction_angle, convention=DEFAULT_CONVENTION):
+    """(Nc, Nq, Nγ) from the closed forms; used to build the tables"""
+    nq_of, ng_of, nc_undrained = CONVENTIONS[convention]
+    degrees = np.asarray(friction_angle, dtype=float)
+    phi = np.radians(degrees)
+    Nq = nq_of(phi)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Nc = np.where(degrees > 0, (Nq - 1) / np.tan(phi), nc_undrained)
+    return Nc, Nq, ng_of(phi, Nq)
+
+def build_tables():
+    """convention -> (values, slopes): per factor (Nc, Nq, Nγ), its value at
+    the start of each PHI_STEP interval and the change across it"""
+    grid = np.linspace(0, PHI_MAX, int(round(PHI_MAX / PHI_STEP)) + 1)
+    tables = {}
+    for name in CONVENTIONS:
+        factors = closed_form_factors(grid, name)
+        tables[name] = (
+            tuple(np.ascontiguousarray(factor[:-1]) for factor in factors),
+            tuple(np.diff(factor) for factor in factors),
+        )
+    return tables
+
+TABLES = build_tables()
+
+def lookup(degrees, convention):
+    """(Nc, Nq, Nγ) of one convention for an array of angles"""
+    if convention not in TABLES:
+        return tuple(np.full(degrees.shape, np.nan) for _ in range(3))
+    values, slopes = TABLES[convention]
+    intervals = len(values[0])
+    position = np.atleast_1d(degrees * (1 / PHI_STEP))
+    # fmin/fmax turn nan into a bound, so the index is always valid; the
+    # nan fraction then makes the factors nan
+    lower = np.fmax(np.fmin(position, intervals - 1), 0).astype(np.intp)
+    fraction = position - lower
+    outside = None
+    # fmin/fmax reductions skip nan, which min()/max() would propagate
+    if position.size and (np.fmin.reduce(position) < 0 or np.fmax.reduce(position) > intervals):
+        outside = (position < 0) | (position > intervals)
+    factors = []
+    for value, slope in zip(values, slopes):
+        # value[lower] + slope[lower]·fraction, in place to save temporaries
+        factor = value.take(lower)
+        change = slope.take(lower)
+        change *= fraction
+        factor += change
+        if outside is not None:
+            factor[outside] = np.nan
+        factors.append(factor.reshape(degrees.shape))
+    return tuple(factors)
+
+def bearing_factors(friction_angle, convention=DEFAULT_CONVENTION):
+    """(Nc, Nq, Nγ) for friction angles in degrees, interpolated from TABLES.
+
+    Both arguments broadcast; unknown conventions and angles outside
+    [0, PHI_MAX] give nan."""
+    degrees = np.asarray(friction_angle, dtype=float)
+    convention = np.asarray(convention)
+    if convention.ndim == 0:
+        return lookup(degrees, str(convention))
+    # Per-row conventions (e.g. a batch file): look up each one's rows
+    shape = np.broadcast_shapes(degrees.shape, convention.shape)
+    degrees = np.broadcast_to(degrees, shape)
+    convention = np.broadcast_to(convention, shape)
+    factors = tuple(np.full(shape, np.nan) for _ in range(3))
+    for name in TABLES:
+        rows = convention == name
+        if rows.any():
+            for factor, values in zip(factors, lookup(degrees[rows], name)):
+                factor[rows] = values
+    return factors
+
+def shape_factors(width, length, friction_angle, Nc, Nq):
+    """De Beer's shape factors (sc, sq, sγ); length 0 means a strip footing"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(length > 0, width / length, 0.0)
+    phi = np.radians(friction_angle)
+    return 1 + ratio * Nq / Nc, 1 + ratio * np.tan(phi), 1 - 0.4 * ratio
+
+def depth_factors(depth, width, friction_angle, Nc):
+    """Hansen's depth factors (dc, dq, dγ), with atan(Df/B) beyond Df/B = 1"""
+    ratio = depth / width
+    k = np.where(ratio <= 1, ratio, np.arctan(ratio))
+    phi = np.radians(friction_angle)
+    dq = 1 + 2 * np.tan(phi) * (1 - np.sin(phi))**2 * k
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dc = np.where(friction_angle > 0, dq - (1 - dq) / (Nc * np.tan(phi)), 1 + 0.4 * k)
+    return dc, dq, np.ones_like(dq)
+
+def inclination_factors(inclination, friction_angle):
+    """Meyerhof's inclination factors (ic, iq, iγ) for a load inclined
+    `inclination` degrees from vertical; iγ is 0 once it exceeds φ"""
+    ic = (1 - inclination / 90)**2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ig = np.where(inclination < friction_angle, (1 - inclination / friction_angle)**2,
+                      np.where(inclination == 0, 1.0, 0.0))
+    return ic, ic, ig
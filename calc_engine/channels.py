@@ -0,0 +1,242 @@
+"""Uniform and gradually varied flow in open channels.
+
+Sections are trapezoidal (bottom width b, side slope z horizontal to 1
+vertical), rectangular (z = 0) or circular (width is the diameter D, for
+culverts and partly full sewers). Depths solve, elementwise over arrays
+of reaches,
+
+    normal    Q·n/√S = A·R^(2/3)            (Manning)
+    critical  Q = A·√(g·A/T)                (Fr = 1)
+
+with bracketed_newton(): Newton steps that fall outside the current
+bracket are replaced by bisection, so every element converges even where
+Newton alone would overshoot (near the crown of a circular section, or
+from a poor first guess). The bracket shrinks with every evaluation.
+
+Gradually varied flow profiles use the standard step method: from a
+control depth, the energy equation between stations Δx apart,
+
+    E_j ∓ ½·Sf_j·Δx = E_k ± ½·Sf_k·Δx ∓ S0·Δx,
+
+is solved for the next depth with the same solver, marching upstream on
+the subcritical branch (y ≥ yc) or downstream on the supercritical one.
+Where the equation has no root on that branch the profile has reached
+critical depth (a hydraulic jump or a choke) and the rest of the reach
+is nan.
+
+Units are SI: m, m³/s, m/m."""
+import numpy as np
+
+GRAVITY = 9.81  # m/s²
+SHAPES = ('trapezoidal', 'rectangular', 'circular')
+DEFAULT_SHAPE = 'trapezoidal'
+# Relative change in depth at which the root finder stops
+DEPTH_TOLERANCE = 1e-10
+ROOT_ITERATIONS = 60
+# Doublings of the initial upper depth allowed while bracketing a root
+BRACKET_DOUBLINGS = 60
+# Smallest depth tried, as a fraction of the width or diameter
+MIN_RELATIVE_DEPTH = 1e-9
+# A circular section carries its largest flow at y/D = 0.938, not full
+CIRCULAR_MAX_FLOW_DEPTH = 0.938
+GVF_STEPS = 100
+# Normal and critical depth within this relative difference: a critical slope
+CRITICAL_SLOPE_TOLERANCE = 1e-3
+
+def section(depth, shape, width, side_slope):
+    """(area, wetted perimeter, top width, dP/dy, dT/dy) at a depth.
+
+    All arguments broadcast; shape is a name from SHAPES (or an array of
+    them) and unknown shapes give nan."""
+    shape = np.asarray(shape)
+    circular = shape == 'circular'
+    known = np.isin(shape, SHAPES)
+    z = np.where(shape == 'rectangular', 0.0, side_slope)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Trapezoid (rectangle when z = 0)
+        slant = 2 * np.sqrt(1 + z**2)
+        area = (width + z * depth) * depth
+        perimeter = width + slant * depth
+        top = width + 2 * z * depth
+        # Circle: θ is the angle the free surface subtends at the centre
+        half = np.arccos(np.clip(1 - 2 * depth / width, -1, 1))
+        sine = np.sin(half)
+        circle_area = width**2 / 8 * (2 * half - np.sin(2 * half))
+        circle_perimeter = width * half
+        circle_top = width * sine
+        properties = (
+            np.where(circular, circle_area, area),
+            np.where(circular, circle_perimeter, perimeter),
+            np.where(circular, circle_top, top),
+            np.where(circular, 2 / sine, slant),
+            np.where(circular, 2 * np.cos(half) / sine, 2 * z),
+        )
+    return tuple(np.where(known, value, np.nan) for value in properties)
+
+def bracketed_newton(function, lower, upper, tolerance=DEPTH_TOLERANCE, max_iterations=ROOT_ITERATIONS):
+    """Roots of function(x) -> (value, derivative) between lower and upper, elementwise.
+
+    The function must change sign over each bracket; elements where it
+    doesn't give nan."""
+    lower, upper = (np.array(bound, dtype=float) for bound in np.broadcast_arrays(lower, upper))
+    start_value, _ = function(lower)
+    end_value, _ = function(upper)
+    valid = start_value * end_value <= 0
+    # Elements that are increasing from lower to upper
+    rising = start_value < 0
+    x = (lower + upper) / 2
+    for _ in range(max_iterations):
+        value, slope = function(x)
+        below = (value < 0) == rising
+        lower = np.where(below, x, lower)
+        upper = np.where(below, upper, x)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            candidate = x - value / slope
+        inside = (candidate >= lower) & (candidate <= upper)
+        updated = np.where(inside, candidate, (lower + upper) / 2)
+        converged = np.abs(updated - x) <= tolerance * np.abs(updated)
+        x = updated
+        if np.all(converged | ~valid):
+            break
+    x = np.where(start_value == 0, lower, x)
+    return np.where(valid, x, np.nan)
+
+def expand_upper(function, lower, upper):
+    """Double upper until function changes sign from lower (for open sections)"""
+    start_value, _ = function(lower)
+    upper = np.array(upper, dtype=float)
+    for _ in range(BRACKET_DOUBLINGS):
+        value, _ = function(upper)
+        short = (value * start_value > 0) & np.isfinite(value)
+        if not short.any():
+            break
+        upper = np.where(short, 2 * upper, upper)
+    return upper
+
+def depth_bounds(function, shape, width, full_depth):
+    """(lower, upper) depths bracketing the root: circular sections stop at
+    full_depth·D, open ones grow until the function changes sign"""
+    circular = np.asarray(shape) == 'circular'
+    lower = MIN_RELATIVE_DEPTH * np.maximum(width, 1e-3)
+    upper = expand_upper(function, lower, np.where(circular, full_depth * width, np.maximum(width, 1.0)))
+    return lower, np.where(circular, full_depth * width, upper)
+
+def conveyance(depth, shape, width, side_slope):
+    """(A·R^(2/3), its derivative with depth)"""
+    area, perimeter, top, dperimeter, _ = section(depth, shape, width, side_slope)
+    radius = area / perimeter
+    factor = radius**(2 / 3)
+    return area * factor, 5 / 3 * factor * top - 2 / 3 * radius * factor * dperimeter
+
+def normal_depth(flow_rate, slope, width, side_slope=0, manning_n=0.013, shape=DEFAULT_SHAPE):
+    """Depth of uniform flow; nan on horizontal or adverse slopes and when
+    a circular section can't carry the flow"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        target = flow_rate * manning_n / np.sqrt(np.where(slope > 0, slope, np.nan))
+
+    def residual(depth):
+        value, derivative = conveyance(depth, shape, width, side_slope)
+        return value - target, derivative
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        lower, upper = depth_bounds(residual, shape, width, CIRCULAR_MAX_FLOW_DEPTH)
+        return bracketed_newton(residual, lower, upper)
+
+def critical_depth(flow_rate, width, side_slope=0, shape=DEFAULT_SHAPE):
+    """Depth at which the Froude number is 1"""
+    root_g = np.sqrt(GRAVITY)
+
+    def residual(depth):
+        area, _, top, _, dtop = section(depth, shape, width, side_slope)
+        # Q_c(y) = √g·A^(3/2)·T^(-1/2)
+        critical_flow = root_g * area * np.sqrt(area / top)
+        derivative = root_g * np.sqrt(area / top) * (1.5 * top - 0.5 * area * dtop / top)
+        return critical_flow - flow_rate, derivative
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        lower, upper = depth_bounds(residual, shape, width, 1 - 1e-9)
+        return bracketed_newton(residual, lower, upper)
+
+def flow_state(depth, flow_rate, manning_n, shape, width, side_slope):
+    """(specific energy, friction slope, their derivatives, velocity, Froude number)"""
+    area, _, top, _, _ = section(depth, shape, width, side_slope)
+    velocity = flow_rate / area
+    froude_squared = velocity**2 * top / (GRAVITY * area)
+    value, dvalue = conveyance(depth, shape, width, side_slope)
+    friction_slope = (flow_rate * manning_n / value)**2
+    return (
+        depth + velocity**2 / (2 * GRAVITY),
+        friction_slope,
+        1 - froude_squared,
+        -2 * friction_slope * dvalue / value,
+        velocity,
+        np.sqrt(froude_squared),
+    )
+
+def profile_type(depth, normal, critical, slope):
+    """Classification of a profile through `depth` (M1, S2, H3, A2...)"""
+    letter = np.where(slope < 0, 'A', np.where(slope == 0, 'H', np.where(
+        np.abs(normal - critical) <= CRITICAL_SLOPE_TOLERANCE * critical, 'C',
+        np.where(normal > critical, 'M', 'S'))))
+    # No normal depth on horizontal and adverse slopes: zones 2 and 3 only
+    high = np.where(slope > 0, np.fmax(normal, critical), np.inf)
+    low = np.where(slope > 0, np.fmin(normal, critical), critical)
+    zone = np.where(depth > high, '1', np.where(depth >= low, '2', '3'))
+    return np.char.add(letter, zone)
+
+def gvf_profile(flow_rate, slope, width, control_depth, length, side_slope=0, manning_n=0.013,
+                shape=DEFAULT_SHAPE, steps=GVF_STEPS):
+    """Water surface profiles by the standard step method, one per reach.
+
+    Scalar inputs or equal-length arrays (one element per reach). A control
+    depth at or above critical is taken at the downstream end and the
+    profile is computed upstream; below critical, at the upstream end and
+    computed downstream. Returns per reach 'normal_depth', 'critical_depth'
+    and 'profile', and per station (shape reaches x steps + 1, ordered
+    downstream from x = 0 at the upstream end) 'distance', 'depth',
+    'velocity', 'froude' and 'bed' (bed elevation above the downstream end)."""
+    flow_rate, slope, width, control_depth, length, side_slope, manning_n, shape = (
+        np.atleast_1d(value) for value in np.broadcast_arrays(
+            flow_rate, slope, width, control_depth, length, side_slope, manning_n, np.asarray(shape)))
+    normal = normal_depth(flow_rate, slope, width, side_slope, manning_n, shape)
+    critical = critical_depth(flow_rate, width, side_slope, shape)
+    # +1 marching upstream from a subcritical control, -1 downstream from a supercritical one
+    direction = np.where(control_depth >= critical, 1.0, -1.0)
+    dx = length / steps
+    circular = shape == 'circular'
+
+    depths = np.full((steps + 1,) + flow_rate.shape, np.nan)
+    depths[0] = control_depth
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for step in range(1, steps + 1):
+            energy, friction, _, _, _, _ = flow_state(depths[step - 1], flow_rate, manning_n, shape, width, side_slope)
+            target = energy + direction * (0.5 * friction - slope) * dx
+
+            def residual(depth):
+                energy, friction, denergy, dfriction, _, _ = flow_state(
+                    depth, flow_rate, manning_n, shape, width, side_slope)
+                return energy - direction * 0.5 * friction * dx - target, denergy - direction * 0.5 * dfriction * dx
+
+            # Subcritical branch [yc, ∞) (up to the crown of a pipe), supercritical (0, yc]
+            tiny = MIN_RELATIVE_DEPTH * np.maximum(width, 1e-3)
+            top = np.where(circular, width * (1 - 1e-9), np.maximum(2 * depths[step - 1], critical))
+            lower = np.where(direction > 0, critical, tiny)
+            upper = np.where(direction > 0, expand_upper(residual, critical, top), critical)
+            depths[step] = bracketed_newton(residual, lower, upper)
+        _, _, _, _, velocity, froude = flow_state(depths, flow_rate, manning_n, shape, width, side_slope)
+
+    # Stations from the control: distance k·Δx upstream (subcritical) or downstream
+    along = np.arange(steps + 1)[:, None] * dx
+    distance = np.where(direction > 0, length - along, along)
+    order = np.argsort(distance, axis=0, kind='stable')
+    ordered = [np.take_along_axis(values, order, axis=0).T for values in (distance, depths, velocity, froude)]
+    return {
+        'normal_depth': normal,
+        'critical_depth': critical,
+        'profile': profile_type(control_depth, normal, critical, slope),
+        'distance': ordered[0],
+        'depth': ordered[1],
+        'velocity': ordered[2],
+        'froude': ordered[3],
+        'bed': slope[:, None] * (length[:, None] - ordered[0]),
+    }
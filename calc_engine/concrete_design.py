@@ -0,0 +1,161 @@
+"""Reinforced concrete section design to NBR 6118:2014 (ELU).
+
+Rectangular sections, CA-50 style steel. All functions are vectorized
+over members; units are MPa for material strengths, m for dimensions,
+kN and kN.m for forces and cm² for steel areas.
+
+Bending uses the rectangular stress block (αc·fcd over λ·x, item 17.2.2)
+with the neutral axis limited to x/d = 0.45 (0.35 above C50) for
+ductility (14.6.4.3); beyond it compression steel takes the excess.
+Shear uses calculation model I (θ = 45°, vertical stirrups, 17.4.2.2).
+Columns are checked against the N-M interaction diagram of the section
+with its steel split equally between the two faces, built from the
+strain domains of 17.2.2. A diagram depends only on the section, so it
+is computed once per distinct section (interaction_diagram is cached)
+and members sharing it are checked together by interpolation."""
+from functools import lru_cache
+import numpy as np
+
+GAMMA_C = 1.4
+GAMMA_S = 1.15
+STEEL_MODULUS = 210000  # MPa
+# Stirrup design strength is limited to 435 MPa (17.4.2.2)
+MAX_STIRRUP_STRENGTH = 435
+# Tension steel strain at pivot A (domain 2)
+STEEL_STRAIN_LIMIT = 0.010
+MAX_STEEL_RATIO = 0.04
+MIN_COLUMN_STEEL_RATIO = 0.004
+STIRRUP_LEGS = 2
+# Minimum flexural steel ratio ρmin by fck (table 17.3)
+MIN_STEEL_RATIO = {
+    20: 0.0015, 25: 0.0015, 30: 0.0015, 35: 0.00164, 40: 0.00179, 45: 0.00194, 50: 0.00208,
+    55: 0.00211, 60: 0.00219, 65: 0.00226, 70: 0.00233, 75: 0.00239, 80: 0.00245, 85: 0.00251, 90: 0.00256,
+}
+# Neutral axis depths per side of the interaction diagram
+DIAGRAM_POINTS = 200
+INTERACTION_CACHE_SIZE = 1024
+
+def concrete(fck):
+    """(αc·fcd, λ, εcu, εc2, x/d limit) for fck in MPa (8.2.10.1, 17.2.2)"""
+    fck = np.asarray(fck, dtype=float)
+    high = fck > 50
+    alpha = np.where(high, 0.85 * (1 - (fck - 50) / 200), 0.85)
+    block = np.where(high, 0.8 - (fck - 50) / 400, 0.8)
+    ultimate = np.where(high, 0.0026 + 0.035 * ((90 - fck) / 100)**4, 0.0035)
+    plastic = np.where(high, 0.002 + 0.000085 * np.maximum(fck - 50, 0)**0.53, 0.002)
+    return alpha * fck / GAMMA_C, block, ultimate, plastic, np.where(high, 0.35, 0.45)
+
+def tensile_strength(fck):
+    """Mean tensile strength fctm (8.2.5), MPa"""
+    fck = np.asarray(fck, dtype=float)
+    return np.where(fck > 50, 2.12 * np.log(1 + 0.11 * fck), 0.3 * fck**(2 / 3))
+
+def min_steel_ratio(fck):
+    grades = list(MIN_STEEL_RATIO)
+    return np.interp(fck, grades, [MIN_STEEL_RATIO[grade] for grade in grades])
+
+def bending_steel(moment, width, depth, cover, fck, fyk):
+    """(tension steel, compression steel) in cm² and x/d for a positive moment"""
+    stress, block, ultimate, _, limit = concrete(fck)
+    fyd = fyk / GAMMA_S
+    # kN.m -> MN.m so forces come out in MN with stresses in MPa
+    moment = np.abs(moment) / 1000
+    mu = moment / (stress * width * depth**2)
+    mu_limit = block * limit * (1 - block * limit / 2)
+    ratio = np.where(mu <= mu_limit, (1 - np.sqrt(1 - 2 * np.minimum(mu, mu_limit))) / block, limit)
+    excess = np.maximum(moment - mu_limit * stress * width * depth**2, 0)
+    lever = depth - cover
+    compression_stress = np.minimum(STEEL_MODULUS * ultimate * (limit * depth - cover) / (limit * depth), fyd)
+    tension = stress * width * block * ratio * depth / fyd + excess / (fyd * lever)
+    compression = np.where(excess > 0, excess / (compression_stress * lever), 0.0)
+    return tension * 1e4, compression * 1e4, ratio
+
+def stirrups(shear, width, depth, fck, fyk, stirrup_diameter):
+    """(Asw/s in cm²/m, spacing in cm, VRd2 in kN) for vertical stirrups"""
+    fcd = fck / GAMMA_C
+    fctd = 0.7 * tensile_strength(fck) / GAMMA_C
+    fywd = np.minimum(fyk / GAMMA_S, MAX_STIRRUP_STRENGTH)
+    shear = np.abs(shear)
+    crushing = 0.27 * (1 - fck / 250) * fcd * width * depth * 1000
+    concrete_share = 0.6 * fctd * width * depth * 1000
+    required = np.maximum(shear - concrete_share, 0) / (0.9 * depth * fywd * 1000)
+    minimum = 0.2 * tensile_strength(fck) / fyk * width
+    area = np.maximum(required, minimum)
+    # Spacing for the chosen stirrup (diameter in mm), within the maximum of 18.3.3.2
+    legs = STIRRUP_LEGS * np.pi * (stirrup_diameter / 1000)**2 / 4
+    maximum = np.where(shear <= 0.67 * crushing, np.minimum(0.6 * depth, 0.30), np.minimum(0.3 * depth, 0.20))
+    return area * 1e4, np.minimum(legs / area, maximum) * 100, crushing
+
+def steel_stress(strain, fyd):
+    return np.clip(STEEL_MODULUS * strain, -fyd, fyd)
+
+@lru_cache(maxsize=INTERACTION_CACHE_SIZE)
+def interaction_diagram(width, height, cover, steel_area, fck, fyk):
+    """Boundary of the N-M resistance of a section as (angles, radii) about
+    the origin, sorted by angle; N (compression positive) in kN, M in kN.m.
+
+    Steel is steel_area (cm²) split equally between layers `cover` from
+    each face. Neutral axis depths sweep domains 1-5 (pivots A, B and C)."""
+    stress, block, ultimate, plastic, _ = (float(value) for value in concrete(fck))
+    fyd = fyk / GAMMA_S
+    layer = steel_area / 2 / 1e4
+    depth = height - cover
+    depths = np.array([cover, depth])
+
+    # x from full tension (negative) through the section to full compression
+    x = np.concatenate([
+        np.linspace(-10 * height, 0, DIAGRAM_POINTS // 4, endpoint=False),
+        np.linspace(1e-6 * height, height, DIAGRAM_POINTS // 2, endpoint=False),
+        height * np.geomspace(1, 100, DIAGRAM_POINTS // 4),
+    ])[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Strain (shortening positive) at each layer
+        pivot_a = STEEL_STRAIN_LIMIT * (x - depths) / (depth - x)
+        pivot_b = ultimate * (x - depths) / x
+        pivot_c = plastic * (x - depths) / (x - (1 - plastic / ultimate) * height)
+    boundary_ab = ultimate / (ultimate + STEEL_STRAIN_LIMIT) * depth
+    strain = np.where(x <= boundary_ab, pivot_a, np.where(x <= height, pivot_b, pivot_c))
+    forces = layer * steel_stress(strain, fyd)
+    compressed = np.clip(block * x[:, 0], 0, height)
+    concrete_force = stress * width * compressed
+    axial = concrete_force + forces.sum(axis=1)
+    moment = concrete_force * (height - compressed) / 2 + (forces * (height / 2 - depths)).sum(axis=1)
+
+    # Pure tension and uniform shortening close the curve; the other side mirrors it
+    axial = np.r_[-2 * layer * fyd, axial, stress * width * height + 2 * layer * steel_stress(plastic, fyd)] * 1000
+    moment = np.r_[0, moment, 0] * 1000
+    axial = np.r_[axial, axial[::-1]]
+    moment = np.r_[moment, -moment[::-1]]
+    angles = np.arctan2(moment, axial)
+    order = np.argsort(angles)
+    angles = angles[order]
+    radii = np.hypot(axial, moment)[order]
+    # Close the curve across ±π
+    return np.r_[angles[-1] - 2 * np.pi, angles, angles[0] + 2 * np.pi], np.r_[radii[-1], radii, radii[0]]
+
+def utilization(axial, moment, width, height, cover, steel_area, fck, fyk):
+    """Design forces over resistance along the same N/M ratio (≤ 1 passes).
+
+    Members are sorted by section, so each distinct section's diagram is
+    built (or taken from the cache) once and checks its members together."""
+    columns = np.broadcast_arrays(axial, moment, width, height, cover, steel_area, fck, fyk)
+    shape = columns[0].shape
+    axial, moment, *section = (np.asarray(column, dtype=float).ravel() for column in columns)
+    width, height, cover, steel_area, fck, fyk = section
+    result = np.full(axial.shape, np.nan)
+    valid = np.flatnonzero(
+        np.isfinite(axial) & np.isfinite(moment) & (width > 0) & (2 * cover < height) & (cover >= 0)
+        & (steel_area >= 0) & (fck > 0) & (fyk > 0)
+    )
+    if valid.size == 0:
+        return result.reshape(shape)
+    keys = np.stack(section, axis=1)[valid]
+    order = np.lexsort(keys.T[::-1])
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, np.any(keys[1:] != keys[:-1], axis=1)])
+    for start, stop in zip(starts, np.r_[starts[1:], len(keys)]):
+        rows = valid[order[start:stop]]
+        angles, radii = interaction_diagram(*keys[start].tolist())
+        result[rows] = np.hypot(axial[rows], moment[rows]) / np.interp(np.arctan2(moment[rows], axial[rows]),
+                                                                        angles, radii)
+    return result.reshape(shape)
@@ -0,0 +1,24 @@
+import numpy as np
+from calc_engine.registry import formula
+
+@formula('bdi_calculation', outputs=('bdi_percent', 'selling_price'), category='costs')
+def bdi_calculation(direct_cost, indirect_cost_percent=15, profit_percent=8, tax_percent=15):
+    """BDI markup and selling price (currency, percentages)"""
+    bdi = (1 + indirect_cost_percent / 100) * (1 + profit_percent / 100) / (1 - tax_percent / 100) - 1
+    return {'bdi_percent': bdi * 100, 'selling_price': direct_cost * (1 + bdi)}
+
+@formula('unit_cost', outputs=('total_unit_cost',), category='costs')
+def unit_cost(material_cost, labor_cost, equipment_cost, productivity=1):
+    """Service unit cost (currency per unit of productivity)"""
+    return {'total_unit_cost': (material_cost + labor_cost + equipment_cost) / productivity}
+
+def schedule_curve(duration_months, curve_type='linear'):
+    """Percentage of the total executed in each month (array of duration_months values).
+
+    's_curve' follows 3t² - 2t³; anything else is linear. Not a registered
+    formula: its output length depends on the input."""
+    months = np.arange(1, int(duration_months) + 1)
+    if curve_type == 's_curve':
+        t = months / duration_months
+        return np.diff(np.concatenate(([0.0], (3 * t**2 - 2 * t**3) * 100)))
+    return np.full(len(months), 100 / duration_months)
@@ -0,0 +1,424 @@
+"""Linear static analysis of plane beams and frames by the direct stiffness method.
+
+Every element is an Euler-Bernoulli frame member with three degrees of
+freedom per node (ux, uy, rz). The element matrices are built for all
+elements at once and assembled into a sparse global matrix; the free
+degrees of freedom are renumbered by reverse Cuthill-McKee, so the
+stiffness matrix is banded with a small bandwidth (a few dofs for a
+continuous beam, about three per node across the narrow side of a
+frame), and solved by a banded Cholesky factorization with every load
+case as a right-hand side. Load combinations are factored sums of the
+load case results, since the analysis is linear.
+
+Loads per case:
+    nodal        {node, fx, fy, mz} in global axes
+    distributed  {element, qx, qy}, uniform over the element, local axes
+    point        {element, position, fx, fy, m}, position in m from the
+                 start node, local axes
+
+Local axes: x from the start to the end node, y 90° anticlockwise from
+it, so a beam drawn left to right has y up and qy = -10 is 10 kN/m of
+gravity load. Moments are anticlockwise positive as loads; in the
+diagrams sagging moment, tension and the shear dM/dx are positive.
+
+Units: kN, m, kN.m, E in kN/m²."""
+import numpy as np
+from scipy import sparse
+from scipy.linalg import cholesky_banded, cho_solve_banded, LinAlgError
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+from calc_engine.network import number
+
+# Restrained (ux, uy, rz) by support type
+SUPPORTS = {
+    'fixed': (True, True, True),
+    'pinned': (True, True, False),
+    'roller': (False, True, False),
+    'roller_x': (True, False, False),
+}
+# Stations per element in the diagrams, ends included
+DIAGRAM_POINTS = 11
+MAX_DIAGRAM_POINTS = 101
+MAX_FRAME_ELEMENTS = 50000
+MAX_LOAD_CASES = 50
+
+class Frame:
+    """Arrays describing a structure, built and validated by parse_frame()"""
+
+    def __init__(self, node_ids, coordinates, restrained, element_ids, start, end, modulus, area, inertia,
+                 cases, nodal_loads, distributed, point_loads, combinations, points):
+        self.node_ids = node_ids
+        self.coordinates = coordinates
+        # (nodes, 3) booleans
+        self.restrained = restrained
+        self.element_ids = element_ids
+        self.start = start
+        self.end = end
+        self.modulus = modulus
+        self.area = area
+        self.inertia = inertia
+        self.cases = cases
+        # (nodes * 3, cases) in global axes
+        self.nodal_loads = nodal_loads
+        # (elements, 2, cases): uniform qx, qy in local axes
+        self.distributed = distributed
+        # (element, case, position, fx, fy, m) columns, one row per load
+        self.point_loads = point_loads
+        # combination name -> factors per case
+        self.combinations = combinations
+        self.points = points
+
+def load_items(loads, group):
+    """The loads of one group (nodal, distributed, point) of a load case"""
+    items = loads.get(group) or []
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError(f'{group} loads must be a list of objects')
+    return items
+
+def parse_loads(case, loads, node_index, element_index, nodal_loads, distributed, point_loads):
+    if not isinstance(loads, dict):
+        raise ValueError('each load case must be an object')
+    for item in load_items(loads, 'nodal'):
+        if str(item.get('node')) not in node_index:
+            raise ValueError(f"unknown node {item.get('node')}")
+        node = node_index[str(item['node'])]
+        for offset, key in enumerate(('fx', 'fy', 'mz')):
+            nodal_loads[3 * node + offset, case] += number(item, key, 0)
+    for item in load_items(loads, 'distributed'):
+        if str(item.get('element')) not in element_index:
+            raise ValueError(f"unknown element {item.get('element')}")
+        element = element_index[str(item['element'])]
+        distributed[element, 0, case] += number(item, 'qx', 0)
+        distributed[element, 1, case] += number(item, 'qy', 0)
+    for item in load_items(loads, 'point'):
+        if str(item.get('element')) not in element_index:
+            raise ValueError(f"unknown element {item.get('element')}")
+        point_loads.append((element_index[str(item['element'])], case, number(item, 'position'),
+                            number(item, 'fx', 0), number(item, 'fy', 0), number(item, 'm', 0)))
+
+def parse_frame(data):
+    """Frame from {"nodes": [{id, x, y, support}], "elements": [{id, start, end, E, A, I}],
+    "load_cases": {name: {nodal, distributed, point}}, "combinations": {name: {case: factor}},
+    "points": stations per element}; E, A and I default to top-level values. Raise ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    nodes = data.get('nodes') or []
+    elements = data.get('elements') or []
+    load_cases = data.get('load_cases') or {}
+    if not isinstance(nodes, list) or not isinstance(elements, list):
+        raise ValueError('nodes and elements must be lists')
+    if not isinstance(load_cases, dict) or not load_cases:
+        raise ValueError('at least one load case is required')
+    if not elements:
+        raise ValueError('no elements')
+    if len(elements) > MAX_FRAME_ELEMENTS:
+        raise ValueError(f'at most {MAX_FRAME_ELEMENTS} elements')
+    if len(load_cases) > MAX_LOAD_CASES:
+        raise ValueError(f'at most {MAX_LOAD_CASES} load cases')
+    points = int(number(data, 'points', DIAGRAM_POINTS))
+    if not 2 <= points <= MAX_DIAGRAM_POINTS:
+        raise ValueError(f'points must be between 2 and {MAX_DIAGRAM_POINTS}')
+
+    node_ids = []
+    coordinates = []
+    restrained = []
+    for item in nodes:
+        if not isinstance(item, dict) or item.get('id') is None:
+            raise ValueError('every node needs an id')
+        node_ids.append(str(item['id']))
+        coordinates.append((number(item, 'x', 0), number(item, 'y', 0)))
+        support = item.get('support')
+        if support and (not isinstance(support, str) or support not in SUPPORTS):
+            raise ValueError(f"{item['id']}: support must be one of {', '.join(SUPPORTS)}")
+        restrained.append(SUPPORTS[support] if support else (False, False, False))
+    node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+    if len(node_index) != len(node_ids):
+        raise ValueError('node ids must be unique')
+
+    element_ids = []
+    start = []
+    end = []
+    properties = []
+    for item in elements:
+        if not isinstance(item, dict) or item.get('id') is None:
+            raise ValueError('every element needs an id')
+        for key in ('start', 'end'):
+            if str(item.get(key)) not in node_index:
+                raise ValueError(f"{item['id']}: unknown node {item.get(key)}")
+        element_ids.append(str(item['id']))
+        start.append(node_index[str(item['start'])])
+        end.append(node_index[str(item['end'])])
+        properties.append(tuple(number(item, key, data.get(key), positive=True) for key in ('E', 'A', 'I')))
+    element_index = {element_id: i for i, element_id in enumerate(element_ids)}
+    if len(element_index) != len(element_ids):
+        raise ValueError('element ids must be unique')
+
+    coordinates = np.array(coordinates).reshape(-1, 2)
+    start = np.array(start)
+    end = np.array(end)
+    if np.any(np.hypot(*(coordinates[end] - coordinates[start]).T) == 0):
+        raise ValueError('elements must have a non-zero length')
+
+    cases = [str(name) for name in load_cases]
+    nodal_loads = np.zeros((3 * len(node_ids), len(cases)))
+    distributed = np.zeros((len(element_ids), 2, len(cases)))
+    point_loads = []
+    for case, loads in enumerate(load_cases.values()):
+        parse_loads(case, loads, node_index, element_index, nodal_loads, distributed, point_loads)
+
+    combinations = data.get('combinations') or {case: {case: 1} for case in cases}
+    if not isinstance(combinations, dict):
+        raise ValueError('combinations must be an object')
+    factors = {}
+    for name, combination in combinations.items():
+        if not isinstance(combination, dict) or not set(combination) <= set(cases):
+            raise ValueError(f'{name}: combinations map load case names to factors')
+        factors[str(name)] = np.array([number(combination, case, 0) for case in cases])
+
+    modulus, area, inertia = np.array(properties).T
+    frame = Frame(
+        node_ids, coordinates, np.array(restrained).reshape(-1, 3), element_ids, start, end,
+        modulus, area, inertia, cases, nodal_loads, distributed,
+        np.array(point_loads, dtype=float).reshape(-1, 6), factors, points,
+    )
+    if len(frame.point_loads):
+        element = frame.point_loads[:, 0].astype(np.intp)
+        position = frame.point_loads[:, 2]
+        outside = (position < 0) | (position > element_lengths(frame)[element])
+        if outside.any():
+            raise ValueError(f'{element_ids[element[outside][0]]}: point load outside the element')
+    return frame
+
+def element_lengths(frame):
+    return np.hypot(*(frame.coordinates[frame.end] - frame.coordinates[frame.start]).T)
+
+def element_matrices(frame):
+    """(local stiffness, rotation T with local = T·global), each (elements, 6, 6)"""
+    delta = frame.coordinates[frame.end] - frame.coordinates[frame.start]
+    length = np.hypot(*delta.T)
+    c, s = (delta / length[:, None]).T
+    count = len(length)
+
+    axial = frame.modulus * frame.area / length
+    ei = frame.modulus * frame.inertia
+    k = np.zeros((count, 6, 6))
+    k[:, [0, 3], [0, 3]] = axial[:, None]
+    k[:, [0, 3], [3, 0]] = -axial[:, None]
+    k[:, [1, 4], [1, 4]] = (12 * ei / length**3)[:, None]
+    k[:, [1, 4], [4, 1]] = (-12 * ei / length**3)[:, None]
+    k[:, [1, 2, 1, 5], [2, 1, 5, 1]] = (6 * ei / length**2)[:, None]
+    k[:, [4, 2, 4, 5], [2, 4, 5, 4]] = (-6 * ei / length**2)[:, None]
+    k[:, [2, 5], [2, 5]] = (4 * ei / length)[:, None]
+    k[:, [2, 5], [5, 2]] = (2 * ei / length)[:, None]
+
+    t = np.zeros((count, 6, 6))
+    for offset in (0, 3):
+        t[:, offset, offset] = c
+        t[:, offset, offset + 1] = s
+        t[:, offset + 1, offset] = -s
+        t[:, offset + 1, offset + 1] = c
+        t[:, offset + 2, offset + 2] = 1
+    return k, t
+
+def equivalent_loads(frame, length):
+    """Nodal loads equivalent to the element loads, (elements, 6, cases) in local axes.
+
+    Consistent loads ∫Nᵀq: the Hermite shape functions for transverse
+    forces, their slopes for point moments, linear ones for axial forces."""
+    qx = frame.distributed[:, 0]
+    qy = frame.distributed[:, 1]
+    span = length[:, None]
+    loads = np.zeros((len(length), 6, len(frame.cases)))
+    loads[:, 0] = loads[:, 3] = qx * span / 2
+    loads[:, 1] = loads[:, 4] = qy * span / 2
+    loads[:, 2] = qy * span**2 / 12
+    loads[:, 5] = -qy * span**2 / 12
+
+    if len(frame.point_loads):
+        element, case, position, fx, fy, m = frame.point_loads.T
+        element = element.astype(np.intp)
+        case = case.astype(np.intp)
+        span = length[element]
+        xi = position / span
+        shape = np.stack([
+            fx * (1 - xi),
+            fy * (1 - 3 * xi**2 + 2 * xi**3) + m * (-6 * xi + 6 * xi**2) / span,
+            fy * span * (xi - 2 * xi**2 + xi**3) + m * (1 - 4 * xi + 3 * xi**2),
+            fx * xi,
+            fy * (3 * xi**2 - 2 * xi**3) + m * (6 * xi - 6 * xi**2) / span,
+            fy * span * (-xi**2 + xi**3) + m * (-2 * xi + 3 * xi**2),
+        ], axis=1)
+        np.add.at(loads, (element[:, None], np.arange(6)[None, :], case[:, None]), shape)
+    return loads
+
+def element_dofs(frame):
+    return np.concatenate([3 * frame.start[:, None] + np.arange(3), 3 * frame.end[:, None] + np.arange(3)], axis=1)
+
+def solve_banded(matrix, rhs):
+    """Solve a sparse symmetric positive definite system for every rhs column.
+
+    Returns (solution, bandwidth); raises ValueError when the matrix is
+    singular (the structure is a mechanism)."""
+    order = reverse_cuthill_mckee(matrix, symmetric_mode=True)
+    permuted = matrix[order][:, order].tocoo()
+    upper = permuted.col >= permuted.row
+    rows, cols, values = permuted.row[upper], permuted.col[upper], permuted.data[upper]
+    bandwidth = int((cols - rows).max()) if len(rows) else 0
+    # LAPACK upper band storage: a[i, j] at ab[bandwidth + i - j, j]
+    band = np.zeros((bandwidth + 1, matrix.shape[0]))
+    np.add.at(band, (bandwidth + rows - cols, cols), values)
+    try:
+        factor = cholesky_banded(band)
+    except LinAlgError:
+        raise ValueError('the structure is unstable: add supports or check element connectivity')
+    solution = np.empty_like(rhs)
+    solution[order] = cho_solve_banded((factor, False), rhs[order])
+    return solution, bandwidth
+
+def loads_on(rows, load_elements):
+    """(row, load) index pairs matching each row's element with the point loads on it"""
+    order = np.argsort(load_elements, kind='stable')
+    first = np.searchsorted(load_elements[order], rows, 'left')
+    counts = np.searchsorted(load_elements[order], rows, 'right') - first
+    row_index = np.repeat(np.arange(len(rows)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return row_index, order[np.repeat(first, counts) + offsets]
+
+def internal_forces(frame, rows, end_forces, stations, inclusive=False):
+    """Axial force, shear, moment and EI times the load part of the deflection
+    at stations along elements `rows`, each (rows, points, cases).
+
+    Point loads act just past their position, or at it when inclusive.
+    Integrating M twice gives EI·v = -m1·x²/2 + fy1·x³/6 + qy·x⁴/24 +
+    Σ (fy·(x-a)³/6 - m·(x-a)²/2) past each load, exact up to the linear
+    term that the end displacements fix."""
+    x = stations[:, :, None]
+    qx = frame.distributed[rows, None, 0]
+    qy = frame.distributed[rows, None, 1]
+    fx1, fy1, m1 = (end_forces[:, None, i] for i in range(3))
+    axial = -fx1 - qx * x
+    shear = fy1 + qy * x
+    moment = -m1 + fy1 * x + qy * x**2 / 2
+    bending = -m1 * x**2 / 2 + fy1 * x**3 / 6 + qy * x**4 / 24
+    if len(frame.point_loads):
+        element, case, position, fx, fy, m = frame.point_loads.T
+        row, load = loads_on(rows, element.astype(np.intp))
+        past = stations[row] - position[load, None]
+        active = past >= 0 if inclusive else past > 0
+        past = np.where(active, past, 0.0)
+        index = (row[:, None], np.arange(stations.shape[1])[None, :], case[load, None].astype(np.intp))
+        np.add.at(axial, index, -fx[load, None] * active)
+        np.add.at(shear, index, fy[load, None] * active)
+        np.add.at(moment, index, fy[load, None] * past - m[load, None] * active)
+        np.add.at(bending, index, fy[load, None] * past**3 / 6 - m[load, None] * past**2 / 2)
+    return axial, shear, moment, bending
+
+def solve_frame(frame):
+    """Displacements, reactions and internal force diagrams per combination"""
+    length = element_lengths(frame)
+    k, t = element_matrices(frame)
+    dofs = element_dofs(frame)
+    size = 3 * len(frame.node_ids)
+
+    # K = Σ Tᵀ·k·T scattered to the element dofs (duplicates summed)
+    global_k = np.einsum('nji,njk,nkl->nil', t, k, t)
+    matrix = sparse.coo_matrix(
+        (global_k.ravel(), (np.repeat(dofs, 6, axis=1).ravel(), np.tile(dofs, (1, 6)).ravel())),
+        shape=(size, size)
+    ).tocsr()
+
+    equivalent = equivalent_loads(frame, length)
+    loads = frame.nodal_loads.copy()
+    np.add.at(loads, dofs, np.einsum('nji,njc->nic', t, equivalent))
+
+    free = np.flatnonzero(~frame.restrained.ravel())
+    if not len(free):
+        raise ValueError('every degree of freedom is restrained')
+    displacements = np.zeros_like(loads)
+    displacements[free], bandwidth = solve_banded(matrix[free][:, free].tocsc(), loads[free])
+
+    # Element end forces in local axes: k·T·d minus the equivalent loads
+    local_displacements = np.einsum('nij,njc->nic', t, displacements[dofs])
+    end_forces = np.einsum('nij,njc->nic', k, local_displacements) - equivalent
+    # Reactions: what the elements pull on restrained dofs, less the nodal loads
+    nodal_sums = np.zeros_like(loads)
+    np.add.at(nodal_sums, dofs, np.einsum('nji,njc->nic', t, end_forces))
+    reactions = nodal_sums - frame.nodal_loads
+
+    elements = np.arange(len(length))
+    stations = np.linspace(0, 1, frame.points)[None, :] * length[:, None]
+    axial, shear, moment, bending = internal_forces(frame, elements, end_forces, stations)
+    # v = v1 + C·x + EI·v/EI with C from v(L) = v2
+    ei = (frame.modulus * frame.inertia)[:, None, None]
+    v1 = local_displacements[:, None, 1]
+    v2 = local_displacements[:, None, 4]
+    deflection = v1 + (v2 - v1 - bending[:, -1:] / ei) * stations[:, :, None] / length[:, None, None] + bending / ei
+
+    # Both sides of every point load, so the envelope has the peaks between stations
+    peaks = None
+    if len(frame.point_loads):
+        rows = frame.point_loads[:, 0].astype(np.intp)
+        at_loads = frame.point_loads[:, 2:3]
+        peaks = (rows, internal_forces(frame, rows, end_forces[rows], at_loads),
+                 internal_forces(frame, rows, end_forces[rows], at_loads, inclusive=True))
+
+    supported = np.flatnonzero(frame.restrained.any(axis=1))
+    combinations = {}
+    for name, factors in frame.combinations.items():
+        nodes = displacements @ factors
+        support_reactions = (reactions @ factors).reshape(-1, 3)[supported]
+        support_reactions[~frame.restrained[supported]] = 0.0
+        combinations[name] = {
+            'nodes': {
+                'id': frame.node_ids,
+                'ux': nodes[0::3],
+                'uy': nodes[1::3],
+                'rz': nodes[2::3],
+            },
+            'reactions': {
+                'id': [frame.node_ids[i] for i in supported],
+                'fx': support_reactions[:, 0],
+                'fy': support_reactions[:, 1],
+                'mz': support_reactions[:, 2],
+            },
+            'elements': {
+                'axial': axial @ factors,
+                'shear': shear @ factors,
+                'moment': moment @ factors,
+                'deflection': deflection @ factors,
+            },
+        }
+    return {
+        'dofs': len(free),
+        'bandwidth': bandwidth,
+        'elements': {'id': frame.element_ids, 'length': length, 'stations': stations},
+        'combinations': combinations,
+        'envelope': envelope(frame, combinations, peaks),
+    }
+
+def envelope(frame, combinations, peaks=None):
+    """Extreme internal forces of each element over all combinations, e.g. for
+    designing the members; peaks are (elements, left, right) internal forces
+    at point loads, which may fall between the diagram stations"""
+    extremes = {}
+    for name, factors in frame.combinations.items():
+        result = combinations[name]['elements']
+        values = {
+            'max_moment': result['moment'].max(axis=1),
+            'min_moment': result['moment'].min(axis=1),
+            'max_shear': np.abs(result['shear']).max(axis=1),
+            'max_axial': result['axial'].max(axis=1),
+            'min_axial': result['axial'].min(axis=1),
+            'max_deflection': np.abs(result['deflection']).max(axis=1),
+        }
+        if peaks is not None:
+            rows, left, right = peaks
+            for axial, shear, moment, _ in (left, right):
+                np.maximum.at(values['max_moment'], rows, (moment @ factors)[:, 0])
+                np.minimum.at(values['min_moment'], rows, (moment @ factors)[:, 0])
+                np.maximum.at(values['max_shear'], rows, np.abs(shear @ factors)[:, 0])
+                np.maximum.at(values['max_axial'], rows, (axial @ factors)[:, 0])
+                np.minimum.at(values['min_axial'], rows, (axial @ factors)[:, 0])
+        for key, value in values.items():
+            reduce = np.minimum if key.startswith('min') else np.maximum
+            extremes[key] = reduce(extremes[key], value) if key in extremes else value
+    return {'id': frame.element_ids, **extremes}
@@ -0,0 +1,63 @@
+import numpy as np
+from calc_engine.registry import formula
+from calc_engine.bearing_factors import (
+    DEFAULT_CONVENTION, bearing_factors, shape_factors, depth_factors, inclination_factors
+)
+
+@formula('bearing_capacity_factors', outputs=('Nc', 'Nq', 'Ng'), category='geotechnics')
+def bearing_capacity_factors(friction_angle, convention=DEFAULT_CONVENTION):
+    """Bearing capacity factors for a friction angle in degrees (see bearing_factors.CONVENTIONS)"""
+    Nc, Nq, Ng = bearing_factors(friction_angle, convention)
+    return {'Nc': Nc, 'Nq': Nq, 'Ng': Ng}
+
+@formula('terzaghi_bearing', outputs=('ultimate_capacity', 'allowable_capacity', 'Nc', 'Nq', 'Ng'),
+         category='geotechnics')
+def terzaghi_bearing(cohesion, unit_weight, depth, width, friction_angle, safety_factor=3,
+                     convention=DEFAULT_CONVENTION):
+    """q_ult = c·Nc + γ·Df·Nq + 0.5·γ·B·Nγ (kPa, kN/m³, m, m, degrees -> kPa)"""
+    factors = bearing_capacity_factors(friction_angle, convention)
+    ultimate = (cohesion * factors['Nc'] + unit_weight * depth * factors['Nq']
+                + 0.5 * unit_weight * width * factors['Ng'])
+    return dict(factors, ultimate_capacity=ultimate, allowable_capacity=ultimate / safety_factor)
+
+@formula('general_bearing',
+         outputs=('ultimate_capacity', 'allowable_capacity', 'Nc', 'Nq', 'Ng',
+                  'sc', 'sq', 'sg', 'dc', 'dq', 'dg', 'ic', 'iq', 'ig'),
+         category='geotechnics')
+def general_bearing(cohesion, unit_weight, depth, width, friction_angle, length=0, load_inclination=0,
+                    safety_factor=3, convention=DEFAULT_CONVENTION):
+    """General bearing capacity equation with shape, depth and inclination factors:
+    q_ult = c·Nc·sc·dc·ic + γ·Df·Nq·sq·dq·iq + 0.5·γ·B·Nγ·sγ·dγ·iγ
+    (kPa, kN/m³, m, m, degrees, m (0 for a strip), degrees from vertical -> kPa)"""
+    factors = bearing_capacity_factors(friction_angle, convention)
+    Nc, Nq, Ng = factors['Nc'], factors['Nq'], factors['Ng']
+    sc, sq, sg = shape_factors(width, length, friction_angle, Nc, Nq)
+    dc, dq, dg = depth_factors(depth, width, friction_angle, Nc)
+    ic, iq, ig = inclination_factors(load_inclination, friction_angle)
+    ultimate = (cohesion * Nc * sc * dc * ic + unit_weight * depth * Nq * sq * dq * iq
+                + 0.5 * unit_weight * width * Ng * sg * dg * ig)
+    return dict(factors, ultimate_capacity=ultimate, allowable_capacity=ultimate / safety_factor,
+                sc=sc, sq=sq, sg=sg, dc=dc, dq=dq, dg=dg, ic=ic, iq=iq, ig=ig)
+
+@formula('pile_capacity', outputs=('tip_capacity', 'shaft_capacity', 'total_capacity', 'allowable_capacity'),
+         category='geotechnics')
+def pile_capacity(diameter, length, tip_resistance, shaft_resistance, safety_factor=2):
+    """Tip plus shaft capacity of a circular pile (m, m, kPa, kPa -> kN)"""
+    tip = tip_resistance * np.pi * (diameter / 2)**2
+    shaft = shaft_resistance * np.pi * diameter * length
+    return {
+        'tip_capacity': tip,
+        'shaft_capacity': shaft,
+        'total_capacity': tip + shaft,
+        'allowable_capacity': (tip + shaft) / safety_factor,
+    }
+
+@formula('effective_stress', outputs=('effective_stress',), category='geotechnics')
+def effective_stress(total_stress, pore_pressure=0):
+    """σ' = σ - u (any consistent pressure unit)"""
+    return {'effective_stress': total_stress - pore_pressure}
+
+@formula('elastic_settlement', outputs=('settlement',), category='geotechnics')
+def elastic_settlement(bearing_pressure, width, elastic_modulus, poisson_ratio=0.3):
+    """S = q·B·(1-ν²)/E (consistent pressure units, m -> m)"""
+    return {'settlement': bearing_pressure * width * (1 - poisson_ratio**2) / elastic_modulus}
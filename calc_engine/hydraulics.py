@@ -0,0 +1,141 @@
+import numpy as np
+from calc_engine.registry import formula
+from calc_engine.friction import friction_factor as darcy_friction_factor
+from calc_engine.channels import section, normal_depth, critical_depth, profile_type, DEFAULT_SHAPE
+
+GRAVITY = 9.81  # m/s²
+HAZEN_WILLIAMS_NEW_PIPE = 130
+# Absolute roughness of new steel / PVC-lined pipe, in m
+PIPE_ROUGHNESS = 0.0001
+# Water at 20 °C
+WATER_DENSITY = 1000  # kg/m³
+WATER_VISCOSITY = 0.001  # Pa.s
+
+# Reynolds number limits between laminar, transitional and turbulent flow
+LAMINAR_REYNOLDS = 2300
+TURBULENT_REYNOLDS = 4000
+
+@formula('pipe_flow', outputs=('area', 'flow_rate'), category='hydraulics')
+def pipe_flow(diameter, velocity):
+    """Flow in a full circular pipe (m, m/s -> m², m³/s)"""
+    area = np.pi * (diameter / 2)**2
+    return {'area': area, 'flow_rate': area * velocity}
+
+@formula('head_loss', outputs=('unit_loss', 'total_loss', 'velocity'), category='hydraulics')
+def head_loss(length, diameter, flow_rate, c_factor=HAZEN_WILLIAMS_NEW_PIPE):
+    """Hazen-Williams head loss (m, m, m³/s -> m/m, m, m/s)"""
+    unit_loss = 10.65 * flow_rate**1.85 / (c_factor**1.85 * diameter**4.87)
+    return {
+        'unit_loss': unit_loss,
+        'total_loss': unit_loss * length,
+        'velocity': flow_rate / (np.pi * (diameter / 2)**2),
+    }
+
+@formula('flow_rate', outputs=('flow_rate',), category='hydraulics')
+def flow_rate(area, velocity):
+    """Q = A·v (m², m/s -> m³/s)"""
+    return {'flow_rate': area * velocity}
+
+@formula('continuity', outputs=('unknown',), category='hydraulics')
+def continuity(area1, velocity1, known2):
+    """A₁·v₁ = A₂·v₂ solved for section 2's other term (v₂ from A₂, or A₂ from v₂)"""
+    return {'unknown': area1 * velocity1 / known2}
+
+@formula('bernoulli_equation',
+         outputs=('pressure_head1', 'velocity_head1', 'total_head1',
+                  'pressure_head2', 'velocity_head2', 'total_head2', 'head_difference'),
+         category='hydraulics')
+def bernoulli_equation(pressure1, velocity1, elevation1, pressure2, velocity2, elevation2,
+                       specific_weight=9810):
+    """Total head p/γ + v²/2g + z at two points (Pa, m/s, m, N/m³ -> m)"""
+    pressure_head1 = pressure1 / specific_weight
+    velocity_head1 = velocity1**2 / (2 * GRAVITY)
+    pressure_head2 = pressure2 / specific_weight
+    velocity_head2 = velocity2**2 / (2 * GRAVITY)
+    total_head1 = pressure_head1 + velocity_head1 + elevation1
+    total_head2 = pressure_head2 + velocity_head2 + elevation2
+    return {
+        'pressure_head1': pressure_head1,
+        'velocity_head1': velocity_head1,
+        'total_head1': total_head1,
+        'pressure_head2': pressure_head2,
+        'velocity_head2': velocity_head2,
+        'total_head2': total_head2,
+        'head_difference': np.abs(total_head1 - total_head2),
+    }
+
+def flow_regime(reynolds):
+    return np.where(reynolds < LAMINAR_REYNOLDS, 'Laminar',
+                    np.where(reynolds > TURBULENT_REYNOLDS, 'Turbulento', 'Transição'))
+
+@formula('reynolds_number', outputs=('reynolds', 'flow_type'), category='hydraulics')
+def reynolds_number(velocity, diameter, density=1000, dynamic_viscosity=0.001):
+    """Re = ρ·v·D/μ (kg/m³, m/s, m, Pa.s) and the flow regime"""
+    reynolds = density * velocity * diameter / dynamic_viscosity
+    return {'reynolds': reynolds, 'flow_type': flow_regime(reynolds)}
+
+@formula('friction_factor', outputs=('friction_factor', 'flow_type'), category='hydraulics')
+def friction_factor(reynolds, relative_roughness=0):
+    """Darcy friction factor: 64/Re when laminar, Colebrook-White when turbulent (-, ε/D -> -)"""
+    return {
+        'friction_factor': darcy_friction_factor(reynolds, relative_roughness,
+                                                 LAMINAR_REYNOLDS, TURBULENT_REYNOLDS),
+        'flow_type': flow_regime(reynolds),
+    }
+
+@formula('darcy_weisbach', outputs=('unit_loss', 'total_loss', 'velocity', 'reynolds', 'friction_factor', 'flow_type'),
+         category='hydraulics')
+def darcy_weisbach(length, diameter, flow_rate, roughness=PIPE_ROUGHNESS, density=WATER_DENSITY,
+                   dynamic_viscosity=WATER_VISCOSITY):
+    """Darcy-Weisbach head loss, hf = f·L/D·v²/2g (m, m, m³/s, m, kg/m³, Pa.s -> m/m, m, m/s)"""
+    velocity = np.abs(flow_rate) / (np.pi * (diameter / 2)**2)
+    flow = reynolds_number(velocity, diameter, density, dynamic_viscosity)
+    factor = darcy_friction_factor(flow['reynolds'], roughness / diameter, LAMINAR_REYNOLDS, TURBULENT_REYNOLDS)
+    # No flow, no loss (f is infinite at Re = 0)
+    unit_loss = np.where(velocity > 0, factor / diameter * velocity**2 / (2 * GRAVITY), 0.0)
+    return {
+        'unit_loss': unit_loss,
+        'total_loss': unit_loss * length,
+        'velocity': velocity,
+        'reynolds': flow['reynolds'],
+        'friction_factor': factor,
+        'flow_type': flow['flow_type'],
+    }
+
+@formula('manning_formula', outputs=('flow_rate', 'hydraulic_radius'), category='hydraulics')
+def manning_formula(area, wetted_perimeter, slope, manning_n=0.013):
+    """Q = 1/n·A·R^(2/3)·S^(1/2) (m², m, m/m -> m³/s, m)"""
+    hydraulic_radius = area / wetted_perimeter
+    return {
+        'flow_rate': area * hydraulic_radius**(2 / 3) * np.sqrt(slope) / manning_n,
+        'hydraulic_radius': hydraulic_radius,
+    }
+
+@formula('channel_flow',
+         outputs=('normal_depth', 'critical_depth', 'velocity', 'froude', 'area', 'hydraulic_radius',
+                  'top_width', 'flow_type', 'slope_type'),
+         category='hydraulics')
+def channel_flow(flow_rate, slope, width, side_slope=0, manning_n=0.013, shape=DEFAULT_SHAPE):
+    """Normal and critical depth of a trapezoidal, rectangular or circular channel
+    (m³/s, m/m, bottom width or diameter in m, z H:1V -> m, m, m/s, -, m², m, m)"""
+    normal = normal_depth(flow_rate, slope, width, side_slope, manning_n, shape)
+    critical = critical_depth(flow_rate, width, side_slope, shape)
+    area, perimeter, top, _, _ = section(normal, shape, width, side_slope)
+    velocity = flow_rate / area
+    froude = velocity / np.sqrt(GRAVITY * area / top)
+    # Profile letter of the slope: M (mild), S (steep), C (critical), H or A;
+    # blank when a pipe can't carry the flow
+    slope_type = np.where((slope > 0) & np.isnan(normal), '',
+                          np.char.rstrip(profile_type(normal, normal, critical, slope), '123'))
+    return {
+        'normal_depth': normal,
+        'critical_depth': critical,
+        'velocity': velocity,
+        'froude': froude,
+        'area': area,
+        'hydraulic_radius': area / perimeter,
+        'top_width': top,
+        'flow_type': np.where(froude < 1, 'Subcrítico', np.where(froude > 1, 'Supercrítico',
+                                                                  np.where(froude == 1, 'Crítico', ''))),
+        'slope_type': slope_type,
+    }
@@ -0,0 +1,58 @@
+import numpy as np
+from calc_engine.registry import formula
+
+STEEL_DENSITY = 7850  # kg/m³
+CEMENT_BAG_KG = 50
+
+@formula('concrete_volume', outputs=('volume', 'cement_bags', 'sand', 'gravel'), category='materials')
+def concrete_volume(length, width, height):
+    """Concrete volume and 1:2:3 mix quantities (m -> m³, 50 kg bags, m³, m³)"""
+    volume = length * width * height
+    return {
+        'volume': volume,
+        'cement_bags': volume * 7,
+        'sand': volume * 0.5,
+        'gravel': volume * 0.8,
+    }
+
+@formula('steel_weight', outputs=('weight_per_meter', 'total_weight'), category='materials')
+def steel_weight(diameter, length, quantity=1):
+    """Rebar weight (m, m -> kg/m, kg)"""
+    weight_per_meter = np.pi * diameter**2 / 4 * STEEL_DENSITY
+    return {
+        'weight_per_meter': weight_per_meter,
+        'total_weight': weight_per_meter * length * quantity,
+    }
+
+@formula('mortar_volume', outputs=('mortar_volume', 'cement_bags', 'sand'), category='materials')
+def mortar_volume(wall_area, joint_thickness=0.01):
+    """Masonry mortar, joints taking ~30% of the wall area, 1:3 mix (m², m -> m³, bags, m³)"""
+    volume = wall_area * joint_thickness * 0.3
+    return {
+        'mortar_volume': volume,
+        'cement_bags': volume * 8,
+        'sand': volume * 0.6,
+    }
+
+@formula('concrete_fck', outputs=('fck',), category='materials')
+def concrete_fck(rupture_force, area):
+    """fck = F/A from a specimen test (N, m² -> Pa)"""
+    return {'fck': rupture_force / area}
+
+@formula('mortar_mix', outputs=('sand', 'aggregate'), category='materials')
+def mortar_mix(cement, sand_ratio=3, aggregate_ratio=0):
+    """Quantities for a 1:a:b mix (in the cement's unit)"""
+    return {
+        'sand': cement * sand_ratio,
+        'aggregate': cement * aggregate_ratio,
+    }
+
+@formula('abrams_law', outputs=('strength',), category='materials')
+def abrams_law(water_cement_ratio, k_constant=200, n_exponent=2):
+    """fc = K·(a/c)^-n (MPa)"""
+    return {'strength': k_constant * water_cement_ratio ** -n_exponent}
+
+@formula('specific_weight', outputs=('specific_weight',), category='materials')
+def specific_weight(weight, volume):
+    """γ = P/V (N, m³ -> N/m³)"""
+    return {'specific_weight': weight / volume}
@@ -0,0 +1,224 @@
+"""Monte Carlo reliability of capacity formulas.
+
+Inputs are numbers or distributions, e.g.
+
+    {'dist': 'normal', 'mean': 30, 'std': 3}
+    {'dist': 'lognormal', 'mean': 10, 'std': 3}
+    {'dist': 'uniform', 'low': 17, 'high': 19}
+    {'dist': 'triangular', 'low': 0.9, 'mode': 1, 'high': 1.2}
+
+and the limit state is g = resistance - demand, failure when g < 0.
+Samples are drawn in fixed-size chunks, each from its own stream spawned
+from one SeedSequence, so a seed gives the same answer whatever the number
+of worker processes; chunks are spread over a process pool."""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import numpy as np
+from calc_engine.registry import get_formula, evaluate
+from calc_engine.sweep import numeric_inputs
+
+# Formula -> output compared with the demand
+RESISTANCE_OUTPUTS = {
+    'terzaghi_bearing': 'ultimate_capacity',
+    'general_bearing': 'ultimate_capacity',
+    'pile_capacity': 'total_capacity',
+}
+
+MC_DEFAULT_SAMPLES = 10**6
+MC_MAX_SAMPLES = 10**7
+# Realizations per task; fixed so results don't depend on the pool size
+MC_CHUNK_SAMPLES = 125000
+MC_WORKERS = int(os.environ.get('MC_WORKERS', 0)) or os.cpu_count() or 1
+PERCENTILES = (1, 5, 10, 50, 90, 95, 99)
+
+# name -> (required parameters, sampler(rng, size, **parameters), mean(**parameters))
+DISTRIBUTIONS = {
+    'normal': (
+        ('mean', 'std'),
+        lambda rng, size, mean, std: rng.normal(mean, std, size),
+        lambda mean, std: mean,
+    ),
+    'lognormal': (
+        ('mean', 'std'),
+        lambda rng, size, mean, std: rng.lognormal(*lognormal_parameters(mean, std), size),
+        lambda mean, std: mean,
+    ),
+    'uniform': (
+        ('low', 'high'),
+        lambda rng, size, low, high: rng.uniform(low, high, size),
+        lambda low, high: (low + high) / 2,
+    ),
+    'triangular': (
+        ('low', 'mode', 'high'),
+        lambda rng, size, low, mode, high: rng.triangular(low, mode, high, size),
+        lambda low, mode, high: (low + mode + high) / 3,
+    ),
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def lognormal_parameters(mean, std):
+    """(μ, σ) of the underlying normal for a lognormal with this mean and std"""
+    sigma2 = np.log(1 + (std / mean)**2)
+    return np.log(mean) - sigma2 / 2, np.sqrt(sigma2)
+
+def parse_distribution(name, value):
+    """A number, or a validated distribution dict; raise ValueError otherwise"""
+    if not isinstance(value, dict):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} is not a number or distribution')
+        if not np.isfinite(value):
+            raise ValueError(f'{name} is not a number')
+        return value
+    kind = value.get('dist')
+    if kind not in DISTRIBUTIONS:
+        raise ValueError(f"{name}: dist must be one of {', '.join(DISTRIBUTIONS)}")
+    parameters = {}
+    for key in DISTRIBUTIONS[kind][0]:
+        try:
+            parameters[key] = float(value[key])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'{name}: {kind} needs a numeric {key}')
+        if not np.isfinite(parameters[key]):
+            raise ValueError(f'{name}: {key} is not a number')
+    if kind in ('normal', 'lognormal') and parameters['std'] < 0:
+        raise ValueError(f'{name}: std must not be negative')
+    if kind == 'lognormal' and parameters['mean'] <= 0:
+        raise ValueError(f'{name}: lognormal mean must be positive')
+    if kind == 'uniform' and not parameters['low'] < parameters['high']:
+        raise ValueError(f'{name}: low must be below high')
+    if kind == 'triangular' and not (parameters['low'] <= parameters['mode'] <= parameters['high']
+                                     and parameters['low'] < parameters['high']):
+        raise ValueError(f'{name}: need low <= mode <= high with low < high')
+    return dict(parameters, dist=kind)
+
+def parameters_of(value):
+    return {key: item for key, item in value.items() if key != 'dist'}
+
+def draw(value, rng, size):
+    if not isinstance(value, dict):
+        return value
+    return DISTRIBUTIONS[value['dist']][1](rng, size, **parameters_of(value))
+
+def mean_value(value):
+    """The mean of a distribution (a number is its own mean)"""
+    if not isinstance(value, dict):
+        return value
+    return DISTRIBUTIONS[value['dist']][2](**parameters_of(value))
+
+def simulate_chunk(name, inputs, demand, seed, size):
+    """Sample one chunk: (resistance array, failures)"""
+    rng = np.random.default_rng(seed)
+    # Draw in a fixed order so each input keeps its stream whatever is random
+    samples = {key: draw(inputs[key], rng, size) for key in sorted(inputs)}
+    resistance = evaluate(name, **samples)[RESISTANCE_OUTPUTS[name]]
+    resistance = np.broadcast_to(resistance, (size,))
+    loads = np.broadcast_to(draw(demand, rng, size), (size,))
+    # A nan capacity (e.g. a negative sampled width) counts as a failure
+    failures = int(np.count_nonzero(~(resistance - loads >= 0)))
+    return resistance.astype(np.float32), failures
+
+def get_pool():
+    """The shared process pool, started on first use.
+
+    Workers come from a forkserver (spawn where unavailable) rather than
+    forking the web process, which has threads and open connections. They
+    still re-import the server's entrypoint, where create_app() skips the
+    database and scheduler setup in pool workers (app.in_pool_worker)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            if 'forkserver' in methods:
+                context.set_forkserver_preload(['calc_engine'])
+            _pool = ProcessPoolExecutor(max_workers=MC_WORKERS, mp_context=context)
+        return _pool
+
+def reliability_index(probability):
+    """β = -Φ⁻¹(pf); None when pf is 0 or 1 (beyond what the samples resolve)"""
+    if not 0 < probability < 1:
+        return None
+    return -NormalDist().inv_cdf(probability)
+
+def simulate(name, inputs, demand, samples=MC_DEFAULT_SAMPLES, seed=0, executor=None):
+    """Failure probability, reliability index and capacity percentiles.
+
+    inputs: formula input -> number or distribution (missing inputs take
+    their defaults); demand: the applied load or pressure, in the units of
+    the resistance output, as a number or distribution. Chunks run on
+    `executor`, by default the shared pool (inline with MC_WORKERS=1).
+    Raises ValueError for invalid inputs."""
+    if name not in RESISTANCE_OUTPUTS:
+        raise ValueError(f'{name} has no reliability mode')
+    spec = get_formula(name)
+    unknown = set(inputs) - set(spec['inputs'])
+    if unknown:
+        raise ValueError(f"Unknown input(s): {', '.join(sorted(unknown))}")
+    numeric = numeric_inputs(spec)
+    # Text inputs (e.g. the bearing factor convention) are passed through
+    inputs = {
+        key: parse_distribution(key, value) if key in numeric else str(value)
+        for key, value in inputs.items()
+    }
+    demand = parse_distribution('demand', demand)
+    missing = [key for key in spec['inputs'] if key not in inputs and key not in spec['defaults']]
+    if missing:
+        raise ValueError(f"Missing input(s): {', '.join(missing)}")
+    try:
+        samples = int(samples)
+        seed = int(seed)
+    except (TypeError, ValueError):
+        raise ValueError('samples and seed must be integers')
+    if seed < 0:
+        raise ValueError('seed must not be negative')
+    if not 1000 <= samples <= MC_MAX_SAMPLES:
+        raise ValueError(f'samples must be between 1000 and {MC_MAX_SAMPLES}')
+
+    sizes = [MC_CHUNK_SAMPLES] * (samples // MC_CHUNK_SAMPLES)
+    if samples % MC_CHUNK_SAMPLES:
+        sizes.append(samples % MC_CHUNK_SAMPLES)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(name, inputs, demand, chunk_seed, size) for chunk_seed, size in zip(seeds, sizes)]
+    if executor is None and MC_WORKERS > 1 and len(tasks) > 1:
+        executor = get_pool()
+    if executor is not None:
+        results = list(executor.map(simulate_chunk, *zip(*tasks)))
+    else:
+        results = [simulate_chunk(*task) for task in tasks]
+
+    resistance = np.concatenate([chunk for chunk, _ in results])
+    failures = sum(count for _, count in results)
+    probability = failures / samples
+    finite = resistance[np.isfinite(resistance)]
+    # The point-value calculation at the input means, with its safety factor
+    deterministic = evaluate(name, **{key: mean_value(value) for key, value in inputs.items()})
+    return {
+        'formula': name,
+        'resistance_output': RESISTANCE_OUTPUTS[name],
+        'samples': samples,
+        'seed': seed,
+        'failures': failures,
+        'failure_probability': probability,
+        # Standard error of the estimate, sqrt(pf (1 - pf) / N)
+        'standard_error': float(np.sqrt(probability * (1 - probability) / samples)),
+        'reliability_index': reliability_index(probability),
+        'resistance': {
+            'mean': float(finite.mean(dtype=np.float64)) if finite.size else None,
+            'std': float(finite.std(dtype=np.float64)) if finite.size else None,
+            'percentiles': {
+                str(p): float(value)
+                for p, value in zip(PERCENTILES, np.percentile(finite, PERCENTILES) if finite.size else [])
+            },
+        },
+        'mean_demand': float(mean_value(demand)),
+        'deterministic': {
+            key: float(array) if np.isfinite(array) else None for key, array in deterministic.items()
+        },
+    }
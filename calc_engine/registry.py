@@ -0,0 +1,55 @@
+import inspect
+import numpy as np
+
+# Registered formulas: name -> dict(func, inputs, defaults, outputs, category)
+FORMULAS = {}
+
+def formula(name, outputs, category):
+    """Register a pure formula.
+
+    The function takes scalars or NumPy arrays and returns a dict with one
+    entry per name in `outputs`; inputs and defaults come from its signature."""
+    def decorator(f):
+        parameters = inspect.signature(f).parameters.values()
+        FORMULAS[name] = {
+            'func': f,
+            'inputs': tuple(p.name for p in parameters),
+            'defaults': {p.name: p.default for p in parameters if p.default is not p.empty},
+            'outputs': tuple(outputs),
+            'category': category,
+        }
+        return f
+    return decorator
+
+def get_formula(name):
+    if name not in FORMULAS:
+        raise KeyError(f'Unknown formula: {name}')
+    return FORMULAS[name]
+
+def as_input(value):
+    """Numeric inputs become float arrays; text (e.g. a slab type) is left as is"""
+    array = np.asarray(value)
+    if array.dtype.kind in 'USO':
+        return array
+    return array.astype(float)
+
+def evaluate(name, **inputs):
+    """Evaluate a formula element-wise over scalars or equally broadcastable arrays.
+
+    Missing inputs take the formula's defaults. Returns a dict of arrays, all
+    with the broadcast shape of the inputs (0-d for scalar inputs). Divisions
+    by zero give inf/nan rather than raising, so one bad row doesn't sink a batch."""
+    spec = get_formula(name)
+    unknown = set(inputs) - set(spec['inputs'])
+    if unknown:
+        raise ValueError(f"Unknown input(s) for {name}: {', '.join(sorted(unknown))}")
+    values = dict(spec['defaults'], **inputs)
+    missing = [key for key in spec['inputs'] if key not in values]
+    if missing:
+        raise ValueError(f"Missing input(s) for {name}: {', '.join(missing)}")
+
+    arrays = {key: as_input(values[key]) for key in spec['inputs']}
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        outputs = spec['func'](**arrays)
+    shape = np.broadcast_shapes(*(array.shape for array in arrays.values()))
+    return {key: np.broadcast_to(outputs[key], shape) for key in spec['outputs']}
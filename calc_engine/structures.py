@@ -0,0 +1,121 @@
+import numpy as np
+from calc_engine.registry import formula
+from calc_engine.concrete_design import (bending_steel, stirrups, utilization, min_steel_ratio, concrete,
+                                         steel_stress, GAMMA_S, MAX_STEEL_RATIO, MIN_COLUMN_STEEL_RATIO)
+
+# Minimum slab thickness as span / ratio, by slab type
+SLAB_SPAN_RATIOS = {
+    'solid': 40,
+    'ribbed': 50,
+}
+SLAB_SPAN_RATIO_DEFAULT = 35
+# Status of a concrete section whose dimensions or materials can't be designed
+INVALID_SECTION = 'Seção inválida'
+
+@formula('beam_moment', outputs=('max_moment',), category='structures')
+def beam_moment(load, length):
+    """Simply supported beam under a uniform load (kN/m, m -> kN.m)"""
+    return {'max_moment': load * length**2 / 8}
+
+@formula('column_load', outputs=('max_load',), category='structures')
+def column_load(fck, area):
+    """Approximate plain concrete column capacity (MPa, mm² -> kN)"""
+    return {'max_load': 0.85 * fck * area / 1000}
+
+@formula('slab_thickness', outputs=('min_thickness',), category='structures')
+def slab_thickness(span, slab_type='solid'):
+    """Minimum slab thickness (m -> m)"""
+    ratio = np.full(np.shape(slab_type), SLAB_SPAN_RATIO_DEFAULT, dtype=float)
+    for name, value in SLAB_SPAN_RATIOS.items():
+        ratio = np.where(slab_type == name, value, ratio)
+    return {'min_thickness': span / ratio}
+
+@formula('normal_stress', outputs=('stress',), category='structures')
+def normal_stress(force, area):
+    """σ = F/A (N, m² -> Pa)"""
+    return {'stress': force / area}
+
+@formula('deformation', outputs=('strain',), category='structures')
+def deformation(delta_length, initial_length):
+    """ε = ΔL/L₀ (any consistent length unit -> dimensionless)"""
+    return {'strain': delta_length / initial_length}
+
+@formula('hooke_law', outputs=('stress',), category='structures')
+def hooke_law(elastic_modulus, strain):
+    """σ = E·ε (Pa -> Pa)"""
+    return {'stress': elastic_modulus * strain}
+
+@formula('bending_moment', outputs=('moment',), category='structures')
+def bending_moment(force, distance):
+    """M = F·d (N, m -> N.m)"""
+    return {'moment': force * distance}
+
+@formula('moment_inertia', outputs=('inertia',), category='structures')
+def moment_inertia(base, height):
+    """Rectangular section, I = b·h³/12 (m -> m⁴)"""
+    return {'inertia': base * height**3 / 12}
+
+@formula('bending_stress', outputs=('stress',), category='structures')
+def bending_stress(moment, distance_centroid, moment_inertia):
+    """σ = M·y/I (N.m, m, m⁴ -> Pa)"""
+    return {'stress': moment * distance_centroid / moment_inertia}
+
+@formula('shear_stress', outputs=('stress',), category='structures')
+def shear_stress(shear_force, area):
+    """τ = V/A (N, m² -> Pa)"""
+    return {'stress': shear_force / area}
+
+@formula('beam_design',
+         outputs=('bottom_steel', 'top_steel', 'neutral_axis_ratio', 'stirrup_area', 'stirrup_spacing',
+                  'shear_capacity', 'status'),
+         category='structures')
+def beam_design(positive_moment, negative_moment, shear, width, height, cover=0.04, fck=25, fyk=500,
+                stirrup_diameter=5):
+    """NBR 6118 design of a rectangular beam section for its sagging and hogging
+    design moments and design shear (kN.m, kN, m, MPa, mm -> cm², -, cm²/m, cm, kN)"""
+    depth = height - cover
+    sagging, sagging_compression, sagging_ratio = bending_steel(positive_moment, width, depth, cover, fck, fyk)
+    hogging, hogging_compression, hogging_ratio = bending_steel(negative_moment, width, depth, cover, fck, fyk)
+    minimum = min_steel_ratio(fck) * width * height * 1e4
+    bottom = np.maximum(np.where(positive_moment != 0, np.maximum(sagging, minimum), 0), hogging_compression)
+    top = np.maximum(np.where(negative_moment != 0, np.maximum(hogging, minimum), 0), sagging_compression)
+    stirrup_area, spacing, crushing = stirrups(shear, width, depth, fck, fyk, stirrup_diameter)
+    excessive = bottom + top > MAX_STEEL_RATIO * width * height * 1e4
+    crushed = np.abs(shear) > crushing
+    valid = (width > 0) & (cover >= 0) & (depth > cover) & (fck > 0) & (fyk > 0) & (stirrup_diameter > 0)
+    return {
+        'bottom_steel': np.where(valid, bottom, np.nan),
+        'top_steel': np.where(valid, top, np.nan),
+        'neutral_axis_ratio': np.where(valid, np.maximum(sagging_ratio, hogging_ratio), np.nan),
+        'stirrup_area': np.where(valid, stirrup_area, np.nan),
+        'stirrup_spacing': np.where(valid, spacing, np.nan),
+        'shear_capacity': np.where(valid, crushing, np.nan),
+        'status': np.where(~valid, INVALID_SECTION, np.where(crushed & excessive, 'Aumentar seção (VRd2 e armadura > 4%)',
+                           np.where(crushed, 'Aumentar seção (VRd2)',
+                                    np.where(excessive, 'Aumentar seção (armadura > 4%)', 'OK')))),
+    }
+
+@formula('column_check',
+         outputs=('design_moment', 'utilization', 'axial_capacity', 'steel_ratio', 'min_steel', 'status'),
+         category='structures')
+def column_check(axial, moment, width, height, steel_area, cover=0.04, fck=25, fyk=500):
+    """NBR 6118 N-M check of a rectangular column with symmetric steel; axial
+    compression positive, moment in the plane of `height`, at least the
+    minimum first-order moment Nd·(0.015 + 0.03·h) (kN, kN.m, m, cm², MPa -> kN.m, -, kN, -, cm²)"""
+    design_moment = np.maximum(np.abs(moment), np.abs(axial) * (0.015 + 0.03 * height))
+    stress = concrete(fck)[0]
+    fyd = fyk / GAMMA_S
+    plastic = concrete(fck)[3]
+    area = width * height
+    ratio = steel_area / 1e4 / area
+    minimum = np.maximum(0.15 * np.maximum(axial, 0) / fyd * 10, MIN_COLUMN_STEEL_RATIO * area * 1e4)
+    used = utilization(axial, design_moment, width, height, cover, steel_area, fck, fyk)
+    return {
+        'design_moment': design_moment,
+        'utilization': used,
+        'axial_capacity': (stress * area + steel_area / 1e4 * steel_stress(plastic, fyd)) * 1000,
+        'steel_ratio': ratio,
+        'min_steel': minimum,
+        'status': np.where(np.isnan(used), INVALID_SECTION, np.where(used > 1, 'Não atende (N-M)', np.where(
+            ratio > MAX_STEEL_RATIO, 'Armadura > 4%', np.where(steel_area < minimum, 'Armadura abaixo da mínima', 'OK')))),
+    }
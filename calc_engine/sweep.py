@@ -0,0 +1,163 @@
+import numpy as np
+from calc_engine.registry import get_formula, evaluate
+
+MAX_SWEEP_AXES = 3
+MAX_AXIS_STEPS = 500
+# Cells in a result surface (product of the axis lengths)
+MAX_SWEEP_POINTS = 100000
+# Default tornado swing for inputs that aren't swept: base ± 10%
+TORNADO_VARIATION = 0.1
+
+def numeric_inputs(spec):
+    """Inputs that can be swept: everything but text inputs such as a slab type"""
+    return [name for name in spec['inputs'] if not isinstance(spec['defaults'].get(name), str)]
+
+def study_inputs(spec, inputs, swept=None):
+    """Base values for every input, or raise ValueError.
+
+    An input takes its given value, else its default, else (for a swept
+    input) the middle of its axis."""
+    swept = swept or {}
+    base = {}
+    for name in spec['inputs']:
+        value = inputs.get(name, spec['defaults'].get(name))
+        if value is None and name in swept:
+            value = float(np.median(swept[name]))
+        if value is None:
+            raise ValueError(f'missing {name}')
+        if isinstance(spec['defaults'].get(name), str):
+            base[name] = str(value)
+            continue
+        try:
+            base[name] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} is not a number')
+        if not np.isfinite(base[name]):
+            raise ValueError(f'{name} is not a number')
+    return base
+
+def axis_values(axis):
+    """Values of one swept axis: explicit `values`, or `steps` points from `start` to `stop`"""
+    if axis.get('values') is not None:
+        values = np.asarray(axis['values'], dtype=float).ravel()
+    else:
+        steps = int(axis.get('steps', 11))
+        if steps < 2:
+            raise ValueError(f"{axis.get('input')}: at least 2 steps")
+        values = np.linspace(float(axis['start']), float(axis['stop']), steps)
+    if not 1 <= values.size <= MAX_AXIS_STEPS:
+        raise ValueError(f"{axis.get('input')}: between 1 and {MAX_AXIS_STEPS} values")
+    if not np.isfinite(values).all():
+        raise ValueError(f"{axis.get('input')}: values must be numbers")
+    return values
+
+def parse_axes(spec, axes):
+    """[(input, values)] for 1 to MAX_SWEEP_AXES axes, or raise ValueError"""
+    if not isinstance(axes, list) or not 1 <= len(axes) <= MAX_SWEEP_AXES:
+        raise ValueError(f'sweep 1 to {MAX_SWEEP_AXES} inputs')
+    sweepable = numeric_inputs(spec)
+    parsed = []
+    for axis in axes:
+        name = axis.get('input') if isinstance(axis, dict) else None
+        if name not in sweepable:
+            raise ValueError(f'{name} is not a numeric input')
+        if name in (seen for seen, _ in parsed):
+            raise ValueError(f'{name} is swept twice')
+        try:
+            parsed.append((name, axis_values(axis)))
+        except (KeyError, TypeError):
+            raise ValueError(f'{name}: give values, or start and stop')
+    points = int(np.prod([values.size for _, values in parsed]))
+    if points > MAX_SWEEP_POINTS:
+        raise ValueError(f'{points} points; at most {MAX_SWEEP_POINTS}')
+    return parsed
+
+def to_json(array):
+    """Nested lists with non-finite numbers (e.g. a division by zero) as None"""
+    if array.dtype.kind != 'f':
+        return array.tolist()
+    array = array.astype(object)
+    array[~np.isfinite(array.astype(float))] = None
+    return array.tolist()
+
+def sweep(name, base, axes):
+    """Result surface of a formula over the grid of its swept inputs.
+
+    Each axis's values are shaped to lie along their own dimension, so a
+    single evaluate() broadcasts them into the full grid; outputs have shape
+    (len(axis 1), len(axis 2), ...)."""
+    dimensions = len(axes)
+    inputs = dict(base)
+    for position, (input_name, values) in enumerate(axes):
+        shape = [1] * dimensions
+        shape[position] = values.size
+        inputs[input_name] = values.reshape(shape)
+    outputs = evaluate(name, **inputs)
+    return {
+        'axes': [{'input': input_name, 'values': values.tolist()} for input_name, values in axes],
+        'outputs': {key: to_json(array) for key, array in outputs.items()},
+    }
+
+def tornado(name, base, ranges=None, variation=TORNADO_VARIATION):
+    """One-at-a-time sensitivities of each numeric output to each numeric input.
+
+    Inputs in `ranges` (name -> (low, high)) move over that range, the rest
+    by ± variation around the base value; inputs that are zero at the base
+    are skipped unless given a range. All 2n+1 cases (the base, then each
+    input low and high) are one vectorized evaluate(). Per output, inputs
+    are listed by decreasing swing, |output(high) - output(low)|."""
+    spec = get_formula(name)
+    ranges = ranges or {}
+    varied = []
+    for input_name in numeric_inputs(spec):
+        if input_name in ranges:
+            varied.append((input_name, *ranges[input_name]))
+        elif base[input_name] != 0:
+            value = base[input_name]
+            varied.append((input_name, value * (1 - variation), value * (1 + variation)))
+
+    cases = 2 * len(varied) + 1
+    inputs = {
+        key: value if isinstance(value, str) else np.full(cases, value)
+        for key, value in base.items()
+    }
+    for i, (input_name, low, high) in enumerate(varied):
+        inputs[input_name][2 * i + 1] = low
+        inputs[input_name][2 * i + 2] = high
+    outputs = evaluate(name, **inputs)
+
+    result = {'base': {}, 'sensitivities': {}}
+    for key, array in outputs.items():
+        if array.dtype.kind != 'f':
+            continue
+        result['base'][key] = to_json(array[:1])[0]
+        bars = []
+        for i, (input_name, low, high) in enumerate(varied):
+            at_low, at_high = array[2 * i + 1], array[2 * i + 2]
+            if not (np.isfinite(at_low) and np.isfinite(at_high)):
+                continue
+            bars.append({
+                'input': input_name,
+                'low_value': float(low),
+                'high_value': float(high),
+                'low': float(at_low),
+                'high': float(at_high),
+                'swing': float(abs(at_high - at_low)),
+            })
+        bars.sort(key=lambda bar: bar['swing'], reverse=True)
+        result['sensitivities'][key] = bars
+    return result
+
+def run_study(name, inputs, axes, variation=TORNADO_VARIATION):
+    """Sweep plus tornado for a study given as plain JSON values.
+
+    Swept inputs use their axis range in the tornado. Raises ValueError
+    for invalid inputs or axes."""
+    spec = get_formula(name)
+    parsed = parse_axes(spec, axes)
+    base = study_inputs(spec, inputs, dict(parsed))
+    ranges = {input_name: (values.min(), values.max()) for input_name, values in parsed}
+    result = {'formula': name, 'inputs': base}
+    result.update(sweep(name, base, parsed))
+    result.update(tornado(name, base, ranges, variation))
+    return result
@@ -0,0 +1,61 @@
+import hashlib
+import secrets
+import threading
+import time
+from datetime import datetime
+from scheduler import format_timestamp
+
+KEY_PREFIX = 'fd_'
+# How long a verified (or rejected) key is trusted without hitting the
+# database; a revoked key stops working within this many seconds.
+KEY_CACHE_SECONDS = 60
+KEY_CACHE_MAX = 10000
+
+_key_cache = {}
+_key_cache_lock = threading.Lock()
+
+def hash_api_key(key):
+    # Keys are 256 random bits, so a plain sha256 is enough (no need for a slow KDF)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def create_device(db, user_id, name, device_id, project_id=None):
+    """Register a field device and return its API key (shown only once; caller commits)"""
+    key = KEY_PREFIX + secrets.token_urlsafe(32)
+    db.execute(
+        'INSERT INTO field_devices (user_id, name, device_id, project_id, key_hash, key_prefix, created_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        (user_id, name, device_id, project_id, hash_api_key(key), key[:len(KEY_PREFIX) + 6],
+         format_timestamp(datetime.now()))
+    )
+    return key
+
+def revoke_device(db, device_pk):
+    """Revoke a device's key (caller commits); cached copies expire within KEY_CACHE_SECONDS"""
+    db.execute(
+        'UPDATE field_devices SET revoked_at = ? WHERE id = ? AND revoked_at IS NULL',
+        (format_timestamp(datetime.now()), device_pk)
+    )
+    with _key_cache_lock:
+        _key_cache.clear()
+
+def verify_api_key(db, key):
+    """The active field_devices row (as a dict) for an API key, or None"""
+    if not key or not key.startswith(KEY_PREFIX):
+        return None
+    digest = hash_api_key(key)
+    now = time.monotonic()
+    cached = _key_cache.get(digest)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    row = db.execute(
+        'SELECT id, user_id, name, device_id, project_id FROM field_devices '
+        'WHERE key_hash = ? AND revoked_at IS NULL',
+        (digest,)
+    ).fetchone()
+    device = dict(row) if row else None
+    with _key_cache_lock:
+        if len(_key_cache) >= KEY_CACHE_MAX:
+            _key_cache.clear()
+        _key_cache[digest] = (device, now + KEY_CACHE_SECONDS)
+    return device
@@ -0,0 +1,217 @@
+import os
+import hashlib
+import logging
+import zipfile
+import multiprocessing
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from scheduler import job, format_timestamp
+
+try:
+    import pypdf
+except ImportError:  # PDF extraction is skipped without pypdf
+    pypdf = None
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_BATCH = 50
+DOCUMENT_MAX_ATTEMPTS = 3
+DOCUMENT_MAX_CHARS = 1000000
+
+# kind -> (code, owner table, file column, title query).
+# A document's documents_text rowid is owner id * 8 + code.
+DOCUMENT_KINDS = {
+    'permit': (1, 'permits', 'document_path', 'SELECT name FROM permits WHERE id = ?'),
+    'compliance_doc': (2, 'compliance_docs', 'file_path', 'SELECT title FROM compliance_docs WHERE id = ?'),
+    'certification': (3, 'worker_trainings', 'certificate_path',
+                      "SELECT w.name || ' - ' || t.title FROM worker_trainings wt "
+                      'JOIN workers w ON wt.worker_id = w.id JOIN trainings t ON wt.training_id = t.id '
+                      'WHERE wt.id = ?'),
+}
+KIND_BY_CODE = {spec[0]: kind for kind, spec in DOCUMENT_KINDS.items()}
+
+# File extension -> function(path) returning the document's text
+EXTRACTORS = {}
+
+def extractor(*extensions):
+    """Register a text extractor for the given file extensions"""
+    def decorator(f):
+        for extension in extensions:
+            EXTRACTORS[extension] = f
+        return f
+    return decorator
+
+@extractor('.txt', '.csv')
+def extract_plain_text(path):
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return f.read(DOCUMENT_MAX_CHARS)
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+@extractor('.docx')
+def extract_docx(path):
+    """Paragraph text from word/document.xml"""
+    with zipfile.ZipFile(path) as archive:
+        root = ET.fromstring(archive.read('word/document.xml'))
+    paragraphs = []
+    for paragraph in root.iter(f'{WORD_NAMESPACE}p'):
+        text = ''.join(node.text or '' for node in paragraph.iter(f'{WORD_NAMESPACE}t'))
+        if text:
+            paragraphs.append(text)
+    return '\n'.join(paragraphs)
+
+if pypdf is not None:
+    @extractor('.pdf')
+    def extract_pdf(path):
+        reader = pypdf.PdfReader(path)
+        return '\n'.join(page.extract_text() or '' for page in reader.pages)
+
+def file_hash(path):
+    """sha256 of a file's content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def extract_text(path):
+    """Run the registered extractor for `path`; None when the type isn't supported.
+
+    Executed in the worker processes, so it must not touch the database."""
+    func = EXTRACTORS.get(os.path.splitext(path)[1].lower())
+    if func is None:
+        return None
+    return func(path)[:DOCUMENT_MAX_CHARS]
+
+_pool = None
+
+def get_pool():
+    """Process pool shared by extraction runs; spawned so workers don't inherit app threads"""
+    global _pool
+    if _pool is None:
+        workers = int(os.environ.get('DOCUMENT_WORKERS', os.cpu_count() or 2))
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+def reset_pool():
+    """Drop a pool whose worker died so the next run starts a fresh one"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _finish(db, entry, status, content_hash=None, error=None):
+    """Mark a queue entry processed; False if it was removed meanwhile (owner deleted)"""
+    return db.execute(
+        'UPDATE document_queue SET status = ?, content_hash = ?, error = ?, processed_at = ? '
+        'WHERE id = ?',
+        (status, content_hash, error, format_timestamp(datetime.now()), entry['id'])
+    ).rowcount == 1
+
+def _fail(db, entry, error):
+    attempts = entry['attempts'] + 1
+    status = 'failed' if attempts >= DOCUMENT_MAX_ATTEMPTS else 'pending'
+    db.execute(
+        'UPDATE document_queue SET status = ?, attempts = ?, error = ? WHERE id = ?',
+        (status, attempts, error, entry['id'])
+    )
+
+def index_document(db, entry, content_hash, text):
+    """Store a document's text under its owning record"""
+    code, _, _, title_query = DOCUMENT_KINDS[entry['kind']]
+    if not _finish(db, entry, 'done', content_hash):
+        return
+    title = db.execute(title_query, (entry['record_id'],)).fetchone()
+    db.execute(
+        'INSERT OR REPLACE INTO documents_text (rowid, title, content) VALUES (?, ?, ?)',
+        (entry['record_id'] * 8 + code, title[0] if title else None, text)
+    )
+
+def requeue_supported(db):
+    """Queue again 'unsupported' files whose type now has an extractor
+    (e.g. PDFs uploaded before pypdf was installed)"""
+    if not EXTRACTORS:
+        return 0
+    patterns = ['%' + extension for extension in EXTRACTORS]
+    return db.execute(
+        "UPDATE document_queue SET status = 'pending', attempts = 0, error = NULL "
+        "WHERE status = 'unsupported' AND (" + ' OR '.join(['file_path LIKE ?'] * len(patterns)) + ')',
+        patterns
+    ).rowcount
+
+def process_document_queue(db):
+    """Extract text for pending uploads, skipping content that was already extracted.
+
+    Hashing happens here; extraction of unseen content runs in the process
+    pool. Identical files (same sha256) are extracted once and reused. Only
+    extracted text is cached: a file no extractor handles is marked
+    'unsupported' and picked up again once one is registered."""
+    if requeue_supported(db):
+        db.commit()
+    processed = 0
+    last_id = 0  # failed entries are retried on the next run, not in this one
+    while True:
+        entries = db.execute(
+            "SELECT * FROM document_queue WHERE status = 'pending' AND id > ? ORDER BY id LIMIT ?",
+            (last_id, DOCUMENT_BATCH)
+        ).fetchall()
+        if not entries:
+            return processed
+        last_id = entries[-1]['id']
+
+        pending = {}
+        for entry in entries:
+            path = entry['file_path']
+            if not path or not os.path.exists(path):
+                _finish(db, entry, 'missing')
+                continue
+            try:
+                content_hash = file_hash(path)
+            except OSError as e:
+                _fail(db, entry, str(e))
+                continue
+            # Rows without text were left by older versions, which cached unsupported files
+            known = db.execute(
+                'SELECT text FROM document_contents WHERE content_hash = ? AND text IS NOT NULL', (content_hash,)
+            ).fetchone()
+            if known is not None:
+                index_document(db, entry, content_hash, known['text'])
+            else:
+                pending.setdefault(content_hash, []).append(entry)
+        db.commit()
+
+        futures = {
+            content_hash: get_pool().submit(extract_text, group[0]['file_path'])
+            for content_hash, group in pending.items()
+        }
+        for content_hash, future in futures.items():
+            group = pending[content_hash]
+            try:
+                text = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    reset_pool()
+                logger.warning('Text extraction failed for %s: %s', group[0]['file_path'], e)
+                for entry in group:
+                    _fail(db, entry, str(e))
+                continue
+            if text is not None:
+                db.execute(
+                    'INSERT OR REPLACE INTO document_contents (content_hash, text, extracted_at) '
+                    'VALUES (?, ?, ?)',
+                    (content_hash, text, format_timestamp(datetime.now()))
+                )
+            for entry in group:
+                if text is None:
+                    _finish(db, entry, 'unsupported', content_hash)
+                else:
+                    index_document(db, entry, content_hash, text)
+        db.commit()
+        processed += len(entries)
+
+@job('extract_documents', '* * * * *')
+def extract_documents(db):
+    """Index the text of newly uploaded permit, compliance and certificate files"""
+    return process_document_queue(db)
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from scheduler import job, format_timestamp, RUN_HISTORY_DAYS
+
+# Modules that register their own jobs
+import blobstore  # noqa: F401
+import calc_cache  # noqa: F401
+import documents  # noqa: F401
+import notifications  # noqa: F401
+import pricing  # noqa: F401
+import purchasing  # noqa: F401
+import search_index  # noqa: F401
+import session_store  # noqa: F401
+import subscription_lifecycle  # noqa: F401
+import webhooks  # noqa: F401
+
+# Dashboard KPIs precomputed by the rollup job: name -> (query, params factory)
+KPI_QUERIES = {
+    'total_projects': ('SELECT COUNT(*) FROM projects', lambda: ()),
+    'active_projects': ('SELECT COUNT(*) FROM projects WHERE status = ?', lambda: ('active',)),
+    'total_budget': ('SELECT COALESCE(SUM(total_cost), 0) FROM budget_items', lambda: ()),
+    'pending_tasks': ('SELECT COUNT(*) FROM tasks WHERE status = ?', lambda: ('pending',)),
+    'overdue_tasks': (
+        'SELECT COUNT(*) FROM tasks WHERE due_date < ? AND status = ?',
+        lambda: (datetime.now().date(), 'pending')
+    ),
+    'open_incidents': ('SELECT COUNT(*) FROM incidents WHERE status = ?', lambda: ('open',)),
+}
+
+def compute_kpis(db):
+    """Compute every dashboard KPI directly from the source tables"""
+    return {
+        name: db.execute(query, params()).fetchone()[0]
+        for name, (query, params) in KPI_QUERIES.items()
+    }
+
+@job('dashboard_rollup', '*/5 * * * *')
+def dashboard_rollup(db):
+    """Materialize dashboard KPIs so the dashboard doesn't aggregate per request"""
+    kpis = compute_kpis(db)
+    now = format_timestamp(datetime.now())
+    db.executemany(
+        'INSERT OR REPLACE INTO kpi_rollups (name, value, computed_at) VALUES (?, ?, ?)',
+        [(name, value, now) for name, value in kpis.items()]
+    )
+    db.commit()
+    return len(kpis)
+
+@job('job_runs_archival', '30 3 * * *')
+def job_runs_archival(db):
+    """Drop scheduler run history older than RUN_HISTORY_DAYS"""
+    cutoff = format_timestamp(datetime.now() - timedelta(days=RUN_HISTORY_DAYS))
+    deleted = db.execute('DELETE FROM job_runs WHERE started_at < ?', (cutoff,)).rowcount
+    db.commit()
+    return deleted
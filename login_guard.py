@@ -0,0 +1,55 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import check_password_hash
+from ratelimit import SlidingWindowLimiter
+
+# Failed logins allowed per window before attempts are rejected without hashing
+LOGIN_WINDOW_SECONDS = 15 * 60
+LOGIN_MAX_FAILURES_PER_USER = int(os.environ.get('LOGIN_MAX_FAILURES_PER_USER', 5))
+LOGIN_MAX_FAILURES_PER_IP = int(os.environ.get('LOGIN_MAX_FAILURES_PER_IP', 30))
+
+# Concurrent password checks per process. scrypt (werkzeug's default) needs
+# ~32 MB and a full core per check, so the pool bounds both CPU and memory.
+LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', 2))
+# Checks allowed to wait for a pool thread; beyond that logins fail fast
+LOGIN_HASH_QUEUE = int(os.environ.get('LOGIN_HASH_QUEUE', 8))
+LOGIN_HASH_WAIT_SECONDS = 5
+
+user_failures = SlidingWindowLimiter(LOGIN_MAX_FAILURES_PER_USER, LOGIN_WINDOW_SECONDS)
+ip_failures = SlidingWindowLimiter(LOGIN_MAX_FAILURES_PER_IP, LOGIN_WINDOW_SECONDS)
+
+# hashlib's scrypt/pbkdf2 release the GIL, so threads run checks in parallel
+_hash_pool = ThreadPoolExecutor(max_workers=LOGIN_HASH_WORKERS, thread_name_prefix='password-check')
+_hash_slots = threading.BoundedSemaphore(LOGIN_HASH_WORKERS + LOGIN_HASH_QUEUE)
+
+# Both counters share one slot file, so keys are namespaced: a username
+# that looks like an IP must not count against that IP
+def user_key(username):
+    return 'user:' + username.lower()
+
+def ip_key(ip):
+    return 'ip:' + (ip or '')
+
+def login_retry_after(username, ip):
+    """Seconds the caller must wait before this username or IP may try again, 0 if allowed"""
+    return max(user_failures.retry_after(user_key(username)), ip_failures.retry_after(ip_key(ip)))
+
+def record_login_failure(username, ip):
+    user_failures.hit(user_key(username))
+    ip_failures.hit(ip_key(ip))
+
+def verify_password(password_hash, password):
+    """check_password_hash on the bounded pool.
+
+    Returns None instead of waiting when LOGIN_HASH_QUEUE checks are already
+    queued, so a burst of attempts can't tie up every request thread."""
+    if not _hash_slots.acquire(blocking=False):
+        return None
+    # The slot is freed when the check finishes, even if we stopped waiting for it
+    future = _hash_pool.submit(check_password_hash, password_hash, password)
+    future.add_done_callback(lambda _: _hash_slots.release())
+    try:
+        return future.result(timeout=LOGIN_HASH_WAIT_SECONDS)
+    except FutureTimeout:
+        return None
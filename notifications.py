@@ -0,0 +1,178 @@
+import os
+import smtplib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from flask import current_app
+from scheduler import job, format_timestamp
+
+DIGEST_HORIZON_DAYS = 30
+DIGEST_BATCH_USERS = 500
+
+KIND_LABELS = {
+    'permit': 'Licença',
+    'compliance_doc': 'Documento de compliance',
+    'certification': 'Certificação de trabalhador',
+}
+
+# Every upcoming expiry per recipient, minus the alerts already sent.
+# Permits and compliance docs go to the project owner; worker certifications
+# aren't tied to a project, so every user receives them.
+UPCOMING_EXPIRIES_SQL = '''
+    CREATE TEMP TABLE digest_items AS
+    WITH upcoming AS (
+        SELECT p.user_id AS user_id, 'permit' AS kind, pe.id AS item_id,
+               pe.name AS title, p.name AS project_name, pe.expiry_date AS expiry_date
+        FROM permits pe
+        JOIN projects p ON pe.project_id = p.id
+        WHERE pe.expiry_date BETWEEN :today AND :horizon
+        UNION ALL
+        SELECT p.user_id, 'compliance_doc', cd.id, cd.title, p.name, cd.expiry_date
+        FROM compliance_docs cd
+        JOIN projects p ON cd.project_id = p.id
+        WHERE cd.expiry_date BETWEEN :today AND :horizon
+        UNION ALL
+        SELECT u.id, 'certification', wt.id, w.name || ' - ' || t.title, NULL, wt.expiry_date
+        FROM worker_trainings wt
+        JOIN workers w ON wt.worker_id = w.id
+        JOIN trainings t ON wt.training_id = t.id
+        CROSS JOIN users u
+        WHERE wt.expiry_date BETWEEN :today AND :horizon
+    )
+    SELECT up.*, u.username, u.email
+    FROM upcoming up
+    JOIN users u ON u.id = up.user_id
+    WHERE u.email IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM notification_log nl
+        WHERE nl.user_id = up.user_id AND nl.kind = up.kind
+          AND nl.item_id = up.item_id AND nl.expiry_date = up.expiry_date
+    )
+'''
+
+class SMTPTransport:
+    """Deliver through an SMTP server, reusing one connection per batch.
+
+    Defaults to a local debugging server: `python -m aiosmtpd -n -l localhost:1025`"""
+
+    def __init__(self, host=None, port=None):
+        self.host = host or os.environ.get('MAIL_SERVER', 'localhost')
+        self.port = int(port or os.environ.get('MAIL_PORT', 1025))
+
+    def send_batch(self, messages):
+        with smtplib.SMTP(self.host, self.port) as smtp:
+            for message in messages:
+                smtp.send_message(message)
+
+class FileTransport:
+    """Append messages to an mbox-style file instead of sending them"""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('MAIL_FILE', os.path.join('outbox', 'digests.mbox'))
+
+    def send_batch(self, messages):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for message in messages:
+                f.write(f"From {message['From']} {message['Date']}\n")
+                f.write(message.as_string())
+                f.write('\n')
+
+TRANSPORTS = {
+    'smtp': SMTPTransport,
+    'file': FileTransport,
+}
+
+def get_transport():
+    """Build the transport selected by MAIL_TRANSPORT (smtp or file)"""
+    name = os.environ.get('MAIL_TRANSPORT', 'smtp')
+    if name not in TRANSPORTS:
+        raise ValueError(f'Unknown MAIL_TRANSPORT: {name}')
+    return TRANSPORTS[name]()
+
+def build_message(template, user, items, sender):
+    """Render one user's digest email"""
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = user['email']
+    message['Subject'] = f'EngenPro: {len(items)} vencimento(s) nos próximos {DIGEST_HORIZON_DAYS} dias'
+    message['Date'] = formatdate(localtime=True)
+    message['Message-ID'] = make_msgid(domain='engenpro.local')
+    message.set_content(template.render(
+        username=user['username'],
+        items=items,
+        labels=KIND_LABELS,
+        horizon_days=DIGEST_HORIZON_DAYS
+    ))
+    return message
+
+def send_expiry_digests(db, transport=None, today=None):
+    """Send each user a digest of upcoming expiries they haven't been alerted about.
+
+    The candidates are computed with a single set-based query into a temp
+    table, then rendered and delivered in batches of DIGEST_BATCH_USERS users.
+    Each batch's notification_log rows are committed only after delivery, so
+    an alert is never recorded without being sent."""
+    transport = transport or get_transport()
+    template = current_app.jinja_env.get_template('email/expiry_digest.txt')
+    sender = os.environ.get('MAIL_FROM', 'alertas@engenpro.local')
+    today = today or datetime.now().date()
+    horizon = today + timedelta(days=DIGEST_HORIZON_DAYS)
+
+    db.execute('DROP TABLE IF EXISTS temp.digest_items')
+    db.execute(UPCOMING_EXPIRIES_SQL, {'today': today.isoformat(), 'horizon': horizon.isoformat()})
+    db.execute('CREATE INDEX temp.idx_digest_items_user ON digest_items (user_id, expiry_date)')
+
+    sent_users = 0
+    last_user_id = 0
+    try:
+        while True:
+            user_ids = [row[0] for row in db.execute(
+                'SELECT DISTINCT user_id FROM temp.digest_items WHERE user_id > ? '
+                'ORDER BY user_id LIMIT ?',
+                (last_user_id, DIGEST_BATCH_USERS)
+            )]
+            if not user_ids:
+                break
+            rows = db.execute(
+                'SELECT * FROM temp.digest_items WHERE user_id BETWEEN ? AND ? '
+                'ORDER BY user_id, expiry_date',
+                (user_ids[0], user_ids[-1])
+            ).fetchall()
+
+            messages = []
+            log_rows = []
+            sent_at = format_timestamp(datetime.now())
+            start = 0
+            for i in range(1, len(rows) + 1):
+                if i == len(rows) or rows[i]['user_id'] != rows[start]['user_id']:
+                    items = rows[start:i]
+                    messages.append(build_message(template, items[0], items, sender))
+                    log_rows.extend(
+                        (item['user_id'], item['kind'], item['item_id'], item['expiry_date'], sent_at)
+                        for item in items
+                    )
+                    start = i
+
+            db.executemany(
+                'INSERT OR IGNORE INTO notification_log (user_id, kind, item_id, expiry_date, sent_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                log_rows
+            )
+            try:
+                transport.send_batch(messages)
+            except Exception:
+                db.rollback()
+                raise
+            db.commit()
+
+            sent_users += len(messages)
+            last_user_id = user_ids[-1]
+    finally:
+        db.execute('DROP TABLE IF EXISTS temp.digest_items')
+
+    return sent_users
+
+@job('expiry_digest', '0 7 * * *', max_attempts=5)
+def expiry_digest(db):
+    """Daily digest of expiring permits, compliance documents and certifications"""
+    return send_expiry_digests(db)
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+from purchasing import normalize_material
+from scheduler import job, migration_progress, save_migration_progress
+
+PRICE_WINDOW_DAYS = 90
+PRICES_MIGRATION = 'material_prices'
+PRICES_MIGRATION_BATCH = 1000
+
+def record_price(db, material_name, unit_price, observed_on, supplier_id=None,
+                 material_id=None, source='manual', source_id=None):
+    """Add one observed unit price to the price history (caller commits)"""
+    key = normalize_material(material_name)
+    if not key or unit_price is None:
+        return
+    db.execute(
+        'INSERT INTO material_prices (material_key, description, material_id, supplier_id, '
+        'unit_price, observed_on, source, source_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (key, material_name.strip(), material_id, supplier_id, unit_price,
+         observed_on or datetime.now().strftime('%Y-%m-%d'), source, source_id)
+    )
+
+def price_lookup(db, material_name, days=PRICE_WINDOW_DAYS, supplier_id=None):
+    """Latest, median and best price paid for a material in the last `days` days.
+
+    Every query is an index seek on (material_key, observed_on), followed by a
+    scan of that material's entries inside the window only."""
+    key = normalize_material(material_name)
+    since = (datetime.now().date() - timedelta(days=days)).isoformat()
+    supplier_filter = ' AND mp.supplier_id = ?' if supplier_id else ''
+    params = [key, since] + ([supplier_id] if supplier_id else [])
+
+    latest = db.execute(
+        'SELECT mp.description, mp.unit_price, mp.observed_on, s.name as supplier_name '
+        'FROM material_prices mp LEFT JOIN suppliers s ON mp.supplier_id = s.id '
+        'WHERE mp.material_key = ? AND mp.observed_on >= ?' + supplier_filter +
+        ' ORDER BY mp.observed_on DESC, mp.id DESC LIMIT 1',
+        params
+    ).fetchone()
+    if latest is None:
+        return None
+
+    best = db.execute(
+        'SELECT mp.unit_price, mp.observed_on, s.name as supplier_name '
+        'FROM material_prices mp LEFT JOIN suppliers s ON mp.supplier_id = s.id '
+        'WHERE mp.material_key = ? AND mp.observed_on >= ?' + supplier_filter +
+        ' ORDER BY mp.unit_price ASC LIMIT 1',
+        params
+    ).fetchone()
+
+    count = db.execute(
+        'SELECT COUNT(*) FROM material_prices mp '
+        'WHERE mp.material_key = ? AND mp.observed_on >= ?' + supplier_filter,
+        params
+    ).fetchone()[0]
+    middle = db.execute(
+        'SELECT mp.unit_price FROM material_prices mp '
+        'WHERE mp.material_key = ? AND mp.observed_on >= ?' + supplier_filter +
+        ' ORDER BY mp.unit_price LIMIT ? OFFSET ?',
+        params + [2 - count % 2, (count - 1) // 2]
+    ).fetchall()
+    median = sum(row[0] for row in middle) / len(middle)
+
+    return {
+        'material': latest['description'],
+        'samples': count,
+        'window_days': days,
+        'latest': {
+            'unit_price': latest['unit_price'],
+            'observed_on': latest['observed_on'],
+            'supplier_name': latest['supplier_name']
+        },
+        'median': median,
+        'best': {
+            'unit_price': best['unit_price'],
+            'observed_on': best['observed_on'],
+            'supplier_name': best['supplier_name']
+        }
+    }
+
+def search_materials(db, prefix, limit=10):
+    """Material keys with price history starting with `prefix`"""
+    key = normalize_material(prefix)
+    if not key:
+        return []
+    return [row[0] for row in db.execute(
+        'SELECT DISTINCT material_key FROM material_prices '
+        'WHERE material_key >= ? AND material_key < ? ORDER BY material_key LIMIT ?',
+        (key, key + '\uffff', limit)
+    )]
+
+@job('migrate_material_prices', '*/5 * * * *')
+def migrate_material_prices(db):
+    """One-off backfill of price history from existing order lines and material logs"""
+    last_id, completed = migration_progress(db, PRICES_MIGRATION)
+    if completed:
+        return 0
+
+    if last_id == 0:
+        # Order lines already carry the normalized key: one set-based insert
+        db.execute(
+            "INSERT INTO material_prices (material_key, description, material_id, supplier_id, "
+            "unit_price, observed_on, source, source_id) "
+            "SELECT l.material_key, l.description, l.material_id, po.supplier_id, l.unit_price, "
+            "COALESCE(po.order_date, date(po.created_at)), 'purchase_order', l.id "
+            "FROM purchase_order_lines l JOIN purchase_orders po ON l.order_id = po.id "
+            "WHERE l.unit_price IS NOT NULL AND NOT EXISTS ("
+            "SELECT 1 FROM material_prices mp WHERE mp.source = 'purchase_order' AND mp.source_id = l.id)"
+        )
+
+    recorded = 0
+    while True:
+        # Logs created since the deploy already have their price (see sustainability.log_usage)
+        logs = db.execute(
+            "SELECT ml.id, ml.quantity, ml.total_cost, ml.date_used, date(ml.created_at) as created_on, "
+            "ml.material_id, m.name, m.supplier_id "
+            "FROM material_logs ml JOIN materials m ON ml.material_id = m.id "
+            "WHERE ml.id > ? AND NOT EXISTS ("
+            "SELECT 1 FROM material_prices mp WHERE mp.source = 'material_log' AND mp.source_id = ml.id) "
+            "ORDER BY ml.id LIMIT ?",
+            (last_id, PRICES_MIGRATION_BATCH)
+        ).fetchall()
+        if not logs:
+            save_migration_progress(db, PRICES_MIGRATION, last_id, completed=True)
+            db.commit()
+            return recorded
+        for log in logs:
+            if log['quantity'] and log['total_cost']:
+                record_price(db, log['name'], log['total_cost'] / log['quantity'],
+                             log['date_used'] or log['created_on'], log['supplier_id'],
+                             log['material_id'], 'material_log', log['id'])
+                recorded += 1
+        last_id = logs[-1]['id']
+        save_migration_progress(db, PRICES_MIGRATION, last_id)
+        db.commit()
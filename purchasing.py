@@ -0,0 +1,155 @@
+import re
+import json
+import unicodedata
+from scheduler import job, migration_progress, save_migration_progress
+
+LINES_MIGRATION = 'purchase_order_lines'
+LINES_MIGRATION_BATCH = 500
+
+# Units recognized right after the quantity in free-text order lines
+UNITS = {
+    'un', 'und', 'unid', 'pc', 'pç', 'pca', 'peça', 'peças', 'sc', 'saco', 'sacos',
+    'kg', 'g', 't', 'ton', 'm', 'ml', 'm2', 'm²', 'm3', 'm³', 'l', 'lt', 'litro', 'litros',
+    'cx', 'caixa', 'caixas', 'br', 'barra', 'barras', 'rl', 'rolo', 'rolos', 'gl', 'galão',
+    'lata', 'latas', 'milheiro', 'vb', 'verba',
+}
+
+# "50 sc Cimento CP-II @ 32,50" -> quantity, optional unit, description, optional unit price
+LINE_PATTERN = re.compile(
+    r'^\s*(?P<quantity>\d+(?:[.,]\d+)*)\s*(?P<rest>.+?)'
+    r'(?:\s*@\s*(?:R\$\s*)?(?P<price>\d+(?:[.,]\d+)*))?\s*$'
+)
+
+def parse_decimal(value):
+    """Parse numbers written as 1234.5, 1234,5 or 1.234,56"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip().replace('R$', '').strip()
+    if ',' in value:
+        value = value.replace('.', '').replace(',', '.')
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def normalize_material(name):
+    """Grouping key for a material description: lowercase, no accents, single spaces"""
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return ' '.join(name.lower().split())
+
+def _line(description, quantity, unit, unit_price):
+    description = (description or '').strip()
+    if not description:
+        return None
+    quantity = quantity if quantity is not None else 1
+    return {
+        'description': description,
+        'material_key': normalize_material(description),
+        'quantity': quantity,
+        'unit': unit,
+        'unit_price': unit_price,
+        'total_price': quantity * unit_price if unit_price is not None else None
+    }
+
+def parse_text_line(text):
+    """Parse one free-text order line such as '10 barras Vergalhão 10mm @ 45,90'"""
+    match = LINE_PATTERN.match(text)
+    if not match:
+        return _line(text, None, None, None)
+    quantity = parse_decimal(match.group('quantity'))
+    rest = match.group('rest').strip()
+    unit = None
+    first, _, remainder = rest.partition(' ')
+    if remainder and first.lower().rstrip('.') in UNITS:
+        unit = first.lower().rstrip('.')
+        rest = remainder
+    if rest.lower().startswith('de '):
+        rest = rest[3:]
+    return _line(rest, quantity, unit, parse_decimal(match.group('price')))
+
+def parse_order_items(items):
+    """Turn a purchase_orders.items value into line dicts.
+
+    Accepts the JSON list the orders page understands
+    ([{"description": ..., "quantity": ..., "unit_price": ...}]) or free
+    text with one item per line."""
+    if not items or not items.strip():
+        return []
+    try:
+        data = json.loads(items)
+    except ValueError:
+        data = None
+
+    if isinstance(data, list):
+        lines = []
+        for item in data:
+            if isinstance(item, dict):
+                line = _line(
+                    item.get('description') or item.get('material') or item.get('name'),
+                    parse_decimal(item.get('quantity', item.get('qty'))),
+                    item.get('unit'),
+                    parse_decimal(item.get('unit_price', item.get('price')))
+                )
+            else:
+                line = parse_text_line(str(item))
+            if line:
+                lines.append(line)
+        return lines
+
+    lines = (parse_text_line(text) for text in items.splitlines() if text.strip())
+    return [line for line in lines if line]
+
+def load_material_ids(db):
+    """Map normalized material names to materials.id"""
+    return {
+        normalize_material(row['name']): row['id']
+        for row in db.execute('SELECT id, name FROM materials')
+    }
+
+def save_order_lines(db, order_id, items, material_ids=None):
+    """Replace an order's line items with the parsed `items` (caller commits)"""
+    if material_ids is None:
+        material_ids = load_material_ids(db)
+    lines = parse_order_items(items)
+    db.execute('DELETE FROM purchase_order_lines WHERE order_id = ?', (order_id,))
+    db.executemany(
+        'INSERT INTO purchase_order_lines (order_id, line_number, material_id, material_key, '
+        'description, quantity, unit, unit_price, total_price) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        [
+            (order_id, number, material_ids.get(line['material_key']), line['material_key'],
+             line['description'], line['quantity'], line['unit'],
+             line['unit_price'], line['total_price'])
+            for number, line in enumerate(lines, start=1)
+        ]
+    )
+    return len(lines)
+
+@job('migrate_purchase_order_lines', '*/5 * * * *')
+def migrate_purchase_order_lines(db):
+    """One-off backfill of purchase_order_lines from existing JSON/text items, in batches"""
+    last_id, completed = migration_progress(db, LINES_MIGRATION)
+    if completed:
+        return 0
+
+    material_ids = load_material_ids(db)
+    migrated = 0
+    while True:
+        orders = db.execute(
+            'SELECT po.id, po.items FROM purchase_orders po WHERE po.id > ? '
+            'AND NOT EXISTS (SELECT 1 FROM purchase_order_lines l WHERE l.order_id = po.id) '
+            'ORDER BY po.id LIMIT ?',
+            (last_id, LINES_MIGRATION_BATCH)
+        ).fetchall()
+        if not orders:
+            save_migration_progress(db, LINES_MIGRATION, last_id, completed=True)
+            db.commit()
+            return migrated
+        for order in orders:
+            migrated += save_order_lines(db, order['id'], order['items'], material_ids)
+        last_id = orders[-1]['id']
+        save_migration_progress(db, LINES_MIGRATION, last_id)
+        db.commit()
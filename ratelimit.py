@@ -0,0 +1,172 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are per process only
+    fcntl = None
+
+SLOTS = 4096
+# A key lives at hash % SLOTS or one of the next PROBES slots; when all are
+# taken by other keys the least recently used one is recycled.
+PROBES = 8
+
+def default_path():
+    """Shared file for the buckets; /dev/shm keeps it in memory on Linux"""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'engenpro-ratelimit')
+
+def key_hash(key):
+    # 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+class SharedSlots:
+    """Fixed-size table of per-key counters shared by every worker process
+    through an mmap'd file.
+
+    Subclasses define SLOT (a struct whose first two fields are the key hash
+    and the last-update time) and the per-key update rule. Updates are
+    serialized with flock on the file (and a thread lock within a process).
+    The file is opened lazily and reopened after a fork, because flock locks
+    are shared by inherited descriptors."""
+
+    SLOT = None
+    # Appended to the file name, so limiters with different layouts never share a file
+    SUFFIX = ''
+
+    def __init__(self, path=None):
+        self.path = (path or os.environ.get('RATE_LIMIT_FILE') or default_path()) + self.SUFFIX
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._map = None
+
+    def _open(self):
+        if self._pid == os.getpid():
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = self.SLOT.size * SLOTS
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        self._file = fd
+        self._map = mmap.mmap(fd, size)
+        self._pid = os.getpid()
+
+    def _find_slot(self, h):
+        """(offset, stored values or None when the key has no slot yet)"""
+        start = h % SLOTS
+        oldest = None
+        for i in range(PROBES):
+            offset = ((start + i) % SLOTS) * self.SLOT.size
+            values = self.SLOT.unpack_from(self._map, offset)
+            if values[0] == h:
+                return offset, values[1:]
+            if values[0] == 0:
+                return offset, None
+            if oldest is None or values[1] < oldest[1]:
+                oldest = (offset, values[1])
+        return oldest[0], None
+
+    def _update(self, key, func):
+        """Apply func(now, stored values or None) -> (new values, result) to key's slot"""
+        h = key_hash(key)
+        with self._lock:
+            self._open()
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                offset, values = self._find_slot(h)
+                values, result = func(now, values)
+                if values is not None:
+                    self.SLOT.pack_into(self._map, offset, h, *values)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._file, fcntl.LOCK_UN)
+        return result
+
+class TokenBucketLimiter(SharedSlots):
+    """Token buckets: each key refills at `rate` tokens per second up to `burst`"""
+
+    # key hash, last refill (unix time), tokens left
+    SLOT = struct.Struct('<Qdd')
+
+    def __init__(self, rate, burst, path=None):
+        super().__init__(path)
+        self.rate = float(rate)
+        self.burst = float(burst)
+
+    def acquire(self, key, cost=1):
+        """Take `cost` tokens from key's bucket.
+
+        Returns (allowed, retry_after): retry_after is the whole number of
+        seconds until enough tokens are available, 0 when allowed."""
+        def take(now, values):
+            tokens = self.burst
+            if values is not None:
+                updated, tokens = values
+                # A clock step backwards simply refills the bucket
+                elapsed = now - updated if now >= updated else math.inf
+                tokens = min(self.burst, tokens + elapsed * self.rate)
+            if tokens >= cost:
+                return (now, tokens - cost), (True, 0)
+            return (now, tokens), (False, max(1, math.ceil((cost - tokens) / self.rate)))
+        return self._update(key, take)
+
+class SlidingWindowLimiter(SharedSlots):
+    """At most `limit` hits per key in any `window` seconds.
+
+    Uses the sliding window counter approximation: the previous fixed
+    window's count is weighted by how much of it still overlaps the
+    sliding window."""
+
+    # key hash, current window number (unix time // window), hits in it, hits in the previous window
+    SLOT = struct.Struct('<Qddd')
+    SUFFIX = '-window'
+
+    def __init__(self, limit, window, path=None):
+        super().__init__(path)
+        self.limit = limit
+        self.window = float(window)
+
+    def _roll(self, now, values):
+        number = float(now // self.window)
+        if values is None:
+            return number, 0.0, 0.0
+        stored, current, previous = values
+        if stored == number:
+            return number, current, previous
+        if stored == number - 1:
+            return number, 0.0, current
+        return number, 0.0, 0.0
+
+    def _retry_after(self, now, number, current, previous):
+        """Seconds until the weighted count drops below limit"""
+        if current >= self.limit:
+            # current becomes the previous window and has to fade out
+            number, current, previous = number + 1, 0.0, current
+        overlap = (self.limit - current) / previous
+        return max(1, math.ceil((number + 1 - overlap) * self.window - now))
+
+    def retry_after(self, key):
+        """0 if key is under its limit, otherwise seconds until it will be"""
+        def check(now, values):
+            number, current, previous = self._roll(now, values)
+            weight = 1 - (now / self.window - number)
+            if previous * weight + current < self.limit:
+                return None, 0
+            return None, self._retry_after(now, number, current, previous)
+        return self._update(key, check)
+
+    def hit(self, key):
+        """Count one hit for key"""
+        def add(now, values):
+            number, current, previous = self._roll(now, values)
+            return (number, current + 1, previous), None
+        self._update(key, add)
@@ -0,0 +1,260 @@
+import os
+import socket
+import threading
+import traceback
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Registered jobs: name -> dict(func, schedule, max_attempts)
+JOBS = {}
+
+LEASE_SECONDS = 300
+POLL_SECONDS = 15
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+RUN_HISTORY_DAYS = 30
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def job(name, schedule, max_attempts=3):
+    """Register a periodic job with a cron-like schedule ('m h dom mon dow')"""
+    parse_cron(schedule)  # fail fast on invalid expressions
+
+    def decorator(f):
+        JOBS[name] = {
+            'func': f,
+            'schedule': schedule,
+            'max_attempts': max_attempts
+        }
+        return f
+    return decorator
+
+def format_timestamp(dt):
+    """Format datetime for lexicographic comparison in SQLite"""
+    return dt.strftime(TIMESTAMP_FORMAT)
+
+def _parse_field(field, minimum, maximum):
+    """Parse one cron field into the set of allowed values"""
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_str = part.split('/', 1)
+            step = int(step_str)
+            if step < 1:
+                raise ValueError(f'Invalid cron step: {field}')
+        if part == '*':
+            start, end = minimum, maximum
+        elif '-' in part:
+            start_str, end_str = part.split('-', 1)
+            start, end = int(start_str), int(end_str)
+        else:
+            start = int(part)
+            end = maximum if step > 1 else start
+        if start < minimum or end > maximum or start > end:
+            raise ValueError(f'Cron field out of range: {field}')
+        values.update(range(start, end + 1, step))
+    return values
+
+def parse_cron(expression):
+    """Parse a 5-field cron expression into sets of minutes, hours, days, months, weekdays"""
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError(f'Cron expression must have 5 fields: {expression}')
+    minutes = _parse_field(fields[0], 0, 59)
+    hours = _parse_field(fields[1], 0, 23)
+    days = _parse_field(fields[2], 1, 31)
+    months = _parse_field(fields[3], 1, 12)
+    # Cron weekdays: 0 (or 7) = Sunday
+    weekdays = {d % 7 for d in _parse_field(fields[4], 0, 7)}
+    return minutes, hours, days, months, weekdays, fields[2] == '*', fields[4] == '*'
+
+def next_run_time(expression, after):
+    """Return the first time strictly after `after` matching the cron expression"""
+    minutes, hours, days, months, weekdays, any_day, any_weekday = parse_cron(expression)
+    dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = dt + timedelta(days=366 * 5)
+
+    def day_matches(d):
+        # Standard cron semantics: if both day fields are restricted, either may match
+        cron_weekday = (d.weekday() + 1) % 7
+        if any_day and any_weekday:
+            return True
+        if any_day:
+            return cron_weekday in weekdays
+        if any_weekday:
+            return d.day in days
+        return d.day in days or cron_weekday in weekdays
+
+    while dt < limit:
+        if dt.month not in months:
+            year = dt.year + (1 if dt.month == 12 else 0)
+            month = 1 if dt.month == 12 else dt.month + 1
+            dt = dt.replace(year=year, month=month, day=1, hour=0, minute=0)
+            continue
+        if not day_matches(dt):
+            dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+            continue
+        if dt.hour not in hours:
+            dt = (dt + timedelta(hours=1)).replace(minute=0)
+            continue
+        if dt.minute not in minutes:
+            dt += timedelta(minutes=1)
+            continue
+        return dt
+    raise ValueError(f'Cron expression never fires: {expression}')
+
+def backoff_delay(attempt):
+    """Exponential backoff delay in seconds for a failed attempt"""
+    return min(BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)), BACKOFF_MAX_SECONDS)
+
+def migration_progress(db, name):
+    """Return (last_id, completed) for a batched one-off data migration"""
+    row = db.execute(
+        'SELECT last_id, completed_at FROM data_migrations WHERE name = ?', (name,)
+    ).fetchone()
+    if row is None:
+        return 0, False
+    return row['last_id'] or 0, row['completed_at'] is not None
+
+def save_migration_progress(db, name, last_id, completed=False):
+    """Record how far a one-off data migration got (caller commits)"""
+    db.execute(
+        'INSERT OR REPLACE INTO data_migrations (name, last_id, completed_at) VALUES (?, ?, ?)',
+        (name, last_id, format_timestamp(datetime.now()) if completed else None)
+    )
+
+class Scheduler:
+    """Runs registered jobs, using row leases in the jobs table so that only
+    one process (e.g. one gunicorn worker) executes a given job at a time."""
+
+    def __init__(self, app):
+        self.app = app
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{id(self)}'
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sync_jobs(self, db):
+        """Insert newly registered jobs and pick up schedule changes"""
+        now = datetime.now()
+        for name, spec in JOBS.items():
+            row = db.execute('SELECT schedule FROM jobs WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                db.execute(
+                    'INSERT OR IGNORE INTO jobs (name, schedule, next_run_at) VALUES (?, ?, ?)',
+                    (name, spec['schedule'], format_timestamp(next_run_time(spec['schedule'], now)))
+                )
+            elif row['schedule'] != spec['schedule']:
+                db.execute(
+                    'UPDATE jobs SET schedule = ?, next_run_at = ? WHERE name = ?',
+                    (spec['schedule'], format_timestamp(next_run_time(spec['schedule'], now)), name)
+                )
+        db.commit()
+
+    def acquire(self, db, name, now):
+        """Try to take the lease on a due job; returns True if this process owns it"""
+        cursor = db.execute(
+            'UPDATE jobs SET lease_owner = ?, lease_expires_at = ? '
+            'WHERE name = ? AND enabled = 1 AND next_run_at <= ? '
+            'AND (lease_expires_at IS NULL OR lease_expires_at < ?)',
+            (self.owner, format_timestamp(now + timedelta(seconds=LEASE_SECONDS)),
+             name, format_timestamp(now), format_timestamp(now))
+        )
+        db.commit()
+        return cursor.rowcount == 1
+
+    def run_job(self, db, name):
+        """Execute a leased job, record the run and compute its next run time"""
+        spec = JOBS[name]
+        row = db.execute('SELECT attempts FROM jobs WHERE name = ?', (name,)).fetchone()
+        attempt = (row['attempts'] or 0) + 1
+        started = datetime.now()
+        run_id = db.execute(
+            'INSERT INTO job_runs (job_name, owner, attempt, status, started_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (name, self.owner, attempt, 'running', format_timestamp(started))
+        ).lastrowid
+        db.commit()
+
+        try:
+            result = spec['func'](db)
+            status, error = 'success', None
+        except Exception:
+            db.rollback()
+            result = None
+            status, error = 'failed', traceback.format_exc()
+            logger.exception('Job %s failed (attempt %s)', name, attempt)
+
+        finished = datetime.now()
+        if status == 'success' or attempt >= spec['max_attempts']:
+            next_run = next_run_time(spec['schedule'], finished)
+            attempts = 0
+        else:
+            next_run = finished + timedelta(seconds=backoff_delay(attempt))
+            attempts = attempt
+
+        db.execute(
+            'UPDATE job_runs SET status = ?, finished_at = ?, error = ?, result = ? WHERE id = ?',
+            (status, format_timestamp(finished), error,
+             str(result) if result is not None else None, run_id)
+        )
+        db.execute(
+            'UPDATE jobs SET attempts = ?, last_status = ?, last_run_at = ?, next_run_at = ?, '
+            'lease_owner = NULL, lease_expires_at = NULL WHERE name = ? AND lease_owner = ?',
+            (attempts, status, format_timestamp(finished), format_timestamp(next_run),
+             name, self.owner)
+        )
+        db.commit()
+        return status
+
+    def run_pending(self):
+        """Run every due job this process manages to lease"""
+        with self.app.app_context():
+            db = self.app.get_db()
+            self.sync_jobs(db)
+            now = datetime.now()
+            due = db.execute(
+                'SELECT name FROM jobs WHERE enabled = 1 AND next_run_at <= ? ORDER BY next_run_at',
+                (format_timestamp(now),)
+            ).fetchall()
+            for row in due:
+                if row['name'] in JOBS and self.acquire(db, row['name'], now):
+                    self.run_job(db, row['name'])
+
+    def run_forever(self):
+        """Poll for due jobs until stopped"""
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception:
+                logger.exception('Scheduler tick failed')
+            self._stop.wait(POLL_SECONDS)
+
+    def start(self):
+        """Start the scheduler in a daemon thread"""
+        self._thread = threading.Thread(target=self.run_forever, name='scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+def init_scheduler(app):
+    """Register jobs and start the in-process scheduler unless disabled.
+
+    Set SCHEDULER_IN_PROCESS=0 to run jobs only in a dedicated worker
+    (`python scheduler.py`)."""
+    import jobs  # noqa: F401 - registers the periodic jobs
+
+    scheduler = Scheduler(app)
+    app.scheduler = scheduler
+    if os.environ.get('SCHEDULER_IN_PROCESS', '1') == '1':
+        scheduler.start()
+    return scheduler
+
+if __name__ == '__main__':
+    # Dedicated worker process: don't start a second scheduler thread on import
+    os.environ['SCHEDULER_IN_PROCESS'] = '0'
+    from app import app
+    app.scheduler.run_forever()
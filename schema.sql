@@ -120,6 +120,7 @@ CREATE TABLE IF NOT EXISTS purchase_orders (
     status TEXT DEFAULT 'pending',
     order_date DATE,
     expected_delivery DATE,
+    delivered_date DATE,
     total_amount REAL,
     items TEXT, -- JSON string for order items
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -252,6 +253,708 @@ CREATE TABLE IF NOT EXISTS audit_log (
     FOREIGN KEY (user_id) REFERENCES users (id)
 );
 
+-- Background jobs (see scheduler.py)
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    schedule TEXT NOT NULL, -- cron expression: minute hour day month weekday
+    enabled INTEGER DEFAULT 1,
+    next_run_at TIMESTAMP,
+    lease_owner TEXT,
+    lease_expires_at TIMESTAMP,
+    attempts INTEGER DEFAULT 0, -- consecutive failed attempts
+    last_status TEXT,
+    last_run_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_next_run ON jobs (enabled, next_run_at);
+
+-- Job run history
+CREATE TABLE IF NOT EXISTS job_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_name TEXT NOT NULL,
+    owner TEXT,
+    attempt INTEGER DEFAULT 1,
+    status TEXT NOT NULL, -- running, success, failed
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    result TEXT,
+    error TEXT,
+    FOREIGN KEY (job_name) REFERENCES jobs (name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_job ON job_runs (job_name, started_at);
+CREATE INDEX IF NOT EXISTS idx_job_runs_started ON job_runs (started_at);
+
+-- Progress of batched one-off data migrations run as jobs
+CREATE TABLE IF NOT EXISTS data_migrations (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER DEFAULT 0, -- highest source row id processed
+    completed_at TIMESTAMP
+);
+
+-- Precomputed aggregates maintained by background jobs
+CREATE TABLE IF NOT EXISTS kpi_rollups (
+    name TEXT PRIMARY KEY,
+    value NUMERIC,
+    computed_at TIMESTAMP
+);
+
+-- Expiry alerts already delivered (dedup for notification digests)
+CREATE TABLE IF NOT EXISTS notification_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    kind TEXT NOT NULL, -- permit, compliance_doc, certification
+    item_id INTEGER NOT NULL,
+    expiry_date DATE,
+    sent_at TIMESTAMP,
+    UNIQUE (user_id, kind, item_id, expiry_date),
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+-- Range scans for expiry checks
+CREATE INDEX IF NOT EXISTS idx_permits_expiry ON permits (expiry_date);
+CREATE INDEX IF NOT EXISTS idx_compliance_docs_expiry ON compliance_docs (expiry_date);
+CREATE INDEX IF NOT EXISTS idx_worker_trainings_expiry ON worker_trainings (expiry_date);
+CREATE INDEX IF NOT EXISTS idx_projects_user ON projects (user_id);
+
+-- Supplier performance, maintained incrementally by the purchase_orders triggers below
+CREATE TABLE IF NOT EXISTS supplier_scorecard (
+    supplier_id INTEGER PRIMARY KEY,
+    order_count INTEGER DEFAULT 0,
+    total_spend REAL DEFAULT 0,
+    lead_time_total REAL DEFAULT 0, -- sum of days from order_date to expected_delivery
+    lead_time_samples INTEGER DEFAULT 0,
+    delivered_count INTEGER DEFAULT 0,
+    on_time_count INTEGER DEFAULT 0, -- delivered on or before expected_delivery
+    avg_lead_time REAL, -- lead_time_total / lead_time_samples
+    on_time_rate REAL, -- on_time_count / delivered_count
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (supplier_id) REFERENCES suppliers (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_purchase_orders_supplier ON purchase_orders (supplier_id);
+CREATE INDEX IF NOT EXISTS idx_supplier_scorecard_spend ON supplier_scorecard (total_spend);
+CREATE INDEX IF NOT EXISTS idx_supplier_scorecard_on_time ON supplier_scorecard (on_time_rate);
+CREATE INDEX IF NOT EXISTS idx_supplier_scorecard_lead_time ON supplier_scorecard (avg_lead_time);
+
+-- Backfill suppliers whose orders predate the scorecard (no-op once rows exist)
+INSERT OR IGNORE INTO supplier_scorecard (
+    supplier_id, order_count, total_spend, lead_time_total, lead_time_samples,
+    delivered_count, on_time_count, avg_lead_time, on_time_rate
+)
+SELECT supplier_id,
+       COUNT(*),
+       COALESCE(SUM(total_amount), 0),
+       COALESCE(SUM(julianday(expected_delivery) - julianday(order_date)), 0),
+       COUNT(julianday(expected_delivery) - julianday(order_date)),
+       COUNT(delivered_date),
+       SUM(delivered_date IS NOT NULL AND expected_delivery IS NOT NULL AND delivered_date <= expected_delivery),
+       AVG(julianday(expected_delivery) - julianday(order_date)),
+       1.0 * SUM(delivered_date IS NOT NULL AND expected_delivery IS NOT NULL AND delivered_date <= expected_delivery)
+           / NULLIF(COUNT(delivered_date), 0)
+FROM purchase_orders
+WHERE supplier_id IS NOT NULL
+GROUP BY supplier_id;
+
+CREATE TRIGGER IF NOT EXISTS purchase_orders_scorecard_insert
+AFTER INSERT ON purchase_orders WHEN NEW.supplier_id IS NOT NULL
+BEGIN
+    INSERT OR IGNORE INTO supplier_scorecard (supplier_id) VALUES (NEW.supplier_id);
+    UPDATE supplier_scorecard SET
+        order_count = order_count + 1,
+        total_spend = total_spend + COALESCE(NEW.total_amount, 0),
+        lead_time_total = lead_time_total + COALESCE(julianday(NEW.expected_delivery) - julianday(NEW.order_date), 0),
+        lead_time_samples = lead_time_samples + (julianday(NEW.expected_delivery) - julianday(NEW.order_date) IS NOT NULL),
+        delivered_count = delivered_count + (NEW.delivered_date IS NOT NULL),
+        on_time_count = on_time_count + COALESCE(NEW.delivered_date <= NEW.expected_delivery, 0)
+    WHERE supplier_id = NEW.supplier_id;
+    UPDATE supplier_scorecard SET
+        avg_lead_time = lead_time_total / NULLIF(lead_time_samples, 0),
+        on_time_rate = 1.0 * on_time_count / NULLIF(delivered_count, 0),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE supplier_id = NEW.supplier_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS purchase_orders_scorecard_delete
+AFTER DELETE ON purchase_orders WHEN OLD.supplier_id IS NOT NULL
+BEGIN
+    UPDATE supplier_scorecard SET
+        order_count = order_count - 1,
+        total_spend = total_spend - COALESCE(OLD.total_amount, 0),
+        lead_time_total = lead_time_total - COALESCE(julianday(OLD.expected_delivery) - julianday(OLD.order_date), 0),
+        lead_time_samples = lead_time_samples - (julianday(OLD.expected_delivery) - julianday(OLD.order_date) IS NOT NULL),
+        delivered_count = delivered_count - (OLD.delivered_date IS NOT NULL),
+        on_time_count = on_time_count - COALESCE(OLD.delivered_date <= OLD.expected_delivery, 0)
+    WHERE supplier_id = OLD.supplier_id;
+    UPDATE supplier_scorecard SET
+        avg_lead_time = lead_time_total / NULLIF(lead_time_samples, 0),
+        on_time_rate = 1.0 * on_time_count / NULLIF(delivered_count, 0),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE supplier_id = OLD.supplier_id;
+END;
+
+-- An update is applied as removing the old order and adding the new one
+CREATE TRIGGER IF NOT EXISTS purchase_orders_scorecard_update
+AFTER UPDATE OF supplier_id, total_amount, order_date, expected_delivery, delivered_date ON purchase_orders
+BEGIN
+    UPDATE supplier_scorecard SET
+        order_count = order_count - 1,
+        total_spend = total_spend - COALESCE(OLD.total_amount, 0),
+        lead_time_total = lead_time_total - COALESCE(julianday(OLD.expected_delivery) - julianday(OLD.order_date), 0),
+        lead_time_samples = lead_time_samples - (julianday(OLD.expected_delivery) - julianday(OLD.order_date) IS NOT NULL),
+        delivered_count = delivered_count - (OLD.delivered_date IS NOT NULL),
+        on_time_count = on_time_count - COALESCE(OLD.delivered_date <= OLD.expected_delivery, 0)
+    WHERE supplier_id = OLD.supplier_id;
+    INSERT OR IGNORE INTO supplier_scorecard (supplier_id)
+    SELECT NEW.supplier_id WHERE NEW.supplier_id IS NOT NULL;
+    UPDATE supplier_scorecard SET
+        order_count = order_count + 1,
+        total_spend = total_spend + COALESCE(NEW.total_amount, 0),
+        lead_time_total = lead_time_total + COALESCE(julianday(NEW.expected_delivery) - julianday(NEW.order_date), 0),
+        lead_time_samples = lead_time_samples + (julianday(NEW.expected_delivery) - julianday(NEW.order_date) IS NOT NULL),
+        delivered_count = delivered_count + (NEW.delivered_date IS NOT NULL),
+        on_time_count = on_time_count + COALESCE(NEW.delivered_date <= NEW.expected_delivery, 0)
+    WHERE supplier_id = NEW.supplier_id;
+    UPDATE supplier_scorecard SET
+        avg_lead_time = lead_time_total / NULLIF(lead_time_samples, 0),
+        on_time_rate = 1.0 * on_time_count / NULLIF(delivered_count, 0),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE supplier_id IN (OLD.supplier_id, NEW.supplier_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS suppliers_scorecard_delete
+AFTER DELETE ON suppliers
+BEGIN
+    DELETE FROM supplier_scorecard WHERE supplier_id = OLD.id;
+END;
+
+-- Purchase order line items (normalized from purchase_orders.items)
+CREATE TABLE IF NOT EXISTS purchase_order_lines (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL,
+    line_number INTEGER NOT NULL,
+    material_id INTEGER, -- set when the description matches a registered material
+    material_key TEXT NOT NULL, -- normalized description used for grouping
+    description TEXT NOT NULL,
+    quantity REAL DEFAULT 1,
+    unit TEXT,
+    unit_price REAL,
+    total_price REAL,
+    FOREIGN KEY (order_id) REFERENCES purchase_orders (id) ON DELETE CASCADE,
+    FOREIGN KEY (material_id) REFERENCES materials (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_purchase_order_lines_order ON purchase_order_lines (order_id);
+CREATE INDEX IF NOT EXISTS idx_purchase_order_lines_material ON purchase_order_lines (material_key, order_id);
+CREATE INDEX IF NOT EXISTS idx_purchase_order_lines_material_id ON purchase_order_lines (material_id);
+
+CREATE TRIGGER IF NOT EXISTS purchase_orders_lines_delete
+AFTER DELETE ON purchase_orders
+BEGIN
+    DELETE FROM purchase_order_lines WHERE order_id = OLD.id;
+END;
+
+-- Observed unit prices per material, fed from order lines and material logs
+CREATE TABLE IF NOT EXISTS material_prices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    material_key TEXT NOT NULL, -- normalized description, same key as purchase_order_lines
+    description TEXT,
+    material_id INTEGER,
+    supplier_id INTEGER,
+    unit_price REAL NOT NULL,
+    observed_on DATE NOT NULL,
+    source TEXT NOT NULL, -- purchase_order, material_log or manual
+    source_id INTEGER,
+    FOREIGN KEY (material_id) REFERENCES materials (id),
+    FOREIGN KEY (supplier_id) REFERENCES suppliers (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_material_prices_material ON material_prices (material_key, observed_on, unit_price);
+CREATE INDEX IF NOT EXISTS idx_material_prices_supplier ON material_prices (material_key, supplier_id, observed_on);
+CREATE INDEX IF NOT EXISTS idx_material_prices_source ON material_prices (source, source_id);
+
+CREATE TRIGGER IF NOT EXISTS purchase_order_lines_price_insert
+AFTER INSERT ON purchase_order_lines
+WHEN NEW.unit_price IS NOT NULL
+BEGIN
+    INSERT INTO material_prices (material_key, description, material_id, supplier_id, unit_price, observed_on, source, source_id)
+    SELECT NEW.material_key, NEW.description, NEW.material_id, po.supplier_id, NEW.unit_price,
+           COALESCE(po.order_date, date(po.created_at)), 'purchase_order', NEW.id
+    FROM purchase_orders po WHERE po.id = NEW.order_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS purchase_order_lines_price_delete
+AFTER DELETE ON purchase_order_lines
+BEGIN
+    DELETE FROM material_prices WHERE source = 'purchase_order' AND source_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS material_logs_price_delete
+AFTER DELETE ON material_logs
+BEGIN
+    DELETE FROM material_prices WHERE source = 'material_log' AND source_id = OLD.id;
+END;
+
+-- Global full-text search. rowid = source id * 8 + kind code (see search_index.py)
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5 (
+    title,
+    body,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+-- Title matches rank above body matches
+INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(10.0, 1.0)');
+
+CREATE TRIGGER IF NOT EXISTS projects_search_insert
+AFTER INSERT ON projects
+BEGIN
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 1, NEW.name, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS projects_search_update
+AFTER UPDATE OF name, description ON projects
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 1;
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 1, NEW.name, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS projects_search_delete
+AFTER DELETE ON projects
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS permits_search_insert
+AFTER INSERT ON permits
+BEGIN
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 2, NEW.name, NEW.issuing_authority);
+END;
+
+CREATE TRIGGER IF NOT EXISTS permits_search_update
+AFTER UPDATE OF name, issuing_authority ON permits
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 2;
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 2, NEW.name, NEW.issuing_authority);
+END;
+
+CREATE TRIGGER IF NOT EXISTS permits_search_delete
+AFTER DELETE ON permits
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 2;
+END;
+
+CREATE TRIGGER IF NOT EXISTS incidents_search_insert
+AFTER INSERT ON incidents
+BEGIN
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 3, NEW.title, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS incidents_search_update
+AFTER UPDATE OF title, description ON incidents
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 3;
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 3, NEW.title, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS incidents_search_delete
+AFTER DELETE ON incidents
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 3;
+END;
+
+CREATE TRIGGER IF NOT EXISTS compliance_docs_search_insert
+AFTER INSERT ON compliance_docs
+BEGIN
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 4, NEW.title, NEW.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS compliance_docs_search_update
+AFTER UPDATE OF title, notes ON compliance_docs
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 4;
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 4, NEW.title, NEW.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS compliance_docs_search_delete
+AFTER DELETE ON compliance_docs
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 4;
+END;
+
+CREATE TRIGGER IF NOT EXISTS risks_search_insert
+AFTER INSERT ON risks
+BEGIN
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 5, NEW.title, NEW.mitigation_plan);
+END;
+
+CREATE TRIGGER IF NOT EXISTS risks_search_update
+AFTER UPDATE OF title, mitigation_plan ON risks
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 5;
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 5, NEW.title, NEW.mitigation_plan);
+END;
+
+CREATE TRIGGER IF NOT EXISTS risks_search_delete
+AFTER DELETE ON risks
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 5;
+END;
+
+CREATE TRIGGER IF NOT EXISTS notes_search_insert
+AFTER INSERT ON notes
+BEGIN
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 6, '', NEW.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS notes_search_update
+AFTER UPDATE OF content ON notes
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 6;
+    INSERT INTO search_index (rowid, title, body) VALUES (NEW.id * 8 + 6, '', NEW.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS notes_search_delete
+AFTER DELETE ON notes
+BEGIN
+    DELETE FROM search_index WHERE rowid = OLD.id * 8 + 6;
+END;
+
+-- Uploaded document text extraction (see documents.py)
+CREATE TABLE IF NOT EXISTS document_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL, -- permit, compliance_doc or certification
+    record_id INTEGER NOT NULL,
+    file_path TEXT NOT NULL,
+    status TEXT DEFAULT 'pending', -- pending, done, unsupported, missing, failed
+    attempts INTEGER DEFAULT 0,
+    content_hash TEXT,
+    error TEXT,
+    queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_document_queue_status ON document_queue (status, id);
+CREATE INDEX IF NOT EXISTS idx_document_queue_record ON document_queue (kind, record_id);
+
+-- Extracted text per file content, so identical uploads are extracted once
+CREATE TABLE IF NOT EXISTS document_contents (
+    content_hash TEXT PRIMARY KEY, -- sha256 of the file
+    text TEXT, -- NULL only in rows from older versions, which also cached unsupported types
+    extracted_at TIMESTAMP
+);
+
+-- Searchable document text. rowid = owner id * 8 + kind code (see documents.py)
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_text USING fts5 (
+    title,
+    content,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS permits_document_insert
+AFTER INSERT ON permits
+WHEN NEW.document_path IS NOT NULL
+BEGIN
+    INSERT INTO document_queue (kind, record_id, file_path) VALUES ('permit', NEW.id, NEW.document_path);
+END;
+
+CREATE TRIGGER IF NOT EXISTS permits_document_update
+AFTER UPDATE OF document_path ON permits
+WHEN NEW.document_path IS NOT OLD.document_path
+BEGIN
+    DELETE FROM documents_text WHERE rowid = OLD.id * 8 + 1;
+    INSERT INTO document_queue (kind, record_id, file_path)
+    SELECT 'permit', NEW.id, NEW.document_path WHERE NEW.document_path IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS permits_document_delete
+AFTER DELETE ON permits
+BEGIN
+    DELETE FROM documents_text WHERE rowid = OLD.id * 8 + 1;
+    DELETE FROM document_queue WHERE kind = 'permit' AND record_id = OLD.id;
+END;
+
+INSERT INTO document_queue (kind, record_id, file_path)
+SELECT 'permit', id, document_path FROM permits
+WHERE document_path IS NOT NULL AND NOT EXISTS (
+    SELECT 1 FROM document_queue dq WHERE dq.kind = 'permit' AND dq.record_id = permits.id
+);
+
+CREATE TRIGGER IF NOT EXISTS compliance_docs_document_insert
+AFTER INSERT ON compliance_docs
+WHEN NEW.file_path IS NOT NULL
+BEGIN
+    INSERT INTO document_queue (kind, record_id, file_path) VALUES ('compliance_doc', NEW.id, NEW.file_path);
+END;
+
+CREATE TRIGGER IF NOT EXISTS compliance_docs_document_update
+AFTER UPDATE OF file_path ON compliance_docs
+WHEN NEW.file_path IS NOT OLD.file_path
+BEGIN
+    DELETE FROM documents_text WHERE rowid = OLD.id * 8 + 2;
+    INSERT INTO document_queue (kind, record_id, file_path)
+    SELECT 'compliance_doc', NEW.id, NEW.file_path WHERE NEW.file_path IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS compliance_docs_document_delete
+AFTER DELETE ON compliance_docs
+BEGIN
+    DELETE FROM documents_text WHERE rowid = OLD.id * 8 + 2;
+    DELETE FROM document_queue WHERE kind = 'compliance_doc' AND record_id = OLD.id;
+END;
+
+INSERT INTO document_queue (kind, record_id, file_path)
+SELECT 'compliance_doc', id, file_path FROM compliance_docs
+WHERE file_path IS NOT NULL AND NOT EXISTS (
+    SELECT 1 FROM document_queue dq WHERE dq.kind = 'compliance_doc' AND dq.record_id = compliance_docs.id
+);
+
+CREATE TRIGGER IF NOT EXISTS worker_trainings_document_insert
+AFTER INSERT ON worker_trainings
+WHEN NEW.certificate_path IS NOT NULL
+BEGIN
+    INSERT INTO document_queue (kind, record_id, file_path) VALUES ('certification', NEW.id, NEW.certificate_path);
+END;
+
+CREATE TRIGGER IF NOT EXISTS worker_trainings_document_update
+AFTER UPDATE OF certificate_path ON worker_trainings
+WHEN NEW.certificate_path IS NOT OLD.certificate_path
+BEGIN
+    DELETE FROM documents_text WHERE rowid = OLD.id * 8 + 3;
+    INSERT INTO document_queue (kind, record_id, file_path)
+    SELECT 'certification', NEW.id, NEW.certificate_path WHERE NEW.certificate_path IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS worker_trainings_document_delete
+AFTER DELETE ON worker_trainings
+BEGIN
+    DELETE FROM documents_text WHERE rowid = OLD.id * 8 + 3;
+    DELETE FROM document_queue WHERE kind = 'certification' AND record_id = OLD.id;
+END;
+
+INSERT INTO document_queue (kind, record_id, file_path)
+SELECT 'certification', id, certificate_path FROM worker_trainings
+WHERE certificate_path IS NOT NULL AND NOT EXISTS (
+    SELECT 1 FROM document_queue dq WHERE dq.kind = 'certification' AND dq.record_id = worker_trainings.id
+);
+
+-- Content-addressed upload store (see blobstore.py); refcount = records pointing at path
+CREATE TABLE IF NOT EXISTS upload_blobs (
+    digest TEXT PRIMARY KEY, -- sha256 of the content
+    path TEXT UNIQUE NOT NULL, -- uploads/<digest>.<ext>
+    size INTEGER,
+    original_name TEXT,
+    refcount INTEGER DEFAULT 0,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_upload_blobs_gc ON upload_blobs (refcount, updated_at);
+
+CREATE INDEX IF NOT EXISTS idx_permits_document_path ON permits (document_path);
+
+CREATE TRIGGER IF NOT EXISTS permits_blob_insert
+AFTER INSERT ON permits
+WHEN NEW.document_path IS NOT NULL
+BEGIN
+    UPDATE upload_blobs SET refcount = refcount + 1 WHERE path = NEW.document_path;
+END;
+
+CREATE TRIGGER IF NOT EXISTS permits_blob_update
+AFTER UPDATE OF document_path ON permits
+WHEN NEW.document_path IS NOT OLD.document_path
+BEGIN
+    UPDATE upload_blobs SET refcount = refcount - 1, updated_at = datetime('now', 'localtime') WHERE path = OLD.document_path;
+    UPDATE upload_blobs SET refcount = refcount + 1 WHERE path = NEW.document_path;
+END;
+
+CREATE TRIGGER IF NOT EXISTS permits_blob_delete
+AFTER DELETE ON permits
+WHEN OLD.document_path IS NOT NULL
+BEGIN
+    UPDATE upload_blobs SET refcount = refcount - 1, updated_at = datetime('now', 'localtime') WHERE path = OLD.document_path;
+END;
+
+CREATE INDEX IF NOT EXISTS idx_compliance_docs_file_path ON compliance_docs (file_path);
+
+CREATE TRIGGER IF NOT EXISTS compliance_docs_blob_insert
+AFTER INSERT ON compliance_docs
+WHEN NEW.file_path IS NOT NULL
+BEGIN
+    UPDATE upload_blobs SET refcount = refcount + 1 WHERE path = NEW.file_path;
+END;
+
+CREATE TRIGGER IF NOT EXISTS compliance_docs_blob_update
+AFTER UPDATE OF file_path ON compliance_docs
+WHEN NEW.file_path IS NOT OLD.file_path
+BEGIN
+    UPDATE upload_blobs SET refcount = refcount - 1, updated_at = datetime('now', 'localtime') WHERE path = OLD.file_path;
+    UPDATE upload_blobs SET refcount = refcount + 1 WHERE path = NEW.file_path;
+END;
+
+CREATE TRIGGER IF NOT EXISTS compliance_docs_blob_delete
+AFTER DELETE ON compliance_docs
+WHEN OLD.file_path IS NOT NULL
+BEGIN
+    UPDATE upload_blobs SET refcount = refcount - 1, updated_at = datetime('now', 'localtime') WHERE path = OLD.file_path;
+END;
+
+CREATE INDEX IF NOT EXISTS idx_worker_trainings_certificate_path ON worker_trainings (certificate_path);
+
+CREATE TRIGGER IF NOT EXISTS worker_trainings_blob_insert
+AFTER INSERT ON worker_trainings
+WHEN NEW.certificate_path IS NOT NULL
+BEGIN
+    UPDATE upload_blobs SET refcount = refcount + 1 WHERE path = NEW.certificate_path;
+END;
+
+CREATE TRIGGER IF NOT EXISTS worker_trainings_blob_update
+AFTER UPDATE OF certificate_path ON worker_trainings
+WHEN NEW.certificate_path IS NOT OLD.certificate_path
+BEGIN
+    UPDATE upload_blobs SET refcount = refcount - 1, updated_at = datetime('now', 'localtime') WHERE path = OLD.certificate_path;
+    UPDATE upload_blobs SET refcount = refcount + 1 WHERE path = NEW.certificate_path;
+END;
+
+CREATE TRIGGER IF NOT EXISTS worker_trainings_blob_delete
+AFTER DELETE ON worker_trainings
+WHEN OLD.certificate_path IS NOT NULL
+BEGIN
+    UPDATE upload_blobs SET refcount = refcount - 1, updated_at = datetime('now', 'localtime') WHERE path = OLD.certificate_path;
+END;
+
+-- Resumable chunked uploads (see blobstore.py)
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL, -- expected digest of the whole file
+    received INTEGER DEFAULT 0, -- last acknowledged offset
+    status TEXT DEFAULT 'open', -- open or complete
+    blob_path TEXT,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_user ON upload_sessions (user_id, sha256, status);
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_updated ON upload_sessions (updated_at);
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_blob ON upload_sessions (blob_path);
+
+-- Server-side sessions (see session_store.py); the cookie carries only the id
+CREATE TABLE IF NOT EXISTS user_sessions (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER,
+    data TEXT NOT NULL,
+    created_at TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_user_sessions_expires ON user_sessions (expires_at);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_user ON user_sessions (user_id);
+
+-- Version counters for in-process caches; bumped by triggers when the source rows change
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO cache_versions (name, version) VALUES ('entitlements', 0);
+
+CREATE TRIGGER IF NOT EXISTS users_entitlements_update
+AFTER UPDATE OF subscription_plan, subscription_status, trial_end_date, subscription_end_date ON users
+BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'entitlements';
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_entitlements_delete
+AFTER DELETE ON users
+BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'entitlements';
+    DELETE FROM user_sessions WHERE user_id = OLD.id;
+END;
+
+-- Payment provider notifications, acknowledged on receipt and applied by a job (see webhooks.py)
+CREATE TABLE IF NOT EXISTS webhook_inbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    payload TEXT,
+    status TEXT DEFAULT 'pending', -- pending, done, ignored, failed
+    attempts INTEGER DEFAULT 0,
+    error TEXT,
+    received_at TIMESTAMP,
+    next_attempt_at TIMESTAMP,
+    processed_at TIMESTAMP,
+    UNIQUE (topic, resource_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_webhook_inbox_pending ON webhook_inbox (status, next_attempt_at);
+
+-- Approved payments already applied to a subscription (makes webhook processing idempotent)
+CREATE TABLE IF NOT EXISTS subscription_payments (
+    payment_id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    status TEXT,
+    amount REAL,
+    applied_at TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+-- Range scans for the subscription sweeper (see subscription_lifecycle.py)
+CREATE INDEX IF NOT EXISTS idx_users_status_end ON users (subscription_status, subscription_end_date);
+CREATE INDEX IF NOT EXISTS idx_users_status_trial ON users (subscription_status, trial_end_date);
+
+-- Subscription state changes made by the sweeper
+CREATE TABLE IF NOT EXISTS subscription_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    event TEXT NOT NULL, -- trial_expired, subscription_expired
+    occurred_at TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_subscription_events_user ON subscription_events (user_id, occurred_at);
+
+-- Renewal reminder candidates, one per user, kind and period end
+CREATE TABLE IF NOT EXISTS subscription_reminders (
+    user_id INTEGER NOT NULL,
+    kind TEXT NOT NULL, -- trial_ending, renewal_due
+    due_date TIMESTAMP NOT NULL,
+    created_at TIMESTAMP,
+    sent_at TIMESTAMP,
+    PRIMARY KEY (user_id, kind, due_date),
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_subscription_reminders_unsent ON subscription_reminders (sent_at);
+
+-- Devices allowed to post to /field/api/record; only the sha256 of each API key is stored
+CREATE TABLE IF NOT EXISTS field_devices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    device_id TEXT NOT NULL,
+    project_id INTEGER, -- when set, the device can only record for this project
+    key_hash TEXT UNIQUE NOT NULL,
+    key_prefix TEXT,
+    created_at TIMESTAMP,
+    revoked_at TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id),
+    FOREIGN KEY (project_id) REFERENCES projects (id)
+);
+
+-- Parametric studies (sweep + sensitivities) by hash of the formula and study; see calc_cache.py
+CREATE TABLE IF NOT EXISTS calc_cache (
+    key TEXT PRIMARY KEY,
+    formula TEXT NOT NULL,
+    result TEXT NOT NULL, -- JSON, served as is
+    created_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_calc_cache_created ON calc_cache (created_at);
+
 -- Insert default admin user (password: admin123)
 INSERT OR IGNORE INTO users (username, email, password_hash) 
 VALUES ('admin', 'admin@civilsaas.com', 'scrypt:32768:8:1$h3KGT9NSAqQmSBYI$e8c1463526cae2e6c7d9882c34d6480f58cab82c6b54733d98b3b29464819f5cd6ae9272f2cada4c531b6827f5b584c4af18fb72a42c97b0feb46f2cd1df33a8');
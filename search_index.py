@@ -0,0 +1,135 @@
+import re
+from markupsafe import Markup, escape
+from scheduler import job, migration_progress, save_migration_progress
+from documents import KIND_BY_CODE as DOCUMENT_KIND_BY_CODE
+
+SEARCH_MIGRATION_BATCH = 2000
+SEARCH_PER_PAGE = 20
+
+# Highlight markers that can't appear in user text; swapped for <mark> after escaping
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+# kind -> (code, table, title column, body column, label).
+# A row's search_index rowid is id * 8 + code, so triggers can update it by rowid.
+SEARCH_KINDS = {
+    'project': (1, 'projects', 'name', 'description', 'Projeto'),
+    'permit': (2, 'permits', 'name', 'issuing_authority', 'Licença'),
+    'incident': (3, 'incidents', 'title', 'description', 'Incidente'),
+    'compliance_doc': (4, 'compliance_docs', 'title', 'notes', 'Documento de compliance'),
+    'risk': (5, 'risks', 'title', 'mitigation_plan', 'Risco'),
+    'note': (6, 'notes', "''", 'content', 'Nota'),
+}
+KIND_BY_CODE = {spec[0]: kind for kind, spec in SEARCH_KINDS.items()}
+
+DOCUMENT_LABELS = {
+    'permit': 'Documento de licença',
+    'compliance_doc': 'Arquivo de compliance',
+    'certification': 'Certificado',
+}
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+def build_match_query(text):
+    """Turn free text into a safe FTS5 query: every word must match, the last as a prefix"""
+    tokens = TOKEN_PATTERN.findall(text or '')
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def highlight(text):
+    """Escape indexed text and turn the match markers into <mark> tags"""
+    html = str(escape(text or ''))
+    return Markup(html.replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+def search(db, text, page=1, kind=None):
+    """Ranked matches for `text`, SEARCH_PER_PAGE per page.
+
+    Returns (results, has_next). One extra row is fetched instead of counting
+    every match, so deep result sets don't slow down the first pages."""
+    match = build_match_query(text)
+    if match is None:
+        return [], False
+
+    query = (
+        'SELECT rowid, highlight(search_index, 0, ?, ?) as title, '
+        "snippet(search_index, 1, ?, ?, '…', 16) as snippet "
+        'FROM search_index WHERE search_index MATCH ?'
+    )
+    params = [MATCH_START, MATCH_END, MATCH_START, MATCH_END, match]
+    if kind in SEARCH_KINDS:
+        query += ' AND rowid % 8 = ?'
+        params.append(SEARCH_KINDS[kind][0])
+    query += ' ORDER BY rank LIMIT ? OFFSET ?'
+    params += [SEARCH_PER_PAGE + 1, (page - 1) * SEARCH_PER_PAGE]
+
+    rows = db.execute(query, params).fetchall()
+    results = []
+    for row in rows[:SEARCH_PER_PAGE]:
+        result_kind = KIND_BY_CODE[row['rowid'] % 8]
+        results.append({
+            'kind': result_kind,
+            'label': SEARCH_KINDS[result_kind][4],
+            'id': row['rowid'] // 8,
+            'title': highlight(row['title']),
+            'snippet': highlight(row['snippet'])
+        })
+    return results, len(rows) > SEARCH_PER_PAGE
+
+def search_documents(db, text, page=1):
+    """Ranked matches inside uploaded documents (documents_text), paginated like search()"""
+    match = build_match_query(text)
+    if match is None:
+        return [], False
+
+    rows = db.execute(
+        'SELECT d.rowid, d.title, '
+        "snippet(documents_text, 1, ?, ?, '…', 24) as snippet, wt.worker_id "
+        'FROM documents_text d '
+        'LEFT JOIN worker_trainings wt ON d.rowid % 8 = 3 AND wt.id = d.rowid / 8 '
+        'WHERE documents_text MATCH ? ORDER BY d.rank LIMIT ? OFFSET ?',
+        (MATCH_START, MATCH_END, match, SEARCH_PER_PAGE + 1, (page - 1) * SEARCH_PER_PAGE)
+    ).fetchall()
+    results = []
+    for row in rows[:SEARCH_PER_PAGE]:
+        owner_kind = DOCUMENT_KIND_BY_CODE[row['rowid'] % 8]
+        results.append({
+            'kind': owner_kind,
+            'label': DOCUMENT_LABELS[owner_kind],
+            'id': row['worker_id'] if owner_kind == 'certification' else row['rowid'] // 8,
+            'title': highlight(row['title']),
+            'snippet': highlight(row['snippet'])
+        })
+    return results, len(rows) > SEARCH_PER_PAGE
+
+@job('build_search_index', '*/5 * * * *')
+def build_search_index(db):
+    """One-off backfill of search_index for rows that predate its triggers"""
+    indexed = 0
+    for kind, (code, table, title, body, _) in SEARCH_KINDS.items():
+        name = f'search_index:{kind}'
+        last_id, completed = migration_progress(db, name)
+        if completed:
+            continue
+        while True:
+            ids = db.execute(
+                f'SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, SEARCH_MIGRATION_BATCH)
+            ).fetchall()
+            if not ids:
+                save_migration_progress(db, name, last_id, completed=True)
+                db.commit()
+                break
+            # OR REPLACE: rows written since the triggers exist are already indexed
+            db.execute(
+                f'INSERT OR REPLACE INTO search_index (rowid, title, body) '
+                f'SELECT id * 8 + {code}, {title}, {body} FROM {table} WHERE id BETWEEN ? AND ?',
+                (ids[0]['id'], ids[-1]['id'])
+            )
+            indexed += len(ids)
+            last_id = ids[-1]['id']
+            save_migration_progress(db, name, last_id)
+            db.commit()
+    return indexed
@@ -0,0 +1,100 @@
+import secrets
+from datetime import datetime, timedelta
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from scheduler import job, format_timestamp
+
+SESSION_LIFETIME_DAYS = 31
+# Only push the expiry forward when it's closer than this, so most requests don't write
+SESSION_REFRESH_DAYS = 1
+
+serializer = TaggedJSONSerializer()
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session data kept in the user_sessions table; the cookie holds only its id"""
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+        self.rotate = False
+
+    def regenerate(self):
+        """Issue a fresh id on the next save (call on login against session fixation)"""
+        self.rotate = True
+        self.modified = True
+
+class SqliteSessionInterface(SessionInterface):
+    """Server-side sessions stored in SQLite.
+
+    Replaces Flask's signed-cookie sessions, so session contents are never
+    sent to the client and can be revoked by deleting the row."""
+
+    def _lifetime(self):
+        return timedelta(days=SESSION_LIFETIME_DAYS)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = app.get_db().execute(
+                'SELECT data, expires_at FROM user_sessions WHERE id = ? AND expires_at > ?',
+                (sid, format_timestamp(datetime.now()))
+            ).fetchone()
+            if row is not None:
+                return ServerSession(serializer.loads(row['data']), sid=sid,
+                                     expires_at=row['expires_at'])
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        db = app.get_db()
+
+        if not session:
+            if not session.new:
+                db.execute('DELETE FROM user_sessions WHERE id = ?', (session.sid,))
+                db.commit()
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = datetime.now()
+        refresh = session.expires_at is None or \
+            session.expires_at < format_timestamp(now + timedelta(days=SESSION_LIFETIME_DAYS - SESSION_REFRESH_DAYS))
+        if not (session.modified or refresh):
+            return
+
+        if session.rotate:
+            db.execute('DELETE FROM user_sessions WHERE id = ?', (session.sid,))
+            session.sid = secrets.token_urlsafe(32)
+        expires = now + self._lifetime()
+        db.execute(
+            'INSERT OR REPLACE INTO user_sessions (id, user_id, data, created_at, expires_at) '
+            'VALUES (?, ?, ?, COALESCE((SELECT created_at FROM user_sessions WHERE id = ?), ?), ?)',
+            (session.sid, session.get('user_id'), serializer.dumps(dict(session)),
+             session.sid, format_timestamp(now), format_timestamp(expires))
+        )
+        db.commit()
+        response.set_cookie(
+            name, session.sid,
+            expires=expires,
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app) or 'Lax'
+        )
+
+@job('session_cleanup', '0 5 * * *')
+def session_cleanup(db):
+    """Delete expired server-side sessions"""
+    deleted = db.execute(
+        'DELETE FROM user_sessions WHERE expires_at < ?', (format_timestamp(datetime.now()),)
+    ).rowcount
+    db.commit()
+    return deleted
@@ -19,6 +19,7 @@ const CivilSaaS = {
         this.initializeComponents();
         this.setupFormValidation();
         this.setupFileUploads();
+        this.setupChunkedUploads();
         this.setupTooltips();
         this.setupModals();
         this.setupMobileOptimizations();
@@ -176,12 +177,12 @@ const CivilSaaS = {
     // Validate uploaded files
     validateFiles(fileInput) {
         const files = Array.from(fileInput.files);
-        const maxSize = 10 * 1024 * 1024; // 10MB
+        const maxSize = parseInt(fileInput.dataset.maxSize, 10) || 10 * 1024 * 1024; // 10MB
         const allowedTypes = fileInput.accept ? fileInput.accept.split(',').map(t => t.trim()) : [];
 
         files.forEach(file => {
             if (file.size > maxSize) {
-                this.showNotification('Arquivo muito grande. Máximo: 10MB', 'error');
+                this.showNotification(`Arquivo muito grande. Máximo: ${this.formatFileSize(maxSize)}`, 'error');
                 fileInput.value = '';
                 return;
             }
@@ -206,6 +207,103 @@ const CivilSaaS = {
         }
     },
 
+    // Send files from [data-chunked-upload] inputs through the resumable upload API.
+    // The form then posts only the upload id (<input name>_upload). Browsers without
+    // WebCrypto (plain http) keep the regular multipart post.
+    setupChunkedUploads() {
+        if (!window.fetch || !window.crypto || !window.crypto.subtle) {
+            return;
+        }
+        document.querySelectorAll('input[type="file"][data-chunked-upload]').forEach(input => {
+            const form = input.closest('form');
+            if (!form) {
+                return;
+            }
+            const uploadId = document.createElement('input');
+            uploadId.type = 'hidden';
+            uploadId.name = `${input.name}_upload`;
+            form.appendChild(uploadId);
+
+            form.addEventListener('submit', async (e) => {
+                if (e.defaultPrevented || !input.files.length || uploadId.value) {
+                    return;
+                }
+                e.preventDefault();
+                const submitButton = form.querySelector('[type="submit"]');
+                if (submitButton) {
+                    this.toggleLoading(submitButton, true);
+                }
+                try {
+                    uploadId.value = await this.chunkedUpload(input.files[0], (sent, total) => {
+                        if (submitButton) {
+                            submitButton.innerHTML = `<span class="loading-spinner me-2"></span>Enviando ${Math.floor(sent * 100 / total)}%`;
+                        }
+                    });
+                    input.disabled = true;
+                    form.submit();
+                } catch (error) {
+                    this.showNotification(`Falha no envio do arquivo: ${error.message}`, 'error');
+                    if (submitButton) {
+                        this.toggleLoading(submitButton, false);
+                    }
+                }
+            });
+        });
+    },
+
+    // Upload a file in chunks, resuming from the server's acknowledged offset
+    // after network errors; resolves to the upload id
+    async chunkedUpload(file, onProgress = () => {}) {
+        const baseUrl = '/upload-sessions';
+        const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+        const sha256 = Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+
+        const request = async (url, options) => {
+            const response = await fetch(url, Object.assign({credentials: 'same-origin'}, options));
+            const data = await response.json().catch(() => ({}));
+            if (!response.ok && response.status !== 409) {
+                throw new Error(data.error || `HTTP ${response.status}`);
+            }
+            return data;
+        };
+
+        let upload = await request(baseUrl, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({filename: file.name, size: file.size, sha256})
+        });
+
+        let failures = 0;
+        while (!upload.complete && upload.offset < upload.size) {
+            onProgress(upload.offset, upload.size);
+            const chunk = file.slice(upload.offset, upload.offset + upload.chunk_size);
+            try {
+                upload = await request(`${baseUrl}/${upload.id}?offset=${upload.offset}`, {
+                    method: 'PUT',
+                    headers: {'Content-Type': 'application/octet-stream'},
+                    body: chunk
+                });
+                failures = 0;
+            } catch (error) {
+                if (++failures > 8) {
+                    throw error;
+                }
+                // Back off, then ask the server how much it actually received
+                await new Promise(resolve => setTimeout(resolve, Math.min(1000 * 2 ** failures, 30000)));
+                upload = await request(`${baseUrl}/${upload.id}`, {method: 'GET'}).catch(() => upload);
+            }
+        }
+        onProgress(upload.size, upload.size);
+
+        if (!upload.complete) {
+            const result = await request(`${baseUrl}/${upload.id}/finalize`, {method: 'POST'});
+            if (!result.complete) {
+                throw new Error(result.error || 'Upload incompleto');
+            }
+        }
+        return upload.id;
+    },
+
     // Setup tooltips and help text
     setupTooltips() {
         // Add help tooltips to form labels
@@ -2,7 +2,8 @@ import os
 import json
 from datetime import datetime, timedelta
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-from subscription_utils import init_mercadopago, is_pro_user, require_login, create_subscription_preference, get_trial_days_remaining
+from subscription_utils import is_pro_user, require_login, create_subscription_preference, get_trial_days_remaining
+from webhooks import parse_notification, record_webhook
 
 subscription_bp = Blueprint('subscription', __name__)
 
@@ -72,10 +73,6 @@ def success():
         ''', ('pro', 'active', subscription_start, subscription_end, user_id))
         db.commit()
         
-        # Update session
-        session['subscription_plan'] = 'pro'
-        session['subscription_status'] = 'active'
-        
         flash('Pagamento aprovado! Agora você tem acesso total ao plano Pro!', 'success')
     else:
         flash('Pagamento pendente. Aguarde a confirmação.', 'warning')
@@ -98,42 +95,17 @@ def pending():
 
 @subscription_bp.route('/webhook', methods=['POST'])
 def webhook():
-    """Handle MercadoPago webhook notifications"""
-    try:
-        data = request.get_json()
-        
-        if data.get('type') == 'payment':
-            payment_id = data.get('data', {}).get('id')
-            
-            # Get payment details from MercadoPago
-            sdk = init_mercadopago()
-            payment_response = sdk.payment().get(payment_id)
-            
-            if payment_response['status'] == 200:
-                payment = payment_response['response']
-                external_reference = payment.get('external_reference')
-                status = payment.get('status')
-                
-                if status == 'approved' and external_reference:
-                    # Update user subscription
-                    db = get_db()
-                    subscription_start = datetime.now()
-                    subscription_end = subscription_start + timedelta(days=30)
-                    
-                    db.execute('''
-                        UPDATE users 
-                        SET subscription_plan = ?, 
-                            subscription_status = ?, 
-                            subscription_start_date = ?, 
-                            subscription_end_date = ?
-                        WHERE id = ?
-                    ''', ('pro', 'active', subscription_start, subscription_end, int(external_reference)))
-                    db.commit()
-        
-        return jsonify({'status': 'success'}), 200
-        
-    except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 400
+    """Store MercadoPago notifications and acknowledge at once; the
+    process_webhooks job fetches and applies them (see webhooks.py)"""
+    data = request.get_json(silent=True)
+    topic, resource_id = parse_notification(data, request.args)
+    if topic is None:
+        return jsonify({'status': 'ignored'}), 200
+    
+    db = get_db()
+    record_webhook(db, topic, resource_id, data or request.args.to_dict())
+    db.commit()
+    return jsonify({'status': 'success'}), 200
 
 @subscription_bp.route('/status')
 @require_login
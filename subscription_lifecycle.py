@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+from scheduler import job, format_timestamp
+
+SWEEP_BATCH = 1000
+RENEWAL_REMINDER_DAYS = 7
+
+# status -> (date column, assignments applied when that date has passed, event)
+# Each lookup is a range scan on idx_users_status_trial / idx_users_status_end.
+EXPIRY_RULES = {
+    'trial': ('trial_end_date', "subscription_status = 'expired', subscription_plan = 'free'", 'trial_expired'),
+    'active': ('subscription_end_date', "subscription_status = 'expired', subscription_plan = 'free'", 'subscription_expired'),
+}
+
+# status -> (date column, reminder kind) for users whose period ends soon
+REMINDER_RULES = {
+    'trial': ('trial_end_date', 'trial_ending'),
+    'active': ('subscription_end_date', 'renewal_due'),
+}
+
+def expire_subscriptions(db, now=None):
+    """Expire lapsed trials and Pro plans in batches of SWEEP_BATCH users.
+
+    Each batch records a subscription_events row per user and is committed
+    on its own; the users_entitlements_update trigger bumps the cache
+    version, so cached entitlements are dropped on the next request."""
+    now = format_timestamp(now or datetime.now())
+    expired = 0
+    for status, (column, assignments, event) in EXPIRY_RULES.items():
+        while True:
+            user_ids = [row[0] for row in db.execute(
+                f'SELECT id FROM users WHERE subscription_status = ? AND {column} < ? '
+                f'ORDER BY {column} LIMIT ?',
+                (status, now, SWEEP_BATCH)
+            )]
+            if not user_ids:
+                break
+            db.executemany(
+                'INSERT INTO subscription_events (user_id, event, occurred_at) VALUES (?, ?, ?)',
+                [(user_id, event, now) for user_id in user_ids]
+            )
+            placeholders = ', '.join('?' * len(user_ids))
+            db.execute(
+                f'UPDATE users SET {assignments} WHERE id IN ({placeholders})',
+                user_ids
+            )
+            db.commit()
+            expired += len(user_ids)
+    return expired
+
+def queue_renewal_reminders(db, now=None):
+    """Record users whose trial or plan ends within RENEWAL_REMINDER_DAYS.
+
+    One subscription_reminders row per user, kind and end date, so a
+    reminder candidate is produced once per period however often this runs."""
+    now = now or datetime.now()
+    horizon = now + timedelta(days=RENEWAL_REMINDER_DAYS)
+    queued = 0
+    for status, (column, kind) in REMINDER_RULES.items():
+        queued += db.execute(
+            'INSERT OR IGNORE INTO subscription_reminders (user_id, kind, due_date, created_at) '
+            f'SELECT id, ?, {column}, ? FROM users '
+            f'WHERE subscription_status = ? AND {column} BETWEEN ? AND ?',
+            (kind, format_timestamp(now), status, format_timestamp(now), format_timestamp(horizon))
+        ).rowcount
+    db.commit()
+    return queued
+
+@job('subscription_expiry', '*/10 * * * *')
+def subscription_expiry(db):
+    """Downgrade users whose trial or paid period has ended"""
+    return expire_subscriptions(db)
+
+@job('renewal_reminders', '0 6 * * *')
+def renewal_reminders(db):
+    """Queue reminder candidates for trials and plans about to end"""
+    return queue_renewal_reminders(db)
@@ -1,45 +1,165 @@
 import os
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import session, redirect, url_for, flash, request
+from flask import session, redirect, url_for, flash, request, g
+import threading
+import requests
 import mercadopago
+from mercadopago.http.http_client import HttpClient
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+MERCADOPAGO_DEFAULT_API_BASE = 'https://api.mercadopago.com'
+MERCADOPAGO_TIMEOUT_SECONDS = 10
+# Retry policy when the SDK doesn't set one
+MERCADOPAGO_MAX_RETRIES = 3
+MERCADOPAGO_RETRY_ON = (429, 500, 502, 503, 504)
+MERCADOPAGO_BACKOFF_FACTOR = 0.5
+
+class PooledHttpClient(HttpClient):
+    """MercadoPago HTTP client reusing keep-alive connection pools.
+
+    The SDK's default client opens a new requests.Session per call. Here
+    each retry policy the SDK asks for (maxretries, retry_on,
+    backoff_factor) gets one pooled session, built on first use.
+    MERCADOPAGO_API_BASE points the SDK at another host (e.g. a local fake
+    payment API in the tests)."""
+
+    def __init__(self, api_base=None):
+        self.api_base = (api_base or MERCADOPAGO_DEFAULT_API_BASE).rstrip('/')
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+
+    def session_for(self, maxretries, retry_on, backoff_factor):
+        policy = (
+            MERCADOPAGO_MAX_RETRIES if maxretries is None else maxretries,
+            tuple(MERCADOPAGO_RETRY_ON if retry_on is None else retry_on),
+            MERCADOPAGO_BACKOFF_FACTOR if backoff_factor is None else backoff_factor,
+        )
+        with self.sessions_lock:
+            session = self.sessions.get(policy)
+            if session is None:
+                total, status_forcelist, backoff = policy
+                # Only idempotent reads are retried; a repeated POST could charge twice
+                retry = Retry(total=total, status_forcelist=status_forcelist, backoff_factor=backoff,
+                              allowed_methods=frozenset(['GET']), raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=16, max_retries=retry)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self.sessions[policy] = session
+            return session
+
+    def request(self, method, url, maxretries=None, retry_on=None, backoff_factor=None, **kwargs):
+        if url.startswith(MERCADOPAGO_DEFAULT_API_BASE):
+            url = self.api_base + url[len(MERCADOPAGO_DEFAULT_API_BASE):]
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = MERCADOPAGO_TIMEOUT_SECONDS
+        session = self.session_for(maxretries, retry_on, backoff_factor)
+        api_result = session.request(method, url, **kwargs)
+        response = {'status': api_result.status_code, 'response': None}
+        if api_result.status_code != 204 and api_result.content:
+            try:
+                response['response'] = api_result.json()
+            except ValueError:
+                pass
+        return response
+
+_sdk = None
+_sdk_token = None
+_sdk_lock = threading.Lock()
 
 def init_mercadopago():
-    """Initialize MercadoPago SDK"""
+    """MercadoPago SDK shared by the process (rebuilt if the access token changes)"""
+    global _sdk, _sdk_token
     access_token = os.environ.get('MERCADOPAGO_ACCESS_TOKEN')
     if not access_token:
         raise ValueError("MERCADOPAGO_ACCESS_TOKEN not found in environment variables")
     
-    sdk = mercadopago.SDK(access_token)
-    return sdk
+    with _sdk_lock:
+        if _sdk is None or _sdk_token != access_token:
+            http_client = PooledHttpClient(os.environ.get('MERCADOPAGO_API_BASE'))
+            _sdk = mercadopago.SDK(access_token, http_client=http_client)
+            _sdk_token = access_token
+        return _sdk
+
+# Per-process entitlement cache: user_id -> (version, entitlement). Entries
+# are only used while cache_versions['entitlements'] still has the version
+# they were read under; a trigger on users bumps it for every subscription
+# change, so upgrades apply at once in every worker.
+_entitlements = {}
+_entitlements_version = None
+_entitlements_lock = threading.Lock()
+
+def parse_timestamp(value):
+    """Parse a stored timestamp into a naive datetime (None if missing or invalid)"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+def _entitlement_version(db):
+    """The entitlements cache version, read once per request"""
+    if 'entitlements_version' not in g:
+        row = db.execute("SELECT version FROM cache_versions WHERE name = 'entitlements'").fetchone()
+        g.entitlements_version = row['version'] if row else 0
+    return g.entitlements_version
+
+def get_entitlement(user_id):
+    """Subscription plan, status and dates for a user, from the cache when current"""
+    global _entitlements_version
+    from flask import current_app
+    db = current_app.get_db()
+    version = _entitlement_version(db)
+    with _entitlements_lock:
+        if version != _entitlements_version:
+            _entitlements.clear()
+            _entitlements_version = version
+        cached = _entitlements.get(user_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    user = db.execute(
+        'SELECT subscription_plan, subscription_status, trial_end_date, subscription_end_date '
+        'FROM users WHERE id = ?', (user_id,)
+    ).fetchone()
+    entitlement = {
+        'plan': user['subscription_plan'] if user else 'free',
+        'status': user['subscription_status'] if user else 'free',
+        'trial_end_date': parse_timestamp(user['trial_end_date']) if user else None,
+        'subscription_end_date': parse_timestamp(user['subscription_end_date']) if user else None,
+    }
+    with _entitlements_lock:
+        # Skip the store if a request under another version has reset the cache meanwhile
+        if version == _entitlements_version:
+            _entitlements[user_id] = (version, entitlement)
+    return entitlement
+
+def current_entitlement():
+    """Entitlement of the logged-in user, or None"""
+    if 'user_id' not in session:
+        return None
+    return get_entitlement(session['user_id'])
 
 def is_pro_user():
     """Check if current user has Pro access (either paid Pro or within trial period)"""
-    if 'user_id' not in session:
+    entitlement = current_entitlement()
+    if entitlement is None:
         return False
     
-    subscription_status = session.get('subscription_status', 'free')
-    subscription_plan = session.get('subscription_plan', 'free')
-    trial_end_date = session.get('trial_end_date')
-    
     # Check if user has active Pro subscription
-    if subscription_status == 'active' and subscription_plan == 'pro':
-        return True
+    # (the end date is checked too, in case the expiry sweep hasn't run yet)
+    if entitlement['status'] == 'active' and entitlement['plan'] == 'pro':
+        end = entitlement['subscription_end_date']
+        return end is None or datetime.now() <= end
     
     # Check if user is within trial period
-    if subscription_status == 'trial' and trial_end_date:
-        try:
-            if isinstance(trial_end_date, str):
-                trial_end = datetime.fromisoformat(trial_end_date.replace('Z', '+00:00'))
-            else:
-                trial_end = trial_end_date
-            
-            if datetime.now() <= trial_end:
-                return True
-        except:
-            pass
-    
-    return False
+    trial_end = entitlement['trial_end_date']
+    return entitlement['status'] == 'trial' and trial_end is not None and datetime.now() <= trial_end
 
 def require_pro(f):
     """Decorator to require Pro subscription or active trial"""
@@ -63,23 +183,12 @@ def require_login(f):
 
 def get_trial_days_remaining():
     """Get number of days remaining in trial period"""
-    if 'user_id' not in session:
-        return 0
-    
-    trial_end_date = session.get('trial_end_date')
-    if not trial_end_date:
+    entitlement = current_entitlement()
+    if entitlement is None or entitlement['trial_end_date'] is None:
         return 0
     
-    try:
-        if isinstance(trial_end_date, str):
-            trial_end = datetime.fromisoformat(trial_end_date.replace('Z', '+00:00'))
-        else:
-            trial_end = trial_end_date
-        
-        days_remaining = (trial_end - datetime.now()).days
-        return max(0, days_remaining)
-    except:
-        return 0
+    days_remaining = (entitlement['trial_end_date'] - datetime.now()).days
+    return max(0, days_remaining)
 
 def create_subscription_preference(user_id, user_email):
     """Create MercadoPago preference for Pro subscription"""
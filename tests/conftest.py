@@ -0,0 +1,53 @@
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# No background jobs, and rate limit counters apart from a running server's
+os.environ['SCHEDULER_IN_PROCESS'] = '0'
+os.environ['RATE_LIMIT_FILE'] = os.path.join(tempfile.mkdtemp(), 'ratelimit')
+
+from fake_mercadopago import FakePaymentAPI  # noqa: E402
+
+@pytest.fixture
+def db():
+    """A fresh database with the application schema"""
+    connection = sqlite3.connect(':memory:')
+    connection.row_factory = sqlite3.Row
+    with open(os.path.join(ROOT, 'schema.sql')) as f:
+        connection.executescript(f.read())
+    yield connection
+    connection.close()
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The application with its database and uploads in a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    from app import create_app
+    application = create_app()
+    application.config['TESTING'] = True
+    return application
+
+@pytest.fixture
+def client(app):
+    """A test client logged in as the default admin user"""
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    return client
+
+@pytest.fixture
+def payment_api(monkeypatch):
+    """The fake payment API, with the SDK pointed at it"""
+    import subscription_utils
+    api = FakePaymentAPI().start()
+    monkeypatch.setenv('MERCADOPAGO_ACCESS_TOKEN', 'TEST-token')
+    monkeypatch.setenv('MERCADOPAGO_API_BASE', api.base_url)
+    # Rebuild the shared SDK for this server and without retry delays
+    monkeypatch.setattr(subscription_utils, '_sdk', None)
+    monkeypatch.setattr(subscription_utils, 'MERCADOPAGO_BACKOFF_FACTOR', 0)
+    yield api
+    api.stop()
@@ -0,0 +1,60 @@
+"""A local stand-in for the MercadoPago payments API.
+
+Serves GET /v1/payments/<id> from an in-memory dict on a free port, so
+tests point MERCADOPAGO_API_BASE at it instead of the real API."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakePaymentAPI:
+    def __init__(self):
+        # payment id -> payment object returned by the API
+        self.payments = {}
+        # payment id -> number of 500 responses to send before answering
+        self.failures = {}
+        # (method, path) of every request received
+        self.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                api.requests.append(('GET', self.path))
+                prefix = '/v1/payments/'
+                payment_id = self.path.split('?', 1)[0][len(prefix):] if self.path.startswith(prefix) else None
+                if payment_id is not None and api.failures.get(payment_id, 0) > 0:
+                    api.failures[payment_id] -= 1
+                    self.reply(500, {'message': 'internal_error', 'status': 500})
+                elif payment_id in api.payments:
+                    self.reply(200, api.payments[payment_id])
+                else:
+                    self.reply(404, {'message': 'Payment not found', 'status': 404})
+
+            def reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,50 @@
+import io
+import json
+
+import pytest
+
+from calc_engine import batch
+from calc_engine.batch import iter_json_rows
+
+ROWS = [
+    {'length': 12.5, 'diameter': 0.1, 'name': 'trecho "A", 1', 'note': 'café \\ ok'},
+    {'length': -3e-2, 'flag': True, 'missing': None, 'nested': {'values': [1, 2.5e3, False]}},
+    {'length': 100, 'label': 'ção'},
+]
+
+class CountingStream(io.StringIO):
+    """Text stream recording how many characters were read"""
+    consumed = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.consumed += len(chunk)
+        return chunk
+
+@pytest.mark.parametrize('text', [
+    json.dumps(ROWS),
+    json.dumps(ROWS, indent=2, ensure_ascii=False),
+    '\n'.join(json.dumps(row) for row in ROWS) + '\n',
+])
+def test_rows_split_at_every_read_boundary(monkeypatch, text):
+    for size in range(1, 40):
+        monkeypatch.setattr(batch, 'JSON_READ_SIZE', size)
+        assert list(iter_json_rows(io.StringIO(text))) == ROWS
+
+def test_malformed_row_raises_without_reading_the_rest(monkeypatch):
+    monkeypatch.setattr(batch, 'JSON_READ_SIZE', 1024)
+    text = '{"length": 1}\n{"length": x}\n' + '{"length": 2}\n' * 100000
+    stream = CountingStream(text)
+    rows = iter_json_rows(stream)
+    assert next(rows) == {'length': 1}
+    with pytest.raises(json.JSONDecodeError):
+        next(rows)
+    assert stream.consumed <= 2048
+
+def test_unterminated_row_is_bounded(monkeypatch):
+    monkeypatch.setattr(batch, 'JSON_READ_SIZE', 1024)
+    monkeypatch.setattr(batch, 'JSON_MAX_ROW_CHARS', 10000)
+    stream = CountingStream('[{"note": "' + 'a' * 1000000)
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_rows(stream))
+    assert stream.consumed <= 12000
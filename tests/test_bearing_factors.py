@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from calc_engine import evaluate
+from calc_engine.bearing_factors import CONVENTIONS, bearing_factors, closed_form_factors
+
+# (Nc, Nq, Nγ) at φ = 30°
+@pytest.mark.parametrize('convention, expected', [
+    ('terzaghi', (37.16, 22.46, 20.12)),
+    ('meyerhof', (30.14, 18.40, 15.67)),
+    ('vesic', (30.14, 18.40, 22.40)),
+    ('hansen', (30.14, 18.40, 15.07)),
+    ('ec7', (30.14, 18.40, 20.09)),
+])
+def test_textbook_values(convention, expected):
+    assert [round(float(factor), 2) for factor in bearing_factors(30, convention)] == list(expected)
+
+@pytest.mark.parametrize('convention', CONVENTIONS)
+def test_tables_match_the_closed_forms(convention):
+    angles = np.random.default_rng(0).uniform(0.5, 60, 20000)
+    tables = np.array(bearing_factors(angles, convention))
+    exact = np.array(closed_form_factors(angles, convention))
+    error = np.abs(tables / exact - 1)
+    assert error[:2].max() < 2e-6
+    assert error[2][angles > 5].max() < 1e-5
+    assert error[2].max() < 2e-4
+
+def test_undrained_and_out_of_range_angles():
+    Nc, Nq, Ng = bearing_factors([0, -1, 60.5, np.nan])
+    assert (Nc[0], Nq[0], Ng[0]) == pytest.approx((5.14, 1, 0))
+    assert np.isnan(Nc[1:]).all() and np.isnan(Nq[1:]).all() and np.isnan(Ng[1:]).all()
+    assert bearing_factors(0, 'terzaghi')[0] == 5.7
+
+def test_conventions_per_row():
+    Nc, Nq, Ng = bearing_factors([30, 30, 30], np.array(['vesic', 'hansen', 'rankine']))
+    assert Ng[:2] == pytest.approx([22.40, 15.07], abs=0.01)
+    assert np.isnan([Nc[2], Nq[2], Ng[2]]).all()
+
+def test_bearing_formula_uses_the_chosen_convention():
+    inputs = dict(cohesion=0, unit_weight=18, depth=1, width=2, friction_angle=30)
+    ec7 = evaluate('terzaghi_bearing', **inputs)['ultimate_capacity']
+    # q·Nq + ½γ·B·Nγ with q = γ·Df
+    assert float(ec7) == pytest.approx(18 * 18.40 + 0.5 * 18 * 2 * 20.09, rel=1e-3)
+    vesic = evaluate('terzaghi_bearing', **inputs, convention='vesic')
+    assert float(vesic['Ng']) == pytest.approx(22.40, abs=0.01)
+    assert np.isnan(evaluate('terzaghi_bearing', **inputs, convention='rankine')['ultimate_capacity'])
@@ -0,0 +1,115 @@
+import hashlib
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import blobstore
+from scheduler import format_timestamp
+
+CONTENT = b'%PDF-1.4 alvara de construcao' * 100
+
+@pytest.fixture
+def store(db, tmp_path, monkeypatch):
+    """The test database, with uploads written under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    return db
+
+def upload_file(db, content=CONTENT, user_id=1):
+    """Send `content` through a chunked upload session; returns the finished session"""
+    digest = hashlib.sha256(content).hexdigest()
+    upload = blobstore.create_upload_session(db, user_id, 'alvara.pdf', len(content), digest)
+    middle = len(content) // 2
+    blobstore.write_chunk(db, upload, 0, io.BytesIO(content[:middle]), middle)
+    upload = db.execute('SELECT * FROM upload_sessions WHERE id = ?', (upload['id'],)).fetchone()
+    blobstore.write_chunk(db, upload, middle, io.BytesIO(content[middle:]), len(content) - middle)
+    upload = db.execute('SELECT * FROM upload_sessions WHERE id = ?', (upload['id'],)).fetchone()
+    assert blobstore.finalize_upload(db, upload) is not None
+    db.commit()
+    return db.execute('SELECT * FROM upload_sessions WHERE id = ?', (upload['id'],)).fetchone()
+
+def age(db, table, hours):
+    """Make every row of `table` last updated `hours` ago"""
+    db.execute(f'UPDATE {table} SET updated_at = ?',
+               (format_timestamp(datetime.now() - timedelta(hours=hours)),))
+    db.commit()
+
+def save_record(db, path):
+    db.execute("INSERT INTO compliance_docs (title, file_path) VALUES ('Alvará', ?)", (path,))
+    db.commit()
+
+def test_duplicate_uploads_share_one_blob(store):
+    first = blobstore.save_upload(store, FileStorage(io.BytesIO(CONTENT), 'alvara.pdf'))
+    second = blobstore.save_upload(store, FileStorage(io.BytesIO(CONTENT), 'copia.PDF'))
+    save_record(store, first)
+    save_record(store, second)
+    assert first == second == blobstore.blob_path(hashlib.sha256(CONTENT).hexdigest(), '.pdf')
+    assert store.execute('SELECT refcount FROM upload_blobs').fetchone()['refcount'] == 2
+
+def test_chunked_upload_resumes_and_verifies(store):
+    digest = hashlib.sha256(CONTENT).hexdigest()
+    upload = blobstore.create_upload_session(store, 1, 'alvara.pdf', len(CONTENT), digest)
+    assert blobstore.write_chunk(store, upload, 0, io.BytesIO(CONTENT[:100]), 100) == 100
+    # A client that lost its session id gets the same one back at the acknowledged offset
+    resumed = blobstore.create_upload_session(store, 1, 'alvara.pdf', len(CONTENT), digest)
+    assert (resumed['id'], resumed['received']) == (upload['id'], 100)
+    with pytest.raises(ValueError, match='offset mismatch'):
+        blobstore.write_chunk(store, resumed, 0, io.BytesIO(CONTENT), len(CONTENT))
+
+    blobstore.write_chunk(store, resumed, 100, io.BytesIO(b'x' * (len(CONTENT) - 100)), len(CONTENT) - 100)
+    corrupt = store.execute('SELECT * FROM upload_sessions WHERE id = ?', (upload['id'],)).fetchone()
+    assert blobstore.finalize_upload(store, corrupt) is None
+    assert store.execute('SELECT received FROM upload_sessions').fetchone()['received'] == 0
+
+def test_claim_is_limited_to_the_owner(store):
+    upload = upload_file(store)
+    assert blobstore.claim_upload(store, upload['id'], 2) is None
+    assert blobstore.claim_upload(store, upload['id'], 1) == upload['blob_path']
+
+def test_gc_keeps_an_unclaimed_upload_while_its_session_lives(store):
+    upload = upload_file(store)
+    age(store, 'upload_blobs', blobstore.GC_GRACE_HOURS + 1)
+    assert blobstore.upload_blob_gc(store) == 0
+    path = blobstore.claim_upload(store, upload['id'], 1)
+    assert os.path.exists(path)
+    save_record(store, path)
+    assert store.execute('SELECT refcount FROM upload_blobs').fetchone()['refcount'] == 1
+
+def test_gc_deletes_unreferenced_blobs_once_sessions_expire(store):
+    upload = upload_file(store)
+    age(store, 'upload_blobs', blobstore.UPLOAD_SESSION_HOURS + 1)
+    age(store, 'upload_sessions', blobstore.UPLOAD_SESSION_HOURS + 1)
+    assert blobstore.upload_session_cleanup(store) == 1
+    assert blobstore.upload_blob_gc(store) == 1
+    assert not os.path.exists(upload['blob_path'])
+    assert blobstore.claim_upload(store, upload['id'], 1) is None
+
+def test_gc_keeps_referenced_and_recent_blobs(store):
+    kept = blobstore.save_upload(store, FileStorage(io.BytesIO(CONTENT), 'alvara.pdf'))
+    save_record(store, kept)
+    recent = blobstore.save_upload(store, FileStorage(io.BytesIO(b'rascunho'), 'rascunho.txt'))
+    store.commit()
+    assert blobstore.upload_blob_gc(store) == 0
+    age(store, 'upload_blobs', blobstore.GC_GRACE_HOURS + 1)
+    assert blobstore.upload_blob_gc(store) == 1
+    assert os.path.exists(kept) and not os.path.exists(recent)
+
+def test_legacy_uploads_move_into_the_blob_store(store):
+    os.makedirs(blobstore.UPLOAD_FOLDER)
+    legacy = [os.path.join(blobstore.UPLOAD_FOLDER, f'2024010{i}_alvara.pdf') for i in (1, 2)]
+    for path in legacy:
+        with open(path, 'wb') as f:
+            f.write(CONTENT)
+    for path in legacy + ['uploads/20240103_missing.pdf']:
+        save_record(store, path)
+
+    assert blobstore.migrate_legacy_uploads(store) == 2
+    paths = [row['file_path'] for row in store.execute('SELECT file_path FROM compliance_docs ORDER BY id')]
+    blob = blobstore.blob_path(hashlib.sha256(CONTENT).hexdigest(), '.pdf')
+    # Identical files share one blob; a record whose file is gone keeps its path
+    assert paths == [blob, blob, 'uploads/20240103_missing.pdf']
+    assert store.execute('SELECT refcount FROM upload_blobs').fetchone()['refcount'] == 2
+    assert not any(os.path.exists(path) for path in legacy)
+    assert blobstore.migrate_legacy_uploads(store) == 0
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from calc_engine.channels import (GRAVITY, critical_depth, gvf_profile, normal_depth, profile_type,
+                                  section)
+
+def manning_flow(depth, slope, width, side_slope=0, manning_n=0.013, shape='trapezoidal'):
+    area, perimeter, _, _, _ = section(depth, shape, width, side_slope)
+    return area * (area / perimeter)**(2 / 3) * np.sqrt(slope) / manning_n
+
+def test_rectangular_critical_depth():
+    # yc = (q²/g)^(1/3) with q = Q/b
+    assert critical_depth(10.0, 5.0, shape='rectangular') == pytest.approx((2**2 / GRAVITY)**(1 / 3))
+
+@pytest.mark.parametrize('shape, width, side_slope', [
+    ('rectangular', 3.0, 0), ('trapezoidal', 2.0, 1.5), ('circular', 1.2, 0),
+])
+def test_normal_depth_carries_the_flow(shape, width, side_slope):
+    flows = np.array([0.05, 0.5, 1.5])
+    depths = normal_depth(flows, 0.002, width, side_slope, 0.015, shape)
+    assert manning_flow(depths, 0.002, width, side_slope, 0.015, shape) == pytest.approx(flows, rel=1e-8)
+
+def test_pipe_over_capacity_and_flat_slopes_have_no_normal_depth():
+    full = manning_flow(0.938 * 0.6, 0.001, 0.6, shape='circular')
+    assert np.isnan(normal_depth(1.01 * full, 0.001, 0.6, shape='circular'))
+    assert not np.isnan(normal_depth(0.99 * full, 0.001, 0.6, shape='circular'))
+    assert np.isnan(normal_depth(1.0, np.array([0, -0.001]), 3.0)).all()
+
+def test_profile_types():
+    # Mild slope: normal above critical
+    assert list(profile_type(np.array([2.0, 0.8, 0.3]), 1.0, 0.5, 0.001)) == ['M1', 'M2', 'M3']
+    assert list(profile_type(np.array([2.0, 0.8, 0.3]), 0.5, 1.0, 0.05)) == ['S1', 'S2', 'S3']
+    assert list(profile_type(np.array([2.0, 0.3]), np.nan, 1.0, 0.0)) == ['H2', 'H3']
+    assert list(profile_type(np.array([2.0]), np.nan, 1.0, -0.001)) == ['A2']
+
+def test_backwater_curve_approaches_normal_depth_upstream():
+    result = gvf_profile(flow_rate=10.0, slope=0.0005, width=5.0, control_depth=3.0, length=20000,
+                         shape='rectangular', steps=200)
+    depth = result['depth'][0]
+    normal = float(result['normal_depth'][0])
+    assert result['profile'][0] == 'M1'
+    # Ordered from the upstream end; the control depth is downstream
+    assert depth[-1] == 3.0
+    assert (np.diff(depth) > 0).all()
+    assert depth[0] == pytest.approx(normal, rel=0.01)
+
+def test_supercritical_profile_is_computed_downstream():
+    result = gvf_profile(flow_rate=10.0, slope=0.02, width=5.0, control_depth=0.2, length=200,
+                         shape='rectangular', steps=100)
+    depth, froude = result['depth'][0], result['froude'][0]
+    assert result['profile'][0] == 'S3'
+    assert depth[0] == 0.2
+    assert (np.diff(depth) > 0).all() and (froude > 1).all()
+    assert depth[-1] < result['normal_depth'][0]
+
+def test_profile_ending_at_critical_depth_is_cut_off():
+    # An S1 curve behind a weir on a steep slope falls to critical depth upstream (a jump)
+    result = gvf_profile(flow_rate=10.0, slope=0.02, width=5.0, control_depth=1.5, length=200,
+                         shape='rectangular', steps=50)
+    depth = result['depth'][0]
+    assert result['profile'][0] == 'S1'
+    reached = np.isnan(depth)
+    assert reached[:10].all() and not reached[-5:].any()
+    assert np.nanmin(depth) >= result['critical_depth'][0]
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+
+from calc_engine.concrete_design import utilization
+from calc_engine.registry import evaluate
+
+def test_beam_bending_steel_matches_hand_calculation():
+    result = evaluate('beam_design', positive_moment=100, negative_moment=0, shear=0, width=0.2, height=0.5)
+    # 20x50, d = 46 cm, C25/CA-50: kmd = 0.185, x/d = 0.215, As = 5.46 cm²
+    assert result['bottom_steel'] == pytest.approx(5.46, abs=0.01)
+    assert result['neutral_axis_ratio'] == pytest.approx(0.213, abs=0.002)
+    assert result['status'] == 'OK'
+
+def test_beam_needs_compression_steel_past_the_ductility_limit():
+    result = evaluate('beam_design', positive_moment=250, negative_moment=0, shear=0, width=0.2, height=0.5)
+    assert result['top_steel'] > 0
+    assert result['neutral_axis_ratio'] == pytest.approx(0.45)
+
+def test_beam_shear_crushing_asks_for_a_larger_section():
+    result = evaluate('beam_design', positive_moment=10, negative_moment=0, shear=500, width=0.2, height=0.5)
+    assert result['status'] == 'Aumentar seção (VRd2)'
+
+def test_column_pure_compression_capacity():
+    result = evaluate('column_check', axial=1000, moment=0, width=0.2, height=0.4, steel_area=8)
+    # 0.85·fcd·Ac plus the steel at the uniform shortening εc2 = 2‰ (σs = 420 MPa)
+    assert result['axial_capacity'] == pytest.approx(0.85 * 25 / 1.4 * 0.08 * 1000 + 8e-4 * 420 * 1000, rel=1e-3)
+    assert 0 < result['utilization'] < 1
+
+def test_column_utilization_grows_with_moment():
+    moments = np.array([0, 50, 100, 200])
+    used = evaluate('column_check', axial=800, moment=moments, width=0.2, height=0.4, steel_area=8)['utilization']
+    assert np.all(np.diff(used) > 0)
+
+@pytest.mark.parametrize('width, height', [(0, 0.4), (0.2, 0.08), (0.2, 0.0)])
+def test_invalid_sections_give_nan_instead_of_raising(width, height):
+    result = evaluate('column_check', axial=1000, moment=50, width=width, height=height, steel_area=8)
+    assert np.isnan(result['utilization'])
+    assert result['status'] == 'Seção inválida'
+
+def test_utilization_with_no_valid_rows():
+    used = utilization(np.array([100.0, 200.0]), 10.0, 0.2, 0.06, 0.04, 8, 25, 500)
+    assert used.shape == (2,) and np.all(np.isnan(used))
+
+def test_column_batch_with_only_invalid_sections(client):
+    rows = [{'axial': 1000, 'moment': 50, 'width': 0.2, 'height': 0.08, 'steel_area': 8}] * 3
+    response = client.post('/calculators/column_check/batch', data=json.dumps(rows), content_type='application/json')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(lines) == 3 and all('error' in line for line in lines)
+
+def test_column_form_with_a_section_too_small_for_its_cover(client):
+    response = client.post('/calculators/concrete-structures', data={
+        'calc_type': 'column_check', 'axial': '1000', 'moment': '50', 'width': '20', 'height': '8',
+        'steel_area': '8', 'cover': '4', 'fck': '25', 'fyk': '500'})
+    assert response.status_code == 200
+    assert 'Seção inválida' in response.get_data(as_text=True)
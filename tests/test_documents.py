@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import documents
+from documents import process_document_queue
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Extract in threads, so extractors registered by a test are visible"""
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(documents, 'get_pool', lambda: executor)
+    monkeypatch.setattr(documents, 'EXTRACTORS', dict(documents.EXTRACTORS))
+    yield executor
+    executor.shutdown()
+
+def queue_file(db, path):
+    db.execute("INSERT INTO document_queue (kind, record_id, file_path) VALUES ('permit', 1, ?)", (str(path),))
+    db.commit()
+
+def queue_status(db):
+    return [row['status'] for row in db.execute('SELECT status FROM document_queue ORDER BY id')]
+
+def test_text_is_extracted_and_indexed(db, pool, tmp_path):
+    path = tmp_path / 'memorial.txt'
+    path.write_text('Concreto fck 30 MPa')
+    queue_file(db, path)
+    assert process_document_queue(db) == 1
+    assert queue_status(db) == ['done']
+    assert db.execute('SELECT content FROM documents_text').fetchone()[0] == 'Concreto fck 30 MPa'
+
+def test_unsupported_file_is_retried_once_an_extractor_exists(db, pool, tmp_path):
+    path = tmp_path / 'planta.dwg'
+    path.write_text('ALVARA 123')
+    queue_file(db, path)
+    process_document_queue(db)
+    assert queue_status(db) == ['unsupported']
+    assert db.execute('SELECT COUNT(*) FROM document_contents').fetchone()[0] == 0
+
+    documents.extractor('.dwg')(documents.extract_plain_text)
+    process_document_queue(db)
+    assert queue_status(db) == ['done']
+    assert db.execute('SELECT content FROM documents_text').fetchone()[0] == 'ALVARA 123'
+
+def test_null_text_from_older_versions_is_extracted_again(db, pool, tmp_path):
+    path = tmp_path / 'laudo.txt'
+    path.write_text('Sondagem SPT')
+    db.execute("INSERT INTO document_contents (content_hash, text) VALUES (?, NULL)", (documents.file_hash(path),))
+    queue_file(db, path)
+    process_document_queue(db)
+    assert queue_status(db) == ['done']
+    assert db.execute('SELECT text FROM document_contents').fetchone()[0] == 'Sondagem SPT'
@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+import subscription_utils
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(subscription_utils, '_entitlements', {})
+    monkeypatch.setattr(subscription_utils, '_entitlements_version', None)
+
+def set_plan(app, plan, status):
+    with app.app_context():
+        db = app.get_db()
+        db.execute('UPDATE users SET subscription_plan = ?, subscription_status = ? WHERE id = 1', (plan, status))
+        db.commit()
+
+def entitlement(app):
+    with app.test_request_context():
+        return subscription_utils.get_entitlement(1)
+
+def test_subscription_change_applies_at_once(app):
+    set_plan(app, 'free', 'free')
+    assert entitlement(app)['plan'] == 'free'
+    assert entitlement(app) is entitlement(app)
+    set_plan(app, 'pro', 'active')
+    assert entitlement(app)['plan'] == 'pro'
+
+def test_read_from_before_a_change_is_not_cached(app, monkeypatch):
+    set_plan(app, 'free', 'free')
+    parse_timestamp = subscription_utils.parse_timestamp
+    upgraded = []
+
+    def upgrade_meanwhile(value):
+        # After this request read the user, another one upgrades it and caches the new plan
+        if not upgraded:
+            upgraded.append(True)
+            set_plan(app, 'pro', 'active')
+            thread = threading.Thread(target=lambda: upgraded.append(entitlement(app)['plan']))
+            thread.start()
+            thread.join()
+        return parse_timestamp(value)
+
+    monkeypatch.setattr(subscription_utils, 'parse_timestamp', upgrade_meanwhile)
+    assert entitlement(app)['plan'] == 'free'
+    assert upgraded == [True, 'pro']
+    assert entitlement(app)['plan'] == 'pro'
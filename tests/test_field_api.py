@@ -0,0 +1,95 @@
+import pytest
+
+import device_keys
+from blueprints import field
+from device_keys import create_device
+from ratelimit import TokenBucketLimiter
+
+@pytest.fixture
+def limiter(tmp_path, monkeypatch):
+    """A fresh ingest limiter allowing a burst of 3 and no refill during the test"""
+    limiter = TokenBucketLimiter(rate=1e-6, burst=3, path=str(tmp_path / 'ratelimit'))
+    monkeypatch.setattr(field, 'ingest_limiter', limiter)
+    monkeypatch.setattr(device_keys, '_key_cache', {})
+    return limiter
+
+def device_key(app, project_id=None):
+    with app.app_context():
+        db = app.get_db()
+        db.execute("INSERT INTO projects (id, name) VALUES (1, 'Obra A'), (2, 'Obra B')")
+        key = create_device(db, 1, 'Sensor', 'S-1', project_id)
+        db.commit()
+    return key
+
+def record(client, key, **data):
+    return client.post('/field/api/record', json={'measurement_type': 'slump', 'value': 10, **data},
+                       headers={'Authorization': f'Bearer {key}'})
+
+def test_requires_a_device_key(app, limiter):
+    assert record(app.test_client(), 'fd_unknown').status_code == 401
+
+def test_records_a_measurement(app, limiter):
+    key = device_key(app)
+    assert record(app.test_client(), key, project_id=1).status_code == 201
+    with app.app_context():
+        row = app.get_db().execute('SELECT project_id, value, device_id FROM field_measurements').fetchone()
+    assert tuple(row) == (1, 10.0, 'S-1')
+
+def test_project_id_spellings_share_one_bucket(app, limiter):
+    key = device_key(app)
+    client = app.test_client()
+    statuses = [record(client, key, project_id=project_id).status_code for project_id in ('1', '01', '001', 1)]
+    assert statuses == [201, 201, 201, 429]
+
+@pytest.mark.parametrize('project_id', ['1.5', 'abc', 99])
+def test_invalid_project_is_rejected_before_the_limiter(app, limiter, project_id):
+    key = device_key(app)
+    client = app.test_client()
+    for _ in range(5):
+        assert record(client, key, project_id=project_id).status_code == 400
+
+def test_bound_device_cannot_record_for_another_project(app, limiter):
+    key = device_key(app, project_id=1)
+    client = app.test_client()
+    assert record(client, key, project_id=2).status_code == 403
+    assert record(client, key, project_id='01').status_code == 201
+    assert record(client, key).status_code == 201
+
+def test_only_the_key_hash_is_stored(app, limiter):
+    key = device_key(app)
+    with app.app_context():
+        device = app.get_db().execute('SELECT key_hash, key_prefix FROM field_devices').fetchone()
+    assert device['key_hash'] == device_keys.hash_api_key(key) != key
+    assert key.startswith(device['key_prefix'])
+
+def test_revoked_key_is_rejected_at_once(app, limiter):
+    key = device_key(app)
+    client = app.test_client()
+    assert record(client, key, project_id=1).status_code == 201
+    with app.app_context():
+        db = app.get_db()
+        device_keys.revoke_device(db, 1)
+        db.commit()
+    assert record(client, key, project_id=1).status_code == 401
+
+def test_keys_revoked_elsewhere_expire_from_the_cache(app, limiter, monkeypatch):
+    key = device_key(app)
+    with app.app_context():
+        db = app.get_db()
+        assert device_keys.verify_api_key(db, key)['device_id'] == 'S-1'
+        # Revoked by another worker: this one trusts its cached copy for a while
+        db.execute("UPDATE field_devices SET revoked_at = '2026-01-01 00:00:00'")
+        db.commit()
+        assert device_keys.verify_api_key(db, key) is not None
+        now = device_keys.time.monotonic()
+        monkeypatch.setattr(device_keys.time, 'monotonic', lambda: now + device_keys.KEY_CACHE_SECONDS + 1)
+        assert device_keys.verify_api_key(db, key) is None
+
+def test_rate_limited_requests_say_when_to_retry(app, limiter):
+    key = device_key(app)
+    client = app.test_client()
+    for _ in range(3):
+        record(client, key, project_id=1)
+    response = record(client, key, project_id=1)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
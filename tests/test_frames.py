@@ -0,0 +1,34 @@
+import pytest
+
+from calc_engine.frames import parse_frame, solve_frame
+
+def simple_beam(**loads):
+    return {
+        'E': 2.8e7, 'A': 0.1, 'I': 0.002,
+        'nodes': [{'id': 'A', 'x': 0, 'y': 0, 'support': 'pinned'}, {'id': 'B', 'x': 5, 'y': 0, 'support': 'roller'}],
+        'elements': [{'id': 'E1', 'start': 'A', 'end': 'B'}],
+        'load_cases': {'G': loads or {'distributed': [{'element': 'E1', 'qy': -10}]}},
+    }
+
+def test_simply_supported_beam():
+    result = solve_frame(parse_frame(simple_beam()))
+    # qL²/8 at midspan and qL/2 at each support
+    assert result['envelope']['max_moment'][0] == pytest.approx(31.25)
+    assert result['combinations']['G']['reactions']['fy'] == pytest.approx([25, 25])
+
+@pytest.mark.parametrize('loads', [
+    {'nodal': [5]},
+    {'distributed': 'x'},
+    {'point': {'element': 'E1'}},
+    {'distributed': [None]},
+])
+def test_malformed_loads_raise_value_error(loads):
+    with pytest.raises(ValueError):
+        parse_frame(simple_beam(**loads))
+
+@pytest.mark.parametrize('support', [['x'], {'fixed': True}, 5, 'hinge'])
+def test_malformed_support_raises_value_error(support):
+    data = simple_beam()
+    data['nodes'][0]['support'] = support
+    with pytest.raises(ValueError):
+        parse_frame(data)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from calc_engine import evaluate
+from calc_engine.friction import colebrook, friction_factor
+from calc_engine.hydraulics import LAMINAR_REYNOLDS, TURBULENT_REYNOLDS
+
+def residual(f, reynolds, relative_roughness):
+    """Colebrook-White: 1/√f + 2·log10(ε/3.7D + 2.51/(Re·√f))"""
+    return 1 / np.sqrt(f) + 2 * np.log10(relative_roughness / 3.7 + 2.51 / (reynolds * np.sqrt(f)))
+
+def test_colebrook_converges_over_the_moody_chart():
+    reynolds, roughness = np.meshgrid(np.logspace(np.log10(4000), 8, 60), np.r_[0, np.logspace(-6, -1.3, 30)])
+    f = colebrook(reynolds, roughness)
+    assert np.abs(residual(f, reynolds, roughness)).max() < 1e-10
+
+@pytest.mark.parametrize('reynolds, roughness, expected', [
+    (1e5, 0, 0.0180),
+    (1e5, 1e-4, 0.0185),
+    (1e6, 1e-3, 0.0199),
+    (1e8, 0.05, 0.0716),
+])
+def test_moody_chart_values(reynolds, roughness, expected):
+    assert float(colebrook(reynolds, roughness)) == pytest.approx(expected, abs=5e-4)
+
+def test_regimes_join_continuously():
+    below, laminar_end, turbulent_start, above = friction_factor(
+        [LAMINAR_REYNOLDS - 1e-6, LAMINAR_REYNOLDS, TURBULENT_REYNOLDS - 1e-6, TURBULENT_REYNOLDS],
+        1e-4, LAMINAR_REYNOLDS, TURBULENT_REYNOLDS)
+    assert below == pytest.approx(64 / LAMINAR_REYNOLDS) == laminar_end
+    assert turbulent_start == pytest.approx(above)
+    assert friction_factor(1000, 1e-4, LAMINAR_REYNOLDS, TURBULENT_REYNOLDS) == pytest.approx(0.064)
+
+def test_darcy_weisbach_head_loss():
+    result = evaluate('darcy_weisbach', length=100, diameter=0.1, flow_rate=[0.0, 0.01, -0.01])
+    velocity = 0.01 / (np.pi * 0.05**2)
+    f = result['friction_factor'][1]
+    assert result['total_loss'][1] == pytest.approx(f * 100 / 0.1 * velocity**2 / (2 * 9.81))
+    assert result['reynolds'][1] == pytest.approx(1000 * velocity * 0.1 / 0.001)
+    # No flow, no loss; reversed flow loses the same head
+    assert result['total_loss'][0] == 0
+    assert result['total_loss'][2] == result['total_loss'][1]
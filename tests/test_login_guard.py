@@ -0,0 +1,52 @@
+import pytest
+
+import login_guard
+from login_guard import login_retry_after, record_login_failure
+from ratelimit import SlidingWindowLimiter
+
+@pytest.fixture
+def limiters(tmp_path, monkeypatch):
+    """Fresh counters sharing one slot file, as the module's defaults do"""
+    path = str(tmp_path / 'ratelimit')
+    monkeypatch.setattr(login_guard, 'user_failures', SlidingWindowLimiter(3, 60, path))
+    monkeypatch.setattr(login_guard, 'ip_failures', SlidingWindowLimiter(5, 60, path))
+
+def test_username_is_throttled_after_its_failures(limiters):
+    for attempt in range(3):
+        assert login_retry_after('Maria', f'198.51.100.{attempt}') == 0
+        record_login_failure('Maria', f'198.51.100.{attempt}')
+    assert login_retry_after('maria', '198.51.100.200') > 0
+    assert login_retry_after('joao', '198.51.100.0') == 0
+
+def test_ip_is_throttled_after_its_failures(limiters):
+    for attempt in range(5):
+        record_login_failure(f'user{attempt}', '198.51.100.7')
+    assert login_retry_after('someone', '198.51.100.7') > 0
+    assert login_retry_after('someone', '198.51.100.8') == 0
+
+def test_username_that_looks_like_an_ip_does_not_count_against_it(limiters):
+    for attempt in range(5):
+        record_login_failure('203.0.113.5', f'198.51.100.{attempt}')
+    assert login_retry_after('someone', '203.0.113.5') == 0
+    assert login_retry_after('203.0.113.5', '198.51.100.99') > 0
+
+def test_forwarded_for_is_ignored_without_trusted_proxies(app, limiters):
+    client = app.test_client()
+    for attempt in range(5):
+        client.post('/login', data={'username': f'user{attempt}', 'password': 'wrong'},
+                    headers={'X-Forwarded-For': f'198.51.100.{attempt}'})
+    response = client.post('/login', data={'username': 'admin', 'password': 'admin123'},
+                           headers={'X-Forwarded-For': '198.51.100.99'})
+    assert response.status_code == 429
+
+def test_forwarded_for_is_used_behind_a_trusted_proxy(tmp_path, monkeypatch, limiters):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('TRUSTED_PROXY_HOPS', '1')
+    from app import create_app
+    client = create_app().test_client()
+    for attempt in range(5):
+        client.post('/login', data={'username': f'user{attempt}', 'password': 'wrong'},
+                    headers={'X-Forwarded-For': '198.51.100.1'})
+    response = client.post('/login', data={'username': 'admin', 'password': 'admin123'},
+                           headers={'X-Forwarded-For': '198.51.100.2'})
+    assert response.status_code == 302
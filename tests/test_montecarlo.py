@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from calc_engine import montecarlo
+
+PILE = {'diameter': 0.5, 'length': 10, 'tip_resistance': 4000,
+        'shaft_resistance': {'dist': 'normal', 'mean': 50, 'std': 10}}
+
+def test_seed_gives_the_same_answer_on_any_executor(monkeypatch):
+    monkeypatch.setattr(montecarlo, 'MC_CHUNK_SAMPLES', 1000)
+    inline = montecarlo.simulate('pile_capacity', PILE, demand=1500, samples=5500, seed=7)
+    with ThreadPoolExecutor(3) as executor:
+        pooled = montecarlo.simulate('pile_capacity', PILE, demand=1500, samples=5500, seed=7, executor=executor)
+    assert pooled == inline
+    assert inline['samples'] == 5500
+
+def test_fixed_inputs_fail_all_or_nothing():
+    fixed = dict(PILE, shaft_resistance=50)
+    # 4000 π 0.25² + 50 π 0.5 10 ≈ 1570.8 kN
+    safe = montecarlo.simulate('pile_capacity', fixed, demand=1500, samples=1000)
+    unsafe = montecarlo.simulate('pile_capacity', fixed, demand=1600, samples=1000)
+    assert safe['failures'] == 0 and safe['reliability_index'] is None
+    assert unsafe['failure_probability'] == 1
+    assert safe['resistance']['mean'] == pytest.approx(1570.8, rel=1e-4)
+
+def test_failure_probability_matches_the_normal_limit_state():
+    # R ~ N(1570.8, 50 π 0.5 10 / 5 ≈ 157.1): pf = Φ(-70.8 / 157.1) ≈ 0.326
+    study = montecarlo.simulate('pile_capacity', PILE, demand=1500, samples=200000, executor=None)
+    assert study['failure_probability'] == pytest.approx(0.326, abs=0.005)
+    assert study['reliability_index'] == pytest.approx(0.45, abs=0.02)
+    assert study['deterministic']['total_capacity'] == pytest.approx(1570.8, rel=1e-4)
+
+@pytest.mark.parametrize('inputs, demand, message', [
+    (dict(PILE, shaft_resistance={'dist': 'normal', 'mean': 50}), 1500, 'needs a numeric std'),
+    (dict(PILE, shaft_resistance={'dist': 'weibull'}), 1500, 'dist must be one of'),
+    (dict(PILE, shaft_resistance={'dist': 'uniform', 'low': 60, 'high': 40}), 1500, 'low must be below high'),
+    (dict(PILE, depth=3), 1500, 'Unknown input'),
+    ({'diameter': 0.5}, 1500, 'Missing input'),
+    (PILE, 'heavy', 'demand is not a number'),
+])
+def test_invalid_studies_are_rejected(inputs, demand, message):
+    with pytest.raises(ValueError, match=message):
+        montecarlo.simulate('pile_capacity', inputs, demand=demand, samples=1000)
+
+def test_only_capacity_formulas_have_a_reliability_mode():
+    with pytest.raises(ValueError, match='no reliability mode'):
+        montecarlo.simulate('effective_stress', {'total_stress': 100}, demand=50)
@@ -0,0 +1,25 @@
+import pytest
+
+from calc_engine.network import parse_network, solve_network
+
+def one_pipe(**pipe):
+    return {
+        'reservoirs': [{'id': 'R', 'head': 50}],
+        'nodes': [{'id': 'J', 'elevation': 10, 'demand': 0.01}],
+        'pipes': [{'id': 'P', 'from': 'R', 'to': 'J', 'length': 500, 'diameter': 0.1, **pipe}],
+        'head_loss': 'hazen_williams' if 'c_factor' in pipe else 'darcy_weisbach',
+    }
+
+def test_one_pipe_carries_the_demand():
+    result = solve_network(parse_network(one_pipe(roughness=0.0001)))
+    assert result['pipes']['flow'][0] == pytest.approx(0.01)
+    assert 10 < result['nodes']['head'][0] < 50
+
+def test_smooth_pipe_is_allowed():
+    result = solve_network(parse_network(one_pipe(roughness=0)))
+    assert result['pipes']['flow'][0] == pytest.approx(0.01)
+
+@pytest.mark.parametrize('pipe', [{'roughness': -5}, {'c_factor': 0}, {'c_factor': -130}])
+def test_invalid_pipe_coefficients_raise_value_error(pipe):
+    with pytest.raises(ValueError):
+        parse_network(one_pipe(**pipe))
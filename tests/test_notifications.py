@@ -0,0 +1,85 @@
+from datetime import date
+
+import pytest
+
+import notifications
+
+TODAY = date(2026, 10, 1)
+
+class RecordingTransport:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def send_batch(self, messages):
+        if self.fail:
+            raise ConnectionRefusedError('SMTP server down')
+        self.batches.append(list(messages))
+
+    @property
+    def messages(self):
+        return [message for batch in self.batches for message in batch]
+
+@pytest.fixture
+def db(app):
+    """The app database with a second user, a project and expiring items"""
+    with app.app_context():
+        db = app.get_db()
+        db.execute("INSERT INTO users (username, email, password_hash) VALUES ('maria', 'maria@obra.com', 'x')")
+        db.execute("INSERT INTO projects (name, user_id) VALUES ('Edifício Aurora', 1)")
+        db.execute("INSERT INTO permits (project_id, name, expiry_date) VALUES (1, 'Alvará de obra', '2026-10-11')")
+        db.execute("INSERT INTO compliance_docs (project_id, title, expiry_date) VALUES (1, 'AVCB', '2026-12-01')")
+        db.execute("INSERT INTO workers (name) VALUES ('João')")
+        db.execute("INSERT INTO trainings (title, validity_months) VALUES ('NR-35', 24)")
+        db.execute("INSERT INTO worker_trainings (worker_id, training_id, completion_date, expiry_date) "
+                   "VALUES (1, 1, '2024-10-06', '2026-10-06')")
+        db.commit()
+        yield db
+
+def recipients(transport):
+    return sorted(message['To'] for message in transport.messages)
+
+def test_each_user_gets_one_digest_of_upcoming_expiries(db):
+    transport = RecordingTransport()
+    assert notifications.send_expiry_digests(db, transport, today=TODAY) == 2
+    admin_email = db.execute('SELECT email FROM users WHERE id = 1').fetchone()['email']
+    assert recipients(transport) == sorted([admin_email, 'maria@obra.com'])
+    digests = {message['To']: message.get_content() for message in transport.messages}
+    # The owner sees the project's permit; certifications go to everyone
+    assert 'Alvará de obra' in digests[admin_email] and 'João - NR-35' in digests[admin_email]
+    assert 'Alvará de obra' not in digests['maria@obra.com'] and 'João - NR-35' in digests['maria@obra.com']
+    # Beyond the horizon
+    assert 'AVCB' not in digests[admin_email]
+
+def test_alerts_are_sent_once_per_expiry_date(db):
+    notifications.send_expiry_digests(db, RecordingTransport(), today=TODAY)
+    transport = RecordingTransport()
+    assert notifications.send_expiry_digests(db, transport, today=TODAY) == 0
+    # A renewed permit with a new expiry date is alerted again
+    db.execute("UPDATE permits SET expiry_date = '2026-10-20'")
+    db.commit()
+    assert notifications.send_expiry_digests(db, transport, today=TODAY) == 1
+    assert 'Alvará de obra' in transport.messages[0].get_content()
+
+def test_nothing_is_logged_when_delivery_fails(db):
+    with pytest.raises(ConnectionRefusedError):
+        notifications.send_expiry_digests(db, RecordingTransport(fail=True), today=TODAY)
+    assert db.execute('SELECT COUNT(*) FROM notification_log').fetchone()[0] == 0
+    assert notifications.send_expiry_digests(db, RecordingTransport(), today=TODAY) == 2
+
+def test_users_are_sent_in_batches(db, monkeypatch):
+    monkeypatch.setattr(notifications, 'DIGEST_BATCH_USERS', 1)
+    transport = RecordingTransport()
+    assert notifications.send_expiry_digests(db, transport, today=TODAY) == 2
+    assert [len(batch) for batch in transport.batches] == [1, 1]
+
+def test_file_transport_appends_to_an_mbox(db, tmp_path):
+    path = tmp_path / 'outbox' / 'digests.mbox'
+    notifications.send_expiry_digests(db, notifications.FileTransport(str(path)), today=TODAY)
+    mbox = path.read_text(encoding='utf-8')
+    assert mbox.count('From alertas@engenpro.local ') == 2
+
+def test_unknown_transport_is_rejected(monkeypatch):
+    monkeypatch.setenv('MAIL_TRANSPORT', 'pigeon')
+    with pytest.raises(ValueError, match='pigeon'):
+        notifications.get_transport()
@@ -0,0 +1,65 @@
+"""Process pool workers re-import the entrypoint that started the server;
+they must not set up the database or start a scheduler of their own."""
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+from conftest import ROOT
+
+ENTRYPOINT = '''
+import json
+import os
+import sys
+import threading
+sys.path.insert(0, {root!r})
+from app import app
+
+def worker_state():
+    return sorted(thread.name for thread in threading.enumerate()), os.getpid()
+
+if __name__ == '__main__':
+    {body}
+    # Workers would otherwise hold the output pipe open after we exit
+    pool.shutdown()
+    print(json.dumps(result))
+    sys.stdout.flush()
+    # Skip waiting for the server's scheduler thread
+    os._exit(0)
+'''
+
+def run_entrypoint(tmp_path, body):
+    """Run `body` in a script that builds the app at import, like main.py; its JSON `result`"""
+    script = tmp_path / 'entrypoint.py'
+    script.write_text(ENTRYPOINT.format(root=ROOT, body=textwrap.indent(textwrap.dedent(body), '    ').strip()))
+    environment = dict(os.environ, SCHEDULER_IN_PROCESS='1')
+    output = subprocess.run([sys.executable, str(script)], cwd=tmp_path, env=environment, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True, timeout=120, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_document_workers_do_not_start_the_app(tmp_path):
+    (tmp_path / 'memorial.txt').write_text('Fundação em estacas')
+    threads, pid, text = run_entrypoint(tmp_path, '''
+        import documents
+        pool = documents.get_pool()
+        threads, pid = pool.submit(worker_state).result()
+        result = [threads, pid, pool.submit(documents.extract_text, 'memorial.txt').result()]
+    ''')
+    assert threads == ['MainThread']
+    assert pid != os.getpid()
+    assert text == 'Fundação em estacas'
+
+def test_monte_carlo_workers_do_not_start_the_app(tmp_path):
+    threads, pid, failures = run_entrypoint(tmp_path, '''
+        from calc_engine import montecarlo
+        pool = montecarlo.get_pool()
+        threads, pid = pool.submit(worker_state).result()
+        study = montecarlo.simulate('pile_capacity', {'diameter': 0.5, 'length': 10, 'tip_resistance': 4000,
+                                    'shaft_resistance': {'dist': 'normal', 'mean': 50, 'std': 10}},
+                                    demand=1500, samples=2000, executor=pool)
+        result = [threads, pid, study['failures']]
+    ''')
+    assert threads == ['MainThread']
+    assert pid != os.getpid()
+    assert 0 < failures < 2000
@@ -0,0 +1,39 @@
+from pricing import PRICES_MIGRATION, migrate_material_prices, record_price
+from scheduler import save_migration_progress
+
+def log_material(db, material_id, quantity, total_cost, record=False):
+    log_id = db.execute(
+        "INSERT INTO material_logs (material_id, quantity, total_cost, date_used) VALUES (?, ?, ?, '2026-01-10')",
+        (material_id, quantity, total_cost)
+    ).lastrowid
+    if record:
+        # What sustainability.log_usage does for new logs
+        record_price(db, 'Cimento CP-II', total_cost / quantity, '2026-01-10', None, material_id,
+                     'material_log', log_id)
+    return log_id
+
+def log_prices(db):
+    return db.execute(
+        "SELECT source_id, unit_price FROM material_prices WHERE source = 'material_log' ORDER BY source_id"
+    ).fetchall()
+
+def test_backfill_skips_logs_already_priced(db):
+    material_id = db.execute("INSERT INTO materials (name, cost_per_unit) VALUES ('Cimento CP-II', 40)").lastrowid
+    old = log_material(db, material_id, 10, 400)
+    new = log_material(db, material_id, 5, 200, record=True)
+    db.commit()
+
+    assert migrate_material_prices(db) == 1
+    assert [tuple(row) for row in log_prices(db)] == [(old, 40.0), (new, 40.0)]
+
+def test_backfill_rerun_does_not_duplicate(db):
+    material_id = db.execute("INSERT INTO materials (name, cost_per_unit) VALUES ('Cimento CP-II', 40)").lastrowid
+    log_material(db, material_id, 10, 400)
+    log_material(db, material_id, 4, 180)
+    db.commit()
+    assert migrate_material_prices(db) == 2
+
+    save_migration_progress(db, PRICES_MIGRATION, 0)
+    db.commit()
+    assert migrate_material_prices(db) == 0
+    assert len(log_prices(db)) == 2
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import scheduler
+from scheduler import Scheduler, format_timestamp, next_run_time
+
+@pytest.fixture
+def jobs(monkeypatch):
+    """An empty job registry"""
+    registry = {}
+    monkeypatch.setattr(scheduler, 'JOBS', registry)
+    return registry
+
+def make_due(db, name):
+    db.execute('UPDATE jobs SET next_run_at = ? WHERE name = ?',
+               (format_timestamp(datetime.now() - timedelta(minutes=1)), name))
+    db.commit()
+
+@pytest.mark.parametrize('expression, after, expected', [
+    ('*/15 * * * *', datetime(2026, 3, 1, 10, 7, 30), datetime(2026, 3, 1, 10, 15)),
+    ('0 6 * * *', datetime(2026, 3, 1, 6, 0), datetime(2026, 3, 2, 6, 0)),
+    ('30 2 1 * *', datetime(2026, 12, 15), datetime(2027, 1, 1, 2, 30)),
+    # 2026-03-02 is a Monday
+    ('0 8 * * 1-5', datetime(2026, 2, 28, 9), datetime(2026, 3, 2, 8, 0)),
+    ('0 8 * * 7', datetime(2026, 2, 28, 9), datetime(2026, 3, 1, 8, 0)),
+    # Day of month and weekday both restricted: either matches
+    ('0 0 15 * 1', datetime(2026, 3, 3), datetime(2026, 3, 9)),
+])
+def test_next_run_time(expression, after, expected):
+    assert next_run_time(expression, after) == expected
+
+@pytest.mark.parametrize('expression', ['* * * *', '60 * * * *', '*/0 * * * *', '0 0 31 2 *'])
+def test_invalid_schedules_are_rejected(expression):
+    with pytest.raises(ValueError):
+        next_run_time(expression, datetime(2026, 1, 1))
+
+def test_backoff_doubles_up_to_the_cap():
+    assert [scheduler.backoff_delay(attempt) for attempt in (1, 2, 3)] == [30, 60, 120]
+    assert scheduler.backoff_delay(20) == scheduler.BACKOFF_MAX_SECONDS
+
+def test_only_one_process_leases_a_due_job(db, jobs):
+    scheduler.job('rollup', '0 * * * *')(lambda db: None)
+    first, second = Scheduler(None), Scheduler(None)
+    first.sync_jobs(db)
+    make_due(db, 'rollup')
+    now = datetime.now()
+    assert first.acquire(db, 'rollup', now)
+    assert not second.acquire(db, 'rollup', now)
+    # An expired lease (e.g. a crashed worker) can be taken over
+    assert second.acquire(db, 'rollup', now + timedelta(seconds=scheduler.LEASE_SECONDS + 1))
+
+def test_failed_job_is_retried_with_backoff_then_rescheduled(db, jobs):
+    calls = []
+
+    @scheduler.job('flaky', '0 3 * * *', max_attempts=2)
+    def flaky(db):
+        calls.append(len(calls))
+        raise RuntimeError('SMTP unavailable')
+
+    runner = Scheduler(None)
+    runner.sync_jobs(db)
+    make_due(db, 'flaky')
+    assert runner.acquire(db, 'flaky', datetime.now())
+    assert runner.run_job(db, 'flaky') == 'failed'
+    job = db.execute('SELECT * FROM jobs').fetchone()
+    assert job['attempts'] == 1 and job['lease_owner'] is None
+    retry_at = datetime.strptime(job['next_run_at'], scheduler.TIMESTAMP_FORMAT)
+    assert retry_at - datetime.now() < timedelta(seconds=scheduler.BACKOFF_BASE_SECONDS + 1)
+
+    make_due(db, 'flaky')
+    assert runner.acquire(db, 'flaky', datetime.now())
+    assert runner.run_job(db, 'flaky') == 'failed'
+    job = db.execute('SELECT * FROM jobs').fetchone()
+    # Out of attempts: back on its schedule
+    assert job['attempts'] == 0
+    assert job['next_run_at'].endswith('03:00:00')
+    runs = db.execute('SELECT attempt, status, error FROM job_runs ORDER BY id').fetchall()
+    assert [(run['attempt'], run['status']) for run in runs] == [(1, 'failed'), (2, 'failed')]
+    assert 'SMTP unavailable' in runs[0]['error']
+
+def test_schedule_changes_are_picked_up(db, jobs):
+    scheduler.job('digest', '0 7 * * *')(lambda db: 1)
+    runner = Scheduler(None)
+    runner.sync_jobs(db)
+    scheduler.job('digest', '30 18 * * *')(lambda db: 1)
+    runner.sync_jobs(db)
+    job = db.execute('SELECT schedule, next_run_at FROM jobs').fetchone()
+    assert job['schedule'] == '30 18 * * *'
+    assert job['next_run_at'].endswith('18:30:00')
+
+def test_migration_progress_round_trip(db):
+    assert scheduler.migration_progress(db, 'blobs') == (0, False)
+    scheduler.save_migration_progress(db, 'blobs', 200)
+    assert scheduler.migration_progress(db, 'blobs') == (200, False)
+    scheduler.save_migration_progress(db, 'blobs', 450, completed=True)
+    assert scheduler.migration_progress(db, 'blobs') == (450, True)
@@ -0,0 +1,64 @@
+import pytest
+
+import search_index
+from search_index import build_match_query, search
+
+@pytest.fixture
+def records(db):
+    db.execute("INSERT INTO projects (name, description) VALUES ('Edifício Aurora', 'Fundação em estacas hélice')")
+    db.execute("INSERT INTO projects (name, description) VALUES ('Ponte do Rio Claro', 'Vigas <protendidas>')")
+    db.execute("INSERT INTO permits (project_id, name, issuing_authority) VALUES (1, 'Alvará de fundação', 'Prefeitura')")
+    db.execute("INSERT INTO notes (content) VALUES ('Conferir armadura da fundação do bloco B')")
+    db.commit()
+    return db
+
+def kinds(results):
+    return sorted((result['kind'], result['id']) for result in results)
+
+@pytest.mark.parametrize('text, expected', [
+    ('fundação', '"fundação"*'),
+    ('ponte  rio', '"ponte" "rio"*'),
+    ('"OR NEAR(* -', '"OR" "NEAR"*'),
+    ('  *- ', None),
+])
+def test_free_text_becomes_a_safe_query(text, expected):
+    assert build_match_query(text) == expected
+
+def test_matches_every_kind_ignoring_accents(records):
+    results, has_next = search(records, 'fundacao')
+    assert kinds(results) == [('note', 1), ('permit', 1), ('project', 1)]
+    assert not has_next
+    assert kinds(search(records, 'fundacao', kind='permit')[0]) == [('permit', 1)]
+
+def test_last_word_matches_as_a_prefix(records):
+    assert kinds(search(records, 'rio cla')[0]) == [('project', 2)]
+    assert search(records, 'cla rio')[0] == []
+
+def test_highlights_are_escaped(records):
+    [result] = search(records, 'protendidas')[0]
+    assert result['title'] == 'Ponte do Rio Claro'
+    assert '&lt;<mark>protendidas</mark>&gt;' in result['snippet']
+
+def test_triggers_keep_the_index_current(records):
+    records.execute("UPDATE projects SET name = 'Residencial Aurora' WHERE id = 1")
+    records.execute('DELETE FROM notes')
+    records.commit()
+    assert kinds(search(records, 'residencial')[0]) == [('project', 1)]
+    assert search(records, 'edificio')[0] == []
+    assert search(records, 'armadura')[0] == []
+
+def test_pages(records, monkeypatch):
+    monkeypatch.setattr(search_index, 'SEARCH_PER_PAGE', 2)
+    first, has_next = search(records, 'fundacao')
+    second, has_more = search(records, 'fundacao', page=2)
+    assert (len(first), has_next, len(second), has_more) == (2, True, 1, False)
+    assert not set(kinds(first)) & set(kinds(second))
+
+def test_backfill_indexes_rows_from_before_the_triggers(records):
+    records.execute('DELETE FROM search_index')
+    records.commit()
+    assert search(records, 'fundacao')[0] == []
+    assert search_index.build_search_index(records) == 4
+    assert kinds(search(records, 'fundacao')[0]) == [('note', 1), ('permit', 1), ('project', 1)]
+    # One-off: done once every kind has completed
+    assert search_index.build_search_index(records) == 0
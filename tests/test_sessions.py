@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import session_store
+from scheduler import format_timestamp
+
+def session_id(client):
+    cookie = client.get_cookie('session')
+    return cookie.value if cookie else None
+
+def session_rows(app):
+    with app.app_context():
+        return app.get_db().execute('SELECT id, user_id, expires_at FROM user_sessions').fetchall()
+
+def login(client):
+    return client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+def test_cookie_carries_only_the_session_id(app):
+    client = app.test_client()
+    login(client)
+    [row] = session_rows(app)
+    assert session_id(client) == row['id']
+    assert row['user_id'] == 1
+
+def test_login_issues_a_fresh_id(app):
+    client = app.test_client()
+    client.set_cookie('session', 'planted-by-attacker')
+    with client.session_transaction() as session:
+        session['language'] = 'pt'
+    before = session_id(client)
+    login(client)
+    assert session_id(client) != before
+    assert [row['id'] for row in session_rows(app)] == [session_id(client)]
+
+def test_deleting_the_row_revokes_the_session(app, client):
+    assert client.get('/dashboard').status_code == 200
+    with app.app_context():
+        db = app.get_db()
+        db.execute('DELETE FROM user_sessions')
+        db.commit()
+    assert client.get('/dashboard').status_code == 302
+
+def test_expired_sessions_are_ignored_and_cleaned_up(app, client):
+    past = format_timestamp(datetime.now() - timedelta(minutes=1))
+    with app.app_context():
+        db = app.get_db()
+        db.execute('UPDATE user_sessions SET expires_at = ?', (past,))
+        db.commit()
+        assert client.get('/dashboard').status_code == 302
+        assert session_store.session_cleanup(db) == 1
+
+def test_logout_drops_the_user_from_the_session(app, client):
+    client.get('/logout')
+    # Only the flashed message is left
+    assert [row['user_id'] for row in session_rows(app)] == [None]
+    assert client.get('/dashboard').status_code == 302
@@ -0,0 +1,83 @@
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import calc_cache
+from calc_engine import evaluate
+from calc_engine.sweep import run_study, sweep, tornado
+from scheduler import format_timestamp
+
+PILE = {'diameter': 0.5, 'length': 10, 'tip_resistance': 4000, 'shaft_resistance': 50}
+
+def test_sweep_surface_matches_pointwise_evaluation():
+    diameters, lengths = np.array([0.4, 0.5, 0.6]), np.array([8.0, 12.0])
+    result = sweep('pile_capacity', PILE, [('diameter', diameters), ('length', lengths)])
+    total = np.array(result['outputs']['total_capacity'])
+    assert total.shape == (3, 2)
+    for i, diameter in enumerate(diameters):
+        for j, length in enumerate(lengths):
+            expected = evaluate('pile_capacity', **dict(PILE, diameter=diameter, length=length))
+            assert total[i, j] == pytest.approx(float(expected['total_capacity']))
+
+def test_non_finite_outputs_become_null():
+    result = sweep('pile_capacity', dict(PILE, safety_factor=1), [('safety_factor', np.array([0.0, 2.0]))])
+    assert result['outputs']['allowable_capacity'][0] is None
+    json.dumps(result, allow_nan=False)
+
+def test_tornado_ranks_inputs_by_swing():
+    result = tornado('pile_capacity', dict(PILE, safety_factor=2))
+    bars = result['sensitivities']['total_capacity']
+    # Tip and shaft give ≈ 785 kN each; the diameter scales both
+    assert bars[0]['input'] == 'diameter'
+    assert [bar['swing'] for bar in bars] == sorted((bar['swing'] for bar in bars), reverse=True)
+    assert bars[-1] == dict(bars[-1], input='safety_factor', swing=0)
+    assert result['base']['total_capacity'] == pytest.approx(1570.8, rel=1e-4)
+
+def test_study_uses_the_swept_range_in_the_tornado():
+    result = run_study('pile_capacity', {key: PILE[key] for key in ('diameter', 'tip_resistance', 'shaft_resistance')},
+                       [{'input': 'length', 'start': 5, 'stop': 15, 'steps': 3}])
+    assert result['axes'] == [{'input': 'length', 'values': [5.0, 10.0, 15.0]}]
+    # Missing base value for a swept input: the middle of its axis
+    assert result['inputs']['length'] == 10
+    [length] = [bar for bar in result['sensitivities']['total_capacity'] if bar['input'] == 'length']
+    assert (length['low_value'], length['high_value']) == (5, 15)
+
+@pytest.mark.parametrize('axes, message', [
+    ([], 'sweep 1 to 3 inputs'),
+    ([{'input': 'depth', 'values': [1, 2]}], 'depth is not a numeric input'),
+    ([{'input': 'length', 'values': [1]}, {'input': 'length', 'values': [2]}], 'swept twice'),
+    ([{'input': 'length', 'start': 1, 'stop': 2, 'steps': 1}], 'at least 2 steps'),
+    ([{'input': 'length'}], 'give values, or start and stop'),
+    ([{'input': name, 'start': 1, 'stop': 2, 'steps': 100} for name in ('diameter', 'length', 'tip_resistance')],
+     'at most 100000'),
+])
+def test_invalid_axes_are_rejected(axes, message):
+    with pytest.raises(ValueError, match=message):
+        run_study('pile_capacity', PILE, axes)
+
+def test_cached_studies_are_computed_once(db):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'value': 1.5}
+
+    study = {'inputs': {'a': 1, 'b': 2}}
+    key, text = calc_cache.cached_json(db, 'pile_capacity', study, compute)
+    # Key order doesn't matter
+    again, cached = calc_cache.cached_json(db, 'pile_capacity', {'inputs': {'b': 2, 'a': 1}}, compute)
+    assert (again, cached) == (key, text)
+    assert json.loads(text) == {'value': 1.5, 'key': key}
+    assert len(calls) == 1
+    assert calc_cache.get_cached(db, 'terzaghi_bearing', key) is None
+
+def test_old_studies_are_cleaned_up(db):
+    old, _ = calc_cache.cached_json(db, 'pile_capacity', {'length': 10}, dict)
+    calc_cache.cached_json(db, 'pile_capacity', {'length': 12}, dict)
+    db.execute('UPDATE calc_cache SET created_at = ? WHERE key = ?',
+               (format_timestamp(datetime.now() - timedelta(days=calc_cache.CALC_CACHE_DAYS + 1)), old))
+    db.commit()
+    assert calc_cache.calc_cache_cleanup(db) == 1
+    assert calc_cache.get_cached(db, 'pile_capacity', old) is None
@@ -0,0 +1,56 @@
+import hashlib
+import io
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from blobstore import save_upload
+
+CONTENT = b'%PDF-1.4 projeto estrutural' * 200
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+@pytest.fixture
+def blob(app):
+    """Name of a stored blob uploaded as 'Planta Baixa.pdf'"""
+    with app.app_context():
+        db = app.get_db()
+        path = save_upload(db, FileStorage(io.BytesIO(CONTENT), 'Planta Baixa.pdf'))
+        db.commit()
+    return os.path.basename(path)
+
+def test_uploads_need_a_login(app, blob):
+    assert app.test_client().get(f'/uploads/{blob}').status_code == 401
+
+def test_blobs_are_immutable_with_their_digest_as_etag(client, blob):
+    response = client.get(f'/uploads/{blob}')
+    assert response.data == CONTENT
+    assert response.headers['ETag'] == f'"{DIGEST}"'
+    assert response.headers['Cache-Control'] == 'private, max-age=31536000, immutable'
+    assert 'Planta Baixa.pdf' in response.headers['Content-Disposition']
+    assert client.get(f'/uploads/{blob}', headers={'If-None-Match': f'"{DIGEST}"'}).status_code == 304
+
+def test_range_requests_are_served(client, blob):
+    response = client.get(f'/uploads/{blob}', headers={'Range': 'bytes=0-7'})
+    assert response.status_code == 206
+    assert response.data == CONTENT[:8]
+
+def test_legacy_names_are_revalidated(client):
+    os.makedirs('uploads', exist_ok=True)
+    with open('uploads/20240101_memorial.pdf', 'wb') as f:
+        f.write(CONTENT)
+    response = client.get('/uploads/20240101_memorial.pdf')
+    assert response.data == CONTENT
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+def test_missing_and_traversing_names_are_not_found(client):
+    assert client.get('/uploads/nope.pdf').status_code == 404
+    assert client.get('/uploads/..%2Fschema.sql').status_code == 404
+
+def test_accel_redirect_offloads_to_the_proxy(app, client, blob):
+    app.config['UPLOADS_SENDFILE'] = 'x-accel-redirect'
+    response = client.get(f'/uploads/{blob}')
+    assert response.data == b''
+    assert response.headers['X-Accel-Redirect'] == f'/_uploads/{blob}'
+    assert response.mimetype == 'application/pdf'
+    assert client.get(f'/uploads/{blob}', headers={'If-None-Match': f'"{DIGEST}"'}).status_code == 304
@@ -0,0 +1,71 @@
+import hashlib
+
+CONTENT = b'%PDF-1.4 licenca ambiental' * 1000
+
+def upload(client, content=CONTENT, filename='licenca.pdf'):
+    """Send `content` through the chunked upload API in two chunks; its session id"""
+    response = client.post('/upload-sessions', json={
+        'filename': filename, 'size': len(content), 'sha256': hashlib.sha256(content).hexdigest()
+    })
+    assert response.status_code == 201
+    upload_id = response.get_json()['id']
+    middle = len(content) // 2
+    assert client.put(f'/upload-sessions/{upload_id}?offset=0', data=content[:middle]).get_json()['offset'] == middle
+    # A retried chunk is told where to resume
+    retry = client.put(f'/upload-sessions/{upload_id}?offset=0', data=content[:middle])
+    assert retry.status_code == 409 and retry.get_json()['offset'] == middle
+    client.put(f'/upload-sessions/{upload_id}?offset={middle}', data=content[middle:])
+    assert client.post(f'/upload-sessions/{upload_id}/finalize').get_json()['complete']
+    return upload_id
+
+def compliance_paths(app):
+    with app.app_context():
+        return [row['file_path'] for row in app.get_db().execute('SELECT file_path FROM compliance_docs')]
+
+def test_finalize_rejects_a_hash_mismatch(client):
+    response = client.post('/upload-sessions', json={
+        'filename': 'licenca.pdf', 'size': len(CONTENT), 'sha256': hashlib.sha256(b'other').hexdigest()
+    })
+    upload_id = response.get_json()['id']
+    client.put(f'/upload-sessions/{upload_id}?offset=0', data=CONTENT)
+    response = client.post(f'/upload-sessions/{upload_id}/finalize')
+    assert response.status_code == 422
+    assert response.get_json()['offset'] == 0
+
+def test_form_saves_a_chunked_upload(app, client):
+    upload_id = upload(client)
+    response = client.post('/compliance/new', data={'title': 'Licença ambiental', 'document_file_upload': upload_id})
+    assert response.status_code == 302
+    [path] = compliance_paths(app)
+    with open(path, 'rb') as f:
+        assert f.read() == CONTENT
+
+def test_form_with_an_unknown_upload_is_not_saved(app, client):
+    response = client.post('/compliance/new', data={'title': 'Licença ambiental', 'document_file_upload': 'f' * 32})
+    assert response.status_code == 200
+    assert b'please upload it again' in response.data
+    assert compliance_paths(app) == []
+
+def test_edit_with_an_unknown_upload_keeps_the_record(app, client):
+    client.post('/compliance/new', data={'title': 'Licença ambiental', 'document_file_upload': upload(client)})
+    [path] = compliance_paths(app)
+    response = client.post('/compliance/1/edit', data={'title': 'Licença renovada', 'document_file_upload': 'f' * 32})
+    assert response.status_code == 200
+    assert b'please upload it again' in response.data
+    with app.app_context():
+        document = app.get_db().execute('SELECT title, file_path FROM compliance_docs').fetchone()
+    assert (document['title'], document['file_path']) == ('Licença ambiental', path)
+
+def test_training_with_an_unknown_certificate_upload_is_not_saved(app, client):
+    with app.app_context():
+        db = app.get_db()
+        db.execute("INSERT INTO workers (name) VALUES ('João')")
+        db.execute("INSERT INTO trainings (title, validity_months) VALUES ('NR-35', 24)")
+        db.commit()
+    response = client.post('/training/assign', data={
+        'worker_id': 1, 'training_id': 1, 'completion_date': '2026-10-01', 'certificate_upload': 'f' * 32
+    })
+    assert response.status_code == 200
+    assert b'please upload it again' in response.data
+    with app.app_context():
+        assert app.get_db().execute('SELECT COUNT(*) FROM worker_trainings').fetchone()[0] == 0
@@ -0,0 +1,85 @@
+from webhooks import apply_payment, process_webhook_inbox, record_webhook
+
+def create_user(db):
+    return db.execute(
+        "INSERT INTO users (username, email, password_hash) VALUES ('ana', 'ana@example.com', 'x')"
+    ).lastrowid
+
+def user_plan(db, user_id):
+    row = db.execute('SELECT subscription_plan, subscription_status FROM users WHERE id = ?', (user_id,)).fetchone()
+    return row['subscription_plan'], row['subscription_status']
+
+def test_duplicate_notification_is_recorded_once(db):
+    payload = {'type': 'payment', 'data': {'id': '123'}}
+    record_webhook(db, 'payment', '123', payload)
+    record_webhook(db, 'payment', '123', payload)
+    db.commit()
+    rows = db.execute('SELECT status, attempts FROM webhook_inbox').fetchall()
+    assert [(row['status'], row['attempts']) for row in rows] == [('pending', 0)]
+
+def test_duplicate_notification_applies_payment_once(db, payment_api):
+    user_id = create_user(db)
+    payment_api.payments['123'] = {'id': 123, 'status': 'approved', 'external_reference': str(user_id),
+                                   'transaction_amount': 49.9}
+    payload = {'type': 'payment', 'data': {'id': '123'}}
+    record_webhook(db, 'payment', '123', payload)
+    db.commit()
+    assert process_webhook_inbox(db) == 1
+
+    # The provider notifies again after the payment was processed
+    record_webhook(db, 'payment', '123', payload)
+    db.commit()
+    assert process_webhook_inbox(db) == 1
+
+    assert db.execute('SELECT COUNT(*) FROM subscription_payments').fetchone()[0] == 1
+    assert db.execute("SELECT status FROM webhook_inbox").fetchone()['status'] == 'done'
+    assert user_plan(db, user_id) == ('pro', 'active')
+
+def test_apply_approved_payment(db):
+    user_id = create_user(db)
+    payment = {'id': 7, 'status': 'approved', 'external_reference': str(user_id), 'transaction_amount': 49.9}
+    assert apply_payment(db, payment)
+    assert not apply_payment(db, payment)
+    assert user_plan(db, user_id) == ('pro', 'active')
+    row = db.execute('SELECT * FROM subscription_payments').fetchone()
+    assert (row['payment_id'], row['user_id'], row['amount']) == ('7', user_id, 49.9)
+
+def test_apply_rejected_payment(db):
+    user_id = create_user(db)
+    payment = {'id': 8, 'status': 'rejected', 'external_reference': str(user_id)}
+    assert not apply_payment(db, payment)
+    assert user_plan(db, user_id) == ('free_trial', 'trial')
+    assert db.execute('SELECT COUNT(*) FROM subscription_payments').fetchone()[0] == 0
+
+def test_rejected_payment_is_processed_without_upgrade(db, payment_api):
+    user_id = create_user(db)
+    payment_api.payments['9'] = {'id': 9, 'status': 'rejected', 'external_reference': str(user_id)}
+    record_webhook(db, 'payment', '9', {})
+    db.commit()
+    assert process_webhook_inbox(db) == 1
+    assert db.execute('SELECT status FROM webhook_inbox').fetchone()['status'] == 'done'
+    assert user_plan(db, user_id) == ('free_trial', 'trial')
+
+def test_payment_lookup_retries_server_errors(db, payment_api):
+    user_id = create_user(db)
+    payment_api.payments['5'] = {'id': 5, 'status': 'approved', 'external_reference': str(user_id)}
+    payment_api.failures['5'] = 2
+    record_webhook(db, 'payment', '5', {})
+    db.commit()
+    assert process_webhook_inbox(db) == 1
+    assert payment_api.requests == [('GET', '/v1/payments/5')] * 3
+    assert user_plan(db, user_id) == ('pro', 'active')
+
+def test_failed_lookup_is_retried_later(db, payment_api):
+    record_webhook(db, 'payment', '404', {})
+    db.commit()
+    assert process_webhook_inbox(db) == 0
+    row = db.execute('SELECT status, attempts, error FROM webhook_inbox').fetchone()
+    assert (row['status'], row['attempts']) == ('pending', 1)
+    assert 'HTTP 404' in row['error']
+
+def test_unknown_topic_is_ignored(db):
+    record_webhook(db, 'merchant_order', '1', {})
+    db.commit()
+    assert process_webhook_inbox(db) == 0
+    assert db.execute('SELECT status FROM webhook_inbox').fetchone()['status'] == 'ignored'
@@ -0,0 +1,120 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from scheduler import job, format_timestamp, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_BATCH = 100
+WEBHOOK_MAX_ATTEMPTS = 8
+SUBSCRIPTION_DAYS = 30
+
+def parse_notification(data, args):
+    """(topic, resource_id) of a MercadoPago notification.
+
+    Webhooks send {"type": "payment", "data": {"id": ...}}; IPN-style
+    notifications use ?topic=payment&id=... instead."""
+    data = data if isinstance(data, dict) else {}
+    topic = data.get('type') or data.get('topic') or args.get('type') or args.get('topic')
+    resource = data.get('data') if isinstance(data.get('data'), dict) else {}
+    resource_id = resource.get('id') or args.get('data.id') or args.get('id')
+    if not resource_id and isinstance(data.get('resource'), str):
+        resource_id = data['resource'].rstrip('/').rsplit('/', 1)[-1]
+    if not topic or not resource_id:
+        return None, None
+    return str(topic), str(resource_id)
+
+def record_webhook(db, topic, resource_id, payload):
+    """Store a notification in the inbox (caller commits).
+
+    Provider retries of a pending notification are no-ops. A notification
+    for a resource that was already processed puts it back in the queue,
+    since MercadoPago notifies again when a payment's status changes."""
+    now = format_timestamp(datetime.now())
+    db.execute(
+        'INSERT INTO webhook_inbox (topic, resource_id, payload, received_at, next_attempt_at) '
+        'VALUES (?, ?, ?, ?, ?) '
+        'ON CONFLICT (topic, resource_id) DO UPDATE SET '
+        "status = 'pending', attempts = 0, error = NULL, payload = excluded.payload, "
+        'received_at = excluded.received_at, next_attempt_at = excluded.next_attempt_at '
+        "WHERE webhook_inbox.status != 'pending'",
+        (topic, resource_id, json.dumps(payload), now, now)
+    )
+
+def apply_payment(db, payment):
+    """Activate Pro for an approved payment, once per payment id (caller commits)"""
+    user_id = payment.get('external_reference')
+    if payment.get('status') != 'approved' or not user_id:
+        return False
+    now = datetime.now()
+    inserted = db.execute(
+        'INSERT OR IGNORE INTO subscription_payments (payment_id, user_id, status, amount, applied_at) '
+        'VALUES (?, ?, ?, ?, ?)',
+        (str(payment.get('id')), int(user_id), payment.get('status'),
+         payment.get('transaction_amount'), format_timestamp(now))
+    ).rowcount
+    if not inserted:
+        return False
+    db.execute('''
+        UPDATE users
+        SET subscription_plan = ?,
+            subscription_status = ?,
+            subscription_start_date = ?,
+            subscription_end_date = ?
+        WHERE id = ?
+    ''', ('pro', 'active', now, now + timedelta(days=SUBSCRIPTION_DAYS), int(user_id)))
+    return True
+
+def handle_payment(db, resource_id):
+    from subscription_utils import init_mercadopago
+    payment_response = init_mercadopago().payment().get(resource_id)
+    if payment_response['status'] != 200:
+        raise RuntimeError(f"Payment lookup failed with HTTP {payment_response['status']}")
+    return apply_payment(db, payment_response['response'])
+
+# topic -> handler(db, resource_id)
+WEBHOOK_HANDLERS = {
+    'payment': handle_payment,
+}
+
+def process_webhook_inbox(db):
+    """Fetch and apply pending notifications; failures are retried with backoff"""
+    now = datetime.now()
+    entries = db.execute(
+        "SELECT * FROM webhook_inbox WHERE status = 'pending' AND next_attempt_at <= ? "
+        'ORDER BY id LIMIT ?',
+        (format_timestamp(now), WEBHOOK_BATCH)
+    ).fetchall()
+    processed = 0
+    for entry in entries:
+        handler = WEBHOOK_HANDLERS.get(entry['topic'])
+        if handler is None:
+            db.execute("UPDATE webhook_inbox SET status = 'ignored', processed_at = ? WHERE id = ?",
+                       (format_timestamp(now), entry['id']))
+            db.commit()
+            continue
+        try:
+            handler(db, entry['resource_id'])
+            db.execute("UPDATE webhook_inbox SET status = 'done', processed_at = ? WHERE id = ?",
+                       (format_timestamp(datetime.now()), entry['id']))
+            db.commit()
+            processed += 1
+        except Exception as e:
+            db.rollback()
+            attempts = entry['attempts'] + 1
+            logger.warning('Webhook %s/%s failed (attempt %s): %s',
+                           entry['topic'], entry['resource_id'], attempts, e)
+            db.execute(
+                'UPDATE webhook_inbox SET status = ?, attempts = ?, error = ?, next_attempt_at = ? '
+                'WHERE id = ?',
+                ('failed' if attempts >= WEBHOOK_MAX_ATTEMPTS else 'pending', attempts, str(e),
+                 format_timestamp(datetime.now() + timedelta(seconds=backoff_delay(attempts))),
+                 entry['id'])
+            )
+            db.commit()
+    return processed
+
+@job('process_webhooks', '* * * * *')
+def process_webhooks(db):
+    """Apply MercadoPago notifications stored by subscription.webhook"""
+    return process_webhook_inbox(db)